@@ -18,6 +18,16 @@ class Settings(BaseSettings):
     OCR_GENERAL_POINTS_COST: int = 50
     JFBYM_POINTS_COST: int = 10
 
+    # 积分账本：预留超时、批量写库、对账
+    POINTS_HOLD_SECONDS: int = 600
+    POINTS_FLUSH_INTERVAL: float = 1.0
+    POINTS_FLUSH_BATCH: int = 200
+    POINTS_RECONCILE_INTERVAL: int = 60
+
+    # 图像识别结果缓存：过期时间（秒）、进程内缓存条数
+    RECOGNITION_CACHE_TTL: int = 300
+    RECOGNITION_LOCAL_CACHE_SIZE: int = 512
+
     AICHAT_BASE_URL: str
     AICHAT_API_KEY: str
 
@@ -2,6 +2,7 @@ from fastapi import Depends, Header, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
 from app.services.point import UserPointService
+from app.services.recognition import RecognitionGateway
 from app.database import get_db
 from app.redis_op import get_redis
 
@@ -27,3 +28,7 @@ def get_user_point_service(
     db: AsyncSession = Depends(get_db), redis: Redis = Depends(get_redis)
 ) -> UserPointService:
     return UserPointService(db, redis)
+
+
+def get_recognition_gateway(redis: Redis = Depends(get_redis)) -> RecognitionGateway:
+    return RecognitionGateway(redis)
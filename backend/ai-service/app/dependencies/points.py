@@ -6,6 +6,7 @@ from app.services.point import (
     PointTransactionType,
     InsufficientPointsError,
 )
+from app.services.points_ledger import Reservation
 from app.dependencies import get_user_point_service, get_user_id_from_header
 logger = get_logger(__name__)
 
@@ -21,28 +22,33 @@ class PointChecker:
     ):
         logger.info("Checking points call...")
         try:
-            # 先尝试增加积分，内部使用了 Redis，性能开销很小
-            await userpoints_service.grant_monthly_points(current_user_id)
-
-            # 检查用户积分
-            points = await userpoints_service.get_cached_points(current_user_id)
-            if points < self.points_cost:
-                raise HTTPException(
-                    status_code=403,
-                    detail="Insufficient points.",
-                )
-
-            # 返回包含用户信息和扣除积分方法的对象
-            return PointsContext(
-                user_id=current_user_id,
-                service=userpoints_service,
-                points_cost=self.points_cost,
-                transaction_type=self.transaction_type,
+            # 检查并预留积分，月度积分补发、余额加载都在积分账本里处理，正常只需一次 Redis 往返
+            reservation = await userpoints_service.reserve_points(
+                current_user_id, self.points_cost, self.transaction_type
+            )
+        except InsufficientPointsError:
+            raise HTTPException(
+                status_code=403,
+                detail="Insufficient points.",
             )
         except Exception as e:
             logger.error(f"Failed to check points: {str(e)}")
             raise e
 
+        # 返回包含用户信息和扣除积分方法的对象
+        context = PointsContext(
+            user_id=current_user_id,
+            service=userpoints_service,
+            points_cost=self.points_cost,
+            transaction_type=self.transaction_type,
+            reservation=reservation,
+        )
+        try:
+            yield context
+        finally:
+            # 请求结束仍未扣除（失败或未成功），释放预留的积分
+            await context.release()
+
 
 class PointsContext:
     def __init__(
@@ -51,28 +57,35 @@ class PointsContext:
         service: UserPointService,
         points_cost: int,
         transaction_type: PointTransactionType,
+        reservation: Reservation,
     ):
         self.user_id = user_id
         self.service = service
         self.points_cost = points_cost
         self.transaction_type = transaction_type
+        self.reservation = reservation
+        self.committed = False
 
     async def deduct_points(self):
         """扣除积分"""
+        if self.committed:
+            return True
         try:
-            await self.service.deduct_points(
-                user_id=self.user_id,
-                amount=self.points_cost,
-                transaction_type=self.transaction_type,
-            )
+            await self.service.commit_points(self.reservation)
+            self.committed = True
             return True
-        except InsufficientPointsError:
-            raise HTTPException(
-                status_code=403,
-                detail="Insufficient points.",
-            )
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to deduct points: {str(e)}",
             )
+
+    async def release(self):
+        """释放预留的积分"""
+        if self.committed:
+            return
+        try:
+            await self.service.release_points(self.reservation)
+        except Exception as e:
+            # 释放失败时由积分账本在预留超时后释放
+            logger.error(f"Failed to release points reservation {self.reservation.id}: {str(e)}")
@@ -1,7 +1,12 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from app.config import get_settings
+from app import redis_op
 from app.redis_op import init_redis_pool, close_redis_pool
+from app.utils.http_client import close_http_clients
+from app.database import AsyncSessionLocal
+from app.services.points_ledger import PointsLedgerWorker
+from redis.asyncio import Redis
 from app.internal import admin
 from app.routers.v1 import chat
 from app.routers.v1 import models
@@ -20,8 +25,17 @@ async def lifespan(app: FastAPI):
     # Initialize connections
     await init_redis_pool()
 
+    # 积分账本：批量写库、释放超时预留、对账
+    points_worker = PointsLedgerWorker(
+        Redis(connection_pool=redis_op.redis_pool), AsyncSessionLocal
+    )
+    points_worker.start()
+
     yield
 
+    await points_worker.stop()
+    await close_http_clients()
+
     # Cleanup connections
     await close_redis_pool()
 
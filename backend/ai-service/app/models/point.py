@@ -5,6 +5,9 @@ from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
 
+# SQLite 只有 INTEGER PRIMARY KEY 才会自增
+BigIntegerPK = BigInteger().with_variant(Integer, "sqlite")
+
 class PointTransactionType(enum.Enum):
     MONTHLY_GRANT = "monthly_grant"
     MONTHLY_RESET = "monthly_reset"
@@ -37,7 +40,7 @@ POINT_TYPE_EXPIRATION_POLICIES = {
 class PointAllocation(Base):
     __tablename__ = "point_allocations"
     
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     user_id = Column(String(50), nullable=False, index=True)
     initial_amount = Column(Integer, nullable=False)  # Original allocated amount
     remaining_amount = Column(Integer, nullable=False)  # Current remaining amount
@@ -54,7 +57,7 @@ class PointAllocation(Base):
 class PointConsumption(Base):
     __tablename__ = "point_consumptions"
     
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     transaction_id = Column(BigInteger, ForeignKey("point_transactions.id"), nullable=False)
     allocation_id = Column(BigInteger, ForeignKey("point_allocations.id"), nullable=False)
     amount = Column(Integer, nullable=False)  # How many points were used from this allocation
@@ -63,7 +66,7 @@ class PointConsumption(Base):
 class PointTransaction(Base):
     __tablename__ = "point_transactions"
     
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     user_id = Column(String(100), nullable=False, index=True)
     amount = Column(Integer, nullable=False)  # Total transaction amount (positive or negative)
     transaction_type = Column(String(50), nullable=False)
@@ -2,9 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException
 import httpx
 from app.logger import get_logger
 from app.schemas.jfbym import JFBYMGeneralRequestBody, JFBYMGeneralResponseBody
-from app.utils.jfbym import verify_captcha, CaptchaVerificationError
+from app.utils.jfbym import CaptchaVerificationError
 from app.services.point import PointTransactionType
+from app.dependencies import get_recognition_gateway
 from app.dependencies.points import PointChecker, PointsContext
+from app.services.recognition import RecognitionGateway
 from app.config import get_settings
 
 
@@ -21,19 +23,20 @@ async def general(
     points_context: PointsContext = Depends(
         PointChecker(get_settings().JFBYM_POINTS_COST, PointTransactionType.JFBYM_COST),
     ),
+    gateway: RecognitionGateway = Depends(get_recognition_gateway),
 ):
     try:
-        payload = params.model_dump(exclude_none=True)
-        logger.info(f"JFBYM processing request: {payload}")
-        result = await verify_captcha(**payload)
-        if result.code == 10000 and result.data.code == 0:
-            # 成功时才扣除积分
-            await points_context.deduct_points()
-            logger.info("JFBYM processing successful, points deducted for user")
+        logger.info(f"JFBYM processing request: type={params.type}, direction={params.direction}")
+        # 相同图片和参数优先返回缓存结果，未命中时调用上游
+        result, fetched = await gateway.captcha(params)
+        if result.code == 10000 and result.data is not None and result.data.code == 0:
+            if fetched:
+                # 实际调用上游并成功时才扣除积分
+                await points_context.deduct_points()
+                logger.info("JFBYM processing successful, points deducted for user")
         else:
             # API返回错误，不扣除积分
-            error_message = result.get("message", "Unknown API error")
-            logger.warning(f"JFBYM API returned error: {error_message}")
+            logger.warning(f"JFBYM API returned error: {result.msg}")
         return result
 
     except CaptchaVerificationError as e:
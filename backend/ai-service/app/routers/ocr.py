@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.schemas.ocr import OCRGeneralRequestBody, OCRGeneralResponseBody
-from app.utils.ocr import recognize_text_from_image, OCRError
+from app.utils.ocr import OCRError
 from app.services.point import PointTransactionType
+from app.dependencies import get_recognition_gateway
 from app.dependencies.points import PointChecker, PointsContext
+from app.services.recognition import RecognitionGateway
 from app.config import get_settings
 from app.logger import get_logger
 import httpx
@@ -23,6 +25,7 @@ async def general_ocr(
             get_settings().OCR_GENERAL_POINTS_COST, PointTransactionType.XFYUN_COST
         ),
     ),
+    gateway: RecognitionGateway = Depends(get_recognition_gateway),
 ):
     """
     Perform OCR on an image using Xunfei's general text recognition API.
@@ -49,14 +52,12 @@ async def general_ocr(
         HTTPException: 400 for invalid requests, 500 for server errors, 503 for network issues
     """
     try:
-        # 调用上游 OCR 服务
-        result = await recognize_text_from_image(
-            params.image, params.encoding, params.status
-        )
+        # 相同图片和参数优先返回缓存结果，未命中时调用上游 OCR 服务
+        result, fetched = await gateway.ocr(params)
 
         # 检查结果并处理积分扣除
-        if result.header.code == 0:
-            # 成功时才扣除积分
+        if result.header.code == 0 and fetched:
+            # 实际调用上游并成功时才扣除积分
             await points_context.deduct_points()
             logger.info("OCR processing successful, points deducted for user")
 
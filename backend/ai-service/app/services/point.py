@@ -14,44 +14,53 @@ from app.models.point import (
     calculate_expiration_date,
 )
 from app.config import get_settings
+from app.services.points_ledger import (
+    PointsLedger,
+    Reservation,
+    RESERVE_INSUFFICIENT,
+    RESERVE_NEEDS_GRANT,
+    RESERVE_NEEDS_LOAD,
+)
 
 logger = get_logger(__name__)
 
+# reserve 时补发月度积分、加载余额后重试的次数
+RESERVE_ATTEMPTS = 5
+
 class UserPointService:
     def __init__(self, db: AsyncSession, redis: Redis):
         self.db = db
         self.redis = redis
+        self.ledger = PointsLedger(redis)
 
     async def get_cached_points(self, user_id: str) -> int:
         try:
-            cached_points = await self.redis.get(f"user_points:{user_id}")
+            cached_points = await self.ledger.balance(user_id)
             if cached_points is not None:
-                return int(cached_points)
+                return cached_points
         except Exception as e:
             # Log the error if needed
             logger.error(f"Error fetching cached points for user {user_id}: {e}")
 
         # Fallback to database if cache miss
-        user_point = await self._calculate_user_points(user_id)
-        await self._set_cached_points(user_id, user_point)
-
-        return user_point
+        return await self.load_points(user_id)
 
-    async def _set_cached_points(self, user_id: str, points: int):
+    async def load_points(self, user_id: str) -> int:
+        """从数据库加载余额到积分账本"""
         try:
-            await self.redis.set(f"user_points:{user_id}", points, ex=3600)
+            points = await self.ledger.load(user_id, lambda: self._calculate_user_points(user_id))
+            if points is not None:
+                return points
         except Exception as e:
-            # Log the error if needed
-            logger.error(f"Error setting cached points for user {user_id}: {e}")
-            pass
+            logger.error(f"Error loading points for user {user_id}: {e}")
+        return await self._calculate_user_points(user_id)
 
-    async def _clear_cached_points(self, user_id: str):
+    async def _adjust_cached_points(self, user_id: str, delta: int):
         try:
-            await self.redis.delete(f"user_points:{user_id}")
+            await self.ledger.adjust(user_id, delta)
         except Exception as e:
             # Log the error if needed
-            logger.error(f"Error clearing cached points for user {user_id}: {e}")
-            pass
+            logger.error(f"Error adjusting cached points for user {user_id}: {e}")
 
     async def _get_available_allocations(self, user_id: str):
         current_time = datetime.now(timezone.utc)
@@ -124,8 +133,8 @@ class UserPointService:
         )
         self.db.add(transaction)
 
-        # Clear the user's cached balance
-        await self._clear_cached_points(user_id)
+        # Add the points to the user's cached balance
+        await self._adjust_cached_points(user_id, amount)
 
         await self.db.flush()
         return allocation
@@ -256,14 +265,45 @@ class UserPointService:
 
         # 4. Update UserPoint cache
         # NOTE: 绝大部分场景都是扣除积分，所以这里直接更新缓存。如果直接清理，则会导致每次重新计算，性能不升反降。
-        user_point = await self.get_cached_points(user_id)
-        user_point -= amount
-        await self._set_cached_points(user_id, user_point)
-
-        await self.db.flush()
+        await self._adjust_cached_points(user_id, -amount)
 
         return transaction
 
+    async def reserve_points(
+        self, user_id: str, amount: int, transaction_type: PointTransactionType
+    ) -> Reservation:
+        """原子地检查并预留积分，正常情况下只需一次 Redis 往返"""
+        if amount <= 0:
+            raise ValueError("Amount must be greater than zero.")
+
+        for _ in range(RESERVE_ATTEMPTS):
+            code, value = await self.ledger.reserve(user_id, amount, transaction_type.value)
+            if code > 0:
+                return Reservation(
+                    id=code,
+                    user_id=user_id,
+                    amount=amount,
+                    transaction_type=transaction_type.value,
+                )
+            if code == RESERVE_INSUFFICIENT:
+                raise InsufficientPointsError(
+                    f"User {user_id} has only {value} points, but {amount} are required."
+                )
+            if code == RESERVE_NEEDS_GRANT:
+                await self.grant_monthly_points(user_id)
+            elif code == RESERVE_NEEDS_LOAD:
+                await self.load_points(user_id)
+
+        raise RuntimeError(f"Failed to reserve points for user {user_id}")
+
+    async def commit_points(self, reservation: Reservation) -> bool:
+        """扣除预留的积分，数据库由积分账本的后台任务批量更新"""
+        return await self.ledger.commit(reservation)
+
+    async def release_points(self, reservation: Reservation) -> bool:
+        """释放未扣除的预留积分"""
+        return await self.ledger.release(reservation.id, reservation.user_id)
+
 
 class InsufficientPointsError(Exception):
     """自定义异常类，表示积分不足的错误"""
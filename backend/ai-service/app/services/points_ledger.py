@@ -0,0 +1,484 @@
+"""
+Points ledger
+
+The per-user balance lives in Redis and is only changed by Lua scripts, so a
+check and a deduction can never interleave with another request:
+
+- reserve: one round-trip that checks the monthly grant marker, checks the
+  balance and holds the cost. Returns a reservation id.
+- commit: turns a hold into a charge and appends an event for the write-behind
+  worker. Committing twice is a no-op.
+- release: gives a hold back (request failed, or the hold expired).
+
+The durable ``PointAllocation`` rows are updated by ``PointsLedgerWorker`` in
+batches. Until an event is flushed, its amount is tracked in a per-user
+``pending`` counter, so that
+
+    balance = sum(remaining_amount in DB) - pending - held
+
+holds at all times. Every script that changes one of these values bumps a
+per-user version, and loading the balance from the DB is a compare-and-set
+on that version.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.logger import get_logger
+from app.models.point import (
+    PointAllocation,
+    PointConsumption,
+    PointTransaction,
+)
+
+logger = get_logger(__name__)
+
+BALANCE_KEY = "user_points:{}"
+HELD_KEY = "points_ledger:held:{}"
+PENDING_KEY = "points_ledger:pending:{}"
+VERSION_KEY = "points_ledger:ver:{}"
+HOLD_PREFIX = "points_ledger:hold:"
+HOLDS_KEY = "points_ledger:holds"
+SEQ_KEY = "points_ledger:seq"
+EVENTS_KEY = "points_ledger:events"
+# users to reconcile, scored by when they are due
+DIRTY_KEY = "points_ledger:dirty"
+FLUSH_LOCK_KEY = "points_ledger:flush_lock"
+GRANT_KEY = "points_monthly_grant:{}:{}-{}"
+
+# Entity type of the transactions written by the worker; the id is the reservation id
+RESERVATION_ENTITY = "PointReservation"
+
+BALANCE_TTL = 3600
+# Committed/released holds are kept a while so that late calls stay idempotent
+HOLD_RECORD_TTL = 24 * 3600
+# Reconcile adjusted users only after the request that changed the DB has committed
+RECONCILE_DELAY = 10
+
+# reserve() result codes
+RESERVE_INSUFFICIENT = -1
+RESERVE_NEEDS_LOAD = -2
+RESERVE_NEEDS_GRANT = -3
+
+RESERVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 0 then return {-3, 0} end
+local balance = redis.call('GET', KEYS[1])
+if not balance then return {-2, 0} end
+balance = tonumber(balance)
+local amount = tonumber(ARGV[2])
+if balance < amount then return {-1, balance} end
+local rid = redis.call('INCR', KEYS[4])
+local hold = ARGV[5] .. rid
+redis.call('DECRBY', KEYS[1], amount)
+redis.call('INCRBY', KEYS[2], amount)
+redis.call('HSET', hold, 'user_id', ARGV[1], 'amount', amount, 'type', ARGV[3], 'state', 'held')
+redis.call('EXPIRE', hold, ARGV[6])
+redis.call('ZADD', KEYS[5], ARGV[4], rid)
+redis.call('INCR', KEYS[6])
+return {rid, balance - amount}
+"""
+
+COMMIT_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state')
+if state == 'committed' then return 0 end
+local amount = tonumber(ARGV[3])
+if state == 'held' then
+    redis.call('DECRBY', KEYS[3], amount)
+elseif redis.call('EXISTS', KEYS[2]) == 1 then
+    -- the hold was already released or has expired, charge the balance directly
+    redis.call('DECRBY', KEYS[2], amount)
+end
+redis.call('HSET', KEYS[1], 'user_id', ARGV[2], 'amount', amount, 'type', ARGV[4], 'state', 'committed')
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+redis.call('ZREM', KEYS[6], ARGV[1])
+redis.call('INCRBY', KEYS[4], amount)
+redis.call('RPUSH', KEYS[5], cjson.encode({id = tonumber(ARGV[1]), user_id = ARGV[2], amount = amount,
+    type = ARGV[4], ts = tonumber(ARGV[5])}))
+redis.call('INCR', KEYS[7])
+return 1
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'state') ~= 'held' then return 0 end
+local amount = tonumber(redis.call('HGET', KEYS[1], 'amount'))
+redis.call('HSET', KEYS[1], 'state', 'released')
+redis.call('ZREM', KEYS[4], ARGV[1])
+redis.call('DECRBY', KEYS[3], amount)
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('INCRBY', KEYS[2], amount)
+end
+redis.call('INCR', KEYS[5])
+return 1
+"""
+
+# Applies a change that was written to the DB outside of the ledger (grants, manual adjustments)
+ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+redis.call('INCR', KEYS[2])
+redis.call('ZADD', KEYS[3], ARGV[3], ARGV[2])
+return 1
+"""
+
+LOAD_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then return false end
+if ARGV[3] == '1' then
+    local current = redis.call('GET', KEYS[1])
+    if current then return tonumber(current) end
+end
+local value = tonumber(ARGV[2]) - tonumber(redis.call('GET', KEYS[3]) or '0')
+    - tonumber(redis.call('GET', KEYS[4]) or '0')
+redis.call('SET', KEYS[1], value, 'EX', ARGV[4])
+return value
+"""
+
+# ARGV: number of flushed events, then (user_id, amount) pairs
+ACK_SCRIPT = """
+redis.call('LTRIM', KEYS[1], tonumber(ARGV[1]), -1)
+for i = 2, #ARGV, 2 do
+    redis.call('DECRBY', KEYS[2] .. ARGV[i], ARGV[i + 1])
+    redis.call('INCR', KEYS[3] .. ARGV[i])
+end
+return 1
+"""
+
+UNLOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+@dataclass
+class Reservation:
+    id: int
+    user_id: str
+    amount: int
+    transaction_type: str
+
+
+class PointsLedger:
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._reserve = redis.register_script(RESERVE_SCRIPT)
+        self._commit = redis.register_script(COMMIT_SCRIPT)
+        self._release = redis.register_script(RELEASE_SCRIPT)
+        self._adjust = redis.register_script(ADJUST_SCRIPT)
+        self._load = redis.register_script(LOAD_SCRIPT)
+
+    @staticmethod
+    def grant_key(user_id: str, now: Optional[datetime] = None) -> str:
+        now = now or datetime.now(timezone.utc)
+        return GRANT_KEY.format(user_id, now.year, now.month)
+
+    async def reserve(self, user_id: str, amount: int, transaction_type: str) -> tuple[int, int]:
+        """
+        Hold ``amount`` points.
+
+        Returns:
+            (reservation id, remaining balance) on success, otherwise one of the
+            RESERVE_* codes and the current balance
+        """
+        deadline = time.time() + get_settings().POINTS_HOLD_SECONDS
+        code, value = await self._reserve(
+            keys=[
+                BALANCE_KEY.format(user_id),
+                HELD_KEY.format(user_id),
+                self.grant_key(user_id),
+                SEQ_KEY,
+                HOLDS_KEY,
+                VERSION_KEY.format(user_id),
+            ],
+            args=[user_id, amount, transaction_type, deadline, HOLD_PREFIX, HOLD_RECORD_TTL],
+        )
+        return int(code), int(value)
+
+    async def commit(self, reservation: Reservation) -> bool:
+        """Charge a reservation. Returns False if it was already committed."""
+        user_id = reservation.user_id
+        res = await self._commit(
+            keys=[
+                HOLD_PREFIX + str(reservation.id),
+                BALANCE_KEY.format(user_id),
+                HELD_KEY.format(user_id),
+                PENDING_KEY.format(user_id),
+                EVENTS_KEY,
+                HOLDS_KEY,
+                VERSION_KEY.format(user_id),
+            ],
+            args=[reservation.id, user_id, reservation.amount, reservation.transaction_type, time.time(), HOLD_RECORD_TTL],
+        )
+        return bool(res)
+
+    async def release(self, reservation_id: int, user_id: str) -> bool:
+        """Give a held reservation back. Returns False if it is no longer held."""
+        res = await self._release(
+            keys=[
+                HOLD_PREFIX + str(reservation_id),
+                BALANCE_KEY.format(user_id),
+                HELD_KEY.format(user_id),
+                HOLDS_KEY,
+                VERSION_KEY.format(user_id),
+            ],
+            args=[reservation_id],
+        )
+        return bool(res)
+
+    async def adjust(self, user_id: str, delta: int):
+        """Reflect a DB-side change of the user's allocations; the user is reconciled later."""
+        await self._adjust(
+            keys=[BALANCE_KEY.format(user_id), VERSION_KEY.format(user_id), DIRTY_KEY],
+            args=[delta, user_id, time.time() + RECONCILE_DELAY],
+        )
+
+    async def balance(self, user_id: str) -> Optional[int]:
+        value = await self.redis.get(BALANCE_KEY.format(user_id))
+        return None if value is None else int(value)
+
+    async def load(
+        self,
+        user_id: str,
+        db_points: Callable[[], Awaitable[int]],
+        overwrite: bool = False,
+        attempts: int = 3,
+    ) -> Optional[int]:
+        """
+        Set the balance from the DB total, minus pending and held points.
+
+        Args:
+            db_points: returns the sum of the user's available allocations
+            overwrite: replace an existing balance (reconciliation) instead of keeping it
+
+        Returns:
+            the balance, or None if the ledger kept changing while loading
+        """
+        for _ in range(attempts):
+            version = await self.redis.get(VERSION_KEY.format(user_id)) or "0"
+            points = await db_points()
+            res = await self._load(
+                keys=[
+                    BALANCE_KEY.format(user_id),
+                    VERSION_KEY.format(user_id),
+                    PENDING_KEY.format(user_id),
+                    HELD_KEY.format(user_id),
+                ],
+                args=[version, points, "0" if overwrite else "1", BALANCE_TTL],
+            )
+            if res is not None:
+                return int(res)
+        return None
+
+    async def pending_events(self) -> int:
+        return await self.redis.llen(EVENTS_KEY)
+
+
+class PointsLedgerWorker:
+    """Write-behind worker: flushes committed charges to the DB, reaps expired holds and reconciles balances"""
+
+    def __init__(self, redis: Redis, session_factory: Callable[[], AsyncSession]):
+        self.redis = redis
+        self.session_factory = session_factory
+        self.ledger = PointsLedger(redis)
+        self._ack = redis.register_script(ACK_SCRIPT)
+        self._unlock = redis.register_script(UNLOCK_SCRIPT)
+        self._task: Optional[asyncio.Task] = None
+
+        # stats
+        self.flushed = 0
+        self.batches = 0
+        self.reaped = 0
+        self.reconciled = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # flush what is left before shutting down
+        try:
+            while await self.flush():
+                pass
+        except Exception as e:
+            logger.error(f"Failed to flush points ledger on shutdown: {e}")
+
+    async def _run(self):
+        settings = get_settings()
+        last_reconcile = time.monotonic()
+        while True:
+            try:
+                flushed = await self.flush()
+                await self.reap_expired()
+                if time.monotonic() - last_reconcile >= settings.POINTS_RECONCILE_INTERVAL:
+                    last_reconcile = time.monotonic()
+                    await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Points ledger worker error: {e}", exc_info=True)
+                flushed = 0
+            if flushed < settings.POINTS_FLUSH_BATCH:
+                await asyncio.sleep(settings.POINTS_FLUSH_INTERVAL)
+
+    async def flush(self) -> int:
+        """Write one batch of committed charges to the DB. Returns the number of events flushed."""
+        settings = get_settings()
+        token = uuid.uuid4().hex
+        # only one flusher across all service workers
+        if not await self.redis.set(FLUSH_LOCK_KEY, token, nx=True, ex=60):
+            return 0
+        try:
+            raw = await self.redis.lrange(EVENTS_KEY, 0, settings.POINTS_FLUSH_BATCH - 1)
+            if not raw:
+                return 0
+            events = [json.loads(item) for item in raw]
+
+            async with self.session_factory() as db:
+                await self._apply(db, events)
+                await db.commit()
+
+            per_user: dict[str, int] = {}
+            for event in events:
+                per_user[event["user_id"]] = per_user.get(event["user_id"], 0) + int(event["amount"])
+            args = [len(events)]
+            for user_id, amount in per_user.items():
+                args.extend([user_id, amount])
+            await self._ack(keys=[EVENTS_KEY, PENDING_KEY.format(""), VERSION_KEY.format("")], args=args)
+
+            self.flushed += len(events)
+            self.batches += 1
+            return len(events)
+        finally:
+            await self._unlock(keys=[FLUSH_LOCK_KEY], args=[token])
+
+    async def _apply(self, db: AsyncSession, events: list[dict]):
+        # events re-read after a crash between DB commit and ack are skipped
+        ids = [int(event["id"]) for event in events]
+        result = await db.execute(
+            select(PointTransaction.related_entity_id).where(
+                PointTransaction.related_entity_type == RESERVATION_ENTITY,
+                PointTransaction.related_entity_id.in_(ids),
+            )
+        )
+        done = set(result.scalars().all())
+
+        by_user: dict[str, list[dict]] = {}
+        for event in events:
+            if int(event["id"]) not in done:
+                by_user.setdefault(event["user_id"], []).append(event)
+
+        now = datetime.now(timezone.utc)
+        for user_id, user_events in by_user.items():
+            result = await db.execute(
+                select(PointAllocation)
+                .where(
+                    PointAllocation.user_id == user_id,
+                    PointAllocation.remaining_amount > 0,
+                    PointAllocation.expires_at > now,
+                )
+                .order_by(PointAllocation.priority.desc(), PointAllocation.expires_at.asc())
+            )
+            allocations = list(result.scalars().all())
+
+            for event in user_events:
+                amount = int(event["amount"])
+                transaction = PointTransaction(
+                    user_id=user_id,
+                    amount=-amount,
+                    transaction_type=event["type"],
+                    related_entity_type=RESERVATION_ENTITY,
+                    related_entity_id=int(event["id"]),
+                )
+                db.add(transaction)
+                await db.flush()
+
+                remaining = amount
+                for allocation in allocations:
+                    if remaining <= 0:
+                        break
+                    if allocation.remaining_amount <= 0:
+                        continue
+                    consumed = min(allocation.remaining_amount, remaining)
+                    db.add(
+                        PointConsumption(
+                            transaction_id=transaction.id,
+                            allocation_id=allocation.id,
+                            amount=consumed,
+                        )
+                    )
+                    allocation.remaining_amount -= consumed
+                    remaining -= consumed
+                if remaining > 0:
+                    logger.warning(
+                        f"User {user_id} allocations short by {remaining} points for reservation {event['id']}"
+                    )
+                    await self.redis.zadd(DIRTY_KEY, {user_id: time.time()})
+        await db.flush()
+
+    async def reap_expired(self, now: Optional[float] = None) -> int:
+        """Release holds whose deadline has passed"""
+        now = time.time() if now is None else now
+        expired = await self.redis.zrangebyscore(HOLDS_KEY, "-inf", now, start=0, num=100)
+        count = 0
+        for rid in expired:
+            user_id = await self.redis.hget(HOLD_PREFIX + str(rid), "user_id")
+            if user_id is None:
+                await self.redis.zrem(HOLDS_KEY, rid)
+                continue
+            if await self.ledger.release(int(rid), user_id):
+                count += 1
+        self.reaped += count
+        return count
+
+    async def reconcile(self, limit: int = 100) -> int:
+        """Recompute balances of users whose allocations changed outside the ledger"""
+        now = time.time()
+        user_ids = await self.redis.zrangebyscore(DIRTY_KEY, "-inf", now, start=0, num=limit)
+        if user_ids:
+            await self.redis.zrem(DIRTY_KEY, *user_ids)
+        count = 0
+        for user_id in user_ids:
+            async with self.session_factory() as db:
+
+                async def db_points():
+                    now = datetime.now(timezone.utc)
+                    result = await db.execute(
+                        select(PointAllocation.remaining_amount).where(
+                            PointAllocation.user_id == user_id,
+                            PointAllocation.remaining_amount > 0,
+                            PointAllocation.expires_at > now,
+                        )
+                    )
+                    return sum(result.scalars().all())
+
+                if await self.ledger.load(user_id, db_points, overwrite=True) is None:
+                    await self.redis.zadd(DIRTY_KEY, {user_id: now + RECONCILE_DELAY})
+                else:
+                    count += 1
+        self.reconciled += count
+        return count
+
+    def stats(self) -> dict:
+        return {
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "reaped": self.reaped,
+            "reconciled": self.reconciled,
+        }
@@ -0,0 +1,203 @@
+"""
+Image recognition gateway.
+
+OCR and captcha results are cached by a hash of the decoded image bytes plus
+the recognition parameters, so robots polling the same screen region do not
+send the same image upstream again and again.
+
+- Lookups go to an in-process LRU first, then Redis; only a miss calls upstream
+- Concurrent identical requests in one process share a single upstream call
+- Only successful results are cached, and only the request that actually
+  called upstream is charged points
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from pydantic import BaseModel
+from redis.asyncio import Redis
+
+from app.config import get_settings
+from app.logger import get_logger
+from app.schemas.jfbym import JFBYMGeneralRequestBody, JFBYMGeneralResponseBody
+from app.schemas.ocr import OCRGeneralRequestBody, OCRGeneralResponseBody
+from app.utils.jfbym import verify_captcha
+from app.utils.ocr import recognize_text_from_image
+
+logger = get_logger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+CACHE_PREFIX = "recognition_cache:"
+
+
+def image_digest(kind: str, image: str, params: dict) -> str:
+    """Hash the decoded image bytes together with the recognition parameters."""
+    try:
+        # 按解码后的内容计算，换行等 base64 格式差异不影响命中
+        data = base64.b64decode(image)
+    except (binascii.Error, ValueError):
+        data = image.encode()
+
+    digest = hashlib.sha256(kind.encode())
+    digest.update(b"\0")
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    digest.update(b"\0")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class LocalCache:
+    """In-process LRU with a per-entry TTL, values are serialized results."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expire_at, value = item
+        if expire_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# 进程内共享：本地缓存和进行中的上游请求
+local_cache = LocalCache(
+    get_settings().RECOGNITION_LOCAL_CACHE_SIZE, get_settings().RECOGNITION_CACHE_TTL
+)
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def _consume_exception(future: asyncio.Future):
+    # 没有等待者时避免 "exception was never retrieved" 警告
+    if not future.cancelled():
+        future.exception()
+
+
+class RecognitionGateway:
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self.ttl = get_settings().RECOGNITION_CACHE_TTL
+
+    async def _get_cached(self, key: str) -> str | None:
+        value = local_cache.get(key)
+        if value is not None:
+            return value
+        try:
+            value = await self.redis.get(key)
+        except Exception as e:
+            # 缓存不可用时直接请求上游
+            logger.warning(f"Failed to read recognition cache: {e}")
+            return None
+        if value is not None:
+            local_cache.set(key, value)
+        return value
+
+    async def _set_cached(self, key: str, value: str):
+        local_cache.set(key, value)
+        try:
+            await self.redis.set(key, value, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Failed to write recognition cache: {e}")
+
+    async def recognize(
+        self,
+        kind: str,
+        image: str,
+        params: dict,
+        model: type[T],
+        fetch: Callable[[], Awaitable[T]],
+        cacheable: Callable[[T], bool],
+    ) -> tuple[T, bool]:
+        """
+        Return a cached result or call upstream once for identical requests.
+
+        Returns:
+            The result and whether this request called upstream (and should be charged)
+        """
+        key = f"{CACHE_PREFIX}{kind}:{image_digest(kind, image, params)}"
+
+        while True:
+            cached = await self._get_cached(key)
+            if cached is not None:
+                logger.info(f"Recognition cache hit: {kind}")
+                return model.model_validate_json(cached), False
+
+            future = _inflight.get(key)
+            if future is None:
+                break
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # 发起上游请求的请求被取消，重新查找
+                continue
+            logger.info(f"Recognition request coalesced: {kind}")
+            return result.model_copy(deep=True), False
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        _inflight[key] = future
+        try:
+            result = await fetch()
+            if cacheable(result):
+                await self._set_cached(key, result.model_dump_json())
+            future.set_result(result)
+            return result, True
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            _inflight.pop(key, None)
+
+    async def ocr(self, params: OCRGeneralRequestBody) -> tuple[OCRGeneralResponseBody, bool]:
+        return await self.recognize(
+            "ocr",
+            params.image,
+            {"encoding": params.encoding, "status": params.status},
+            OCRGeneralResponseBody,
+            lambda: recognize_text_from_image(params.image, params.encoding, params.status),
+            lambda result: result.header.code == 0,
+        )
+
+    async def captcha(
+        self, params: JFBYMGeneralRequestBody
+    ) -> tuple[JFBYMGeneralResponseBody, bool]:
+        payload = params.model_dump(exclude_none=True)
+        return await self.recognize(
+            "jfbym",
+            params.image,
+            {key: value for key, value in payload.items() if key != "image"},
+            JFBYMGeneralResponseBody,
+            lambda: verify_captcha(**payload),
+            lambda result: result.code == 10000 and result.data is not None and result.data.code == 0,
+        )
@@ -0,0 +1,47 @@
+"""
+Shared HTTP clients for upstream services.
+
+Each upstream gets one long-lived ``httpx.AsyncClient`` so that TLS sessions
+and keep-alive connections are reused across requests instead of being set
+up and torn down on every call.
+"""
+
+import httpx
+
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 每个上游的连接池上限
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30.0
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def get_http_client(name: str, timeout: float = 30.0) -> httpx.AsyncClient:
+    """Return the pooled client for an upstream, creating it on first use."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+        _clients[name] = client
+    return client
+
+
+async def close_http_clients():
+    """Close all pooled clients, called on application shutdown."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close HTTP client: {e}")
@@ -4,6 +4,7 @@ import httpx
 from app.config import get_settings
 from app.logger import get_logger
 from app.schemas.jfbym import JFBYMGeneralResponseBody
+from app.utils.http_client import get_http_client
 
 API_ENDPOINT = get_settings().JFBYM_ENDPOINT
 API_TOKEN = get_settings().JFBYM_API_TOKEN
@@ -36,20 +37,20 @@ async def verify_captcha(type: str, image: str, direction: str = "") -> JFBYMGen
     if direction:
         payload["direction"] = direction
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(API_ENDPOINT, json=payload, timeout=30.0)
-            response.raise_for_status()
-            logger.info(f"JFBYM response: {response.json()}")
-            model = JFBYMGeneralResponseBody.model_validate(response.json())
-            return model
-
-        except httpx.HTTPError as e:
-            logger.error(f"HTTP error during OCR request: {e}")
-            raise  # Re-raise httpx.HTTPError instead of wrapping it
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to decode JSON response: {e}")
-            raise CaptchaVerificationError("Invalid response format") from e
-        except Exception as e:
-            logger.error(f"Unexpected error during : {e}")
-            raise CaptchaVerificationError(f"Unexpected error: {str(e)}")
\ No newline at end of file
+    client = get_http_client("jfbym")
+    try:
+        response = await client.post(API_ENDPOINT, json=payload, timeout=30.0)
+        response.raise_for_status()
+        logger.info(f"JFBYM response: {response.json()}")
+        model = JFBYMGeneralResponseBody.model_validate(response.json())
+        return model
+
+    except httpx.HTTPError as e:
+        logger.error(f"HTTP error during OCR request: {e}")
+        raise  # Re-raise httpx.HTTPError instead of wrapping it
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to decode JSON response: {e}")
+        raise CaptchaVerificationError("Invalid response format") from e
+    except Exception as e:
+        logger.error(f"Unexpected error during : {e}")
+        raise CaptchaVerificationError(f"Unexpected error: {str(e)}")
\ No newline at end of file
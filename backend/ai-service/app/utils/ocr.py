@@ -28,6 +28,7 @@ import httpx
 from app.config import get_settings
 from app.logger import get_logger
 from app.schemas.ocr import OCRGeneralResponseBody
+from app.utils.http_client import get_http_client
 
 logger = get_logger(__name__)
 
@@ -164,11 +165,14 @@ async def recognize_text_from_image(
             "app_id": APP_ID,
         }
 
-        # Make async request
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
-                authenticated_url, data=json.dumps(request_payload), headers=headers
-            )
+        # Make async request on the pooled client
+        client = get_http_client("xfyun")
+        response = await client.post(
+            authenticated_url,
+            data=json.dumps(request_payload),
+            headers=headers,
+            timeout=timeout,
+        )
 
         response.raise_for_status()
         result = response.json()
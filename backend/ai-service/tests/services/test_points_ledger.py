@@ -0,0 +1,207 @@
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import get_settings
+from app.database import Base
+from app.models.point import PointAllocation, PointTransaction, PointTransactionType
+from app.services.point import InsufficientPointsError, UserPointService
+from app.services.points_ledger import (
+    HOLDS_KEY,
+    PENDING_KEY,
+    PointsLedger,
+    PointsLedgerWorker,
+)
+
+USER_ID = "ledger-user"
+COST = 100
+
+
+@pytest_asyncio.fixture(scope="function")
+async def redis():
+    redis = FakeRedis(server=FakeServer(), decode_responses=True)
+    yield redis
+    await redis.aclose()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'points.db'}")
+
+    from app.models import load_models
+
+    load_models()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    await engine.dispose()
+
+
+async def add_points(session_factory, redis, amount: int):
+    """给用户发放积分，并标记本月已发放月度积分"""
+    async with session_factory() as db:
+        service = UserPointService(db, redis)
+        await service.manual_add_points(USER_ID, amount)
+        await db.commit()
+    await redis.set(PointsLedger.grant_key(USER_ID), "1")
+
+
+async def db_remaining(session_factory) -> int:
+    async with session_factory() as db:
+        result = await db.execute(
+            select(func.sum(PointAllocation.remaining_amount)).where(PointAllocation.user_id == USER_ID)
+        )
+        return result.scalar() or 0
+
+
+@pytest.mark.asyncio
+async def test_reserve_grants_monthly_points(session_factory, redis):
+    async with session_factory() as db:
+        service = UserPointService(db, redis)
+        reservation = await service.reserve_points(USER_ID, COST, PointTransactionType.AICHAT_COST)
+        await db.commit()
+
+    assert reservation.amount == COST
+    assert await service.ledger.balance(USER_ID) == get_settings().MONTHLY_GRANT_AMOUNT - COST
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reserve_never_overspends(session_factory, redis):
+    await add_points(session_factory, redis, 10 * COST)
+
+    async def reserve():
+        async with session_factory() as db:
+            service = UserPointService(db, redis)
+            try:
+                return await service.reserve_points(USER_ID, COST, PointTransactionType.AICHAT_COST)
+            except InsufficientPointsError:
+                return None
+
+    results = await asyncio.gather(*(reserve() for _ in range(50)))
+    assert len([r for r in results if r is not None]) == 10
+    assert await PointsLedger(redis).balance(USER_ID) == 0
+
+
+@pytest.mark.asyncio
+async def test_reserve_is_one_round_trip(session_factory, redis):
+    await add_points(session_factory, redis, 10 * COST)
+    async with session_factory() as db:
+        service = UserPointService(db, redis)
+        # 第一次调用时加载脚本
+        await service.commit_points(await service.reserve_points(USER_ID, COST, PointTransactionType.AICHAT_COST))
+
+        calls = []
+        execute_command = redis.execute_command
+
+        async def counting(*args, **kwargs):
+            calls.append(args[0])
+            return await execute_command(*args, **kwargs)
+
+        redis.execute_command = counting
+        reservation = await service.reserve_points(USER_ID, COST, PointTransactionType.AICHAT_COST)
+        assert calls == ["EVALSHA"]
+
+        calls.clear()
+        await service.commit_points(reservation)
+        assert calls == ["EVALSHA"]
+
+
+@pytest.mark.asyncio
+async def test_commit_is_flushed_once(session_factory, redis):
+    await add_points(session_factory, redis, 10 * COST)
+    worker = PointsLedgerWorker(redis, session_factory)
+
+    async with session_factory() as db:
+        service = UserPointService(db, redis)
+        reservation = await service.reserve_points(USER_ID, COST, PointTransactionType.XFYUN_COST)
+        assert await service.commit_points(reservation)
+        assert not await service.commit_points(reservation)
+
+    assert await redis.get(PENDING_KEY.format(USER_ID)) == str(COST)
+    assert await db_remaining(session_factory) == 10 * COST
+
+    assert await worker.flush() == 1
+    assert await worker.flush() == 0
+    assert await redis.get(PENDING_KEY.format(USER_ID)) == "0"
+    assert await db_remaining(session_factory) == 9 * COST
+
+    async with session_factory() as db:
+        result = await db.execute(select(func.count()).select_from(PointTransaction).where(PointTransaction.amount < 0))
+        assert result.scalar() == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_after_crash_is_idempotent(session_factory, redis):
+    await add_points(session_factory, redis, 10 * COST)
+    worker = PointsLedgerWorker(redis, session_factory)
+
+    async with session_factory() as db:
+        service = UserPointService(db, redis)
+        reservation = await service.reserve_points(USER_ID, COST, PointTransactionType.JFBYM_COST)
+        await service.commit_points(reservation)
+
+    # 写库成功但确认前崩溃，事件仍在队列里
+    events = [{"id": reservation.id, "user_id": USER_ID, "amount": COST, "type": reservation.transaction_type}]
+    async with session_factory() as db:
+        await worker._apply(db, events)
+        await db.commit()
+
+    assert await worker.flush() == 1
+    assert await db_remaining(session_factory) == 9 * COST
+    assert await redis.get(PENDING_KEY.format(USER_ID)) == "0"
+
+
+@pytest.mark.asyncio
+async def test_release_and_reap(session_factory, redis):
+    await add_points(session_factory, redis, 10 * COST)
+    worker = PointsLedgerWorker(redis, session_factory)
+
+    async with session_factory() as db:
+        service = UserPointService(db, redis)
+        released = await service.reserve_points(USER_ID, COST, PointTransactionType.AICHAT_COST)
+        expired = await service.reserve_points(USER_ID, COST, PointTransactionType.AICHAT_COST)
+        assert await service.ledger.balance(USER_ID) == 8 * COST
+
+        assert await service.release_points(released)
+        assert not await service.release_points(released)
+        assert await service.ledger.balance(USER_ID) == 9 * COST
+
+        assert await worker.reap_expired(now=time.time() + get_settings().POINTS_HOLD_SECONDS + 1) == 1
+        assert await redis.zcard(HOLDS_KEY) == 0
+        assert await service.ledger.balance(USER_ID) == 10 * COST
+
+        # 预留超时后仍然成功的请求照常扣除
+        await service.commit_points(expired)
+        assert await service.ledger.balance(USER_ID) == 9 * COST
+
+
+@pytest.mark.asyncio
+async def test_reconcile_matches_db(session_factory, redis):
+    await add_points(session_factory, redis, 10 * COST)
+    worker = PointsLedgerWorker(redis, session_factory)
+
+    async with session_factory() as db:
+        service = UserPointService(db, redis)
+        held = await service.reserve_points(USER_ID, COST, PointTransactionType.AICHAT_COST)
+        charged = await service.reserve_points(USER_ID, COST, PointTransactionType.AICHAT_COST)
+        await service.commit_points(charged)
+        await redis.set(f"user_points:{USER_ID}", 12345)
+
+    # 余额被改乱后，对账按 数据库 - 待写库 - 预留 恢复
+    await redis.zadd("points_ledger:dirty", {USER_ID: 0})
+    assert await worker.reconcile() == 1
+    assert await PointsLedger(redis).balance(USER_ID) == 8 * COST
+
+    await worker.flush()
+    async with session_factory() as db:
+        await UserPointService(db, redis).release_points(held)
+    assert await PointsLedger(redis).balance(USER_ID) == 9 * COST
+    assert await db_remaining(session_factory) == 9 * COST
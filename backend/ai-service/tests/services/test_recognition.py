@@ -0,0 +1,160 @@
+import asyncio
+import base64
+
+import pytest
+import pytest_asyncio
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from app.schemas.jfbym import JFBYMGeneralRequestBody, JFBYMGeneralResponseBody
+from app.schemas.ocr import OCRGeneralRequestBody, OCRGeneralResponseBody
+from app.services import recognition
+from app.services.recognition import RecognitionGateway, image_digest
+from app.utils.http_client import close_http_clients, get_http_client
+
+IMAGE = base64.b64encode(b"screenshot-region" * 64).decode()
+UPSTREAM_LATENCY = 0.05
+
+
+def ocr_response(code: int = 0) -> OCRGeneralResponseBody:
+    return OCRGeneralResponseBody.model_validate(
+        {
+            "header": {"code": code, "message": "success", "sid": "sid"},
+            "payload": {
+                "result": {"compress": "raw", "encoding": "utf8", "format": "json", "text": "dGV4dA=="}
+            },
+        }
+    )
+
+
+class MockUpstream:
+    """模拟上游识别服务，记录调用次数"""
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    async def __call__(self, *args, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(UPSTREAM_LATENCY)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response.model_copy(deep=True)
+
+
+@pytest_asyncio.fixture(scope="function")
+async def redis():
+    redis = FakeRedis(server=FakeServer(), decode_responses=True)
+    recognition.local_cache.clear()
+    yield redis
+    recognition.local_cache.clear()
+    await redis.aclose()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    mock = MockUpstream(ocr_response())
+    monkeypatch.setattr(recognition, "recognize_text_from_image", mock)
+    return mock
+
+
+@pytest.mark.asyncio
+async def test_repeated_ocr_is_served_from_cache(redis, upstream):
+    gateway = RecognitionGateway(redis)
+    params = OCRGeneralRequestBody(image=IMAGE)
+
+    result, fetched = await gateway.ocr(params)
+    assert fetched
+    assert result.header.code == 0
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for _ in range(20):
+        result, fetched = await gateway.ocr(params)
+        assert not fetched
+        assert result.header.sid == "sid"
+    assert loop.time() - start < UPSTREAM_LATENCY
+    assert upstream.calls == 1
+
+    # 参数不同视为不同请求
+    await gateway.ocr(OCRGeneralRequestBody(image=IMAGE, encoding="png"))
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_are_coalesced(redis, upstream):
+    params = OCRGeneralRequestBody(image=IMAGE)
+    results = await asyncio.gather(*(RecognitionGateway(redis).ocr(params) for _ in range(20)))
+
+    assert upstream.calls == 1
+    assert sum(fetched for _, fetched in results) == 1
+    assert all(result.header.code == 0 for result, _ in results)
+
+
+@pytest.mark.asyncio
+async def test_shared_redis_cache_and_base64_formatting(redis, upstream):
+    await RecognitionGateway(redis).ocr(OCRGeneralRequestBody(image=IMAGE))
+
+    # 其他进程没有本地缓存，从 Redis 命中；base64 换行不影响命中
+    recognition.local_cache.clear()
+    wrapped = "\n".join(IMAGE[i : i + 76] for i in range(0, len(IMAGE), 76))
+    _, fetched = await RecognitionGateway(redis).ocr(OCRGeneralRequestBody(image=wrapped))
+    assert not fetched
+    assert upstream.calls == 1
+    assert image_digest("ocr", IMAGE, {}) == image_digest("ocr", wrapped, {})
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached(redis, upstream):
+    gateway = RecognitionGateway(redis)
+    params = OCRGeneralRequestBody(image=IMAGE)
+
+    upstream.response = ocr_response(code=10001)
+    result, fetched = await gateway.ocr(params)
+    assert fetched and result.header.code == 10001
+
+    upstream.response = RuntimeError("upstream down")
+    results = await asyncio.gather(*(gateway.ocr(params) for _ in range(5)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert upstream.calls == 2
+
+    upstream.response = ocr_response()
+    _, fetched = await gateway.ocr(params)
+    assert fetched
+    assert upstream.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_captcha_cache(redis, monkeypatch):
+    upstream = MockUpstream(
+        JFBYMGeneralResponseBody.model_validate(
+            {
+                "code": 10000,
+                "msg": "识别成功",
+                "data": {"code": 0, "data": "5298", "time": 0.03, "unique_code": "abc"},
+            }
+        )
+    )
+    monkeypatch.setattr(recognition, "verify_captcha", upstream)
+    gateway = RecognitionGateway(redis)
+
+    first, fetched = await gateway.captcha(JFBYMGeneralRequestBody(image=IMAGE, type="10110"))
+    assert fetched
+    second, fetched = await gateway.captcha(JFBYMGeneralRequestBody(image=IMAGE, type="10110"))
+    assert not fetched
+    assert second.data.data == first.data.data
+
+    await gateway.captcha(JFBYMGeneralRequestBody(image=IMAGE, type="10111"))
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_http_clients_are_pooled():
+    client = get_http_client("xfyun")
+    assert get_http_client("xfyun") is client
+    assert get_http_client("jfbym") is not client
+
+    await close_http_clients()
+    assert client.is_closed
+    assert get_http_client("xfyun") is not client
+    await close_http_clients()
@@ -5,17 +5,20 @@ from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
 
+from app.database import AsyncSessionLocal
 from app.dependencies import get_ws_service
 from app.internal import admin
 from app.logger import get_logger
 from app.middlewares.tracing import RequestTracingMiddleware
-from app.redis import close_redis_pool, init_redis_pool
+from app.redis import close_redis_pool, get_redis_client, init_redis_pool
 from app.routers import api_keys, executions, healthcheck, user, websocket, workflows
 from app.routers.streamable_mcp import (
     handle_streamable_http,
     session_manager,
     tools_config,
 )
+from app.services.execution_dispatch import ExecutionDispatcher
+from app.services.execution_events import start_event_bus, stop_event_bus
 
 logger = get_logger(__name__)
 
@@ -30,9 +33,16 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
 
     # 初始化 WsManagerService 单例实例
     worker_id = os.getpid()
-    await get_ws_service()
+    ws_service = await get_ws_service()
     logger.info(f"WsManagerService singleton initialized for worker {worker_id}")
 
+    # 执行状态事件：等待执行结果的请求订阅事件，不再轮询数据库
+    await start_event_bus(get_redis_client())
+
+    # 执行下发：消费下发队列和执行结果，清理孤儿执行
+    dispatcher = ExecutionDispatcher(get_redis_client(), ws_service.ws_manager, AsyncSessionLocal)
+    await dispatcher.start()
+
     # 使用 async with 管理 session_manager 的生命周期
     async with session_manager.run():
         logger.info("Application started with StreamableHTTP session manager!")
@@ -45,6 +55,9 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
             await tools_config.cleanup_connections()
             logger.info("Tools config connections cleaned up")
 
+            await dispatcher.stop()
+            await stop_event_bus()
+
             await close_redis_pool()
             logger.info(f"Worker {worker_id} shutting down")
 
@@ -17,6 +17,7 @@ class Workflow(Base):
     version = Column(Integer, nullable=False, default=1)
     status = Column(Integer, default=1, nullable=False)
     parameters = Column(Text, nullable=True)  # 存储JSON字符串格式的参数
+    parameters_hash = Column(String(64), nullable=True)  # 参数规范化后的sha256，用于判断参数是否变化
     user_id = Column(String(50), nullable=False, index=True)
     example_project_id = Column(String(100), nullable=True)  # 示例用户账号下的project_id，用于执行时映射
     created_at = Column(DateTime, default=func.now(), nullable=False)
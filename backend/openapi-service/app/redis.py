@@ -24,6 +24,13 @@ async def close_redis_pool():
         redis_pool = None
 
 
+def get_redis_client() -> Redis:
+    """获取使用全局连接池的客户端，用于依赖注入之外的场景"""
+    if redis_pool is None:
+        raise RuntimeError("Redis pool is not initialized. Call init_redis_pool() first.")
+    return Redis(connection_pool=redis_pool)
+
+
 async def get_redis() -> AsyncGenerator[Redis]:
     global redis_pool
     if redis_pool is None:
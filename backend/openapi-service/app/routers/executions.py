@@ -1,12 +1,21 @@
 from fastapi import APIRouter, Depends, Path, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database import AsyncSessionLocal, get_db
 from app.dependencies import get_execution_service, get_user_id_from_api_key
 from app.logger import get_logger
 from app.schemas import ResCode, StandardResponse
 from app.services.execution import ExecutionService
+from app.services.execution_events import encode_execution, execution_events, is_finished, wait_for_finish
 
 logger = get_logger(__name__)
 
+# 长轮询最长等待时间（秒）
+MAX_WAIT_TIMEOUT = 120
+# SSE 心跳间隔（秒）
+SSE_HEARTBEAT = 15
+
 router = APIRouter(
     prefix="/executions",
     tags=["executions"],
@@ -71,3 +80,79 @@ async def get_execution(
     except Exception as e:
         logger.error(f"Error getting execution {execution_id}: {str(e)}")
         return StandardResponse(code=ResCode.ERR, msg="Failed to get execution", data=None)
+
+
+async def _load_execution(execution_id: str) -> dict | None:
+    """使用短生命周期的会话读取执行记录，等待期间不占用数据库连接"""
+    async with AsyncSessionLocal() as db:
+        execution = await ExecutionService(db).get_execution(execution_id)
+        return execution.to_dict() if execution else None
+
+
+@router.get(
+    "/{execution_id}/wait",
+    response_model=StandardResponse,
+    summary="等待执行结束（长轮询）",
+    description="执行结束后立即返回执行记录，超时返回当前状态，finished 表示是否已结束",
+)
+async def wait_execution(
+    execution_id: str = Path(..., description="执行记录ID"),
+    timeout: float = Query(30, ge=0, le=MAX_WAIT_TIMEOUT, description="最长等待秒数"),
+    user_id: str = Depends(get_user_id_from_api_key),
+    db: AsyncSession = Depends(get_db),
+):
+    """长轮询等待执行结束"""
+    try:
+        # 鉴权查询结束后释放连接，等待期间不占用数据库连接
+        await db.commit()
+        execution = await wait_for_finish(execution_id, lambda: _load_execution(execution_id), timeout)
+        if not execution:
+            return StandardResponse(
+                code=ResCode.ERR,
+                msg=f"Execution with ID {execution_id} not found",
+                data=None,
+            )
+
+        return StandardResponse(
+            code=ResCode.SUCCESS,
+            msg="",
+            data={"execution": execution, "finished": is_finished(execution)},
+        )
+    except Exception as e:
+        logger.error(f"Error waiting execution {execution_id}: {str(e)}")
+        return StandardResponse(code=ResCode.ERR, msg="Failed to wait execution", data=None)
+
+
+@router.get(
+    "/{execution_id}/events",
+    summary="订阅执行状态（SSE）",
+    description="以 Server-Sent Events 推送执行记录的当前状态和之后的每次变化，执行结束后关闭",
+)
+async def stream_execution_events(
+    execution_id: str = Path(..., description="执行记录ID"),
+    user_id: str = Depends(get_user_id_from_api_key),
+    db: AsyncSession = Depends(get_db),
+):
+    """SSE 推送执行状态"""
+    await db.commit()
+    if await _load_execution(execution_id) is None:
+        return StandardResponse(
+            code=ResCode.ERR,
+            msg=f"Execution with ID {execution_id} not found",
+            data=None,
+        )
+
+    async def stream():
+        async for execution in execution_events(
+            execution_id, lambda: _load_execution(execution_id), heartbeat=SSE_HEARTBEAT
+        ):
+            if execution is None:
+                yield ": ping\n\n"
+            else:
+                yield f"event: execution\ndata: {encode_execution(execution)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
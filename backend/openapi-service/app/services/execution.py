@@ -1,18 +1,16 @@
-import asyncio
 import json
 from datetime import datetime
 from typing import Any, Optional
 from uuid import uuid4
 
 from redis.asyncio import Redis
-from rpawebsocket.ws import BaseMsg
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import AsyncSessionLocal
 from app.logger import get_logger
 from app.models.workflow import Execution
 from app.schemas.workflow import ExecutionCreate, ExecutionStatus
+from app.services.execution_events import FINISHED_STATUSES, publish_execution_event, wait_for_finish
 
 logger = get_logger(__name__)
 
@@ -49,7 +47,8 @@ class ExecutionService:
 
     async def get_execution(self, execution_id: str, user_id: str | None = None) -> Optional[Execution]:
         """获取执行记录"""
-        query = select(Execution).where(Execution.id == execution_id)
+        # 总是取数据库中的最新状态，而不是会话中缓存的对象
+        query = select(Execution).where(Execution.id == execution_id).execution_options(populate_existing=True)
 
         # 不校验user_id
         # if user_id is not None:
@@ -109,11 +108,19 @@ class ExecutionService:
         status: str,
         result: dict[str, Any] | None = None,
         error: str | None = None,
+        expected_status: list[str] | None = None,
     ) -> Optional[Execution]:
-        """更新执行记录状态"""
+        """
+        更新执行记录状态
+
+        expected_status 不为空时只更新处于这些状态的记录，未更新时返回 None，
+        用于重复下发、迟到的回调等需要幂等的场景
+        """
         try:
             # 直接使用SQL更新，避免会话状态问题
             update_stmt = update(Execution).where(Execution.id == execution_id)
+            if expected_status:
+                update_stmt = update_stmt.where(Execution.status.in_(expected_status))
 
             update_data = {Execution.status: status}
             if result is not None:
@@ -124,19 +131,20 @@ class ExecutionService:
                     update_data[Execution.result] = str(result)
             if error is not None:
                 update_data[Execution.error] = error
-            if status in [
-                ExecutionStatus.COMPLETED.value,
-                ExecutionStatus.FAILED.value,
-                ExecutionStatus.CANCELLED.value,
-            ]:
+            if status in FINISHED_STATUSES:
                 update_data[Execution.end_time] = datetime.now()
 
             update_stmt = update_stmt.values(update_data)
-            await self.db.execute(update_stmt)
+            updated = await self.db.execute(update_stmt)
             await self.db.commit()
+            if expected_status and updated.rowcount == 0:
+                return None
 
-            # 返回更新后的执行记录
-            return await self.get_execution(execution_id)
+            # 返回更新后的执行记录，并通知等待该执行的请求
+            execution = await self.get_execution(execution_id)
+            if execution is not None:
+                await publish_execution_event(self.redis, execution)
+            return execution
         except Exception as e:
             # 如果更新失败，回滚事务并记录错误
             try:
@@ -162,178 +170,30 @@ class ExecutionService:
         logger.info("Created execution %s and committed to database", execution.id)
         logger.info("[execute_workflow] user_id: %s ", user_id)
 
-        # 保存 execution_id，后续需要用
-        execution_id = execution.id
+        # 放入下发队列，由持有该用户执行器连接的实例下发，结果通过回调更新状态
+        from app.services.execution_dispatch import enqueue_execution
 
-        # 执行工作流逻辑（异步/同步）
-        # 添加短暂延迟，确保数据库事务完全提交
-        await asyncio.sleep(0.1)
+        await enqueue_execution(self.redis, execution.id, user_id)
 
         if wait:
-            # 同步执行模式 - 使用新的数据库会话，避免长时间占用连接
-            await self._run_workflow_with_new_session_sync(execution_id, workflow_timeout, user_id)
-
-            # 使用原会话重新获取最新状态
-            await self.db.refresh(execution)
-        else:
-            # 异步执行模式，后台执行（不等待结果）
-            asyncio.create_task(self._run_workflow_with_new_session(execution_id, workflow_timeout, user_id))
+            # 同步执行模式，超时后返回当前状态（仍为 RUNNING 时由调用方提示稍后查询）
+            return await self.wait_for_execution(execution, workflow_timeout)
 
         return execution
 
-    async def _run_workflow(self, execution_id: str, workflow_timeout: int = 36000, user_id: str = "") -> None:
-        """运行工作流执行逻辑"""
-        try:
-            # 获取执行记录
-            execution = await self.get_execution(execution_id)
-            if not execution:
-                logger.info("Execution not found for execution_id: %s", execution_id)
-                raise Exception(f"Execution not found for execution_id: {execution_id}")
-            logger.info("[_run_workflow] user_id: %s ", user_id)
-            # 设置超时
-            await asyncio.wait_for(
-                self._execute_workflow_logic(execution, user_id),
-                timeout=workflow_timeout,
-            )
-        except TimeoutError:
-            # 超时处理 - 使用update_execution_status方法避免会话问题
-            await self.update_execution_status(execution_id, ExecutionStatus.RUNNING.value)
-            raise
-        except Exception as e:
-            await self.update_execution_status(execution_id, ExecutionStatus.FAILED.value, error=str(e))
-
-    async def _run_workflow_with_new_session_sync(self, execution_id: str, workflow_timeout: int, user_id: str) -> None:
-        """使用新的数据库会话运行工作流（同步版本，会抛出异常）"""
-        async with AsyncSessionLocal() as db:
-            execution_service = ExecutionService(db, self.redis)
-            logger.info("Running workflow execution %s", execution_id)
-            await execution_service._run_workflow(execution_id, workflow_timeout, user_id)
-
-    async def _run_workflow_with_new_session(self, execution_id: str, workflow_timeout: int, user_id: str) -> None:
-        """使用新的数据库会话运行工作流（异步版本，不抛出异常）"""
-        async with AsyncSessionLocal() as db:
-            try:
-                execution_service = ExecutionService(db, self.redis)
-                logger.info("Running background workflow execution %s", execution_id)
-                await execution_service._run_workflow(execution_id, workflow_timeout, user_id)
-            except Exception as e:
-                # 记录错误日志
-                logger.exception("Error in background workflow execution %s", execution_id)
-
-                # 更新执行状态为失败，确保用户能看到错误
-                try:
-                    # 使用新的会话来更新状态，避免会话问题
-                    async with AsyncSessionLocal() as update_db:
-                        update_service = ExecutionService(update_db, self.redis)
-                        await update_service.update_execution_status(
-                            execution_id, ExecutionStatus.FAILED.value, error=str(e)
-                        )
-                except Exception as update_error:
-                    logger.exception("Failed to update execution status for %s", execution_id)
-
-    async def _execute_workflow_logic(self, execution: Execution, user_id: str) -> None:
-        """
-        实现工作流执行的实际逻辑
-        这里是一个示例，实际项目中需要根据不同工作流实现不同的逻辑
-        """
-        import json
-
-        logger.info("Starting workflow execution logic for execution %s", execution.id)
+    async def wait_for_execution(self, execution: Execution, timeout: float) -> Execution:
+        """等待执行结束（订阅状态事件，没有事件总线时轮询），超时返回当前状态"""
 
-        try:
-            # 模拟异步工作流执行
-            # 实际项目中可能涉及调用外部系统、处理数据等操作
-            # 回调事件
-            from app.dependencies import get_ws_service
-
-            websocket_service = await get_ws_service()
-            logger.info("Got websocket service for execution %s", execution.id)
-            logger.info("execution.user_id: %s", execution.user_id)
-            logger.info("input user_id: %s", user_id)
-
-            wait = asyncio.Event()
-            res = {}
-            res_e = None
-
-            def callback(watch_msg: BaseMsg | None = None, e: Exception | None = None):
-                nonlocal wait, res, res_e
-                if watch_msg:
-                    res = watch_msg.data
-                    logger.info("Received response for execution %s: %s", execution.id, res)
-                    # Received response for execution 71e3147f-55cd-43f5-b7a8-b734d1075618:
-                    # {'code': '5001', 'msg': '', 'data': None}
-                if e:
-                    res_e = e
-                    logger.error("Received error for execution %s: %s", execution.id, e)
-                wait.set()
-
-            # 解析参数，确保是字典格式
-            if execution.parameters is None:
-                parameters_dict = {}
-            elif isinstance(execution.parameters, str):
-                try:
-                    parameters_dict = json.loads(execution.parameters)
-                except json.JSONDecodeError as e:
-                    logger.exception("Failed to parse parameters JSON for execution %s", execution.id)
-                    parameters_dict = {}
-            else:
-                parameters_dict = execution.parameters
-
-            run_param = []
-            for key, value in parameters_dict.items():
-                logger.debug("参数: %s=%s", key, value)
-                run_param.append({"varName": key, "varValue": value})
-            run_param = json.dumps(run_param, ensure_ascii=False)
-
-            executor_data = {
-                "project_id": execution.project_id,
-                "exec_position": execution.exec_position,
-                "jwt": "",
-                "run_param": run_param,
-            }
-            if execution.recording_config:
-                executor_data["recording_config"] = execution.recording_config
-            if execution.version:
-                executor_data["version"] = execution.version
-
-            base_msg = BaseMsg(
-                channel="remote",
-                key="run",
-                uuid="$root$",
-                send_uuid=f"{user_id}",
-                need_reply=True,
-                data=executor_data,
-            ).init()
-
-            logger.info("Sending WebSocket message for execution %s: %s", execution.id, base_msg.data)
-            await websocket_service.ws_manager.send_reply(base_msg, 10 * 3600, callback)
-
-            # 等待
-            logger.info("Waiting for response for execution %s", execution.id)
-            await wait.wait()
-            logger.info("Received response for execution %s", execution.id)
-
-            # 假设工作流执行成功
-            if res.get("code") == "0000":
-                await self.update_execution_status(
-                    execution.id,
-                    ExecutionStatus.COMPLETED.value,
-                    result=res,
-                    error=str(res_e) if res_e else None,
-                )
-                logger.info("Updated execution %s status to COMPLETED", execution.id)
-            elif res.get("code") == "5001":
-                await self.update_execution_status(
-                    execution.id,
-                    ExecutionStatus.FAILED.value,
-                    result=res,
-                    error=str(res_e) if res_e else None,
-                )
-                logger.info("Updated execution %s status to FAILED", execution.id)
+        async def load():
+            # 结束当前事务，避免可重复读隔离级别下一直读到旧快照
+            await self.db.commit()
+            await self.db.refresh(execution)
+            return execution.to_dict()
 
-        except Exception as e:
-            logger.exception("Error in workflow execution logic for %s", execution.id)
-            raise
+        await wait_for_finish(execution.id, load, timeout)
+        await self.db.commit()
+        await self.db.refresh(execution)
+        return execution
 
     async def cancel_execution(self, execution_id: str, user_id: str) -> bool:
         """取消执行"""
@@ -0,0 +1,438 @@
+"""
+工作流执行下发
+
+执行记录创建后放入 Redis Stream，由各 API 实例以消费组方式下发，执行器回复通过结果流更新状态：
+- 执行器的 ws 连接只在某一个实例上，持有连接的实例在 Redis 中登记为该用户的所有者（带过期时间，定期续期）；
+  其他实例读到消息时转给所有者下发，只有没有存活的所有者且超过下发期限时才标记失败
+- 下发前把执行记录从 PENDING 改为 RUNNING，只有改成功的实例才下发，重复投递不会重复执行
+- 下发消息的 event_id 由执行 ID 生成，回复直接转入结果流，不在内存中登记等待，实例重启不丢失
+- 执行期限记录在 Redis 有序集合中，超时的执行和启动时没有期限记录的 RUNNING 执行标记失败
+"""
+
+import asyncio
+import functools
+import json
+import os
+import socket
+import time
+from collections import UserDict
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError, WatchError
+from rpawebsocket.ws import BaseMsg, Watch
+from sqlalchemy import select
+
+from app.logger import get_logger
+from app.models.workflow import Execution
+from app.schemas.workflow import ExecutionStatus
+
+logger = get_logger(__name__)
+
+DISPATCH_STREAM = "execution:dispatch"
+DISPATCH_GROUP = "execution-dispatchers"
+RESULT_STREAM = "execution:results"
+RESULT_GROUP = "execution-results"
+# 执行 ID -> 执行期限
+RUNNING_KEY = "execution:running"
+# 用户 ID -> 持有其执行器连接的实例
+OWNER_KEY = "execution:owner:{}"
+
+# 下发消息的 event_id 前缀，回复的 reply_event_id 带此前缀时转入结果流
+EVENT_PREFIX = "execution:"
+REPLY_WATCH_PREFIX = "reply$$" + EVENT_PREFIX
+
+# 等待执行器连接的最长时间（秒）
+DISPATCH_TIMEOUT = 30
+# 执行的最长时间（秒）
+RUN_TIMEOUT = 10 * 3600
+
+# 所有者登记的过期时间和续期间隔（秒），实例退出后最多过期时间内其他实例认为连接仍然存在
+OWNER_TTL = 15
+OWNER_REFRESH_INTERVAL = 5.0
+# 其他实例空闲多久的消息可以被认领（毫秒）
+CLAIM_IDLE_MS = 1000
+CLAIM_INTERVAL = 1.0
+REAP_INTERVAL = 30.0
+READ_BLOCK_MS = 1000
+BATCH_SIZE = 50
+STREAM_MAXLEN = 100000
+
+
+async def enqueue_execution(redis: Redis, execution_id: str, user_id: str, timeout: int = RUN_TIMEOUT) -> str:
+    """执行记录放入下发队列"""
+    return await redis.xadd(
+        DISPATCH_STREAM,
+        {
+            "execution_id": execution_id,
+            "user_id": user_id,
+            "timeout": timeout,
+            "dispatch_deadline": time.time() + DISPATCH_TIMEOUT,
+        },
+        maxlen=STREAM_MAXLEN,
+        approximate=True,
+    )
+
+
+def build_run_message(execution: Execution) -> BaseMsg:
+    """构造下发给执行器的运行消息"""
+    parameters_dict = execution.get_parameters_as_dict()
+    run_param = [{"varName": key, "varValue": value} for key, value in parameters_dict.items()]
+
+    executor_data = {
+        "project_id": execution.project_id,
+        "exec_position": execution.exec_position,
+        "jwt": "",
+        "run_param": json.dumps(run_param, ensure_ascii=False),
+    }
+    if execution.recording_config:
+        executor_data["recording_config"] = execution.recording_config
+    if execution.version:
+        executor_data["version"] = execution.version
+
+    msg = BaseMsg(
+        channel="remote",
+        key="run",
+        uuid="$root$",
+        send_uuid=f"{execution.user_id}",
+        need_reply=True,
+        data=executor_data,
+    ).init()
+    # 重复下发时 event_id 不变，回复可以直接对应到执行记录
+    msg.event_id = EVENT_PREFIX + execution.id
+    return msg
+
+
+class ReplyWatches(UserDict):
+    """
+    替换 WsManager.watch_msg
+
+    执行结果的回复不登记 watch，按 reply_event_id 前缀直接回调，其余 watch 行为不变
+    """
+
+    def __init__(self, on_reply: Callable[..., Awaitable], watches: dict | None = None):
+        super().__init__(watches or {})
+        self.on_reply = on_reply
+
+    def __contains__(self, name) -> bool:
+        return name in self.data or str(name).startswith(REPLY_WATCH_PREFIX)
+
+    def __getitem__(self, name) -> Watch:
+        if name in self.data or not str(name).startswith(REPLY_WATCH_PREFIX):
+            return self.data[name]
+        execution_id = name[len(REPLY_WATCH_PREFIX) :]
+        return Watch(watch_type="reply", watch_key=name, callback=functools.partial(self.on_reply, execution_id))
+
+    def __delitem__(self, name):
+        self.data.pop(name, None)
+
+
+class ExecutionDispatcher:
+    def __init__(self, redis: Redis, ws_manager, session_factory, consumer: str | None = None):
+        self.redis = redis
+        self.ws_manager = ws_manager
+        self.session_factory = session_factory
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.claim_idle_ms = CLAIM_IDLE_MS
+        self._tasks: list[asyncio.Task] = []
+        # 已登记为所有者的用户
+        self._owned: set[str] = set()
+
+        # 统计
+        self.dispatched = 0
+        self.deferred = 0
+        self.results = 0
+        self.reaped = 0
+
+    def install(self):
+        """接管 ws 回复，执行结果转入结果流"""
+        if not isinstance(self.ws_manager.watch_msg, ReplyWatches):
+            self.ws_manager.watch_msg = ReplyWatches(self.on_reply, self.ws_manager.watch_msg)
+
+    async def start(self):
+        self.install()
+        await self.ensure_groups()
+        await self.refresh_owners()
+        try:
+            await self.reap_orphans()
+        except Exception:
+            logger.exception("Failed to reap orphaned executions")
+
+        self._tasks = [
+            asyncio.create_task(self._consume(DISPATCH_STREAM, DISPATCH_GROUP, self._handle_dispatch)),
+            asyncio.create_task(self._consume(RESULT_STREAM, RESULT_GROUP, self._handle_result)),
+            asyncio.create_task(self._maintain()),
+        ]
+        logger.info("Execution dispatcher %s started", self.consumer)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for user_id in list(self._owned):
+            await self._release(user_id)
+        self._owned = set()
+
+    async def ensure_groups(self):
+        for stream, group in ((DISPATCH_STREAM, DISPATCH_GROUP), (RESULT_STREAM, RESULT_GROUP)):
+            try:
+                await self.redis.xgroup_create(stream, group, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def _service(self, db):
+        from app.services.execution import ExecutionService
+
+        return ExecutionService(db, self.redis)
+
+    async def _update_status(self, execution_id: str, status: str, expected_status: list[str], **kwargs):
+        async with self.session_factory() as db:
+            return await self._service(db).update_execution_status(
+                execution_id, status, expected_status=expected_status, **kwargs
+            )
+
+    async def _get_status(self, execution_id: str) -> str | None:
+        async with self.session_factory() as db:
+            result = await db.execute(select(Execution.status).where(Execution.id == execution_id))
+            return result.scalar()
+
+    async def _consume(self, stream: str, group: str, handler):
+        while True:
+            try:
+                await self.read(stream, group, handler, block=READ_BLOCK_MS)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to consume %s", stream)
+                await asyncio.sleep(1)
+
+    async def refresh_owners(self):
+        """登记或续期本实例持有连接的用户，释放已断开的用户"""
+        users = set(self.ws_manager.conns)
+        if users:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for user_id in users:
+                    pipe.set(OWNER_KEY.format(user_id), self.consumer, ex=OWNER_TTL)
+                await pipe.execute()
+        for user_id in self._owned - users:
+            await self._release(user_id)
+        self._owned = users
+
+    async def _release(self, user_id: str):
+        """所有者仍是本实例时删除登记，其他实例已接管时不动"""
+        key = OWNER_KEY.format(user_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                if await pipe.get(key) == self.consumer:
+                    pipe.multi()
+                    pipe.delete(key)
+                    await pipe.execute()
+            except WatchError:
+                pass
+
+    async def _maintain(self):
+        last_reap = last_refresh = time.monotonic()
+        while True:
+            await asyncio.sleep(CLAIM_INTERVAL)
+            try:
+                if time.monotonic() - last_refresh >= OWNER_REFRESH_INTERVAL:
+                    last_refresh = time.monotonic()
+                    await self.refresh_owners()
+                await self.claim_stale()
+                if time.monotonic() - last_reap >= REAP_INTERVAL:
+                    last_reap = time.monotonic()
+                    await self.reap_timeouts()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Execution dispatcher maintenance failed")
+
+    async def read(self, stream: str, group: str, handler, block: int | None = None) -> int:
+        """读取新消息并处理，返回已确认的条数"""
+        response = await self.redis.xreadgroup(group, self.consumer, {stream: ">"}, count=BATCH_SIZE, block=block)
+        count = 0
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                count += await self._handle(stream, group, handler, entry_id, fields)
+        return count
+
+    async def dispatch_pending(self) -> int:
+        return await self.read(DISPATCH_STREAM, DISPATCH_GROUP, self._handle_dispatch)
+
+    async def apply_results(self) -> int:
+        return await self.read(RESULT_STREAM, RESULT_GROUP, self._handle_result)
+
+    async def claim_stale(self) -> int:
+        """处理转给本实例的下发消息，并认领其他实例（或自己）长时间未确认的消息"""
+        count = 0
+        response = await self.redis.xreadgroup(DISPATCH_GROUP, self.consumer, {DISPATCH_STREAM: "0"}, count=BATCH_SIZE)
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                if fields:
+                    count += await self._handle(
+                        DISPATCH_STREAM, DISPATCH_GROUP, self._handle_dispatch, entry_id, fields
+                    )
+        for stream, group, handler in (
+            (DISPATCH_STREAM, DISPATCH_GROUP, self._handle_dispatch),
+            (RESULT_STREAM, RESULT_GROUP, self._handle_result),
+        ):
+            start = "0-0"
+            while True:
+                response = await self.redis.xautoclaim(
+                    stream, group, self.consumer, self.claim_idle_ms, start_id=start, count=BATCH_SIZE
+                )
+                start, entries = response[0], response[1]
+                for entry_id, fields in entries:
+                    if fields:
+                        count += await self._handle(stream, group, handler, entry_id, fields)
+                if start in ("0-0", b"0-0"):
+                    break
+        return count
+
+    async def _handle(self, stream: str, group: str, handler, entry_id, fields) -> int:
+        try:
+            done = await handler(fields, entry_id)
+        except Exception:
+            # 留在待确认列表，空闲超时后重新认领
+            logger.exception("Failed to handle %s entry %s", stream, entry_id)
+            return 0
+        if not done:
+            return 0
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xack(stream, group, entry_id)
+            pipe.xdel(stream, entry_id)
+            await pipe.execute()
+        return 1
+
+    async def _handle_dispatch(self, fields: dict, entry_id=None) -> bool:
+        execution_id = fields["execution_id"]
+        user_id = fields["user_id"]
+
+        if user_id not in self.ws_manager.conns:
+            owner = await self.redis.get(OWNER_KEY.format(user_id))
+            if owner and owner != self.consumer:
+                # 执行器连接在其他实例上，转入所有者的待确认列表，由它下发；所有者存活时不标记失败
+                if entry_id is not None:
+                    await self.redis.xclaim(DISPATCH_STREAM, DISPATCH_GROUP, owner, 0, [entry_id])
+                self.deferred += 1
+                return False
+            if time.time() < float(fields["dispatch_deadline"]):
+                # 执行器可能正在连接，等待所有者登记
+                self.deferred += 1
+                return False
+            await self._update_status(
+                execution_id,
+                ExecutionStatus.FAILED.value,
+                [ExecutionStatus.PENDING.value],
+                error="Executor is not connected",
+            )
+            logger.warning("Execution %s failed: executor of user %s is not connected", execution_id, user_id)
+            return True
+
+        # 先登记期限再改状态，保证 RUNNING 的执行一定有期限记录
+        await self.redis.zadd(RUNNING_KEY, {execution_id: time.time() + int(fields["timeout"])})
+        execution = await self._update_status(
+            execution_id, ExecutionStatus.RUNNING.value, [ExecutionStatus.PENDING.value]
+        )
+        if execution is None:
+            await self.redis.zrem(RUNNING_KEY, execution_id)
+            if await self._get_status(execution_id) == ExecutionStatus.PENDING.value:
+                # 更新失败，留待重试
+                raise RuntimeError(f"Failed to claim execution {execution_id}")
+            # 已被其他实例下发或已取消
+            return True
+
+        msg = build_run_message(execution)
+        try:
+            logger.info("Sending WebSocket message for execution %s: %s", execution_id, msg.data)
+            await self.ws_manager.send(msg)
+            self.dispatched += 1
+        except Exception as e:
+            logger.exception("Failed to send execution %s", execution_id)
+            await self._finish(execution_id, ExecutionStatus.FAILED.value, error=str(e))
+        return True
+
+    async def on_reply(self, execution_id: str, watch_msg: BaseMsg | None = None, e: Exception | None = None):
+        """执行器回复，转入结果流，由任意实例更新状态"""
+        if watch_msg is None:
+            return
+        logger.info("Received response for execution %s: %s", execution_id, watch_msg.data)
+        fields = {"execution_id": execution_id, "data": json.dumps(watch_msg.data or {}, ensure_ascii=False)}
+        try:
+            await self.redis.xadd(RESULT_STREAM, fields, maxlen=STREAM_MAXLEN, approximate=True)
+        except Exception:
+            logger.exception("Failed to publish result of execution %s, applying directly", execution_id)
+            await self._handle_result(fields)
+
+    async def _handle_result(self, fields: dict, entry_id=None) -> bool:
+        execution_id = fields["execution_id"]
+        result = json.loads(fields["data"])
+        if result.get("code") == "0000":
+            status = ExecutionStatus.COMPLETED.value
+        else:
+            status = ExecutionStatus.FAILED.value
+        # 已取消或已超时的执行不再更新
+        await self._finish(execution_id, status, result=result)
+        self.results += 1
+        logger.info("Updated execution %s status to %s", execution_id, status)
+        return True
+
+    async def _finish(self, execution_id: str, status: str, **kwargs):
+        execution = await self._update_status(execution_id, status, [ExecutionStatus.RUNNING.value], **kwargs)
+        await self.redis.zrem(RUNNING_KEY, execution_id)
+        return execution
+
+    async def reap_timeouts(self, now: float | None = None) -> int:
+        """超过执行期限仍未收到回复的执行标记失败"""
+        now = time.time() if now is None else now
+        expired = await self.redis.zrangebyscore(RUNNING_KEY, "-inf", now, start=0, num=BATCH_SIZE * 10)
+        count = 0
+        for execution_id in expired:
+            if await self._finish(execution_id, ExecutionStatus.FAILED.value, error="Execution timed out"):
+                count += 1
+        self.reaped += count
+        return count
+
+    async def reap_orphans(self) -> int:
+        """
+        启动时清理孤儿执行
+
+        - RUNNING 但没有期限记录：由旧版本在进程内等待、随进程退出丢失的执行
+        - PENDING 且超过下发期限：创建后没有进入下发队列的执行
+        """
+        running = set(await self.redis.zrange(RUNNING_KEY, 0, -1))
+        pending_before = datetime.now() - timedelta(seconds=DISPATCH_TIMEOUT * 2)
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(Execution.id, Execution.status).where(
+                    (Execution.status == ExecutionStatus.RUNNING.value)
+                    | ((Execution.status == ExecutionStatus.PENDING.value) & (Execution.start_time < pending_before))
+                )
+            )
+            rows = result.all()
+
+        count = 0
+        for execution_id, status in rows:
+            if status == ExecutionStatus.RUNNING.value and execution_id in running:
+                continue
+            if await self._update_status(
+                execution_id, ExecutionStatus.FAILED.value, [status], error="Execution was orphaned"
+            ):
+                count += 1
+        if count:
+            logger.warning("Reaped %s orphaned executions", count)
+        self.reaped += count
+        return count
+
+    def stats(self) -> dict:
+        return {
+            "consumer": self.consumer,
+            "dispatched": self.dispatched,
+            "deferred": self.deferred,
+            "results": self.results,
+            "reaped": self.reaped,
+        }
@@ -0,0 +1,239 @@
+"""
+执行状态事件
+
+update_execution_status 更新成功后把执行记录发布到 Redis 频道，等待执行结果的请求订阅事件而不是轮询数据库：
+- 每个实例只订阅一次频道，按执行 ID 在内存中分发给所有等待者
+- 等待者先登记再读一次数据库，之后只等事件，不会漏掉登记前已经结束的执行
+- 订阅断开重连后通知等待者重新读取一次数据库，补上断开期间的事件
+- 事件总线未启动时退化为带退避的数据库轮询
+"""
+
+import asyncio
+import contextlib
+import json
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import datetime
+
+from redis.asyncio import Redis
+
+from app.logger import get_logger
+from app.models.workflow import Execution
+from app.schemas.workflow import ExecutionStatus
+
+logger = get_logger(__name__)
+
+EVENTS_CHANNEL = "execution:events"
+
+FINISHED_STATUSES = (
+    ExecutionStatus.COMPLETED.value,
+    ExecutionStatus.FAILED.value,
+    ExecutionStatus.CANCELLED.value,
+)
+
+# 没有事件总线时轮询执行状态的间隔（秒），逐步退避
+WAIT_POLL_MIN_INTERVAL = 0.2
+WAIT_POLL_MAX_INTERVAL = 2.0
+
+# 订阅断开后重连的间隔（秒）
+RECONNECT_INTERVAL = 1.0
+
+# 订阅断开期间可能漏掉事件，通知等待者重新读取
+RESYNC = object()
+
+Loader = Callable[[], Awaitable[dict | None]]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_execution(execution: dict) -> str:
+    return json.dumps(execution, ensure_ascii=False, default=_json_default)
+
+
+def is_finished(execution: dict | None) -> bool:
+    return execution is None or execution.get("status") in FINISHED_STATUSES
+
+
+async def publish_execution_event(redis: Redis | None, execution: Execution):
+    """发布执行状态变化，失败只记录日志，等待者会在超时或重连后重新读取"""
+    if redis is None:
+        return
+    try:
+        await redis.publish(EVENTS_CHANNEL, encode_execution(execution.to_dict()))
+    except Exception:
+        logger.exception("Failed to publish event of execution %s", execution.id)
+
+
+class ExecutionEventBus:
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        # 执行 ID -> 等待者队列
+        self._watchers: dict[str, set[asyncio.Queue]] = {}
+        self._task: asyncio.Task | None = None
+        self._subscribed = asyncio.Event()
+
+        # 统计
+        self.received = 0
+        self.delivered = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        self._task = asyncio.create_task(self._listen())
+        # 等订阅生效，避免启动后立即发布的事件丢失
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._subscribed.wait(), timeout=5)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(EVENTS_CHANNEL)
+                if self._subscribed.is_set():
+                    # 重连成功，补上断开期间的事件
+                    self._broadcast(RESYNC)
+                self._subscribed.set()
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message and message["type"] == "message":
+                        self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Execution event subscription failed, reconnecting")
+                await asyncio.sleep(RECONNECT_INTERVAL)
+            finally:
+                with contextlib.suppress(Exception):
+                    await pubsub.aclose()
+
+    def _dispatch(self, data: str):
+        self.received += 1
+        try:
+            event = json.loads(data)
+        except (TypeError, ValueError):
+            logger.warning("Invalid execution event: %s", data)
+            return
+        for queue in self._watchers.get(event.get("id"), ()):
+            queue.put_nowait(event)
+            self.delivered += 1
+
+    def _broadcast(self, event):
+        for queues in self._watchers.values():
+            for queue in queues:
+                queue.put_nowait(event)
+
+    @contextlib.contextmanager
+    def watch(self, execution_id: str):
+        """登记一个等待者，返回接收该执行事件的队列"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._watchers.setdefault(execution_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._watchers.get(execution_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._watchers[execution_id]
+
+    async def events(self, execution_id: str, load: Loader, heartbeat: float) -> AsyncIterator[dict | None]:
+        """
+        依次产出执行的当前状态和之后的每次变化，执行结束后停止
+
+        超过 heartbeat 秒没有变化时产出 None，供调用方发送心跳
+        """
+        with self.watch(execution_id) as queue:
+            current = await load()
+            yield current
+            while not is_finished(current):
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except TimeoutError:
+                    yield None
+                    continue
+                current = await load() if event is RESYNC else event
+                yield current
+
+    def stats(self) -> dict:
+        return {
+            "watching": len(self._watchers),
+            "watchers": sum(len(queues) for queues in self._watchers.values()),
+            "received": self.received,
+            "delivered": self.delivered,
+        }
+
+
+_event_bus: ExecutionEventBus | None = None
+
+
+def get_event_bus() -> ExecutionEventBus | None:
+    return _event_bus if _event_bus is not None and _event_bus.running else None
+
+
+async def start_event_bus(redis: Redis) -> ExecutionEventBus:
+    global _event_bus
+    _event_bus = ExecutionEventBus(redis)
+    await _event_bus.start()
+    return _event_bus
+
+
+async def stop_event_bus():
+    global _event_bus
+    if _event_bus is not None:
+        await _event_bus.stop()
+        _event_bus = None
+
+
+async def poll_events(load: Loader, interval: float = WAIT_POLL_MIN_INTERVAL) -> AsyncIterator[dict | None]:
+    """没有事件总线时轮询数据库，状态变化或结束时产出"""
+    current = await load()
+    yield current
+    delay = interval
+    while not is_finished(current):
+        await asyncio.sleep(delay)
+        latest = await load()
+        if latest is None or latest.get("status") != current.get("status"):
+            current = latest
+            delay = interval
+            yield current
+        else:
+            delay = min(delay * 2, WAIT_POLL_MAX_INTERVAL)
+
+
+def execution_events(execution_id: str, load: Loader, heartbeat: float = 15.0) -> AsyncIterator[dict | None]:
+    bus = get_event_bus()
+    if bus is not None:
+        return bus.events(execution_id, load, heartbeat)
+    return poll_events(load)
+
+
+async def wait_for_finish(execution_id: str, load: Loader, timeout: float) -> dict | None:
+    """等待执行结束，超时返回最近一次读到的状态；超时前一次也没读到时补读一次，不把存在的执行当作不存在"""
+    current = None
+    events = execution_events(execution_id, load, heartbeat=timeout)
+    try:
+        async with asyncio.timeout(timeout):
+            async for event in events:
+                if event is not None:
+                    current = event
+                if is_finished(current):
+                    break
+    except TimeoutError:
+        pass
+    finally:
+        await events.aclose()
+    if current is None:
+        current = await load()
+    return current
@@ -92,12 +92,8 @@ class ToolsConfig:
         try:
             workflow_service, db = await self._get_workflow_service()
 
-            # 获取用户工作流
-            user_workflows = await workflow_service.get_workflows(user_id)
-            workflows = []
-            for workflow in user_workflows:
-                workflows.append(workflow.to_dict())
-            return workflows
+            # 获取用户工作流（按缓存代数读取）
+            return await workflow_service.get_workflow_dicts(user_id)
         except Exception as e:
             logger.exception("Error getting user workflows")
             return []
@@ -153,10 +149,11 @@ class ToolsConfig:
 
             # 创建执行服务并执行工作流
             from app.database import AsyncSessionLocal
+            from app.redis import get_redis_client
             from app.services.execution import ExecutionService
 
             async with AsyncSessionLocal() as db_session:
-                execution_service = ExecutionService(db_session)
+                execution_service = ExecutionService(db_session, get_redis_client())
                 logger.info("[execute_workflow_by_name] user_id '%s'", user_id)
                 # 异步执行工作流
                 execution = await execution_service.execute_workflow(
@@ -1,11 +1,13 @@
+import hashlib
 import json
 from typing import Optional
 
 import httpx
 from redis.asyncio import Redis
-from sqlalchemy import delete, select, update
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database import after_commit
 from app.logger import get_logger
 from app.models.workflow import Workflow
 from app.schemas.workflow import WorkflowBase
@@ -14,19 +16,52 @@ logger = get_logger(__name__)
 
 ASTRON_AGENT_WORKFLOWS_URL = "https://xingchen-api.xf-yun.com/manage/workflow/get_info"
 
+# 工作流列表缓存时间（秒），失效靠递增代数，旧代数的缓存自然过期
+WORKFLOWS_CACHE_TTL = 300
+
+# 参数合并时比较的字段
+PARAMETER_MERGE_FIELDS = ("varDirection", "varName", "varType", "varValue", "processId", "varDescribe")
+
+
+def parameters_digest(parameters: Optional[str]) -> Optional[str]:
+    """计算参数规范化后的sha256，键顺序和空白不影响结果"""
+    if parameters is None:
+        return None
+    try:
+        canonical = json.dumps(json.loads(parameters), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    except (json.JSONDecodeError, TypeError):
+        canonical = parameters
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
 
 class WorkflowService:
     def __init__(self, db: AsyncSession, redis: Redis = None):
         self.db = db
         self.redis = redis
 
+    @staticmethod
+    def _workflows_generation_key(user_id: str) -> str:
+        return f"workflows:{user_id}:gen"
+
+    async def _workflows_cache_key(self, user_id: str) -> str:
+        """当前代数下的用户工作流列表缓存键"""
+        generation = await self.redis.get(self._workflows_generation_key(user_id))
+        return f"workflows:{user_id}:{generation or 0}:list"
+
     async def _invalidate_workflows_cache(self, user_id: str) -> None:
-        """清除用户工作流缓存"""
+        """
+        清除用户工作流缓存：事务提交后递增代数，旧缓存键不再被读取
+
+        提交前递增时，并发的读取可能把提交前的数据缓存到新代数下
+        """
         if self.redis:
-            # 清除可能的所有分页缓存
-            keys = await self.redis.keys(f"workflows:{user_id}:*")
-            if keys:
-                await self.redis.delete(*keys)
+            after_commit(self.db, lambda: self._bump_workflows_generation(user_id))
+
+    async def _bump_workflows_generation(self, user_id: str) -> None:
+        try:
+            await self.redis.incr(self._workflows_generation_key(user_id))
+        except Exception:
+            logger.exception("Failed to invalidate workflows cache of user %s", user_id)
 
     async def _compare_and_merge_parameters(
         self, robot_params: Optional[str], existing_params: Optional[str]
@@ -71,14 +106,7 @@ class WorkflowService:
 
             if existing_param:
                 # 现有参数中存在，检查关键字段是否有变化
-                if (
-                    existing_param.get("varDirection") != robot_param.get("varDirection")
-                    or existing_param.get("varName") != robot_param.get("varName")
-                    or existing_param.get("varType") != robot_param.get("varType")
-                    or existing_param.get("varValue") != robot_param.get("varValue")
-                    or existing_param.get("processId") != robot_param.get("processId")
-                    or existing_param.get("varDescribe") != robot_param.get("varDescribe")
-                ):
+                if any(existing_param.get(field) != robot_param.get(field) for field in PARAMETER_MERGE_FIELDS):
                     # 更新这条记录（保留其他字段）
                     logger.info("参数 %s 检测到变化，进行更新", robot_param_id)
 
@@ -90,16 +118,8 @@ class WorkflowService:
                         varDescribe = existing_param.get("varDescribe")
 
                     updated_param = existing_param.copy()
-                    updated_param.update(
-                        {
-                            "varDirection": robot_param.get("varDirection"),
-                            "varName": robot_param.get("varName"),
-                            "varType": robot_param.get("varType"),
-                            "varValue": robot_param.get("varValue"),
-                            "processId": robot_param.get("processId"),
-                            "varDescribe": varDescribe,
-                        }
-                    )
+                    updated_param.update({field: robot_param.get(field) for field in PARAMETER_MERGE_FIELDS})
+                    updated_param["varDescribe"] = varDescribe
                     updated_list.append(updated_param)
                     updated_count += 1
                 else:
@@ -112,9 +132,8 @@ class WorkflowService:
                 added_count += 1
 
         # 记录删除的参数
-        deleted_count = len(existing_list) - len(
-            [p for p in existing_list if p.get("id") in {rp.get("id") for rp in robot_params}]
-        )
+        robot_param_ids = {rp.get("id") for rp in robot_params}
+        deleted_count = sum(1 for p in existing_list if p.get("id") not in robot_param_ids)
         if deleted_count > 0:
             logger.info("检测到 %s 个已删除的参数", deleted_count)
 
@@ -140,7 +159,9 @@ class WorkflowService:
 
         workflow_dict = workflow_data.model_dump()
 
-        workflow = Workflow(**workflow_dict, user_id=user_id)
+        workflow = Workflow(
+            **workflow_dict, parameters_hash=parameters_digest(workflow_dict["parameters"]), user_id=user_id
+        )
 
         self.db.add(workflow)
         await self.db.flush()
@@ -189,6 +210,30 @@ class WorkflowService:
         workflows = result.scalars().all()
         return workflows
 
+    async def get_workflow_dicts(self, user_id: str) -> list[dict]:
+        """获取用户工作流列表的字典形式，Redis可用时按当前代数缓存"""
+        cache_key = None
+        if self.redis:
+            try:
+                cache_key = await self._workflows_cache_key(user_id)
+                cached_data = await self.redis.get(cache_key)
+                if cached_data:
+                    return json.loads(cached_data)
+            except Exception:
+                logger.exception("Failed to read workflows cache of user %s", user_id)
+                cache_key = None
+
+        workflows = [workflow.to_dict() for workflow in await self.get_workflows(user_id)]
+        # 时间字段统一序列化为字符串，命中缓存与否返回的结构一致
+        payload = json.dumps(workflows, ensure_ascii=False, default=str)
+
+        if cache_key:
+            try:
+                await self.redis.set(cache_key, payload, ex=WORKFLOWS_CACHE_TTL)
+            except Exception:
+                logger.exception("Failed to write workflows cache of user %s", user_id)
+        return json.loads(payload)
+
     async def update_workflow(self, workflow_data: WorkflowBase, user_id: str) -> Optional[Workflow]:
         """更新工作流"""
         # 检查工作流是否存在且属于当前用户
@@ -203,14 +248,27 @@ class WorkflowService:
             return workflow
 
         if "parameters" in workflow_dict:
-            logger.info(workflow_dict["parameters"])
-            # 用户没设置parameters，去请求接口并比较
-            merged_params = await self._compare_and_merge_parameters(
-                workflow_dict["parameters"],  # 新参数为None表示用户未设置
-                workflow.parameters,  # 现有参数
-            )
-            if merged_params is not None:
-                workflow_dict["parameters"] = merged_params
+            incoming_hash = parameters_digest(workflow_dict["parameters"])
+            existing_hash = workflow.parameters_hash or parameters_digest(workflow.parameters)
+            if incoming_hash == existing_hash:
+                # 参数内容未变化，无需解析合并
+                del workflow_dict["parameters"]
+                if not workflow.parameters_hash:
+                    workflow_dict["parameters_hash"] = existing_hash
+            else:
+                # 用户没设置parameters，去请求接口并比较
+                merged_params = await self._compare_and_merge_parameters(
+                    workflow_dict["parameters"],  # 新参数为None表示用户未设置
+                    workflow.parameters,  # 现有参数
+                )
+                if merged_params is not None:
+                    workflow_dict["parameters"] = merged_params
+                workflow_dict["parameters_hash"] = parameters_digest(workflow_dict["parameters"])
+
+        # 字段都没有变化时不写库，也不清除缓存
+        workflow_dict = {key: value for key, value in workflow_dict.items() if getattr(workflow, key) != value}
+        if not workflow_dict:
+            return workflow
 
         # 执行更新
         stmt = (
@@ -247,16 +305,16 @@ class WorkflowService:
 
     async def get_workflow_stats(self, user_id: str | None = None) -> dict:
         """获取工作流统计信息"""
-        query = select(Workflow)
+        query = select(Workflow.status, func.count()).group_by(Workflow.status)
         if user_id is not None:
             query = query.where(Workflow.user_id == user_id)
 
         result = await self.db.execute(query)
-        workflows = result.scalars().all()
+        counts = dict(result.all())
 
-        total = len(workflows)
-        active = sum(1 for w in workflows if w.status == 1)
-        inactive = sum(1 for w in workflows if w.status == 0)
+        total = sum(counts.values())
+        active = counts.get(1, 0)
+        inactive = counts.get(0, 0)
 
         return {"total": total, "active": active, "inactive": inactive}
 
@@ -0,0 +1,301 @@
+import asyncio
+import json
+import time
+
+import pytest
+import pytest_asyncio
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from rpawebsocket.ws import BaseMsg, Conn, IWebSocket
+from rpawebsocket.ws_service import WsManager
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models.workflow import Execution
+from app.schemas.workflow import ExecutionCreate, ExecutionStatus
+from app.services import execution_dispatch
+from app.services.execution import ExecutionService
+from app.services.execution_dispatch import (
+    DISPATCH_STREAM,
+    OWNER_KEY,
+    RUNNING_KEY,
+    ExecutionDispatcher,
+)
+
+USER_ID = "dispatch-user"
+
+
+class FakeExecutorSocket(IWebSocket):
+    """模拟执行器的 ws 连接，收到运行消息后按需回复"""
+
+    def __init__(self):
+        self.inbox = asyncio.Queue()
+        self.received: list[dict] = []
+
+    async def receive_text(self) -> str:
+        return await self.inbox.get()
+
+    async def send(self, message) -> None:
+        self.received.append(json.loads(message))
+
+    async def close(self) -> None:
+        pass
+
+    def reply(self, msg: dict, code: str = "0000"):
+        reply = BaseMsg(**msg).to_reply()
+        reply.data = {"code": code, "msg": "", "data": None}
+        self.inbox.put_nowait(reply.tojson())
+
+
+@pytest_asyncio.fixture(scope="function")
+async def redis():
+    redis = FakeRedis(server=FakeServer(), decode_responses=True)
+    yield redis
+    await redis.aclose()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'executions.db'}")
+
+    from app.models import load_models
+
+    load_models()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    await engine.dispose()
+
+
+async def create_executions(session_factory, redis, count: int) -> list[str]:
+    ids = []
+    async with session_factory() as db:
+        service = ExecutionService(db, redis)
+        for _ in range(count):
+            execution = await service.execute_workflow(
+                ExecutionCreate(project_id="project", params={"a": 1}), USER_ID, wait=False
+            )
+            ids.append(execution.id)
+    return ids
+
+
+async def statuses(session_factory) -> dict[str, str]:
+    async with session_factory() as db:
+        result = await db.execute(select(Execution.id, Execution.status))
+        return dict(result.all())
+
+
+async def connect_executor(ws_manager: WsManager) -> tuple[FakeExecutorSocket, asyncio.Task]:
+    socket = FakeExecutorSocket()
+    task = asyncio.create_task(ws_manager.listen(USER_ID, Conn(ws=socket)))
+    await asyncio.sleep(0)
+    return socket, task
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_dispatch_and_result_callback(session_factory, redis):
+    ws_manager = WsManager()
+    dispatcher = ExecutionDispatcher(redis, ws_manager, session_factory, consumer="worker-a")
+    dispatcher.install()
+    await dispatcher.ensure_groups()
+    socket, listener = await connect_executor(ws_manager)
+
+    [execution_id] = await create_executions(session_factory, redis, 1)
+    assert await dispatcher.dispatch_pending() == 1
+    assert (await statuses(session_factory))[execution_id] == ExecutionStatus.RUNNING.value
+
+    [msg] = socket.received
+    assert msg["channel"] == "remote" and msg["key"] == "run"
+    assert json.loads(msg["data"]["run_param"]) == [{"varName": "a", "varValue": 1}]
+
+    # 回复进入结果流，不在进程内登记等待
+    assert len(ws_manager.watch_msg) == 0
+    socket.reply(msg)
+    await settle()
+    assert await dispatcher.apply_results() == 1
+
+    assert (await statuses(session_factory))[execution_id] == ExecutionStatus.COMPLETED.value
+    assert await redis.zcard(RUNNING_KEY) == 0
+    assert await redis.xlen(DISPATCH_STREAM) == 0
+    listener.cancel()
+
+
+@pytest.mark.asyncio
+async def test_duplicate_delivery_runs_once(session_factory, redis):
+    ws_manager = WsManager()
+    dispatcher = ExecutionDispatcher(redis, ws_manager, session_factory, consumer="worker-a")
+    await dispatcher.ensure_groups()
+    socket, listener = await connect_executor(ws_manager)
+
+    [execution_id] = await create_executions(session_factory, redis, 1)
+    # 同一执行重复入队（例如确认前实例崩溃后被重新认领）
+    await execution_dispatch.enqueue_execution(redis, execution_id, USER_ID)
+
+    assert await dispatcher.dispatch_pending() == 2
+    assert len(socket.received) == 1
+    listener.cancel()
+
+
+@pytest.mark.asyncio
+async def test_entry_is_claimed_by_worker_holding_connection(session_factory, redis):
+    lonely = ExecutionDispatcher(redis, WsManager(), session_factory, consumer="worker-a")
+    owner_manager = WsManager()
+    owner = ExecutionDispatcher(redis, owner_manager, session_factory, consumer="worker-b")
+    await lonely.ensure_groups()
+    socket, listener = await connect_executor(owner_manager)
+    await owner.refresh_owners()
+
+    [execution_id] = await create_executions(session_factory, redis, 1)
+    # 没有连接的实例先读到，不确认，转给所有者
+    assert await lonely.dispatch_pending() == 0
+    assert lonely.deferred == 1
+
+    assert await owner.claim_stale() == 1
+    assert len(socket.received) == 1
+    assert (await statuses(session_factory))[execution_id] == ExecutionStatus.RUNNING.value
+    listener.cancel()
+
+
+@pytest.mark.asyncio
+async def test_non_owner_does_not_fail_connected_executor(session_factory, redis, monkeypatch):
+    lonely = ExecutionDispatcher(redis, WsManager(), session_factory, consumer="worker-a")
+    owner_manager = WsManager()
+    owner = ExecutionDispatcher(redis, owner_manager, session_factory, consumer="worker-b")
+    await lonely.ensure_groups()
+    lonely.claim_idle_ms = 0
+    socket, listener = await connect_executor(owner_manager)
+    await owner.refresh_owners()
+    monkeypatch.setattr(execution_dispatch, "DISPATCH_TIMEOUT", 0)
+
+    [execution_id] = await create_executions(session_factory, redis, 1)
+    # 超过下发期限，但所有者存活，其他实例不标记失败
+    assert await lonely.dispatch_pending() == 0
+    assert await lonely.claim_stale() == 0
+    assert (await statuses(session_factory))[execution_id] == ExecutionStatus.PENDING.value
+
+    assert await owner.claim_stale() == 1
+    assert len(socket.received) == 1
+    assert (await statuses(session_factory))[execution_id] == ExecutionStatus.RUNNING.value
+    listener.cancel()
+
+
+@pytest.mark.asyncio
+async def test_owner_released_after_disconnect(session_factory, redis, monkeypatch):
+    owner_manager = WsManager()
+    owner = ExecutionDispatcher(redis, owner_manager, session_factory, consumer="worker-b")
+    lonely = ExecutionDispatcher(redis, WsManager(), session_factory, consumer="worker-a")
+    await owner.ensure_groups()
+    _, listener = await connect_executor(owner_manager)
+    await owner.refresh_owners()
+    assert await redis.get(OWNER_KEY.format(USER_ID)) == "worker-b"
+
+    # 执行器断开
+    listener.cancel()
+    owner_manager.conns.clear()
+    await owner.refresh_owners()
+    assert await redis.get(OWNER_KEY.format(USER_ID)) is None
+
+    monkeypatch.setattr(execution_dispatch, "DISPATCH_TIMEOUT", 0)
+    [execution_id] = await create_executions(session_factory, redis, 1)
+    assert await lonely.dispatch_pending() == 1
+    assert (await statuses(session_factory))[execution_id] == ExecutionStatus.FAILED.value
+
+
+@pytest.mark.asyncio
+async def test_executor_offline_fails_after_dispatch_deadline(session_factory, redis, monkeypatch):
+    dispatcher = ExecutionDispatcher(redis, WsManager(), session_factory, consumer="worker-a")
+    await dispatcher.ensure_groups()
+    monkeypatch.setattr(execution_dispatch, "DISPATCH_TIMEOUT", 0)
+
+    [execution_id] = await create_executions(session_factory, redis, 1)
+    assert await dispatcher.dispatch_pending() == 1
+    assert (await statuses(session_factory))[execution_id] == ExecutionStatus.FAILED.value
+
+
+@pytest.mark.asyncio
+async def test_reap_timeouts_and_orphans(session_factory, redis):
+    ws_manager = WsManager()
+    dispatcher = ExecutionDispatcher(redis, ws_manager, session_factory, consumer="worker-a")
+    await dispatcher.ensure_groups()
+    _, listener = await connect_executor(ws_manager)
+
+    timed_out, orphan, alive = await create_executions(session_factory, redis, 3)
+    assert await dispatcher.dispatch_pending() == 3
+
+    assert await dispatcher.reap_timeouts(now=time.time()) == 0
+    await redis.zadd(RUNNING_KEY, {timed_out: 0})
+    assert await dispatcher.reap_timeouts() == 1
+
+    # 重启后期限记录丢失的 RUNNING 执行视为孤儿
+    await redis.zrem(RUNNING_KEY, orphan)
+    assert await dispatcher.reap_orphans() == 1
+
+    result = await statuses(session_factory)
+    assert result[timed_out] == ExecutionStatus.FAILED.value
+    assert result[orphan] == ExecutionStatus.FAILED.value
+    assert result[alive] == ExecutionStatus.RUNNING.value
+    listener.cancel()
+
+
+@pytest.mark.asyncio
+async def test_in_flight_executions_hold_no_worker_state(session_factory, redis):
+    ws_manager = WsManager()
+    dispatcher = ExecutionDispatcher(redis, ws_manager, session_factory, consumer="worker-a")
+    dispatcher.install()
+    await dispatcher.ensure_groups()
+    socket, listener = await connect_executor(ws_manager)
+    tasks_before = len(asyncio.all_tasks())
+
+    count = 1000
+    await create_executions(session_factory, redis, count)
+    while await dispatcher.dispatch_pending():
+        pass
+
+    # 大量长时间运行的执行不占用协程、watch 和等待堆
+    assert len(socket.received) == count
+    assert len(ws_manager.watch_msg) == 0
+    assert ws_manager.watch_msg_queue == []
+    assert len(asyncio.all_tasks()) == tasks_before
+    assert await redis.zcard(RUNNING_KEY) == count
+
+    for msg in socket.received:
+        socket.reply(msg)
+        await settle()
+    while await dispatcher.apply_results():
+        pass
+    assert set((await statuses(session_factory)).values()) == {ExecutionStatus.COMPLETED.value}
+    listener.cancel()
+
+
+@pytest.mark.asyncio
+async def test_sync_execute_waits_for_result(session_factory, redis):
+    ws_manager = WsManager()
+    dispatcher = ExecutionDispatcher(redis, ws_manager, session_factory, consumer="worker-a")
+    dispatcher.install()
+    await dispatcher.ensure_groups()
+    socket, listener = await connect_executor(ws_manager)
+
+    async def executor():
+        while not await dispatcher.dispatch_pending():
+            await asyncio.sleep(0.01)
+        socket.reply(socket.received[0], code="5001")
+        await settle()
+        await dispatcher.apply_results()
+
+    async with session_factory() as db:
+        service = ExecutionService(db, redis)
+        execution, _ = await asyncio.gather(
+            service.execute_workflow(ExecutionCreate(project_id="project"), USER_ID, wait=True, workflow_timeout=5),
+            executor(),
+        )
+    assert execution.status == ExecutionStatus.FAILED.value
+    assert execution.get_result_as_dict()["code"] == "5001"
+    listener.cancel()
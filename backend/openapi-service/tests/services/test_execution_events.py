@@ -0,0 +1,166 @@
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.routers import executions
+from app.schemas.workflow import ExecutionCreate, ExecutionStatus
+from app.services import execution_events
+from app.services.execution import ExecutionService
+from app.services.execution_events import (
+    EVENTS_CHANNEL,
+    RESYNC,
+    get_event_bus,
+    start_event_bus,
+    stop_event_bus,
+    wait_for_finish,
+)
+
+USER_ID = "events-user"
+
+
+@pytest_asyncio.fixture(scope="function")
+async def redis():
+    redis = FakeRedis(server=FakeServer(), decode_responses=True)
+    yield redis
+    await redis.aclose()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'executions.db'}")
+
+    from app.models import load_models
+
+    load_models()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def bus(redis):
+    bus = await start_event_bus(redis)
+    yield bus
+    await stop_event_bus()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def execution_id(session_factory, redis):
+    async with session_factory() as db:
+        service = ExecutionService(db, redis)
+        execution = await service.create_execution(ExecutionCreate(project_id="project"), USER_ID)
+        await db.commit()
+    async with session_factory() as db:
+        await ExecutionService(db, redis).update_execution_status(execution.id, ExecutionStatus.RUNNING.value)
+    return execution.id
+
+
+def make_loader(session_factory, execution_id, calls: list | None = None):
+    async def load():
+        if calls is not None:
+            calls.append(execution_id)
+        async with session_factory() as db:
+            execution = await ExecutionService(db).get_execution(execution_id)
+            return execution.to_dict() if execution else None
+
+    return load
+
+
+async def set_status(session_factory, redis, execution_id, status):
+    async with session_factory() as db:
+        await ExecutionService(db, redis).update_execution_status(execution_id, status, result={"code": "0000"})
+
+
+@pytest.mark.asyncio
+async def test_watchers_share_one_subscription(session_factory, redis, bus, execution_id):
+    calls = []
+    load = make_loader(session_factory, execution_id, calls)
+    waiters = [asyncio.create_task(wait_for_finish(execution_id, load, timeout=10)) for _ in range(100)]
+    while bus.stats()["watchers"] < 100:
+        await asyncio.sleep(0.01)
+
+    assert await redis.pubsub_numsub(EVENTS_CHANNEL) == [(EVENTS_CHANNEL, 1)]
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await set_status(session_factory, redis, execution_id, ExecutionStatus.COMPLETED.value)
+    results = await asyncio.gather(*waiters)
+
+    assert loop.time() - start < 0.5
+    assert all(result["status"] == ExecutionStatus.COMPLETED.value for result in results)
+    # 每个等待者只在登记后读一次数据库
+    assert len(calls) == 100
+    assert bus.stats()["watchers"] == 0
+
+
+@pytest.mark.asyncio
+async def test_long_poll_times_out_with_current_status(session_factory, bus, execution_id):
+    result = await wait_for_finish(execution_id, make_loader(session_factory, execution_id), timeout=0.1)
+    assert result["status"] == ExecutionStatus.RUNNING.value
+
+
+@pytest.mark.asyncio
+async def test_already_finished_returns_immediately(session_factory, redis, bus, execution_id):
+    await set_status(session_factory, redis, execution_id, ExecutionStatus.FAILED.value)
+    result = await wait_for_finish(execution_id, make_loader(session_factory, execution_id), timeout=10)
+    assert result["status"] == ExecutionStatus.FAILED.value
+
+
+@pytest.mark.asyncio
+async def test_resync_after_missed_event(session_factory, bus, execution_id):
+    waiter = asyncio.create_task(wait_for_finish(execution_id, make_loader(session_factory, execution_id), timeout=10))
+    while bus.stats()["watchers"] < 1:
+        await asyncio.sleep(0.01)
+
+    # 订阅断开期间的更新没有事件
+    await set_status(session_factory, None, execution_id, ExecutionStatus.CANCELLED.value)
+    bus._broadcast(RESYNC)
+    assert (await waiter)["status"] == ExecutionStatus.CANCELLED.value
+
+
+@pytest.mark.asyncio
+async def test_zero_timeout_returns_current_state(session_factory, execution_id):
+    execution = await wait_for_finish(execution_id, make_loader(session_factory, execution_id), timeout=0)
+    assert execution["status"] == ExecutionStatus.RUNNING.value
+    assert await wait_for_finish("missing", make_loader(session_factory, "missing"), timeout=0) is None
+
+
+@pytest.mark.asyncio
+async def test_poll_fallback_without_bus(session_factory, redis, execution_id, monkeypatch):
+    assert get_event_bus() is None
+    monkeypatch.setattr(execution_events, "WAIT_POLL_MIN_INTERVAL", 0.01)
+    waiter = asyncio.create_task(wait_for_finish(execution_id, make_loader(session_factory, execution_id), timeout=10))
+    await asyncio.sleep(0.05)
+    await set_status(session_factory, redis, execution_id, ExecutionStatus.COMPLETED.value)
+    assert (await waiter)["status"] == ExecutionStatus.COMPLETED.value
+
+
+@pytest.mark.asyncio
+async def test_sse_streams_transitions(session_factory, redis, bus, execution_id, monkeypatch):
+    monkeypatch.setattr(executions, "AsyncSessionLocal", session_factory)
+    async with session_factory() as db:
+        response = await executions.stream_execution_events(execution_id, user_id=USER_ID, db=db)
+
+    frames = []
+
+    async def read():
+        async for frame in response.body_iterator:
+            frames.append(frame)
+
+    reader = asyncio.create_task(read())
+    while bus.stats()["watchers"] < 1:
+        await asyncio.sleep(0.01)
+    await set_status(session_factory, redis, execution_id, ExecutionStatus.COMPLETED.value)
+    await asyncio.wait_for(reader, timeout=5)
+
+    statuses = [json.loads(frame.split("data: ", 1)[1])["status"] for frame in frames]
+    assert statuses == [ExecutionStatus.RUNNING.value, ExecutionStatus.COMPLETED.value]
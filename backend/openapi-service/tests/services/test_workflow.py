@@ -0,0 +1,196 @@
+import json
+
+import pytest
+import pytest_asyncio
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base, commit
+from app.schemas.workflow import WorkflowBase
+from app.services.workflow import WorkflowService, parameters_digest
+
+USER_ID = "workflow-user"
+
+PARAMETERS = [
+    {"id": "p1", "varDirection": 0, "varName": "city", "varType": "Str", "varValue": "", "varDescribe": "城市"},
+    {"id": "p2", "varDirection": 1, "varName": "weather", "varType": "Str", "varValue": "", "varDescribe": ""},
+]
+
+
+class MonitoredRedis(FakeRedis):
+    """记录执行过的 Redis 命令"""
+
+    commands: list[str]
+
+    async def execute_command(self, *args, **options):
+        self.commands.append(str(args[0]).upper())
+        return await super().execute_command(*args, **options)
+
+
+@pytest_asyncio.fixture(scope="function")
+async def redis():
+    redis = MonitoredRedis(server=FakeServer(), decode_responses=True)
+    redis.commands = []
+    yield redis
+    await redis.aclose()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'workflows.db'}")
+
+    from app.models import load_models
+
+    load_models()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield engine
+
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def db(engine):
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+
+
+def workflow_data(project_id: str = "project", parameters: list | None = None, **kwargs) -> WorkflowBase:
+    fields = {
+        "project_id": project_id,
+        "name": "天气查询",
+        "status": 1,
+        "parameters": json.dumps(PARAMETERS if parameters is None else parameters, ensure_ascii=False),
+    }
+    return WorkflowBase(**{**fields, **kwargs})
+
+
+def record_updates(engine) -> list[str]:
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE"):
+            statements.append(statement)
+
+    return statements
+
+
+def test_parameters_digest_ignores_formatting():
+    compact = json.dumps(PARAMETERS, ensure_ascii=False, separators=(",", ":"))
+    reordered = json.dumps([dict(reversed(param.items())) for param in PARAMETERS], indent=2)
+    assert parameters_digest(compact) == parameters_digest(reordered)
+    assert parameters_digest(compact) != parameters_digest(json.dumps(PARAMETERS[:1]))
+    assert parameters_digest(None) is None
+
+
+@pytest.mark.asyncio
+async def test_unchanged_update_short_circuits(engine, db, redis):
+    service = WorkflowService(db, redis)
+    workflow = await service.create_workflow(workflow_data(), USER_ID)
+    assert workflow.parameters_hash == parameters_digest(workflow.parameters)
+
+    updates = record_updates(engine)
+    redis.commands.clear()
+    for _ in range(3):
+        await service.update_workflow(workflow_data(), USER_ID)
+
+    assert updates == []
+    assert redis.commands == []
+
+
+@pytest.mark.asyncio
+async def test_changed_parameters_are_merged(db, redis):
+    service = WorkflowService(db, redis)
+    await service.create_workflow(workflow_data(), USER_ID)
+
+    changed = [
+        {**PARAMETERS[0], "varValue": "合肥", "varDescribe": ""},
+        {"id": "p3", "varDirection": 1, "varName": "humidity", "varType": "Str", "varValue": ""},
+    ]
+    workflow = await service.update_workflow(workflow_data(parameters=changed), USER_ID)
+
+    merged = json.loads(workflow.parameters)
+    assert [param["id"] for param in merged] == ["p1", "p3"]
+    assert merged[0]["varValue"] == "合肥"
+    # 新描述为空时保留原描述
+    assert merged[0]["varDescribe"] == "城市"
+    assert workflow.parameters_hash == parameters_digest(workflow.parameters)
+
+
+@pytest.mark.asyncio
+async def test_legacy_rows_without_hash_are_backfilled(engine, db, redis):
+    service = WorkflowService(db, redis)
+    workflow = await service.create_workflow(workflow_data(), USER_ID)
+    workflow.parameters_hash = None
+    await db.flush()
+
+    updates = record_updates(engine)
+    workflow = await service.update_workflow(workflow_data(), USER_ID)
+    assert len(updates) == 1
+    assert workflow.parameters_hash == parameters_digest(workflow.parameters)
+
+
+@pytest.mark.asyncio
+async def test_cache_invalidation_uses_generation(db, redis):
+    service = WorkflowService(db, redis)
+    await service.create_workflow(workflow_data("first"), USER_ID)
+    await commit(db)
+
+    first = await service.get_workflow_dicts(USER_ID)
+    assert [workflow["project_id"] for workflow in first] == ["first"]
+    redis.commands.clear()
+    assert await service.get_workflow_dicts(USER_ID) == first
+    assert "SET" not in redis.commands
+
+    await service.create_workflow(workflow_data("second"), USER_ID)
+    await commit(db)
+    assert {workflow["project_id"] for workflow in await service.get_workflow_dicts(USER_ID)} == {"first", "second"}
+
+    await service.update_workflow(workflow_data("first", description="新描述"), USER_ID)
+    await service.delete_workflow("second", USER_ID)
+    await commit(db)
+    [workflow] = await service.get_workflow_dicts(USER_ID)
+    assert workflow["description"] == "新描述"
+
+    assert "KEYS" not in redis.commands and "SCAN" not in redis.commands
+
+
+@pytest.mark.asyncio
+async def test_cache_generation_bumped_after_commit(db, redis):
+    service = WorkflowService(db, redis)
+    generation_key = service._workflows_generation_key(USER_ID)
+    await service.create_workflow(workflow_data(), USER_ID)
+    # 提交前不递增代数，并发读取不会把未提交的数据缓存到新代数下
+    assert await redis.get(generation_key) is None
+    await commit(db)
+    assert await redis.get(generation_key) == "1"
+
+    await service.update_workflow(workflow_data(description="回滚"), USER_ID)
+    await db.rollback()
+    await commit(db)
+    assert await redis.get(generation_key) == "1"
+
+
+@pytest.mark.asyncio
+async def test_workflow_dicts_without_redis(db):
+    service = WorkflowService(db)
+    await service.create_workflow(workflow_data(), USER_ID)
+    [workflow] = await service.get_workflow_dicts(USER_ID)
+    assert workflow["parameters"] == PARAMETERS
+
+
+@pytest.mark.asyncio
+async def test_stats_use_sql_aggregates(db):
+    service = WorkflowService(db)
+    for index in range(5):
+        await service.create_workflow(workflow_data(f"active-{index}"), USER_ID)
+    for index in range(2):
+        await service.create_workflow(workflow_data(f"inactive-{index}", status=0), USER_ID)
+    await service.create_workflow(workflow_data("other"), "other-user")
+
+    assert await service.get_workflow_stats(USER_ID) == {"total": 7, "active": 5, "inactive": 2}
+    assert await service.get_workflow_stats() == {"total": 8, "active": 6, "inactive": 2}
@@ -1693,11 +1693,13 @@ CREATE TABLE `openai_workflows` (
   `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
   `english_name` varchar(100) DEFAULT NULL COMMENT '翻译后的英文名称',
   `parameters` text COMMENT '存储JSON字符串格式的参数',
+  `parameters_hash` varchar(64) DEFAULT NULL COMMENT '参数规范化后的sha256',
   PRIMARY KEY (`project_id`),
   KEY `idx_name` (`name`),
   KEY `idx_user_id` (`user_id`),
   KEY `idx_status` (`status`),
-  KEY `idx_created_at` (`created_at`)
+  KEY `idx_created_at` (`created_at`),
+  KEY `idx_user_status` (`user_id`, `status`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 
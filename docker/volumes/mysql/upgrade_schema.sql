@@ -0,0 +1,24 @@
+-- 已有数据库的表结构升级，每次启动都会执行，语句均可重复执行
+-- 新建数据库时 schema.sql 已包含这些字段和索引，这里会全部跳过
+
+-- rpa.openai_workflows: 参数哈希字段（旧记录为空，更新时自动补齐）
+SET @sql = IF(
+  (SELECT COUNT(*) FROM information_schema.COLUMNS
+   WHERE TABLE_SCHEMA = 'rpa' AND TABLE_NAME = 'openai_workflows' AND COLUMN_NAME = 'parameters_hash') = 0,
+  'ALTER TABLE rpa.openai_workflows ADD COLUMN `parameters_hash` varchar(64) DEFAULT NULL COMMENT ''参数规范化后的sha256'' AFTER `parameters`',
+  'SELECT 1'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- rpa.openai_workflows: 按用户统计各状态工作流数量的联合索引
+SET @sql = IF(
+  (SELECT COUNT(*) FROM information_schema.STATISTICS
+   WHERE TABLE_SCHEMA = 'rpa' AND TABLE_NAME = 'openai_workflows' AND INDEX_NAME = 'idx_user_status') = 0,
+  'ALTER TABLE rpa.openai_workflows ADD KEY `idx_user_status` (`user_id`, `status`)',
+  'SELECT 1'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
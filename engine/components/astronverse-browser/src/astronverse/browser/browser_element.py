@@ -45,12 +45,8 @@ from astronverse.browser.core.core import IBrowserCore
 from astronverse.browser.error import *
 from astronverse.browser.js.base import BaseBuilder
 from astronverse.browser.js.chrome import CodeChromeBuilder
-from astronverse.browser.utils.table_filter import (
-    DataFilter,
-    page_values_merge,
-    table_df_to_out,
-    table_json_merge_values,
-)
+from astronverse.browser.utils.page_pipeline import ColumnBuffer, PagePipeline
+from astronverse.browser.utils.table_filter import table_chunks_to_out
 from astronverse.input.code.screenshot import Screenshot
 
 if sys.platform == "win32":
@@ -166,6 +162,70 @@ def extract_path_attributes(path_data):
     }
 
 
+def click_next_page(
+    browser_obj: Browser,
+    pipeline: PagePipeline,
+    element_data: WebPick,
+    simulate_flag: bool,
+    button_type: ButtonForClickTypeFlag,
+    element_timeout: int,
+    scroll_into_center: bool,
+):
+    """
+    数据抓取翻页：当前页在后台取数时，先等待并定位翻页按钮，取数完成后再点击
+    模拟人工点击会滚动页面、移动鼠标，等当前页取数完成后再开始；翻页失败时忽略，与原有行为一致
+    """
+    if simulate_flag or browser_obj.browser_type not in CHROME_LIKE_BROWSERS:
+        pipeline.wait_extracted()
+        try:
+            BrowserElement.click(
+                browser_obj=browser_obj,
+                element_data=element_data,
+                simulate_flag=simulate_flag,
+                assistive_key=ButtonForAssistiveKeyFlag.Nothing,
+                button_type=button_type,
+                element_timeout=element_timeout,
+                scroll_into_center=scroll_into_center,
+            )
+        except Exception:
+            pass
+        return
+
+    # 只读取页面，与当前页取数同时进行
+    try:
+        located = BrowserElement.wait_element(
+            browser_obj=browser_obj,
+            element_data=element_data,
+            ele_status=WaitElementForStatusFlag.ElementExists,
+            element_timeout=int(element_timeout),
+        )
+        if located:
+            element = Locator.locator(
+                element_data.get("elementData"),
+                cur_target_app=browser_obj.browser_type.value,
+                scroll_into_view=False,
+            )
+            located = not isinstance(element.rect(), list)
+    except Exception:
+        located = False
+
+    # 当前页取数完成前不能点击，否则会读到翻页后的内容
+    pipeline.wait_extracted()
+    if not located:
+        return
+    try:
+        browser_obj.send_browser_extension(
+            browser_type=browser_obj.browser_type.value,
+            key="clickElement",
+            data={
+                **element_data["elementData"]["path"],
+                "atomConfig": {"buttonType": button_type.value},
+            },
+        )
+    except Exception:
+        pass
+
+
 class BrowserElement:
     """浏览器元素操作类，提供网页元素的各种操作方法。"""
 
@@ -1617,91 +1677,67 @@ class BrowserElement:
         scroll_into_center: bool = True,
     ):
         """数据抓取（web）"""
-        table_list = []
         batch_element = batch_data.get("elementData")  # 抓取对象
         table_element = batch_element["path"]  # 元素信息
         produce_type = table_element["produceType"]  # 抓取类型， produceType: table/similar
-        for i in range(1, page_count + 1):
-            # 获取表格内容, 二维数组
-            if produce_type == "table":
-                # 等待元素
-                wait = BrowserElement.wait_element(
-                    browser_obj=browser_obj,
-                    element_data=batch_data,
-                    ele_status=WaitElementForStatusFlag.ElementExists,
-                    element_timeout=int(element_timeout),
-                )
-                if not wait:
-                    raise BaseException(WEB_GET_ELE_ERROR.format("请检查抓取元素"), "浏览器元素未找到！")
-                # 发送给插件
-                response = browser_obj.send_browser_extension(
-                    browser_type=browser_obj.browser_type.value,
-                    key="tableDataBatch",
-                    data=table_element,
-                )
-                # 打印 response
-                # logger.info(f'table_element response: {response}')
-                table_values = response["values"]
-                table_list = page_values_merge(table_list, table_values, produce_type)
-            else:
-                # 相似元素对象
-                similar_element = batch_element["path"]
-                wait = BrowserElement.wait_element(
-                    browser_obj=browser_obj,
-                    element_data={
-                        "elementData": {
-                            "version": batch_element["version"],
-                            "type": batch_element["type"],
-                            "app": batch_element["app"],
-                            "picker_type": "ELEMENT",
-                            "path": similar_element,
-                        }
-                    },
-                    ele_status=WaitElementForStatusFlag.ElementExists,
-                    element_timeout=int(element_timeout),
-                )
-                if not wait:
-                    raise BaseException(WEB_GET_ELE_ERROR.format("请检查抓取元素"), "浏览器元素未找到！")
-                response = browser_obj.send_browser_extension(
-                    browser_type=browser_obj.browser_type.value,
-                    key="simalarListBatch",
-                    data=similar_element,
-                )
-                # 打印 response
-                # logger.info(f'similar_element response: {response}')
-                similar_values = response["values"]
-                table_list = page_values_merge(table_list, similar_values, produce_type)
-
-            # 是否翻页
-            if page_count > 1 and multi_page:
-                # logger.info(f'翻页: {i} 页')
-                # 点击翻页按钮元素,调用 上面的click 方法
-                try:
-                    BrowserElement.click(
-                        browser_obj=browser_obj,
-                        element_data=element_data,
-                        simulate_flag=simulate_flag,
-                        assistive_key=ButtonForAssistiveKeyFlag.Nothing,
-                        button_type=button_type,
-                        element_timeout=element_timeout,
-                        scroll_into_center=scroll_into_center,
-                    )
-                except Exception:
-                    pass
-                # 等待 page_interval 秒
-                time.sleep(page_interval)
-
-        # logger.info(f'表格数据: {table_list}')
-        # 合并获取到的数据 到 table_element的 values 中
-        data_formated = table_json_merge_values(data_json=table_element, values=table_list)
-        # logger.info(f'表格数据格式化: {data_formated}')
-
-        # 数据处理
-        data_filtered = DataFilter(data_json=data_formated).get_filtered_data()
-        # logger.info(f'表格数据过滤: {data_filtered}')
-
-        # 得到过滤后的 table_df
-        table_df_out = table_df_to_out(data_json=data_filtered)
+        if produce_type == "table":
+            wait_data = batch_data
+            extension_key = "tableDataBatch"
+        else:
+            # 相似元素对象
+            wait_data = {
+                "elementData": {
+                    "version": batch_element["version"],
+                    "type": batch_element["type"],
+                    "app": batch_element["app"],
+                    "picker_type": "ELEMENT",
+                    "path": table_element,
+                }
+            }
+            extension_key = "simalarListBatch"
+
+        def fetch_page() -> list:
+            # 等待元素
+            wait = BrowserElement.wait_element(
+                browser_obj=browser_obj,
+                element_data=wait_data,
+                ele_status=WaitElementForStatusFlag.ElementExists,
+                element_timeout=int(element_timeout),
+            )
+            if not wait:
+                raise BaseException(WEB_GET_ELE_ERROR.format("请检查抓取元素"), "浏览器元素未找到！")
+            # 发送给插件，获取表格内容, 二维数组
+            response = browser_obj.send_browser_extension(
+                browser_type=browser_obj.browser_type.value,
+                key=extension_key,
+                data=table_element,
+            )
+            return response["values"]
+
+        # 当前页在后台取数，同时定位翻页按钮；页数据由另一个后台线程追加到列式缓冲区，与翻页重叠执行
+        table_buffer = ColumnBuffer(produce_type)
+        try:
+            with PagePipeline(table_buffer, page_count=page_count) as pipeline:
+                for i in range(1, page_count + 1):
+                    pipeline.extract(i, fetch_page)
+
+                    # 是否翻页
+                    if page_count > 1 and multi_page:
+                        click_next_page(
+                            browser_obj=browser_obj,
+                            pipeline=pipeline,
+                            element_data=element_data,
+                            simulate_flag=simulate_flag,
+                            button_type=button_type,
+                            element_timeout=element_timeout,
+                            scroll_into_center=scroll_into_center,
+                        )
+                        # 等待 page_interval 秒
+                        time.sleep(page_interval)
+            # 已落盘的数据逐块读回，合并到 table_element 的 values 中、过滤并转换成输出 table_df
+            table_df_out = table_chunks_to_out(data_json=table_element, chunks=table_buffer.iter_values())
+        finally:
+            table_buffer.close()
 
         # 是否过滤空列
         if output_filter_empty_col:
@@ -0,0 +1,231 @@
+"""
+分页抓取流水线
+
+数据抓取（web）翻页时，当前页的取数在后台抓取线程中进行，主线程同时等待并定位翻页按钮，
+取数完成后再点击翻页；页数据的补齐、追加、落盘交给另一个后台线程完成，与下一次翻页重叠执行。
+页数据按列追加到 ColumnBuffer 中，不再反复合并字典；行数过多时分块落盘（parquet/csv），
+之后按块读回交给下游处理，不会把整次抓取一次性读回内存。
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import pandas as pd
+from astronverse.actionlib.logger import logger
+
+# 内存中超过该行数后落盘
+SPILL_ROWS = 50000
+
+
+def _empty_cell(produce_type: str):
+    """空单元格，similar 类型需要新建字典，避免后续处理时共享引用"""
+    if produce_type == "table":
+        return ""
+    return {"text": "", "attrs": {}}
+
+
+class ColumnBuffer:
+    """
+    按列追加的抓取缓冲区
+
+    @:param produce_type: 抓取类型 table/similar
+    @:param spill_rows: 内存中最多保留的行数，超过后写入临时文件，<=0 表示不落盘
+    @:param spill_format: 落盘格式 parquet/csv，parquet 依赖 pyarrow，不可用时回退为 csv
+    """
+
+    def __init__(
+        self,
+        produce_type: str,
+        spill_rows: int = SPILL_ROWS,
+        spill_dir: Optional[str] = None,
+        spill_format: str = "parquet",
+    ):
+        self.produce_type = produce_type
+        self.spill_rows = spill_rows
+        self.spill_dir = spill_dir
+        self.spill_format = spill_format
+        self.columns: list[list] = []
+        self.rows = 0  # 总行数（含已落盘部分）
+        self._chunks: list[str] = []
+        self._tmp_dir: Optional[str] = None
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def spilled(self) -> bool:
+        return len(self._chunks) > 0
+
+    def append(self, values: list):
+        """
+        追加一页数据
+        @:param values: 插件返回的页数据，以列为单元 [{"value": [...]}, ...]
+        """
+        if not values:
+            return
+        page_rows = max(len(item["value"]) for item in values)
+        if not self.columns:
+            self.columns = [[] for _ in values]
+        if len(values) != len(self.columns):
+            raise ValueError(f"抓取数据列数不一致：已有 {len(self.columns)} 列，本页 {len(values)} 列")
+        for col, item in zip(self.columns, values):
+            col.extend(item["value"])
+            for _ in range(page_rows - len(item["value"])):
+                col.append(_empty_cell(self.produce_type))
+        self.rows += page_rows
+
+        if 0 < self.spill_rows <= len(self.columns[0]):
+            self._spill()
+
+    def _spill(self):
+        """把内存中的行写入临时文件"""
+        if not self.columns or not self.columns[0]:
+            return
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix="data_batch_", dir=self.spill_dir)
+        data = {}
+        for index, col in enumerate(self.columns):
+            if self.produce_type == "table":
+                data[str(index)] = col
+            else:
+                data[str(index)] = [json.dumps(cell, ensure_ascii=False) for cell in col]
+        df = pd.DataFrame(data)
+
+        path = os.path.join(self._tmp_dir, f"chunk_{len(self._chunks)}")
+        spilled = False
+        if self.spill_format == "parquet":
+            try:
+                df.to_parquet(path + ".parquet", index=False)
+                path += ".parquet"
+                spilled = True
+            except ImportError:
+                logger.info("pyarrow 不可用，抓取数据改为 csv 落盘")
+                self.spill_format = "csv"
+            except (ValueError, TypeError) as e:
+                # pyarrow 的 ArrowInvalid/ArrowTypeError，常见于同一列混有不同类型，该块改为 csv
+                logger.warning(f"抓取数据 parquet 落盘失败，改为 csv: {e}")
+                if os.path.exists(path + ".parquet"):
+                    os.remove(path + ".parquet")
+        if not spilled:
+            path += ".csv"
+            df.to_csv(path, index=False)
+        self._chunks.append(path)
+        logger.info(f"数据抓取落盘: {path}, 行数: {len(df)}")
+        self.columns = [[] for _ in self.columns]
+
+    @staticmethod
+    def _read_chunk(path: str) -> pd.DataFrame:
+        if path.endswith(".parquet"):
+            return pd.read_parquet(path)
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+    def iter_values(self) -> Iterator[list]:
+        """
+        按块输出原有结构 [{"value": [...]}, ...]
+
+        已落盘的块按顺序逐块读回，最后输出内存中的剩余行；同一时刻只有一块数据在内存中
+        """
+        for path in self._chunks:
+            df = self._read_chunk(path)
+            chunk = []
+            for index in range(len(self.columns)):
+                col = df[str(index)].tolist()
+                if self.produce_type != "table":
+                    col = [json.loads(cell) for cell in col]
+                chunk.append({"value": col})
+            del df
+            yield chunk
+        if not self._chunks or (self.columns and self.columns[0]):
+            yield [{"value": col} for col in self.columns]
+
+    def close(self):
+        """删除临时文件"""
+        if self._tmp_dir:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+        self._chunks = []
+
+
+class PagePipeline:
+    """
+    翻页抓取流水线
+
+    extract 在抓取线程中取一页数据后交给 submit，调用方同时准备翻页，点击翻页前调用 wait_extracted；
+    submit 把一页数据交给后台线程写入缓冲区后立即返回，调用方随即翻页；
+    同一时刻最多只有一页在抓取、一页在处理，保证顺序且内存占用有上限。
+    """
+
+    def __init__(
+        self,
+        buffer: ColumnBuffer,
+        page_count: int = 1,
+        progress: Optional[Callable[[int, int, int], None]] = None,
+    ):
+        self.buffer = buffer
+        self.page_count = page_count
+        self.progress = progress
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="data_batch")
+        self._extractor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="data_batch_extract")
+        self._pending: Optional[Future] = None
+        self._extracting: Optional[Future] = None
+        self._start = time.time()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.finish()
+        except Exception as e:
+            if exc_type is None:
+                raise
+            # 已有异常时不覆盖原始异常
+            logger.warning(f"数据抓取后台任务异常: {e}")
+
+    def _consume(self, page: int, values: list):
+        self.buffer.append(values)
+        elapsed = time.time() - self._start
+        logger.info(f"数据抓取进度: {page}/{self.page_count} 页, 共 {self.buffer.rows} 行, 耗时 {elapsed:.2f}s")
+        if self.progress:
+            self.progress(page, self.page_count, self.buffer.rows)
+
+    def _wait(self):
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def submit(self, page: int, values: list):
+        """提交一页数据，上一页尚未处理完时先等待，后台异常在此处抛出"""
+        self._wait()
+        self._pending = self._executor.submit(self._consume, page, values)
+
+    def extract(self, page: int, fetch: Callable[[], list]):
+        """
+        在抓取线程中取一页数据并提交，立即返回
+
+        @:param fetch: 读取当前页数据，返回插件的页数据 [{"value": [...]}, ...]
+        """
+        self.wait_extracted()
+        self._extracting = self._extractor.submit(lambda: self.submit(page, fetch()))
+
+    def wait_extracted(self):
+        """等待当前页取数完成，之后才能翻页，取数异常在此处抛出"""
+        if self._extracting is not None:
+            extracting, self._extracting = self._extracting, None
+            extracting.result()
+
+    def finish(self) -> ColumnBuffer:
+        """等待最后一页抓取、处理完成"""
+        try:
+            self.wait_extracted()
+            self._wait()
+        finally:
+            self._extractor.shutdown(wait=True)
+            self._executor.shutdown(wait=True)
+        return self.buffer
@@ -493,6 +493,33 @@ def table_df_to_out(data_json):
     return df
 
 
+def table_chunks_to_out(data_json, chunks):
+    """
+    逐块合并、过滤抓取数据并转换成输出 table，只保留输出需要的文本
+    单元格过滤会把一列中符合条件的值整体上移，依赖整张表，存在单元格过滤时先合并所有块再处理
+    @:param data_json: 抓取对象
+    @:param chunks: 按块输出的抓取数据，每块结构同 table_json_merge_values 的 values
+    """
+    if any(item.get("colFilterConfig") for item in data_json["values"]):
+        merged = None
+        for chunk in chunks:
+            if merged is None:
+                merged = chunk
+            else:
+                for col, item in zip(merged, chunk):
+                    col["value"].extend(item["value"])
+        chunks = [merged] if merged is not None else []
+
+    frames = []
+    for chunk in chunks:
+        # 每块使用独立的抓取对象副本，过滤配置的改写不影响后续块
+        chunk_json = {**data_json, "values": [dict(item) for item in data_json["values"]]}
+        data_formated = table_json_merge_values(data_json=chunk_json, values=chunk)
+        data_filtered = DataFilter(data_json=data_formated).get_filtered_data()
+        frames.append(table_df_to_out(data_json=data_filtered))
+    return pd.concat(frames, ignore_index=True)
+
+
 def table_values_to_table_dict(values, produce_type):
     """
     将 values 转换成 table dict
@@ -0,0 +1,71 @@
+import os
+import threading
+from unittest import TestCase
+
+from astronverse.browser.utils.page_pipeline import ColumnBuffer, PagePipeline
+
+
+def page(start: int, rows: int = 3) -> list:
+    return [{"value": [str(start + i) for i in range(rows)]}, {"value": ["x"] * rows}]
+
+
+class TestPagePipeline(TestCase):
+    def test_extract_in_order(self):
+        buffer = ColumnBuffer("table")
+        with PagePipeline(buffer, page_count=5) as pipeline:
+            for i in range(5):
+                pipeline.extract(i + 1, lambda i=i: page(i * 3))
+        self.assertEqual(buffer.rows, 15)
+        values = list(buffer.iter_values())
+        self.assertEqual(values[0][0]["value"], [str(i) for i in range(15)])
+
+    def test_extract_overlaps_caller(self):
+        """取数在后台进行，调用方可以同时定位翻页按钮，点击前等待取数完成"""
+        started, release = threading.Event(), threading.Event()
+
+        def fetch():
+            started.set()
+            self.assertTrue(release.wait(5))
+            return page(0)
+
+        buffer = ColumnBuffer("table")
+        with PagePipeline(buffer) as pipeline:
+            pipeline.extract(1, fetch)
+            self.assertTrue(started.wait(5))
+            # 取数尚未完成，调用方没有被阻塞
+            self.assertEqual(buffer.rows, 0)
+            release.set()
+            pipeline.wait_extracted()
+        self.assertEqual(buffer.rows, 3)
+
+    def test_extract_error(self):
+        def fetch():
+            raise RuntimeError("元素未找到")
+
+        pipeline = PagePipeline(ColumnBuffer("table"))
+        pipeline.extract(1, fetch)
+        with self.assertRaisesRegex(RuntimeError, "元素未找到"):
+            pipeline.wait_extracted()
+        pipeline.finish()
+
+    def test_exit_keeps_original_error(self):
+        def fetch():
+            raise RuntimeError("background")
+
+        with self.assertRaisesRegex(ValueError, "caller"):
+            with PagePipeline(ColumnBuffer("table")) as pipeline:
+                pipeline.extract(1, fetch)
+                raise ValueError("caller")
+
+    def test_spill(self):
+        buffer = ColumnBuffer("similar", spill_rows=4, spill_format="csv")
+        similar = [{"value": [{"text": "a", "attrs": {}}]}]
+        with PagePipeline(buffer, page_count=10) as pipeline:
+            for i in range(10):
+                pipeline.extract(i + 1, lambda: similar)
+        self.assertTrue(buffer.spilled)
+        tmp_dir = buffer._tmp_dir
+        cells = [cell for chunk in buffer.iter_values() for cell in chunk[0]["value"]]
+        self.assertEqual(cells, [{"text": "a", "attrs": {}}] * 10)
+        buffer.close()
+        self.assertFalse(os.path.exists(tmp_dir))
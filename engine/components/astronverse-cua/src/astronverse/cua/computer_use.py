@@ -3,11 +3,8 @@ Computer Use Agent - 使用视觉大模型操作电脑
 实现完整的自动化流程：用户指令 → 截图 → 模型分析 → 执行操作 → 循环直到任务完成
 """
 
-import base64
-import json
 import tempfile
 import time
-from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
@@ -21,7 +18,8 @@ from astronverse.cua.action_parser import (
     parsing_response_to_pyautogui_code,
 )
 from astronverse.cua.custom_action_screen import CustomActionScreen
-from PIL import Image, ImageDraw
+from astronverse.cua.frame import Frame, FramePipeline, draw_click_marker, drop_duplicate_images, post_messages
+from PIL import Image
 
 # 电脑 GUI 任务场景的提示词模板
 COMPUTER_USE_PROMPT = """You are a GUI agent. You are given a task and your action history, with screenshots. You need to perform the next action to complete the task.
@@ -79,6 +77,9 @@ class ComputerUseAgent:
         self.screenshot_dir = Path(tempfile.mkdtemp(prefix="cua_agent_"))
         self.screenshot_dir.mkdir(parents=True, exist_ok=True)
 
+        # 截图处理：内存中缩小、编码，跳过重复帧
+        self.frames = FramePipeline(save_dir=str(self.screenshot_dir))
+
         # 历史记录
         self.action_history: list[dict] = []
         self.screenshots: list[str] = []
@@ -104,36 +105,21 @@ class ComputerUseAgent:
 
         logger.info(f"[初始化] 截图保存目录: {self.screenshot_dir}")
 
-    def take_screenshot(self) -> tuple[str, str]:
+    def take_screenshot(self) -> Frame:
         """
         截取当前屏幕，并在截图上标记上一次点击的位置（如果有）
 
         Returns:
-            Tuple[截图文件路径, Base64编码的图片]
+            缩小并编码后的截图
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        screenshot_path = self.screenshot_dir / f"screenshot_{timestamp}.png"
-
-        # 使用pyautogui截图
-        screenshot = pyautogui.screenshot()
-        screenshot.save(str(screenshot_path))
+        frame = self.frames.capture(marker=self.last_click_coords)
 
-        # 第一次截图时保存屏幕尺寸，避免后续每次都打开Image文件
+        # 第一次截图时保存屏幕尺寸
         if self.screen_width is None or self.screen_height is None:
-            self.screen_width, self.screen_height = screenshot.size
+            self.screen_width, self.screen_height = frame.screen_width, frame.screen_height
             logger.info(f"[初始化] 保存屏幕尺寸: {self.screen_width}x{self.screen_height}")
 
-        # 如果有上一次点击坐标，在截图上标记
-        final_screenshot_path = str(screenshot_path)
-        if self.last_click_coords:
-            x, y = self.last_click_coords
-            final_screenshot_path = self.mark_click_on_image(str(screenshot_path), x, y)
-
-        # 编码为Base64（使用标记后的图片）
-        with open(final_screenshot_path, "rb") as f:
-            base64_image = base64.b64encode(f.read()).decode("utf-8")
-
-        return final_screenshot_path, base64_image
+        return frame
 
     @staticmethod
     def mark_click_on_image(image_path: str, x: int, y: int, radius: int = 20) -> str:
@@ -150,20 +136,8 @@ class ComputerUseAgent:
             标记后的图片路径
         """
         try:
-            # 打开图片
             img = Image.open(image_path)
-            draw = ImageDraw.Draw(img)
-
-            # 绘制红色实心圆点
-            draw.ellipse([x - radius, y - radius, x + radius, y + radius], fill="red", outline="white", width=3)
-
-            # 绘制外圈
-            draw.ellipse([x - radius - 10, y - radius - 10, x + radius + 10, y + radius + 10], outline="red", width=3)
-
-            # 绘制十字准线
-            line_length = radius + 15
-            draw.line([x - line_length, y, x + line_length, y], fill="red", width=2)
-            draw.line([x, y - line_length, x, y + line_length], fill="red", width=2)
+            draw_click_marker(img, x, y, radius)
 
             # 保存标记后的图片
             marked_path = str(Path(image_path).parent / f"marked_{Path(image_path).name}")
@@ -220,21 +194,21 @@ class ComputerUseAgent:
             logger.info(f"[警告] 无法解析坐标: {e}")
             return None
 
-    def build_messages(self, instruction: str, screenshot_path: str, base64_image: str) -> list[dict]:
+    def build_messages(self, instruction: str, frame: Frame) -> list[dict]:
         """
         构建发送给模型的消息（包含完整对话历史）
 
         Args:
             instruction: 用户指令
-            screenshot_path: 截图路径
-            base64_image: Base64编码的图片
+            frame: 当前截图
         """
         # 保存指令（用于后续步骤）
         if not self.instruction:
             self.instruction = instruction
 
-        # 获取图片格式
-        image_format = Path(screenshot_path).suffix[1:] or "png"
+        current_content = [{"type": "image_url", "image_url": {"url": frame.data_url}}]
+        if frame.unchanged:
+            current_content.append({"type": "text", "text": "（屏幕画面与上一步完全相同，上一步操作可能没有生效）"})
 
         # 构建系统提示词
         system_prompt = COMPUTER_USE_PROMPT.format(instruction=self.instruction)
@@ -245,12 +219,7 @@ class ComputerUseAgent:
         if not self.conversation_history:
             messages = [
                 {"role": "user", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "image_url", "image_url": {"url": f"data:image/{image_format};base64,{base64_image}"}}
-                    ],
-                },
+                {"role": "user", "content": current_content},
             ]
         else:
             # 后续步骤：按照格式添加历史对话
@@ -277,16 +246,10 @@ class ComputerUseAgent:
                     )
 
             # 添加当前截图
-            messages.append(
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "image_url", "image_url": {"url": f"data:image/{image_format};base64,{base64_image}"}}
-                    ],
-                }
-            )
+            messages.append({"role": "user", "content": current_content})
 
-        return messages
+        # 历史中最后一张截图就是当前截图，重复的图片只发送一次
+        return drop_duplicate_images(messages)
 
     def inference(self, messages: list[dict] = None) -> str:
         """
@@ -301,7 +264,7 @@ class ComputerUseAgent:
 
         try:
             # 发送 API 请求
-            response = requests.post(API_URL, data=json.dumps(messages, ensure_ascii=False))
+            response = post_messages(API_URL, messages)
             response.raise_for_status()  # 检查请求是否成功
 
             # 返回模型生成的回复
@@ -417,26 +380,26 @@ class ComputerUseAgent:
                 logger.info("-" * 60)
 
                 # 1. 截图（执行动作后的新状态）
-                screenshot_path, base64_image = self.take_screenshot()
-                self.screenshots.append(screenshot_path)
+                frame = self.take_screenshot()
+                if frame.path:
+                    self.screenshots.append(frame.path)
 
                 # 如果有待保存的响应，现在保存（因为有了新的截图）
                 if self.pending_response:
                     # 在添加新历史前，先清理旧的截图以限制数量
                     self.limit_screenshots_in_history()
 
-                    image_format = Path(screenshot_path).suffix[1:] or "png"
                     self.conversation_history.append(
                         (
                             self.pending_response,  # 上一步的响应
-                            (base64_image, image_format),  # 当前步骤的截图（执行动作后的新状态）
+                            (frame.base64, frame.format),  # 当前步骤的截图（执行动作后的新状态）
                         )
                     )
                     self.pending_response = None
 
                 # 2. 构建消息并调用模型
                 logger.info("模型分析中...")
-                messages = self.build_messages(instruction, screenshot_path, base64_image)
+                messages = self.build_messages(instruction, frame)
 
                 response = self.inference(messages)
                 logger.info(response)
@@ -535,6 +498,7 @@ class ComputerUseAgent:
                 "error": str(e),
             }
         finally:
+            logger.info(f"[截图统计] {self.frames.stats()}")
             # 设置PyAutoGUI安全设置
             pyautogui.FAILSAFE = current_failsafe  # 鼠标移到左上角会触发异常停止
             pyautogui.PAUSE = current_pause  # 每个操作之间暂停0.5秒
@@ -1,8 +1,6 @@
-import base64
 import json
 import tempfile
 import time
-from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
@@ -11,6 +9,7 @@ import pyperclip
 import requests
 from astronverse.actionlib.atomic import atomicMg
 from astronverse.baseline.logger.logger import logger
+from astronverse.cua.frame import Frame, FramePipeline, drop_duplicate_images, post_messages
 
 # 电脑 GUI 任务场景的提示词模板
 COMPUTER_USE_PROMPT = """You are a GUI agent. You are given a task and your action history, with screenshots. You need to perform the next action to complete the task.  
@@ -211,6 +210,9 @@ class CustomActionScreen:
         self.screenshot_dir = Path(tempfile.mkdtemp(prefix="cua_agent_"))
         self.screenshot_dir.mkdir(parents=True, exist_ok=True)
 
+        # 截图处理：内存中缩小、编码，跳过重复帧
+        self.frames = FramePipeline(save_dir=str(self.screenshot_dir))
+
         # 历史记录
         self.screenshots: list[str] = []
         # 保存对话历史：(assistant响应, (base64_image, image_format) 或 None)
@@ -225,47 +227,34 @@ class CustomActionScreen:
 
         logger.info(f"[初始化] 截图保存目录: {self.screenshot_dir}")
 
-    def take_screenshot(self) -> tuple[str, str]:
+    def take_screenshot(self) -> Frame:
         """
-        截取当前屏幕，并在截图上标记上一次点击的位置（如果有）
+        截取当前屏幕
 
         Returns:
-            Tuple[截图文件路径, Base64编码的图片]
+            缩小并编码后的截图
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        screenshot_path = self.screenshot_dir / f"screenshot_{timestamp}.png"
-
-        # 使用pyautogui截图
-        screenshot = pyautogui.screenshot()
-        screenshot.save(str(screenshot_path))
+        frame = self.frames.capture()
 
-        # 第一次截图时保存屏幕尺寸，避免后续每次都打开Image文件
+        # 第一次截图时保存屏幕尺寸
         if self.screen_width is None or self.screen_height is None:
-            self.screen_width, self.screen_height = screenshot.size
+            self.screen_width, self.screen_height = frame.screen_width, frame.screen_height
             logger.info(f"[初始化] 保存屏幕尺寸: {self.screen_width}x{self.screen_height}")
 
-        # 编码为Base64（使用标记后的图片）
-        with open(str(screenshot_path), "rb") as f:
-            base64_image = base64.b64encode(f.read()).decode("utf-8")
-
-        return str(screenshot_path), base64_image
+        return frame
 
-    def build_messages(self, instruction: str, screenshot_path: str, base64_image: str) -> list[dict]:
+    def build_messages(self, instruction: str, frame: Frame) -> list[dict]:
         """
         构建发送给模型的消息（包含完整对话历史）
 
         Args:
             instruction: 用户指令
-            screenshot_path: 截图路径
-            base64_image: Base64编码的图片
+            frame: 当前截图
         """
         # 保存指令（用于后续步骤）
         if not self.instruction:
             self.instruction = instruction
 
-        # 获取图片格式
-        image_format = Path(screenshot_path).suffix[1:] or "png"
-
         # 构建系统提示词
         messages = [{"role": "system", "content": COMPUTER_USE_PROMPT}]
 
@@ -297,17 +286,15 @@ class CustomActionScreen:
                 messages.append({"role": "assistant", "content": assistant_response})
 
         # 添加当前用户消息（包含截图和指令）
-        messages.append(
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image_url", "image_url": {"url": f"data:image/{image_format};base64,{base64_image}"}},
-                    {"type": "text", "text": self.instruction},
-                ],
-            }
-        )
+        current_content = [
+            {"type": "image_url", "image_url": {"url": frame.data_url}},
+            {"type": "text", "text": self.instruction},
+        ]
+        if frame.unchanged:
+            current_content.append({"type": "text", "text": "（屏幕画面与上一步完全相同，上一步操作可能没有生效）"})
+        messages.append({"role": "user", "content": current_content})
 
-        return messages
+        return drop_duplicate_images(messages)
 
     def inference(self, messages: list[dict] = None) -> str:
         """
@@ -322,7 +309,7 @@ class CustomActionScreen:
 
         try:
             # 发送 API 请求
-            response = requests.post(API_URL, data=json.dumps(messages, ensure_ascii=False))
+            response = post_messages(API_URL, messages)
             response.raise_for_status()  # 检查请求是否成功
 
             # 返回模型生成的回复
@@ -556,23 +543,23 @@ class CustomActionScreen:
                 logger.info("-" * 60)
 
                 # 1. 截图（执行动作后的新状态）
-                screenshot_path, base64_image = self.take_screenshot()
-                self.screenshots.append(screenshot_path)
+                frame = self.take_screenshot()
+                if frame.path:
+                    self.screenshots.append(frame.path)
 
                 # 如果有待保存的响应，现在保存（因为有了新的截图）
                 if self.pending_response:
-                    image_format = Path(screenshot_path).suffix[1:] or "png"
                     self.conversation_history.append(
                         (
                             self.pending_response,  # 上一步的响应
-                            (base64_image, image_format),  # 当前步骤的截图（执行动作后的新状态）
+                            (frame.base64, frame.format),  # 当前步骤的截图（执行动作后的新状态）
                         )
                     )
                     self.pending_response = None
 
                 # 2. 构建消息并调用模型
                 logger.info("模型分析中...")
-                messages = self.build_messages(instruction, screenshot_path, base64_image)
+                messages = self.build_messages(instruction, frame)
 
                 response = self.inference(messages)
                 logger.info(response)
@@ -644,6 +631,7 @@ class CustomActionScreen:
                 "data": param,
             }
         finally:
+            logger.info(f"[截图统计] {self.frames.stats()}")
             # 设置PyAutoGUI安全设置
             pyautogui.FAILSAFE = current_failsafe  # 鼠标移到左上角会触发异常停止
             pyautogui.PAUSE = current_pause  # 每个操作之间暂停0.5秒
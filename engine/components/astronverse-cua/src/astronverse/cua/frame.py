@@ -0,0 +1,230 @@
+"""
+截图帧处理
+
+代理每一步都要把屏幕截图发给模型：
+- 截图只在内存中处理，不再先存 PNG 再读回
+- 按模型输入尺寸缩小后编码为 JPEG/WebP，质量可调；模型输出的是相对坐标，缩小不影响坐标换算
+- 与上一帧像素完全相同时直接复用上一帧的编码结果，并标记 unchanged，调用方据此省略重复图片
+- 推理请求复用连接池中的 HTTP 连接
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import requests
+from PIL import Image, ImageDraw
+from requests.adapters import HTTPAdapter
+
+# 发送给模型的截图最长边（像素），0 表示不缩小
+FRAME_MAX_SIDE = 1280
+# 编码格式 jpeg/webp/png
+FRAME_FORMAT = "jpeg"
+# jpeg/webp 编码质量
+FRAME_QUALITY = 80
+
+_PIL_FORMATS = {"jpeg": "JPEG", "jpg": "JPEG", "webp": "WEBP", "png": "PNG"}
+
+
+@dataclass
+class Frame:
+    """一帧已编码的截图"""
+
+    base64: str
+    format: str
+    # 编码后的图片尺寸
+    width: int
+    height: int
+    # 原始屏幕尺寸，坐标换算使用
+    screen_width: int
+    screen_height: int
+    # 缩小后、标记前的像素摘要
+    digest: str
+    # 编码后的字节数
+    size: int
+    # 屏幕内容与上一帧完全相同
+    unchanged: bool = False
+    # 保存的文件路径
+    path: Optional[str] = None
+
+    @property
+    def data_url(self) -> str:
+        return f"data:image/{self.format};base64,{self.base64}"
+
+
+def draw_click_marker(image: Image.Image, x: int, y: int, radius: int = 20):
+    """在图片上绘制红色圆点标记，表示上一次点击的位置"""
+    draw = ImageDraw.Draw(image)
+
+    # 绘制红色实心圆点
+    draw.ellipse([x - radius, y - radius, x + radius, y + radius], fill="red", outline="white", width=3)
+
+    # 绘制外圈
+    draw.ellipse([x - radius - 10, y - radius - 10, x + radius + 10, y + radius + 10], outline="red", width=3)
+
+    # 绘制十字准线
+    line_length = radius + 15
+    draw.line([x - line_length, y, x + line_length, y], fill="red", width=2)
+    draw.line([x, y - line_length, x, y + line_length], fill="red", width=2)
+
+
+class FramePipeline:
+    """截图 -> 缩小 -> 标记 -> 编码，并跳过与上一帧相同的截图"""
+
+    def __init__(
+        self,
+        max_side: int = FRAME_MAX_SIDE,
+        image_format: str = FRAME_FORMAT,
+        quality: int = FRAME_QUALITY,
+        save_dir: Optional[str] = None,
+    ):
+        image_format = image_format.lower()
+        if image_format not in _PIL_FORMATS:
+            raise ValueError(f"不支持的截图格式: {image_format}")
+        self.max_side = max_side
+        self.format = "jpeg" if image_format == "jpg" else image_format
+        self.quality = quality
+        self.save_dir = save_dir
+
+        self._last: Optional[Frame] = None
+        self._last_marker = None
+
+        # 统计
+        self.frames = 0
+        self.unchanged = 0
+        self.encoded_bytes = 0
+        self.seconds = 0.0
+
+    @staticmethod
+    def grab() -> Image.Image:
+        # 截图依赖桌面环境，按需导入
+        import pyautogui
+
+        return pyautogui.screenshot()
+
+    def capture(self, marker: Optional[tuple[int, int]] = None) -> Frame:
+        """截取当前屏幕，marker 为需要标记的屏幕坐标"""
+        return self.process(self.grab(), marker)
+
+    def process(self, image: Image.Image, marker: Optional[tuple[int, int]] = None) -> Frame:
+        start = time.perf_counter()
+        screen_width, screen_height = image.size
+
+        scale = 1.0
+        if self.max_side and max(screen_width, screen_height) > self.max_side:
+            scale = self.max_side / max(screen_width, screen_height)
+            size = (max(1, round(screen_width * scale)), max(1, round(screen_height * scale)))
+            image = image.resize(size, Image.BILINEAR)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16).hexdigest()
+        unchanged = self._last is not None and self._last.digest == digest
+
+        if unchanged and self._last_marker == marker:
+            # 画面和标记都没变，直接复用上一帧的编码结果
+            frame = replace(self._last, unchanged=True)
+        else:
+            if marker:
+                if image.size == (screen_width, screen_height):
+                    image = image.copy()
+                x, y = marker
+                draw_click_marker(image, round(x * scale), round(y * scale), radius=max(4, round(20 * scale)))
+            data = self.encode(image)
+            frame = Frame(
+                base64=base64.b64encode(data).decode("utf-8"),
+                format=self.format,
+                width=image.width,
+                height=image.height,
+                screen_width=screen_width,
+                screen_height=screen_height,
+                digest=digest,
+                size=len(data),
+                unchanged=unchanged,
+                path=self.save(data),
+            )
+            self.encoded_bytes += len(data)
+
+        self._last = frame
+        self._last_marker = marker
+        self.frames += 1
+        if unchanged:
+            self.unchanged += 1
+        self.seconds += time.perf_counter() - start
+        return frame
+
+    def encode(self, image: Image.Image) -> bytes:
+        buf = io.BytesIO()
+        pil_format = _PIL_FORMATS[self.format]
+        if pil_format == "PNG":
+            image.save(buf, format=pil_format)
+        elif pil_format == "WEBP":
+            image.save(buf, format=pil_format, quality=self.quality, method=2)
+        else:
+            image.save(buf, format=pil_format, quality=self.quality)
+        return buf.getvalue()
+
+    def save(self, data: bytes) -> Optional[str]:
+        if not self.save_dir:
+            return None
+        path = os.path.join(self.save_dir, "screenshot_{:04d}.{}".format(self.frames + 1, self.format))
+        try:
+            with open(path, "wb") as f:
+                f.write(data)
+        except OSError:
+            return None
+        return path
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "unchanged": self.unchanged,
+            "encoded_bytes": self.encoded_bytes,
+            "avg_ms": round(self.seconds * 1000 / self.frames, 2) if self.frames else 0,
+        }
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """推理请求共用的 HTTP 会话，连接保持复用"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def post_messages(url: str, messages: list[dict], timeout=None) -> requests.Response:
+    body = json.dumps(messages, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return http_session().post(url, data=body, timeout=timeout)
+
+
+def drop_duplicate_images(messages: list[dict]) -> list[dict]:
+    """同一张图片在消息中出现多次时只保留最后一次，其余替换为文字说明"""
+    seen = set()
+    for message in reversed(messages):
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for i, part in enumerate(content):
+            if part.get("type") != "image_url":
+                continue
+            url = part["image_url"]["url"]
+            if url in seen:
+                content[i] = {"type": "text", "text": "（截图与后续截图相同，已省略）"}
+            else:
+                seen.add(url)
+    return messages
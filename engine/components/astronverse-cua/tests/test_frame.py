@@ -0,0 +1,140 @@
+import base64
+import io
+import json
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+from astronverse.cua.frame import FramePipeline, drop_duplicate_images, post_messages
+from PIL import Image, ImageDraw
+
+
+def _screen(seed: int = 0, size=(2560, 1440)) -> Image.Image:
+    """模拟桌面截图：带噪点的渐变壁纸上叠加窗口、文字行"""
+    rnd = random.Random(seed)
+    small = (size[0] // 4, size[1] // 4)
+    noise = Image.frombytes("L", small, random.Random(0).randbytes(small[0] * small[1])).resize(size)
+    gradient = Image.linear_gradient("L").resize(size)
+    img = Image.merge("RGB", (gradient, noise, Image.new("L", size, 180)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rnd.randint(0, size[0] - 600), rnd.randint(0, size[1] - 400)
+        draw.rectangle([x, y, x + 600, y + 400], fill=(255, 255, 255), outline=(120, 120, 120))
+        for line in range(12):
+            draw.text((x + 16, y + 16 + line * 28), "row {} value {}".format(line, rnd.random()), fill=(20, 20, 20))
+    return img
+
+
+def _png_base64(img: Image.Image) -> str:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode("utf-8")
+
+
+class _MockInference(BaseHTTPRequestHandler):
+    bodies = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        _MockInference.bodies.append(body)
+        data = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFramePipeline(TestCase):
+    def test_downscale_and_encode(self):
+        frame = FramePipeline().process(_screen())
+        self.assertEqual((frame.screen_width, frame.screen_height), (2560, 1440))
+        self.assertEqual((frame.width, frame.height), (1280, 720))
+        self.assertEqual(frame.format, "jpeg")
+        self.assertTrue(frame.data_url.startswith("data:image/jpeg;base64,"))
+        self.assertEqual(Image.open(io.BytesIO(base64.b64decode(frame.base64))).size, (1280, 720))
+
+    def test_payload_smaller_than_png(self):
+        img = _screen()
+        png = _png_base64(img)
+        jpeg = FramePipeline().process(img)
+        webp = FramePipeline(image_format="webp", quality=70).process(img)
+        self.assertLess(len(jpeg.base64) * 8, len(png))
+        self.assertLess(len(webp.base64) * 8, len(png))
+
+    def test_unchanged_frame_reuses_encoding(self):
+        pipeline = FramePipeline()
+        first = pipeline.process(_screen(1))
+        second = pipeline.process(_screen(1))
+        self.assertFalse(first.unchanged)
+        self.assertTrue(second.unchanged)
+        self.assertIs(second.base64, first.base64)
+        self.assertEqual(pipeline.encoded_bytes, first.size)
+
+        third = pipeline.process(_screen(2))
+        self.assertFalse(third.unchanged)
+
+    def test_marker_changes_image_not_digest(self):
+        pipeline = FramePipeline()
+        first = pipeline.process(_screen(1))
+        marked = pipeline.process(_screen(1), marker=(1000, 500))
+        self.assertTrue(marked.unchanged)
+        self.assertEqual(marked.digest, first.digest)
+        self.assertNotEqual(marked.base64, first.base64)
+
+    def test_save_dir(self):
+        tmp = tempfile.mkdtemp()
+        frame = FramePipeline(save_dir=tmp).process(_screen())
+        with open(frame.path, "rb") as f:
+            self.assertEqual(base64.b64encode(f.read()).decode("utf-8"), frame.base64)
+
+    def test_drop_duplicate_images(self):
+        frame = FramePipeline().process(_screen())
+        image = {"type": "image_url", "image_url": {"url": frame.data_url}}
+        messages = [
+            {"role": "user", "content": "prompt"},
+            {"role": "assistant", "content": "a"},
+            {"role": "user", "content": [dict(image)]},
+            {"role": "user", "content": [dict(image)]},
+        ]
+        drop_duplicate_images(messages)
+        self.assertEqual(messages[2]["content"][0]["type"], "text")
+        self.assertEqual(messages[3]["content"][0]["type"], "image_url")
+
+
+class TestInference(TestCase):
+    def setUp(self):
+        _MockInference.bodies = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _MockInference)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:{}/cua/chat".format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_recorded_session(self):
+        """模拟 6 步任务：每两步画面不变，对比原始 PNG 方式的请求体大小"""
+        screens = [_screen(seed) for seed in range(3)]
+        recorded = [screens[step // 2] for step in range(6)]
+        pipeline = FramePipeline()
+
+        start = time.perf_counter()
+        for img in recorded:
+            frame = pipeline.process(img)
+            messages = [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": frame.data_url}}]}]
+            response = post_messages(self.url, messages)
+            self.assertEqual(response.json()["choices"][0]["message"]["content"], "ok")
+        elapsed = time.perf_counter() - start
+
+        new_bytes = sum(len(b) for b in _MockInference.bodies)
+        old_bytes = sum(len(_png_base64(img)) for img in screens) * 2
+        self.assertEqual(pipeline.unchanged, 3)
+        self.assertLess(new_bytes * 8, old_bytes)
+        self.assertLess(elapsed, 10)
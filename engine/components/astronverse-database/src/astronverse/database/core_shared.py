@@ -0,0 +1,281 @@
+"""
+数据库核心实现（windows/linux 共用）
+
+驱动按需导入，未安装的驱动只在使用对应数据库类型时报错；
+连接按数据源池化复用，查询使用服务端游标 + fetchmany 分批写入 sink。
+"""
+
+import re
+import sqlite3
+import uuid
+from typing import Optional
+
+from astronverse.actionlib.logger import logger
+from astronverse.database import DatabaseType
+from astronverse.database.core import IDatabaseCore
+from astronverse.database.pool import PooledConnection, pool_manager
+from astronverse.database.sink import ListSink, RowConverter
+
+# 每次 fetchmany/executemany 的行数
+BATCH_SIZE = 1000
+
+# 各驱动的参数占位符
+PARAM_STYLE = {
+    DatabaseType.MySQL: "%s",
+    DatabaseType.PostgreSQL: "%s",
+    DatabaseType.SQLite: "?",
+    DatabaseType.SQLServer: "?",
+    DatabaseType.Access: "?",
+    DatabaseType.Oracle: ":{}",
+}
+
+# 各数据库的标识符引号
+IDENTIFIER_QUOTE = {
+    DatabaseType.MySQL: ("`", "`"),
+    DatabaseType.SQLServer: ("[", "]"),
+    DatabaseType.Access: ("[", "]"),
+}
+
+# postgres/oracle 中加引号的标识符区分大小写，普通标识符保持原样，其余加引号
+_PLAIN_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+_CASE_FOLDING = (DatabaseType.PostgreSQL, DatabaseType.Oracle)
+
+
+def quote_identifier(db_type: Optional[DatabaseType], name: str) -> str:
+    """
+    按数据库方言给表名/列名加引号，支持 schema.table 形式；
+    已加引号的部分保持不变，名称中的引号字符转义，避免拼接进 SQL
+    """
+    left, right = IDENTIFIER_QUOTE.get(db_type, ('"', '"'))
+    parts = []
+    for part in str(name).split("."):
+        if not part:
+            raise ValueError("非法的标识符: {}".format(name))
+        if (
+            len(part) > 2
+            and part[0] == left
+            and part[-1] == right
+            and left not in part[1:-1]
+            and right not in part[1:-1]
+        ):
+            parts.append(part)
+        elif db_type in _CASE_FOLDING and _PLAIN_IDENTIFIER.match(part):
+            parts.append(part)
+        else:
+            parts.append(left + part.replace(right, right * 2) + right)
+    return ".".join(parts)
+
+
+def _raw_connect(db_info_dict: dict, db_type: DatabaseType):
+    if db_type == DatabaseType.MySQL:
+        import pymysql
+
+        if db_info_dict.get("PORT", ""):
+            db_info_dict["port"] = int(db_info_dict.get("PORT", 3306))
+        return pymysql.connect(
+            host=db_info_dict["host"],
+            port=int(db_info_dict.get("port", 3306)),
+            user=db_info_dict["user"],
+            password=db_info_dict["password"],
+            database=db_info_dict["database"],
+            charset=db_info_dict.get("charset", "utf8").replace("-", ""),
+        )
+    elif db_type == DatabaseType.SQLServer:
+        import pyodbc
+
+        server = "{},{}".format(db_info_dict.get("host", ""), int(db_info_dict.get("port", 1433)))
+        # 连接字符串
+        conn_str = (
+            r"DRIVER={{{}}};".format(db_info_dict.get("driver", "SQL Server"))
+            + rf"SERVER={server};"
+            + rf"DATABASE={db_info_dict.get('database', '')};"
+            + rf"UID={db_info_dict.get('user', '')};"
+            + rf"PWD={db_info_dict.get('password', '')};"
+        )
+        return pyodbc.connect(conn_str)
+    elif db_type == DatabaseType.Oracle:
+        import cx_Oracle
+
+        if db_info_dict.get("service_type", "") == "service":
+            service = db_info_dict.get("service", "")
+        else:
+            service = db_info_dict.get("sid", "")
+        return cx_Oracle.connect(
+            user=db_info_dict.get("user", ""),
+            password=db_info_dict.get("password", ""),
+            dsn=f"{db_info_dict.get('host', '')}:{int(db_info_dict.get('port', 1521))}/{service}",
+        )
+    elif db_type == DatabaseType.PostgreSQL:
+        import psycopg2
+
+        return psycopg2.connect(
+            database=db_info_dict.get("database", ""),
+            user=db_info_dict.get("user", ""),
+            password=db_info_dict.get("password", ""),
+            host=db_info_dict.get("host", ""),
+            port=int(db_info_dict.get("port", 5432)),
+        )
+    elif db_type == DatabaseType.SQLite:
+        # 连接池中的连接可能被不同线程使用
+        return sqlite3.connect(f"{db_info_dict.get('sqlite_path', '')}", check_same_thread=False)
+    elif db_type == DatabaseType.Access:
+        import pyodbc
+
+        conn_str = (
+            r"DRIVER={Driver do Microsoft Access (*.mdb)};"
+            rf"DBQ={db_info_dict.get('access_path', '')};"
+            rf"PWD={db_info_dict.get('password', '')};"
+        )
+        return pyodbc.connect(conn_str)
+    elif db_type == DatabaseType.DB2:
+        raise Exception("暂不支持DB2数据库!")
+    else:
+        raise Exception("找不到该数据库类型!")
+
+
+def _db_type(db_conn) -> Optional[DatabaseType]:
+    return db_conn.db_type if isinstance(db_conn, PooledConnection) else None
+
+
+def _raw(db_conn):
+    return db_conn.raw if isinstance(db_conn, PooledConnection) else db_conn
+
+
+def _stream_cursor(db_conn):
+    """服务端游标：结果集留在数据库端，fetchmany 时才传输"""
+    db_type = _db_type(db_conn)
+    raw = _raw(db_conn)
+    if db_type == DatabaseType.MySQL:
+        import pymysql.cursors
+
+        return raw.cursor(pymysql.cursors.SSCursor)
+    if db_type == DatabaseType.PostgreSQL:
+        cursor = raw.cursor(name="astron_{}".format(uuid.uuid4().hex))
+        cursor.itersize = BATCH_SIZE
+        return cursor
+    cursor = raw.cursor()
+    if db_type == DatabaseType.Oracle:
+        cursor.arraysize = BATCH_SIZE
+    return cursor
+
+
+class DatabaseSharedCore(IDatabaseCore):
+    @staticmethod
+    def connect(db_info_dict: dict, db_type: DatabaseType = DatabaseType.MySQL) -> PooledConnection:
+        """连接数据库，相同连接信息在一次运行内复用连接池中的连接"""
+        info = dict(db_info_dict)
+        pool = pool_manager.get(info, db_type, lambda: _raw_connect(dict(info), db_type))
+        return pool.acquire()
+
+    @staticmethod
+    def disconnect(db_conn: object):
+        """断开连接，池化连接归还到连接池"""
+        db_conn.close()
+
+    @staticmethod
+    def execute(db_conn: object, sql_str: str, params=None) -> bool:
+        cursor = db_conn.cursor()
+        try:
+            if params:
+                cursor.execute(sql_str, params)
+            else:
+                cursor.execute(sql_str)
+            db_conn.commit()
+        except Exception as e:
+            logger.error("执行SQL失败: {}".format(e))
+            db_conn.rollback()
+            return False
+        finally:
+            cursor.close()
+        return True
+
+    @staticmethod
+    def execute_many(db_conn: object, sql_str: str, params_list: list, batch_size: int = BATCH_SIZE) -> int:
+        """批量执行同一条 SQL，按批提交，任何一批失败则整体回滚；返回执行的行数"""
+        cursor = db_conn.cursor()
+        count = 0
+        try:
+            if _db_type(db_conn) == DatabaseType.SQLServer:
+                cursor.fast_executemany = True
+            for start in range(0, len(params_list), batch_size):
+                batch = params_list[start : start + batch_size]
+                cursor.executemany(sql_str, batch)
+                count += len(batch)
+            db_conn.commit()
+        except Exception:
+            db_conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        return count
+
+    @staticmethod
+    def insert_sql(db_type: Optional[DatabaseType], table: str, columns: list[str]) -> str:
+        style = PARAM_STYLE.get(db_type, "%s")
+        if "{}" in style:
+            placeholders = ", ".join(style.format(i + 1) for i in range(len(columns)))
+        else:
+            placeholders = ", ".join([style] * len(columns))
+        return "INSERT INTO {} ({}) VALUES ({})".format(
+            quote_identifier(db_type, table),
+            ", ".join(quote_identifier(db_type, column) for column in columns),
+            placeholders,
+        )
+
+    @staticmethod
+    def bulk_insert(
+        db_conn: object, table: str, data: list, columns: Optional[list[str]] = None, batch_size: int = BATCH_SIZE
+    ) -> int:
+        """
+        批量插入
+        :param data: 字典列表（键为列名）或二维列表（需指定 columns）
+        """
+        if not data:
+            return 0
+        if isinstance(data[0], dict):
+            columns = columns or list(data[0].keys())
+            rows = [tuple(item.get(col) for col in columns) for item in data]
+        else:
+            if not columns:
+                raise ValueError("二维列表数据需要指定列名")
+            rows = [tuple(item) for item in data]
+        sql_str = DatabaseSharedCore.insert_sql(_db_type(db_conn), table, columns)
+        return DatabaseSharedCore.execute_many(db_conn, sql_str, rows, batch_size)
+
+    @staticmethod
+    def query_to(db_conn: object, sql_str: str, sink, params=None, batch_size: int = BATCH_SIZE):
+        """
+        分批查询并写入 sink，内存中同时只保留一批数据
+        :return: sink.close() 的返回值
+        """
+        cursor = _stream_cursor(db_conn)
+        try:
+            if params:
+                cursor.execute(sql_str, params)
+            else:
+                cursor.execute(sql_str)
+            rows = cursor.fetchmany(batch_size)
+            # 具名游标（postgres）在第一次 fetch 之后才有 description
+            columns = [key[0] for key in cursor.description] if cursor.description else []
+            sink.open(columns)
+            converter = RowConverter(len(columns))
+            while rows:
+                sink.write(converter.convert(rows))
+                rows = cursor.fetchmany(batch_size)
+        except BaseException:
+            # 关闭文件句柄并丢弃写了一半的结果
+            sink.abort()
+            raise
+        finally:
+            try:
+                cursor.close()
+            finally:
+                # 服务端游标会开启事务，结束后释放
+                if _db_type(db_conn) == DatabaseType.PostgreSQL:
+                    db_conn.rollback()
+        return sink.close()
+
+    @staticmethod
+    def query(db_conn: object, sql_str: str, params=None) -> list:
+        """查询，返回字典列表"""
+        return DatabaseSharedCore.query_to(db_conn, sql_str, ListSink(), params=params)
@@ -1,7 +1,5 @@
-from astronverse.database.core import IDatabaseCore
+from astronverse.database.core_shared import DatabaseSharedCore
 
 
-class DatabaseCore(IDatabaseCore):
-    @staticmethod
-    def print(msg: str = "") -> str:
-        return "linux {}".format(msg)
+class DatabaseCore(DatabaseSharedCore):
+    pass
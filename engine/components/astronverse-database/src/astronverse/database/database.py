@@ -4,7 +4,9 @@ import sys
 from astronverse.actionlib.atomic import atomicMg
 from astronverse.database import DatabaseType
 from astronverse.database.core import IDatabaseCore
+from astronverse.database.core_shared import BATCH_SIZE
 from astronverse.database.error import *
+from astronverse.database.sink import CsvSink, DataTableSink
 
 if sys.platform == "win32":
     from astronverse.database.core_win import DatabaseCore
@@ -47,5 +49,52 @@ class Database:
         outputList=[atomicMg.param("query_db_result", types="Any")],
     )
     def query_sql(database_obj: object, sql: str):
-        query_db_result = DatabaseCore.execute(database_obj, sql)
+        query_db_result = DatabaseCore.query(database_obj, sql)
         return query_db_result
+
+    @staticmethod
+    @atomicMg.atomic(
+        "Database",
+        inputList=[atomicMg.param("batch_size", types="Int", required=False)],
+        outputList=[atomicMg.param("export_file_path", types="Str")],
+    )
+    def export_sql_to_csv(database_obj: object, sql: str, file_path: str, batch_size: int = BATCH_SIZE):
+        """查询结果分批写入csv，不在内存中保留完整结果集"""
+        export_file_path = DatabaseCore.query_to(database_obj, sql, CsvSink(file_path), batch_size=batch_size)
+        return export_file_path
+
+    @staticmethod
+    @atomicMg.atomic(
+        "Database",
+        inputList=[atomicMg.param("batch_size", types="Int", required=False)],
+        outputList=[atomicMg.param("export_row_count", types="Int")],
+    )
+    def export_sql_to_datatable(database_obj: object, sql: str, batch_size: int = BATCH_SIZE):
+        """查询结果分批追加到数据表格"""
+        export_row_count = DatabaseCore.query_to(database_obj, sql, DataTableSink(), batch_size=batch_size)
+        return export_row_count
+
+    @staticmethod
+    @atomicMg.atomic(
+        "Database",
+        inputList=[atomicMg.param("params_list", types="List")],
+        outputList=[atomicMg.param("execute_row_count", types="Int")],
+    )
+    def execute_many_sql(database_obj: object, sql: str, params_list: list):
+        """同一条SQL按参数列表批量执行"""
+        execute_row_count = DatabaseCore.execute_many(database_obj, sql, params_list)
+        return execute_row_count
+
+    @staticmethod
+    @atomicMg.atomic(
+        "Database",
+        inputList=[
+            atomicMg.param("data", types="List"),
+            atomicMg.param("columns", types="List", required=False),
+        ],
+        outputList=[atomicMg.param("insert_row_count", types="Int")],
+    )
+    def bulk_insert(database_obj: object, table: str, data: list, columns: list | None = None):
+        """批量插入，data 为字典列表或二维列表（二维列表需指定列名）"""
+        insert_row_count = DatabaseCore.bulk_insert(database_obj, table, data, columns or None)
+        return insert_row_count
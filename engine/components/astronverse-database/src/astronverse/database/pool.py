@@ -0,0 +1,157 @@
+"""
+数据库连接池
+
+同一次运行中，连接信息相同（数据库类型 + 连接参数）的“连接数据库”原子共用一个连接池：
+断开连接只是把连接归还到池中，下一次连接直接复用，进程退出时统一关闭。
+"""
+
+import atexit
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Callable
+
+from astronverse.actionlib.logger import logger
+from astronverse.database import DatabaseType
+
+# 每个连接池最多保留的空闲连接数
+POOL_MAX_IDLE = 4
+# 空闲超过该秒数的连接在取用前做一次存活检查
+POOL_CHECK_IDLE_SECONDS = 30
+
+
+def dsn_key(db_info_dict: dict, db_type: DatabaseType) -> str:
+    """连接池的键，连接参数相同即视为同一数据源"""
+    content = json.dumps(db_info_dict, sort_keys=True, default=str, ensure_ascii=False)
+    return "{}:{}".format(db_type.value, hashlib.sha256(content.encode("utf-8")).hexdigest())
+
+
+class PooledConnection:
+    """
+    池化连接，行为与 DB-API 连接一致（cursor/commit/rollback/close），
+    close 时归还到连接池而不是真正关闭
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw):
+        self.pool = pool
+        self.raw = raw
+        self.db_type = pool.db_type
+        self.closed = False
+
+    def cursor(self, *args, **kwargs):
+        return self.raw.cursor(*args, **kwargs)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.pool.release(self.raw)
+
+    def __getattr__(self, item):
+        return getattr(self.raw, item)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, key: str, db_type: DatabaseType, factory: Callable, max_idle: int = POOL_MAX_IDLE):
+        self.key = key
+        self.db_type = db_type
+        self.factory = factory
+        self.max_idle = max_idle
+        self._idle: list[tuple[object, float]] = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def _alive(self, raw) -> bool:
+        try:
+            if self.db_type == DatabaseType.MySQL:
+                raw.ping(reconnect=True)
+                return True
+            cursor = raw.cursor()
+            try:
+                cursor.execute("SELECT 1 FROM DUAL" if self.db_type == DatabaseType.Oracle else "SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception as e:
+            logger.info("数据库连接已失效，重新连接: {}".format(e))
+            return False
+
+    def acquire(self) -> PooledConnection:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                raw, released_at = self._idle.pop()
+            if time.time() - released_at < POOL_CHECK_IDLE_SECONDS or self._alive(raw):
+                self.reused += 1
+                return PooledConnection(self, raw)
+            self._close_raw(raw)
+
+        raw = self.factory()
+        self.created += 1
+        return PooledConnection(self, raw)
+
+    def release(self, raw):
+        # 归还前结束未提交的事务，避免把脏状态带给下一个使用者
+        try:
+            raw.rollback()
+        except Exception:
+            self._close_raw(raw)
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((raw, time.time()))
+                return
+        self._close_raw(raw)
+
+    @staticmethod
+    def _close_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for raw, _ in idle:
+            self._close_raw(raw)
+
+
+class PoolManager:
+    def __init__(self):
+        self._pools: dict[str, ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db_info_dict: dict, db_type: DatabaseType, factory: Callable) -> ConnectionPool:
+        key = dsn_key(db_info_dict, db_type)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(key, db_type, factory)
+                self._pools[key] = pool
+            return pool
+
+    def close_all(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+pool_manager = PoolManager()
+atexit.register(pool_manager.close_all)
@@ -0,0 +1,165 @@
+"""
+查询结果输出
+
+查询以 fetchmany 分批读取，每批行直接写入 sink，不在内存中保留完整结果集
+（成功时调用 close 返回结果，查询中途失败时调用 abort 丢弃已写入的部分）：
+- ListSink: 返回字典列表（与原查询结果结构一致）
+- CsvSink: 逐批写入 csv 文件
+- DataTableSink: 逐行追加到数据表格
+"""
+
+import csv
+import datetime
+import os
+from collections.abc import Callable
+from decimal import Decimal
+from typing import Optional
+
+
+def _identity(value):
+    return value
+
+
+def _datetime(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _date(value):
+    return value.strftime("%Y-%m-%d")
+
+
+def _decimal(value):
+    # 这个用字符串，用float会造成精度丢失
+    return str(value)
+
+
+def converter_for(value) -> Callable:
+    """按值类型选择转换函数（datetime 需先于 date 判断）"""
+    if isinstance(value, datetime.datetime):
+        return _datetime
+    if isinstance(value, datetime.date):
+        return _date
+    if isinstance(value, Decimal):
+        return _decimal
+    return _identity
+
+
+class RowConverter:
+    """
+    按列转换：每列在遇到第一个非空值时确定转换函数，之后整列复用；
+    没有需要转换的列时直接返回原始行
+    """
+
+    def __init__(self, column_count: int):
+        self.converters: list[Optional[Callable]] = [None] * column_count
+        self._pending = set(range(column_count))
+        self._active: list[tuple[int, Callable]] = []
+
+    def _resolve(self, row):
+        for index in list(self._pending):
+            value = row[index]
+            if value is None:
+                continue
+            converter = converter_for(value)
+            self.converters[index] = converter
+            self._pending.discard(index)
+            if converter is not _identity:
+                self._active.append((index, converter))
+
+    def convert(self, rows: list) -> list:
+        if self._pending:
+            for row in rows:
+                self._resolve(row)
+                if not self._pending:
+                    break
+        if not self._active:
+            return rows
+        result = []
+        for row in rows:
+            row = list(row)
+            for index, converter in self._active:
+                if row[index] is not None:
+                    row[index] = converter(row[index])
+            result.append(row)
+        return result
+
+
+class ListSink:
+    def __init__(self):
+        self.columns: list[str] = []
+        self.rows: list[dict] = []
+
+    def open(self, columns: list[str]):
+        self.columns = columns
+
+    def write(self, rows: list):
+        columns = self.columns
+        self.rows.extend(dict(zip(columns, row)) for row in rows)
+
+    def close(self):
+        return self.rows
+
+    def abort(self):
+        self.rows = []
+
+
+class CsvSink:
+    def __init__(self, file_path: str, encoding: str = "utf-8-sig", include_header: bool = True):
+        self.file_path = file_path
+        self.encoding = encoding
+        self.include_header = include_header
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def open(self, columns: list[str]):
+        self._file = open(self.file_path, "w", encoding=self.encoding, newline="")  # noqa: SIM115
+        self._writer = csv.writer(self._file)
+        if self.include_header:
+            self._writer.writerow(columns)
+
+    def write(self, rows: list):
+        self._writer.writerows(rows)
+        self.count += len(rows)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return self.file_path
+
+    def abort(self):
+        """关闭文件并删除写了一半的 csv"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.remove(self.file_path)
+
+
+class DataTableSink:
+    """追加到数据表格末尾（首行为列名），全部写完后保存一次"""
+
+    def __init__(self, include_header: bool = True):
+        from astronverse.datatable.datatable import append_rows, save_data_table
+
+        self._append_rows = append_rows
+        self._save = save_data_table
+        self.include_header = include_header
+        self.count = 0
+
+    def open(self, columns: list[str]):
+        if self.include_header:
+            self._append_rows([columns])
+
+    def write(self, rows: list):
+        self._append_rows(rows)
+        self.count += len(rows)
+
+    def close(self):
+        self._save()
+        return self.count
+
+    def abort(self):
+        # 不保存，已追加的行不落盘
+        pass
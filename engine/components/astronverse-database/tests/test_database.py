@@ -0,0 +1,177 @@
+import csv
+import datetime
+import json
+import os
+import tempfile
+from decimal import Decimal
+from unittest import TestCase, skipUnless
+
+from astronverse.database import DatabaseType
+from astronverse.database.core_shared import DatabaseSharedCore as DatabaseCore
+from astronverse.database.core_shared import quote_identifier
+from astronverse.database.pool import pool_manager
+from astronverse.database.sink import CsvSink, RowConverter
+
+# 外部数据库测试：设置为 json 格式的连接信息后运行，例如
+# DB_TEST_POSTGRES='{"host": "127.0.0.1", "port": 5432, "user": "postgres", "password": "postgres", "database": "postgres"}'
+DB_TEST_POSTGRES = os.environ.get("DB_TEST_POSTGRES")
+DB_TEST_MYSQL = os.environ.get("DB_TEST_MYSQL")
+
+
+class FailingCsvSink(CsvSink):
+    """第二批数据写入时失败"""
+
+    def write(self, rows: list):
+        if self.count:
+            raise OSError("disk full")
+        super().write(rows)
+
+
+class TestSQLite(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.info = {"sqlite_path": os.path.join(self.tmp, "test.db")}
+        self.conn = DatabaseCore.connect(self.info, DatabaseType.SQLite)
+        DatabaseCore.execute(self.conn, "CREATE TABLE users (id INTEGER, name TEXT, score REAL)")
+
+    def tearDown(self):
+        DatabaseCore.disconnect(self.conn)
+        pool_manager.close_all()
+
+    def test_connect_returns_pooled_connection(self):
+        self.assertIsNotNone(self.conn)
+        DatabaseCore.disconnect(self.conn)
+        again = DatabaseCore.connect(self.info, DatabaseType.SQLite)
+        self.assertIs(again.raw, self.conn.raw)
+        self.assertEqual(again.pool.reused, 1)
+        self.conn = again
+
+    def test_execute_and_query(self):
+        self.assertTrue(DatabaseCore.execute(self.conn, "INSERT INTO users VALUES (1, 'a', 1.5)"))
+        self.assertFalse(DatabaseCore.execute(self.conn, "INSERT INTO missing VALUES (1)"))
+        self.assertEqual(DatabaseCore.query(self.conn, "SELECT * FROM users"), [{"id": 1, "name": "a", "score": 1.5}])
+
+    def test_query_empty(self):
+        self.assertEqual(DatabaseCore.query(self.conn, "SELECT * FROM users"), [])
+
+    def test_bulk_insert(self):
+        count = DatabaseCore.bulk_insert(
+            self.conn, "users", [{"id": i, "name": str(i), "score": i} for i in range(2500)]
+        )
+        self.assertEqual(count, 2500)
+        count = DatabaseCore.bulk_insert(self.conn, "users", [[1, "x", 0]], columns=["id", "name", "score"])
+        self.assertEqual(count, 1)
+        self.assertEqual(DatabaseCore.query(self.conn, "SELECT COUNT(*) AS c FROM users"), [{"c": 2501}])
+
+    def test_execute_many_rollback(self):
+        with self.assertRaises(Exception):
+            DatabaseCore.execute_many(self.conn, "INSERT INTO users VALUES (?, ?, ?)", [(1, "a", 1), (2, "b")])
+        self.assertEqual(DatabaseCore.query(self.conn, "SELECT * FROM users"), [])
+
+    def test_export_csv(self):
+        DatabaseCore.bulk_insert(
+            self.conn, "users", [{"id": i, "name": "n{}".format(i), "score": i} for i in range(5000)]
+        )
+        path = os.path.join(self.tmp, "out.csv")
+        sink = CsvSink(path)
+        self.assertEqual(DatabaseCore.query_to(self.conn, "SELECT * FROM users", sink, batch_size=700), path)
+        self.assertEqual(sink.count, 5000)
+        with open(path, encoding="utf-8-sig") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["id", "name", "score"])
+        self.assertEqual(len(rows), 5001)
+
+    def test_export_csv_failure_removes_partial_file(self):
+        DatabaseCore.bulk_insert(self.conn, "users", [{"id": i, "name": "n", "score": i} for i in range(10)])
+        path = os.path.join(self.tmp, "out.csv")
+        sink = FailingCsvSink(path)
+        with self.assertRaises(OSError):
+            DatabaseCore.query_to(self.conn, "SELECT * FROM users", sink, batch_size=3)
+        self.assertIsNone(sink._file)
+        self.assertFalse(os.path.exists(path))
+
+    def test_bulk_insert_quotes_identifiers(self):
+        DatabaseCore.execute(self.conn, 'CREATE TABLE "order items" ("用户 名" TEXT, "select" INTEGER)')
+        count = DatabaseCore.bulk_insert(self.conn, "order items", [{"用户 名": "a", "select": 1}])
+        self.assertEqual(count, 1)
+        self.assertEqual(
+            DatabaseCore.query(self.conn, 'SELECT * FROM "order items"'), [{"用户 名": "a", "select": 1}]
+        )
+        with self.assertRaises(Exception):
+            DatabaseCore.bulk_insert(self.conn, "users; DROP TABLE users; --", [{"id": 1}])
+        self.assertEqual(DatabaseCore.query(self.conn, "SELECT COUNT(*) AS c FROM users"), [{"c": 0}])
+
+
+class TestQuoteIdentifier(TestCase):
+    def test_dialects(self):
+        self.assertEqual(
+            DatabaseCore.insert_sql(DatabaseType.MySQL, "db.users", ["id", "na`me"]),
+            "INSERT INTO `db`.`users` (`id`, `na``me`) VALUES (%s, %s)",
+        )
+        self.assertEqual(
+            DatabaseCore.insert_sql(DatabaseType.SQLServer, "dbo.users", ["id"]),
+            "INSERT INTO [dbo].[users] ([id]) VALUES (?)",
+        )
+        self.assertEqual(
+            DatabaseCore.insert_sql(DatabaseType.Oracle, "Users", ["id", "full name"]),
+            'INSERT INTO Users (id, "full name") VALUES (:1, :2)',
+        )
+
+    def test_keeps_quoted_names(self):
+        self.assertEqual(quote_identifier(DatabaseType.MySQL, "`order`"), "`order`")
+        self.assertEqual(quote_identifier(DatabaseType.PostgreSQL, 'public."Users"'), 'public."Users"')
+        with self.assertRaises(ValueError):
+            quote_identifier(DatabaseType.MySQL, "db..users")
+
+
+class TestRowConverter(TestCase):
+    def test_convert_per_column(self):
+        converter = RowConverter(4)
+        rows = [
+            (None, 1, None, None),
+            (datetime.datetime(2024, 1, 2, 3, 4, 5), 2, datetime.date(2024, 1, 2), Decimal("1.10")),
+        ]
+        self.assertEqual(
+            converter.convert(rows),
+            [[None, 1, None, None], ["2024-01-02 03:04:05", 2, "2024-01-02", "1.10"]],
+        )
+
+    def test_no_conversion_returns_rows(self):
+        rows = [(1, "a"), (2, "b")]
+        self.assertIs(RowConverter(2).convert(rows), rows)
+
+
+class _ServerTest:
+    db_type: DatabaseType = None
+    info: dict = None
+
+    def setUp(self):
+        self.conn = DatabaseCore.connect(self.info, self.db_type)
+        DatabaseCore.execute(self.conn, "DROP TABLE IF EXISTS astron_test")
+        DatabaseCore.execute(
+            self.conn, "CREATE TABLE astron_test (id INTEGER, name VARCHAR(32), amount DECIMAL(10, 2))"
+        )
+
+    def tearDown(self):
+        DatabaseCore.execute(self.conn, "DROP TABLE IF EXISTS astron_test")
+        DatabaseCore.disconnect(self.conn)
+        pool_manager.close_all()
+
+    def test_stream_query(self):
+        data = [{"id": i, "name": "n{}".format(i), "amount": Decimal("1.25")} for i in range(3000)]
+        self.assertEqual(DatabaseCore.bulk_insert(self.conn, "astron_test", data), 3000)
+        rows = DatabaseCore.query(self.conn, "SELECT id, name, amount FROM astron_test ORDER BY id")
+        self.assertEqual(len(rows), 3000)
+        self.assertEqual(rows[0], {"id": 0, "name": "n0", "amount": "1.25"})
+
+
+@skipUnless(DB_TEST_POSTGRES, "DB_TEST_POSTGRES not set")
+class TestPostgres(_ServerTest, TestCase):
+    db_type = DatabaseType.PostgreSQL
+    info = json.loads(DB_TEST_POSTGRES or "{}")
+
+
+@skipUnless(DB_TEST_MYSQL, "DB_TEST_MYSQL not set")
+class TestMySQL(_ServerTest, TestCase):
+    db_type = DatabaseType.MySQL
+    info = json.loads(DB_TEST_MYSQL or "{}")
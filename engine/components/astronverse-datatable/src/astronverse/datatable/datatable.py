@@ -93,6 +93,17 @@ def sync_data_table_head():
     PyxlHeadWrapper.save(path=_head_file_path)
 
 
+def append_rows(rows: list):
+    """追加多行到数据表格末尾，供其他组件分批写入，全部写完后调用 save_data_table 保存一次"""
+    for row in rows:
+        PyxlWrapper.append_row(list(row))
+
+
+def save_data_table():
+    """保存数据表格"""
+    PyxlWrapper.save(path=_xlsx_file_path)
+
+
 class DataTable:
     """数据表格"""
 
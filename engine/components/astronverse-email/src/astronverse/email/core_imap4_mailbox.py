@@ -0,0 +1,472 @@
+"""
+基于 IMAP4 UID 的增量邮箱读取。
+
+- 列表/过滤只取 ENVELOPE、BODYSTRUCTURE，多封邮件合并为一条 UID FETCH 命令
+- 正文和附件按 BODY.PEEK[part] 按需获取，附件分块下载直接写入磁盘
+- 同一次运行内同一账号复用一条连接
+"""
+
+import atexit
+import base64
+import email.header
+import email.utils
+import imaplib
+import os
+import quopri
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from astronverse.baseline.logger.logger import logger
+
+# 一条 UID FETCH 命令包含的邮件数
+FETCH_BATCH = 500
+# 附件分块下载大小
+PART_CHUNK = 1024 * 1024
+
+HEADER_ITEMS = "(UID FLAGS RFC822.SIZE ENVELOPE BODYSTRUCTURE)"
+
+
+# ---------- IMAP 响应解析 ----------
+
+
+class _Literal(bytes):
+    """字面量 {n} 的内容，与普通原子区分"""
+
+
+def _tokenize(data: bytes, tokens: list, literal: Optional[bytes] = None):
+    i, n = 0, len(data)
+    while i < n:
+        c = data[i : i + 1]
+        if c in (b" ", b"\r", b"\n"):
+            i += 1
+        elif c in (b"(", b")"):
+            tokens.append(c)
+            i += 1
+        elif c == b'"':
+            i += 1
+            buf = bytearray()
+            while i < n and data[i : i + 1] != b'"':
+                if data[i : i + 1] == b"\\":
+                    i += 1
+                buf += data[i : i + 1]
+                i += 1
+            tokens.append(_Literal(bytes(buf)))
+            i += 1
+        elif literal is not None and c == b"{" and data.rstrip().endswith(b"}") and data.rfind(b"{") == i:
+            # 行尾的 {n} 由紧随其后的字面量内容替换
+            tokens.append(_Literal(literal or b""))
+            i = n
+        else:
+            start = i
+            depth = 0
+            while i < n:
+                ch = data[i : i + 1]
+                if ch == b"[":
+                    depth += 1
+                elif ch == b"]":
+                    depth -= 1
+                elif depth == 0 and ch in (b" ", b"(", b")"):
+                    break
+                i += 1
+            tokens.append(data[start:i])
+
+
+def _parse_tokens(tokens: list, pos: int = 0):
+    token = tokens[pos]
+    if token == b"(" and not isinstance(token, _Literal):
+        items = []
+        pos += 1
+        while pos < len(tokens) and not (tokens[pos] == b")" and not isinstance(tokens[pos], _Literal)):
+            item, pos = _parse_tokens(tokens, pos)
+            items.append(item)
+        return items, pos + 1
+    if not isinstance(token, _Literal) and token.upper() == b"NIL":
+        return None, pos + 1
+    return token, pos + 1
+
+
+def parse_fetch_response(data: list) -> list[dict]:
+    """
+    解析 imaplib 的 FETCH 响应为 [{"UID": b"1", "ENVELOPE": [...], ...}]
+    data 中的字面量以 (前缀, 内容) 元组给出
+    """
+    tokens: list = []
+    for item in data:
+        if item is None:
+            continue
+        if isinstance(item, tuple):
+            _tokenize(item[0], tokens, item[1])
+        else:
+            _tokenize(item, tokens)
+
+    result = []
+    pos = 0
+    while pos < len(tokens):
+        # imaplib 已去掉 "* " 和 "FETCH"，每封邮件为 "序号 (...)"
+        if pos + 1 < len(tokens) and tokens[pos].isdigit() and tokens[pos + 1] == b"(":
+            items, pos = _parse_tokens(tokens, pos + 1)
+            message = {}
+            for i in range(0, len(items) - 1, 2):
+                message[items[i].decode("ascii", "ignore").upper()] = items[i + 1]
+            result.append(message)
+        else:
+            pos += 1
+    return result
+
+
+# ---------- 信封与结构 ----------
+
+
+def decode_words(value) -> str:
+    """解码 RFC2047 编码字"""
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "replace")
+    try:
+        return str(email.header.make_header(email.header.decode_header(value)))
+    except Exception:
+        return value
+
+
+def _address(addresses) -> tuple[str, str]:
+    """ENVELOPE 地址列表的第一个地址 -> (称呼, 地址)"""
+    if not addresses:
+        return "", ""
+    name, _, mailbox, host = (addresses[0] + [None] * 4)[:4]
+    mailbox = mailbox.decode("utf-8", "replace") if mailbox else ""
+    host = host.decode("utf-8", "replace") if host else ""
+    return decode_words(name), "{}@{}".format(mailbox, host) if host else mailbox
+
+
+def _params(value) -> dict:
+    if not isinstance(value, list):
+        return {}
+    params = {}
+    for i in range(0, len(value) - 1, 2):
+        key = value[i].decode("ascii", "ignore").lower()
+        params[key] = value[i + 1].decode("utf-8", "replace") if value[i + 1] else ""
+    return params
+
+
+def _filename(params: dict) -> str:
+    for key in ("filename", "name"):
+        if key in params:
+            return decode_words(params[key])
+        if key + "*" in params:
+            # RFC2231: charset'lang'value
+            return email.utils.collapse_rfc2231_value(email.utils.decode_rfc2231(params[key + "*"]))
+    return ""
+
+
+@dataclass
+class MailPart:
+    section: str
+    content_type: str
+    encoding: str = "7bit"
+    size: int = 0
+    charset: str = ""
+    filename: str = ""
+    disposition: str = ""
+
+    @property
+    def is_attachment(self) -> bool:
+        return self.disposition == "attachment"
+
+
+def parse_bodystructure(structure, section: str = "") -> list[MailPart]:
+    """展开 BODYSTRUCTURE 为叶子部分列表（message/rfc822 作为整体，不再展开）"""
+    if not isinstance(structure, list) or not structure:
+        return []
+    if isinstance(structure[0], list):
+        parts = []
+        index = 0
+        for child in structure:
+            if not isinstance(child, list):
+                break
+            index += 1
+            parts.extend(parse_bodystructure(child, "{}.{}".format(section, index) if section else str(index)))
+        return parts
+
+    main = (structure[0] or b"").decode("ascii", "ignore").lower()
+    sub = (structure[1] or b"").decode("ascii", "ignore").lower()
+    params = _params(structure[2])
+    encoding = (structure[5] or b"7bit").decode("ascii", "ignore").lower()
+    size = int(structure[6]) if structure[6] and structure[6].isdigit() else 0
+    # 扩展字段的位置：text 有 lines，message/rfc822 有 envelope/body/lines
+    if main == "text":
+        ext = 8
+    elif main == "message" and sub == "rfc822":
+        ext = 10
+    else:
+        ext = 7
+    disposition, disposition_params = "", {}
+    if len(structure) > ext + 1 and isinstance(structure[ext + 1], list):
+        disposition = (structure[ext + 1][0] or b"").decode("ascii", "ignore").lower()
+        disposition_params = _params(structure[ext + 1][1] if len(structure[ext + 1]) > 1 else None)
+    return [
+        MailPart(
+            section=section or "1",
+            content_type="{}/{}".format(main, sub),
+            encoding=encoding,
+            size=size,
+            charset=params.get("charset", ""),
+            filename=_filename(disposition_params) or _filename(params),
+            disposition=disposition,
+        )
+    ]
+
+
+@dataclass
+class MailSummary:
+    uid: int
+    flags: list = field(default_factory=list)
+    size: int = 0
+    date: Optional[str] = None
+    subject: str = ""
+    sender: tuple = ("", "")
+    receiver: tuple = ("", "")
+    parts: list = field(default_factory=list)
+
+    @property
+    def attachments(self) -> list[MailPart]:
+        return [part for part in self.parts if part.is_attachment]
+
+    def text_parts(self, content_type: str) -> list[MailPart]:
+        """正文可能分成多个同类型部分，按出现顺序全部返回"""
+        return [part for part in self.parts if part.content_type == content_type and not part.is_attachment]
+
+    @classmethod
+    def from_fetch(cls, message: dict) -> "MailSummary":
+        envelope = message.get("ENVELOPE") or [None] * 10
+        date = None
+        if envelope[0]:
+            date_tuple = email.utils.parsedate_tz(envelope[0].decode("ascii", "ignore"))
+            if date_tuple:
+                date = datetime.fromtimestamp(email.utils.mktime_tz(date_tuple)).strftime("%Y-%m-%d %H:%M:%S")
+        return cls(
+            uid=int(message["UID"]),
+            flags=[flag.decode("ascii", "ignore") for flag in message.get("FLAGS") or []],
+            size=int(message.get("RFC822.SIZE") or 0),
+            date=date,
+            subject=decode_words(envelope[1]),
+            sender=_address(envelope[2]),
+            receiver=_address(envelope[5]),
+            parts=parse_bodystructure(message.get("BODYSTRUCTURE")),
+        )
+
+
+# ---------- 内容传输编码的流式解码 ----------
+
+
+class _Base64Decoder:
+    def __init__(self):
+        self.rest = b""
+
+    def feed(self, data: bytes) -> bytes:
+        data = self.rest + b"".join(data.split())
+        cut = len(data) // 4 * 4
+        self.rest = data[cut:]
+        data = data[:cut]
+        # 多段各自带填充拼接时逐段解码，b64decode 会丢弃第一个填充之后的内容；内容损坏时抛出 binascii.Error
+        if b"=" not in data.rstrip(b"="):
+            return base64.b64decode(data)
+        return b"".join(
+            base64.b64decode(segment + b"=" * (-len(segment) % 4)) for segment in data.split(b"=") if segment
+        )
+
+    def flush(self) -> bytes:
+        rest, self.rest = self.rest, b""
+        return base64.b64decode(rest + b"=" * (-len(rest) % 4)) if rest.strip(b"=") else b""
+
+
+class _QuotedPrintableDecoder:
+    def __init__(self):
+        self.rest = b""
+
+    def feed(self, data: bytes) -> bytes:
+        # 只解码完整的行，避免把 =XX 或软换行拆开
+        data = self.rest + data
+        cut = data.rfind(b"\n") + 1
+        self.rest = data[cut:]
+        return quopri.decodestring(data[:cut])
+
+    def flush(self) -> bytes:
+        rest, self.rest = self.rest, b""
+        return quopri.decodestring(rest)
+
+
+class _PlainDecoder:
+    def feed(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def decoder_for(encoding: str):
+    if encoding == "base64":
+        return _Base64Decoder()
+    if encoding == "quoted-printable":
+        return _QuotedPrintableDecoder()
+    return _PlainDecoder()
+
+
+def uid_set(uids: list[int]) -> str:
+    """[1,2,3,5] -> "1:3,5"，减少命令长度"""
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(a) if a == b else "{}:{}".format(a, b) for a, b in ranges)
+
+
+# ---------- 读取器 ----------
+
+
+class MailboxReader:
+    """基于一个已登录的 IMAP4 连接，按 UID 读取邮箱"""
+
+    def __init__(self, handler: imaplib.IMAP4):
+        self.handler = handler
+        self.folder: Optional[str] = None
+        self.readonly = True
+        self.lock = threading.Lock()
+
+    def alive(self) -> bool:
+        try:
+            return self.handler.noop()[0] == "OK"
+        except Exception:
+            return False
+
+    def select(self, folder: str = "INBOX", readonly: bool = True):
+        """选择文件夹；已选中且读写模式满足时不重复选择"""
+        if self.folder == folder and (readonly or not self.readonly):
+            return
+        typ, data = self.handler.select(folder, readonly=readonly)
+        if typ != "OK":
+            raise ValueError("选择邮件目录失败: {}".format(data))
+        self.folder = folder
+        self.readonly = readonly
+
+    def search(self, *criteria: str) -> list[int]:
+        typ, data = self.handler.uid("SEARCH", *criteria)
+        if typ != "OK" or not data or not data[0]:
+            return []
+        return [int(uid) for uid in data[0].split()]
+
+    def _fetch(self, uids: list[int], items: str) -> list[dict]:
+        typ, data = self.handler.uid("FETCH", uid_set(uids), items)
+        if typ != "OK":
+            raise ValueError("获取邮件失败: {}".format(data))
+        return parse_fetch_response(data)
+
+    def fetch_summaries(self, uids: list[int], batch_size: int = FETCH_BATCH) -> list[MailSummary]:
+        """批量获取邮件的信封和结构，每批一次往返，按传入的 UID 顺序返回"""
+        result: dict[int, MailSummary] = {}
+        for start in range(0, len(uids), batch_size):
+            for message in self._fetch(uids[start : start + batch_size], HEADER_ITEMS):
+                if "UID" in message:
+                    summary = MailSummary.from_fetch(message)
+                    result[summary.uid] = summary
+        return [result[uid] for uid in uids if uid in result]
+
+    def iter_part(self, uid: int, section: str, chunk_size: int = PART_CHUNK):
+        """分块获取某个部分的原始（未解码）内容"""
+        offset = 0
+        while True:
+            item = "BODY.PEEK[{}]<{}.{}>".format(section, offset, chunk_size)
+            messages = self._fetch([uid], "(UID {})".format(item))
+            data = b""
+            for message in messages:
+                for key, value in message.items():
+                    if key.startswith("BODY[") and value:
+                        data = bytes(value)
+            if data:
+                yield data
+            if len(data) < chunk_size:
+                return
+            offset += len(data)
+
+    def fetch_part(self, uid: int, part: MailPart) -> bytes:
+        decoder = decoder_for(part.encoding)
+        content = b"".join(decoder.feed(chunk) for chunk in self.iter_part(uid, part.section))
+        return content + decoder.flush()
+
+    def fetch_text(self, uid: int, parts: list[MailPart]) -> Optional[str]:
+        """获取并拼接正文各部分，没有正文时返回 None"""
+        if not parts:
+            return None
+        return "".join(self._decode_text(self.fetch_part(uid, part), part.charset) for part in parts)
+
+    @staticmethod
+    def _decode_text(content: bytes, charset: str) -> str:
+        for item in [charset, "utf-8", "gb18030"]:
+            if not item:
+                continue
+            try:
+                return content.decode(item)
+            except (LookupError, UnicodeDecodeError):
+                continue
+        return content.decode("utf-8", "replace")
+
+    def save_part(self, uid: int, part: MailPart, dst_dir: str, name: str = "") -> str:
+        """把某个部分分块下载、解码后直接写入磁盘，不在内存中保留整个附件"""
+        file_path = os.path.join(dst_dir, name or part.filename or "{}_{}".format(uid, part.section))
+        decoder = decoder_for(part.encoding)
+        with open(file_path, "wb") as f:
+            for chunk in self.iter_part(uid, part.section):
+                f.write(decoder.feed(chunk))
+            f.write(decoder.flush())
+        return file_path
+
+    def mark_seen(self, uids: list[int]):
+        if uids:
+            self.handler.uid("STORE", uid_set(uids), "+FLAGS", "(\\Seen)")
+
+    def close(self):
+        try:
+            self.handler.logout()
+        except Exception:
+            pass
+
+
+class MailboxPool:
+    """同一次运行内按账号复用已登录的连接，进程退出时统一登出"""
+
+    def __init__(self):
+        self._readers: dict[tuple, MailboxReader] = {}
+        self._lock = threading.Lock()
+
+    def get(self, server: str, port: int, user: str, password: str) -> MailboxReader:
+        key = (server, int(port), user)
+        with self._lock:
+            reader = self._readers.get(key)
+        if reader is not None and reader.alive():
+            return reader
+        if reader is not None:
+            logger.info("IMAP连接已断开，重新登录: {}".format(user))
+            reader.close()
+
+        from astronverse.email.core_imap4_receive import EmailImap4Receive
+
+        core = EmailImap4Receive()
+        core.login(server=server, port=port, user=user, password=password)
+        reader = MailboxReader(core.mail_handler)
+        with self._lock:
+            self._readers[key] = reader
+        return reader
+
+    def close_all(self):
+        with self._lock:
+            readers, self._readers = list(self._readers.values()), {}
+        for reader in readers:
+            reader.close()
+
+
+mailbox_pool = MailboxPool()
+atexit.register(mailbox_pool.close_all)
@@ -0,0 +1,297 @@
+"""
+批量发送邮件
+
+- 附件只读取、编码一次，生成的 MIME 部分在所有邮件间复用
+- 多条已登录的 SMTP 连接组成连接池并发发送
+- 按设置的速率限流；服务器返回 421/4xx 限流类错误时退避后重试，并按服务器单连接邮件数上限重建连接
+- 返回每个收件人的发送结果
+"""
+
+import mimetypes
+import os
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.encoders import encode_base64
+from email.header import make_header
+from email.mime.base import MIMEBase
+from typing import Optional
+
+from astronverse.baseline.logger.logger import logger
+
+# 并发连接数
+POOL_SIZE = 3
+# 单条连接发送多少封后重建（很多服务器限制单个会话的邮件数）
+MAX_MESSAGES_PER_CONNECTION = 100
+# 临时性错误（限流、服务繁忙）的重试次数与退避
+RETRY_TIMES = 3
+RETRY_BACKOFF = 2.0
+
+
+class AttachmentCache:
+    """按路径缓存已编码的附件，同一附件在一次批量发送中只读取、编码一次"""
+
+    def __init__(self):
+        self._parts: dict[str, MIMEBase] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def encode(attachment_path: str) -> MIMEBase:
+        attachment_filename = os.path.basename(attachment_path)
+        ctype, encoding = mimetypes.guess_type(attachment_path)
+        if ctype is None or encoding is not None:
+            ctype = "application/octet-stream"
+        maintype, subtype = ctype.split("/", 1)
+        file_msg = MIMEBase(maintype, subtype)
+        with open(attachment_path, "rb") as f:
+            file_msg.set_payload(f.read())
+        file_msg.add_header(
+            "Content-Disposition",
+            "attachment",
+            filename=(make_header([(attachment_filename, "UTF-8")]).encode("UTF-8")),
+        )
+        encode_base64(file_msg)  # 把附件编码
+        return file_msg
+
+    def get(self, attachment_path: str) -> MIMEBase:
+        with self._lock:
+            part = self._parts.get(attachment_path)
+            if part is None:
+                part = self.encode(attachment_path)
+                self._parts[attachment_path] = part
+            return part
+
+
+@dataclass
+class OutgoingMail:
+    """一封待发送的邮件：信封收件人 + 已构建的邮件"""
+
+    receiver: str
+    recipients: list
+    message: object
+
+
+@dataclass
+class SendResult:
+    receiver: str
+    success: bool
+    error: str = ""
+    # 服务器拒收的具体地址 {地址: 错误}
+    refused: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {"receiver": self.receiver, "success": self.success, "error": self.error, "refused": self.refused}
+
+
+class RateLimiter:
+    """令牌桶限流，多个发送线程共享；per_minute<=0 表示不限流"""
+
+    def __init__(self, per_minute: int = 0):
+        self.interval = 60.0 / per_minute if per_minute and per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _PooledSmtp:
+    def __init__(self, handler: smtplib.SMTP):
+        self.handler = handler
+        self.sent = 0
+
+
+class SmtpConnectionPool:
+    """已登录的 SMTP 连接池，连接按需创建，断开或达到单连接邮件数上限时重建"""
+
+    def __init__(
+        self,
+        server: str,
+        port: int,
+        user: str,
+        password: str,
+        use_ssl: bool = False,
+        size: int = POOL_SIZE,
+        timeout: int = 20,
+        max_messages: int = MAX_MESSAGES_PER_CONNECTION,
+    ):
+        self.server = server
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_ssl = use_ssl
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self._idle: queue.Queue = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            handler = smtplib.SMTP_SSL(self.server, self.port, timeout=self.timeout)
+        else:
+            handler = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        if self.user and self.password:
+            handler.login(self.user, self.password)
+        return handler
+
+    def put_handler(self, handler: smtplib.SMTP):
+        """把外部已登录的连接放入池中复用"""
+        with self._lock:
+            self._created += 1
+        self._idle.put(_PooledSmtp(handler))
+
+    def acquire(self) -> _PooledSmtp:
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    return _PooledSmtp(self.connect())
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            # 连接都在使用中时等待归还；重建失败的连接会让出名额，由下一轮重新创建
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def release(self, conn: _PooledSmtp, broken: bool = False):
+        if broken or (self.max_messages and conn.sent >= self.max_messages):
+            self._quit(conn.handler)
+            try:
+                conn = _PooledSmtp(self.connect())
+            except Exception as e:
+                logger.error("SMTP重新连接失败: {}".format(e))
+                with self._lock:
+                    self._created -= 1
+                return
+        self._idle.put(conn)
+
+    @staticmethod
+    def _quit(handler: smtplib.SMTP):
+        try:
+            handler.quit()
+        except Exception:
+            try:
+                handler.close()
+            except Exception:
+                pass
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(conn.handler)
+        with self._lock:
+            self._created = 0
+
+
+def _is_temporary(error: Exception) -> bool:
+    """421 服务不可用、450/451/452 临时失败（多为限流）"""
+    code = getattr(error, "smtp_code", None)
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [value[0] for value in error.recipients.values()]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+    return isinstance(code, int) and 400 <= code < 500
+
+
+class BulkSender:
+    """通过连接池并发发送多封邮件"""
+
+    def __init__(self, pool: SmtpConnectionPool, sender: str, rate_per_minute: int = 0, retries: int = RETRY_TIMES):
+        self.pool = pool
+        self.sender = sender
+        self.limiter = RateLimiter(rate_per_minute)
+        self.retries = retries
+
+    def _send_one(self, mail: OutgoingMail) -> SendResult:
+        data = mail.message.as_string()
+        attempt = 0
+        while True:
+            self.limiter.wait()
+            try:
+                conn = self.pool.acquire()
+            except Exception as e:
+                return SendResult(mail.receiver, False, "连接失败: {}".format(e))
+            broken = False
+            try:
+                refused = conn.handler.sendmail(self.sender, mail.recipients, data)
+                conn.sent += 1
+                return SendResult(mail.receiver, True, refused=refused_text(refused))
+            except smtplib.SMTPServerDisconnected as e:
+                broken = True
+                error = e
+            except smtplib.SMTPException as e:
+                error = e
+                # 会话级错误后 RSET，保证连接可继续使用
+                try:
+                    conn.handler.rset()
+                except smtplib.SMTPException:
+                    broken = True
+            except OSError as e:
+                broken = True
+                error = e
+            finally:
+                self.pool.release(conn, broken=broken)
+
+            attempt += 1
+            if attempt > self.retries or not (broken or _is_temporary(error)):
+                refused = refused_text(error.recipients) if isinstance(error, smtplib.SMTPRecipientsRefused) else {}
+                return SendResult(mail.receiver, False, str(error), refused)
+            delay = RETRY_BACKOFF * 2 ** (attempt - 1)
+            logger.info("发送给{}失败，{}秒后重试: {}".format(mail.receiver, delay, error))
+            time.sleep(delay)
+
+    def send_all(self, mails: list[OutgoingMail]) -> list[SendResult]:
+        """并发发送，结果与传入顺序一致"""
+        if not mails:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.pool.size, len(mails))) as executor:
+            return list(executor.map(self._send_one, mails))
+
+
+def refused_text(refused: dict) -> dict:
+    """{地址: (错误码, 消息)} -> {地址: "错误码 消息"}"""
+    result = {}
+    for addr, (code, msg) in refused.items():
+        msg = msg.decode("utf-8", "replace") if isinstance(msg, bytes) else str(msg)
+        result[addr] = "{} {}".format(code, msg)
+    return result
+
+
+def send_with_pool(
+    pool: SmtpConnectionPool,
+    sender: str,
+    mails: list[OutgoingMail],
+    rate_per_minute: int = 0,
+    handler: Optional[smtplib.SMTP] = None,
+) -> list[SendResult]:
+    """使用连接池批量发送，handler 为已登录的连接时直接放入池中复用"""
+    if handler is not None:
+        pool.put_handler(handler)
+    try:
+        return BulkSender(pool, sender, rate_per_minute).send_all(mails)
+    finally:
+        pool.close()
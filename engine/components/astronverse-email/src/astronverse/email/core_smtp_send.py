@@ -2,19 +2,23 @@
 
 import ast
 import copy
-import mimetypes
-import os
 import smtplib
 import time
-from email.encoders import encode_base64
-from email.header import Header, make_header
-from email.mime.base import MIMEBase
+from email.header import Header
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import formataddr, parseaddr
 from typing import Union
 
 from astronverse.baseline.logger.logger import logger
+from astronverse.email.core_smtp_bulk import (
+    POOL_SIZE,
+    AttachmentCache,
+    OutgoingMail,
+    SmtpConnectionPool,
+    refused_text,
+    send_with_pool,
+)
 from astronverse.email.error import *
 
 
@@ -23,9 +27,19 @@ class EmailSmtpSend:
 
     def __init__(self):
         self.mail_handler: smtplib.SMTP | smtplib.SMTP_SSL
+        self.login_info: dict = {}
 
     def login(self, server, port: int, user, password, use_ssl: bool = False, timeout=20):
         """登录邮箱服务器"""
+        # 记录登录信息，批量发送时按需建立更多连接
+        self.login_info = {
+            "server": server,
+            "port": port,
+            "user": user,
+            "password": password,
+            "use_ssl": use_ssl,
+            "timeout": timeout,
+        }
         if use_ssl:
             self.mail_handler = smtplib.SMTP_SSL(server, port, timeout=timeout)
         else:
@@ -65,22 +79,7 @@ class EmailSmtpSend:
         """
         添加附件. 后面需要添加多个附件，可以外部循环调用此方法.
         """
-        attachment_filename = os.path.basename(attachment_path)
-        data = open(attachment_path, "rb")
-        ctype, encoding = mimetypes.guess_type(attachment_path)
-        if ctype is None or encoding is not None:
-            ctype = "application/octet-stream"
-        maintype, subtype = ctype.split("/", 1)
-        file_msg = MIMEBase(maintype, subtype)
-        file_msg.set_payload(data.read())
-        file_msg.add_header(
-            "Content-Disposition",
-            "attachment",
-            filename=(make_header([(attachment_filename, "UTF-8")]).encode("UTF-8")),
-        )
-        data.close()
-        encode_base64(file_msg)  # 把附件编码
-        return file_msg
+        return AttachmentCache.encode(attachment_path)
 
     def send(
         self,
@@ -93,8 +92,15 @@ class EmailSmtpSend:
         content_is_html: bool = False,
         subject: str = "",
         attachment_path: str = "",
+        concurrency: int = POOL_SIZE,
+        rate_per_minute: int = 0,
     ):
-        """发送邮件"""
+        """
+        发送邮件，每个收件人（组）一封
+        :param concurrency: 多个收件人时并发的 SMTP 连接数
+        :param rate_per_minute: 每分钟最多发送的邮件数，0 为不限制
+        :return: 每个收件人的发送结果
+        """
         receiver_list, receiver_group_list = self.__handle_email_address__(receiver)
         if not receiver_list:
             return False
@@ -111,6 +117,13 @@ class EmailSmtpSend:
 
         origin_content = copy.deepcopy(content)
 
+        # 附件只编码一次，所有收件人的邮件共用
+        attachments = AttachmentCache()
+        attachment_parts = (
+            [attachments.get(item) for item in attachment_path.split(",") if item] if attachment_path else []
+        )
+
+        mails = []
         for i in range(len(receiver_list)):
             msg = MIMEMultipart()
             name, addr = parseaddr(f"{user_name} <{user}>")
@@ -124,16 +137,29 @@ class EmailSmtpSend:
                 msg.attach(MIMEText(origin_content, "plain", "utf-8"))
             else:
                 msg.attach(MIMEText(origin_content, "html", "utf-8"))
-            if attachment_path:
-                for item_path in attachment_path.split(","):
-                    if item_path:
-                        msg.attach(self.__handle_attachment__(item_path))
+            for part in attachment_parts:
+                msg.attach(part)
+            mails.append(
+                OutgoingMail(
+                    receiver=receiver_list[i],
+                    recipients=receiver_group_list[i] + cc_group_list[i] + bcc_group_list[i],
+                    message=msg,
+                )
+            )
 
+        if len(mails) == 1:
             try:
-                self.mail_handler.sendmail(
-                    user,
-                    receiver_group_list[i] + cc_group_list[i] + bcc_group_list[i],
-                    msg.as_string(),
-                )
+                refused = self.mail_handler.sendmail(user, mails[0].recipients, mails[0].message.as_string())
             except smtplib.SMTPException as e:
                 raise BaseException(LOGIN_FAIL_FORMAT.format(e), "发送失败{}".format(e))
+            return [{"receiver": mails[0].receiver, "success": True, "error": "", "refused": refused_text(refused)}]
+
+        # 多个收件人：已登录的连接加上按需新建的连接并发发送
+        pool = SmtpConnectionPool(size=concurrency, **self.login_info)
+        results = send_with_pool(pool, user, mails, rate_per_minute=rate_per_minute, handler=self.mail_handler)
+        failed = [result for result in results if not result.success]
+        for result in failed:
+            logger.error("发送给{}失败: {}".format(result.receiver, result.error))
+        if failed and len(failed) == len(results):
+            raise BaseException(LOGIN_FAIL_FORMAT.format(failed[0].error), "发送失败{}".format(failed[0].error))
+        return [result.to_dict() for result in results]
@@ -48,8 +48,10 @@ class Email:
                 required=False,
             ),
             atomicMg.param("mail_port", required=False),
+            atomicMg.param("concurrency", types="Int", required=False, level=AtomicLevel.ADVANCED.value),
+            atomicMg.param("rate_per_minute", types="Int", required=False, level=AtomicLevel.ADVANCED.value),
         ],
-        outputList=[],
+        outputList=[atomicMg.param("send_result", types="List")],
     )
     def send_email(
         receiver: str = "",
@@ -67,8 +69,15 @@ class Email:
         password: str = "",
         bcc: str = "",
         replace_table: str = "",
+        concurrency: int = 3,
+        rate_per_minute: int = 0,
     ):
-        """邮件发送原子能力"""
+        """
+        邮件发送原子能力
+        concurrency: `int`, 多个收件人时并发的连接数
+        rate_per_minute: `int`, 每分钟最多发送的邮件数，0 为不限制
+        返回每个收件人的发送结果
+        """
         mail_server_dict = {
             EmailServerType.QQ: "smtp.qq.com",
             EmailServerType.NETEASE_163: "smtp.163.com",
@@ -95,7 +104,7 @@ class Email:
                     content = content.replace(str(replace.get("origintext")), str(replace.get("replacetext")))  # type: ignore
         except Exception:
             pass
-        core.send(
+        return core.send(
             user=sender_mail,
             user_name=send_name,
             receiver=receiver,
@@ -105,6 +114,8 @@ class Email:
             content_is_html=is_html,
             subject=subject,
             attachment_path=attachment_path,
+            concurrency=concurrency,
+            rate_per_minute=rate_per_minute,
         )
 
     @staticmethod
@@ -223,77 +234,69 @@ class Email:
             EmailServerType.IFLYTEK.value: "mail.iflytek.com",
             EmailServerType.OTHER.value: custom_mail_server,
         }
-        from astronverse.email.core_imap4_receive import EmailImap4Receive
+        from astronverse.email.core_imap4_mailbox import FETCH_BATCH, mailbox_pool
 
-        core = EmailImap4Receive()
-        core.login(
+        # 同一次运行内同一账号复用连接
+        reader = mailbox_pool.get(
             server=mail_server_dict.get(mail_server.value),
             port=custom_mail_port,
             user=user_mail,
             password=user_password,
-            # use_ssl=True,
         )
-        core.select(selector=folder_name)
-
-        mail_ids = []
-        for num in core.search(
-            "utf-8",
-            EmailSeenType.ALL.value if not unseen_flag else EmailSeenType.UNSEEN.value,
-        )[1][0].split(b" "):
-            if not num or num == b"":
-                continue
-            try:
-                logger.info(f"mail id:{str(num)}")
-                mail_info = core.get_entire_mail_info(num)
-            except Exception as e:
-                logger.info(f"im error：{str(e)}")
-                continue
-            # 判断其id是否符合查询要求
-            if (
-                (not (sender_text or receiver_text or theme_text or content_text))
-                or sender_text
-                and mail_info["from"]
-                and sender_text in " ".join([item for item in mail_info["from"] if item])
-                or receiver_text
-                and mail_info["to"]
-                and receiver_text in " ".join([item for item in mail_info["to"] if item])
-                or theme_text
-                and mail_info["subject"]
-                and theme_text in mail_info["subject"]
-                or content_text
-                and mail_info["body"]
-                and content_text in mail_info["body"]
-            ):
-                logger.info(f"im append：{str(num)}")
-                mail_ids.append(num)
-            else:
-                logger.info(f"im continue：{str(num)}")
-                continue
-
-            # 满足最大返回条件即可结束
-            if len(mail_ids) == max_return_num:
-                break
+        with reader.lock:
+            # 只读打开，除非需要标记已读
+            reader.select(folder_name, readonly=not mask_as_read_flag)
+            uids = reader.search(EmailSeenType.ALL.value if not unseen_flag else EmailSeenType.UNSEEN.value)
+            logger.info(f"mail count:{len(uids)}")
 
-        logger.info(f"mail id:{mail_ids}")
+            # 按批获取信封和结构进行过滤，只有需要按内容过滤时才获取正文
+            selected = []
+            for start in range(0, len(uids), FETCH_BATCH):
+                for summary in reader.fetch_summaries(uids[start : start + FETCH_BATCH]):
+                    if (
+                        (not (sender_text or receiver_text or theme_text or content_text))
+                        or sender_text
+                        and sender_text in " ".join([item for item in summary.sender if item])
+                        or receiver_text
+                        and receiver_text in " ".join([item for item in summary.receiver if item])
+                        or theme_text
+                        and summary.subject
+                        and theme_text in summary.subject
+                    ):
+                        selected.append((summary, None))
+                    elif content_text:
+                        body = reader.fetch_text(summary.uid, summary.text_parts("text/plain"))
+                        if body and content_text in body:
+                            selected.append((summary, body))
+                    # 满足最大返回条件即可结束
+                    if len(selected) == max_return_num:
+                        break
+                if len(selected) == max_return_num:
+                    break
 
-        # 获取邮件详细信息，并存储附件
-        return_mail_res = []
-        from pathlib import Path
+            logger.info(f"mail uid:{[summary.uid for summary, _ in selected]}")
 
-        for mail_id in mail_ids:
-            mail_info = core.get_entire_mail_info(mail_id)
-            # 判断是否需要保存附件
-            if save_attachment_flag:
-                for attachment in mail_info["attachments"]:
-                    if not attachment:
-                        continue
-                    file_path = Path(save_attachment_path) / attachment["name"]
-                    file_path.write_bytes(attachment["data"])
+            # 获取邮件正文，附件按部分直接下载到磁盘
+            return_mail_res = []
+            for summary, body in selected:
+                if body is None:
+                    body = reader.fetch_text(summary.uid, summary.text_parts("text/plain"))
+                attachments = [part for part in summary.attachments if part.filename]
+                if save_attachment_flag:
+                    for part in attachments:
+                        reader.save_part(summary.uid, part, save_attachment_path)
+                return_mail_res.append(
+                    {
+                        "from": summary.sender,
+                        "to": summary.receiver,
+                        "subject": summary.subject,
+                        "body": body,
+                        "html": reader.fetch_text(summary.uid, summary.text_parts("text/html")),
+                        "time": summary.date,
+                        "attachments": [part.filename for part in attachments],
+                    }
+                )
             # 判断是否需要标注为已读
             if mask_as_read_flag:
-                core.mask_as_read(mail_id)
-            mail_info["attachments"] = [
-                attachment["name"] for attachment in mail_info["attachments"] if attachment and attachment["name"]
-            ]
-            return_mail_res.append(mail_info)
+                reader.mark_seen([summary.uid for summary, _ in selected])
         return return_mail_res
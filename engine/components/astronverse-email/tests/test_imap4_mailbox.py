@@ -0,0 +1,152 @@
+import base64
+import binascii
+import os
+import quopri
+import re
+import tempfile
+from unittest import TestCase
+
+from astronverse.email.core_imap4_mailbox import (
+    HEADER_ITEMS,
+    MailboxReader,
+    decoder_for,
+    parse_fetch_response,
+    uid_set,
+)
+
+ATTACHMENT = os.urandom(200 * 1024 + 7)
+ATTACHMENT_B64 = base64.encodebytes(ATTACHMENT)
+
+
+def header_line(seq: int, uid: int) -> bytes:
+    """模拟服务器对 ENVELOPE/BODYSTRUCTURE 的响应：正文 + 附件"""
+    return (
+        b"%d (UID %d FLAGS (\\Seen) RFC822.SIZE 2048 ENVELOPE "
+        b'("Mon, 7 Feb 1994 21:52:25 -0800" "=?UTF-8?B?5rWL6K+V?= %d" '
+        b'(("Sender" NIL "from" "example.com")) (("Sender" NIL "from" "example.com")) NIL '
+        b'(("=?UTF-8?B?5pS25Lu25Lq6?=" NIL "to" "example.com")) NIL NIL NIL "<id%d@example.com>") '
+        b'BODYSTRUCTURE (("text" "plain" ("charset" "utf-8") NIL NIL "quoted-printable" 20 1 NIL NIL NIL NIL)'
+        b'("application" "octet-stream" ("name" "a.bin") NIL NIL "base64" %d NIL ("attachment" ("filename" "a.bin")) '
+        b'NIL NIL) "mixed" ("boundary" "xyz") NIL NIL NIL))' % (seq, uid, uid, uid, len(ATTACHMENT_B64))
+    )
+
+
+class FakeHandler:
+    """只实现 MailboxReader 用到的 imaplib 接口"""
+
+    def __init__(self, count=1000):
+        self.count = count
+        self.commands = []
+        self.body = quopri.encodestring("正文 hello".encode("utf-8"))
+
+    def select(self, folder, readonly=False):
+        self.commands.append(("SELECT", folder, readonly))
+        return "OK", [str(self.count).encode()]
+
+    def noop(self):
+        return "OK", [b""]
+
+    def uid(self, command, *args):
+        self.commands.append((command,) + args)
+        if command == "SEARCH":
+            return "OK", [" ".join(str(i) for i in range(1, self.count + 1)).encode()]
+        if command == "STORE":
+            return "OK", []
+        uids, items = args
+        if items == HEADER_ITEMS:
+            selected = []
+            for part in uids.split(","):
+                a, _, b = part.partition(":")
+                selected.extend(range(int(a), int(b or a) + 1))
+            return "OK", [header_line(seq, uid) for seq, uid in enumerate(selected, 1)]
+        section, offset, length = re.search(r"BODY\.PEEK\[([\d.]+)\]<(\d+)\.(\d+)>", items).groups()
+        source = ATTACHMENT_B64 if section == "2" else self.body
+        data = source[int(offset) : int(offset) + int(length)]
+        prefix = b"1 (UID %s BODY[%s]<%s> {%d}" % (uids.encode(), section.encode(), offset.encode(), len(data))
+        return "OK", [(prefix, data), b")"]
+
+
+class TestParse(TestCase):
+    def test_fetch_response_with_literal(self):
+        data = [
+            (b'1 (UID 7 ENVELOPE ("Mon, 7 Feb 1994 21:52:25 -0800" {11}', b'hello (x) "'),
+            b' NIL NIL NIL NIL NIL NIL NIL NIL "<a@b>") FLAGS (\\Seen))',
+            b"2 (UID 8 FLAGS ())",
+        ]
+        messages = parse_fetch_response(data)
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[0]["UID"], b"7")
+        self.assertEqual(messages[0]["ENVELOPE"][1], b'hello (x) "')
+        self.assertEqual(messages[0]["FLAGS"], [b"\\Seen"])
+        self.assertEqual(messages[1]["FLAGS"], [])
+
+    def test_uid_set(self):
+        self.assertEqual(uid_set([5, 1, 2, 3, 9, 10]), "1:3,5,9:10")
+
+    def test_stream_decoders(self):
+        text = ("第一行 line=1 " * 40 + "\n").encode("utf-8") * 200
+        for encoding, raw, encoded in (
+            ("base64", ATTACHMENT, ATTACHMENT_B64),
+            ("quoted-printable", text, quopri.encodestring(text)),
+        ):
+            decoder = decoder_for(encoding)
+            out = b"".join(decoder.feed(encoded[i : i + 997]) for i in range(0, len(encoded), 997))
+            self.assertEqual(out + decoder.flush(), raw)
+
+    def test_base64_decoder_errors(self):
+        # 各段单独填充后拼接的内容完整解码
+        decoder = decoder_for("base64")
+        out = decoder.feed(base64.b64encode(b"a") + b"\r\n" + base64.b64encode(b"bcd"))
+        self.assertEqual(out + decoder.flush(), b"abcd")
+        # 损坏的内容报错而不是返回空内容
+        with self.assertRaises(binascii.Error):
+            decoder_for("base64").feed(b"QUJD*Q===")
+
+
+class TestMailboxReader(TestCase):
+    def test_summaries_in_one_round_trip(self):
+        handler = FakeHandler()
+        reader = MailboxReader(handler)
+        reader.select("INBOX")
+        uids = reader.search("ALL")
+        summaries = reader.fetch_summaries(uids, batch_size=1000)
+        fetches = [command for command in handler.commands if command[0] == "FETCH"]
+        self.assertEqual(len(fetches), 1)
+        self.assertEqual(fetches[0][1], "1:1000")
+        self.assertEqual(len(summaries), 1000)
+
+        summary = summaries[0]
+        self.assertEqual(summary.subject, "测试 1")
+        self.assertEqual(summary.sender, ("Sender", "from@example.com"))
+        self.assertEqual(summary.receiver, ("收件人", "to@example.com"))
+        self.assertEqual(summary.flags, ["\\Seen"])
+        self.assertEqual([part.section for part in summary.parts], ["1", "2"])
+        self.assertEqual([part.filename for part in summary.attachments], ["a.bin"])
+        self.assertEqual([part.encoding for part in summary.text_parts("text/plain")], ["quoted-printable"])
+
+    def test_lazy_body_and_attachment(self):
+        handler = FakeHandler(count=1)
+        reader = MailboxReader(handler)
+        summary = reader.fetch_summaries([1])[0]
+        self.assertEqual(reader.fetch_text(1, summary.text_parts("text/plain")), "正文 hello")
+        self.assertIsNone(reader.fetch_text(1, summary.text_parts("text/html")))
+        # 多个正文部分按顺序拼接
+        self.assertEqual(reader.fetch_text(1, summary.text_parts("text/plain") * 2), "正文 hello正文 hello")
+
+        dst = tempfile.mkdtemp()
+        path = reader.save_part(1, summary.attachments[0], dst)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), ATTACHMENT)
+        # 附件分块获取
+        chunks = [command for command in handler.commands if "BODY.PEEK[2]" in str(command)]
+        self.assertEqual(len(chunks), len(ATTACHMENT_B64) // (1024 * 1024) + 1)
+
+    def test_select_once(self):
+        handler = FakeHandler(count=1)
+        reader = MailboxReader(handler)
+        reader.select("INBOX")
+        reader.select("INBOX")
+        reader.select("INBOX", readonly=False)
+        self.assertEqual(
+            [c for c in handler.commands if c[0] == "SELECT"], [("SELECT", "INBOX", True), ("SELECT", "INBOX", False)]
+        )
@@ -0,0 +1,128 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+from email import message_from_bytes
+from unittest import TestCase, mock
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult, LoginPassword
+from astronverse.email import core_smtp_bulk
+from astronverse.email.core_smtp_send import EmailSmtpSend
+
+
+class _Handler:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.busy = 0
+        self.lock = threading.Lock()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):  # noqa: N802
+        if address.startswith("reject"):
+            return "550 no such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):  # noqa: N802
+        with self.lock:
+            if self.busy:
+                # 模拟服务器限流
+                self.busy -= 1
+                return "451 rate limited, try again later"
+            self.messages.append((envelope.rcpt_tos, envelope.content))
+            self.sessions.add(id(session))
+        return "250 Message accepted"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _authenticator(server, session, envelope, mechanism, auth_data):
+    ok = isinstance(auth_data, LoginPassword) and auth_data.password == b"secret"
+    return AuthResult(success=ok)
+
+
+class TestBulkSend(TestCase):
+    def setUp(self):
+        self.handler = _Handler()
+        self.controller = Controller(
+            self.handler,
+            hostname="127.0.0.1",
+            port=_free_port(),
+            authenticator=_authenticator,
+            auth_require_tls=False,
+        )
+        self.controller.start()
+        self.port = self.controller.port
+        self.attachment = os.path.join(tempfile.mkdtemp(), "报告.bin")
+        with open(self.attachment, "wb") as f:
+            f.write(os.urandom(256 * 1024))
+
+    def tearDown(self):
+        self.controller.stop()
+
+    def login(self):
+        core = EmailSmtpSend()
+        self.assertTrue(core.login("127.0.0.1", self.port, "robot@example.com", "secret"))
+        return core
+
+    def test_bulk_send_encodes_attachment_once(self):
+        receivers = ["user{}@example.com".format(i) for i in range(40)]
+        with mock.patch.object(
+            core_smtp_bulk.AttachmentCache, "encode", wraps=core_smtp_bulk.AttachmentCache.encode
+        ) as encode:
+            results = self.login().send(
+                user="robot@example.com",
+                user_name="机器人",
+                receiver=receivers,
+                content="hello",
+                subject="通知",
+                attachment_path=self.attachment,
+                concurrency=4,
+            )
+        self.assertEqual(encode.call_count, 1)
+        self.assertEqual([result["receiver"] for result in results], receivers)
+        self.assertTrue(all(result["success"] for result in results))
+        self.assertEqual(len(self.handler.messages), 40)
+        self.assertLessEqual(len(self.handler.sessions), 4)
+
+        msg = message_from_bytes(self.handler.messages[0][1])
+        parts = [part for part in msg.walk() if part.get_filename()]
+        with open(self.attachment, "rb") as f:
+            self.assertEqual(parts[0].get_payload(decode=True), f.read())
+
+    def test_per_recipient_results(self):
+        results = self.login().send(
+            user="robot@example.com",
+            user_name="",
+            receiver=["ok@example.com", "reject@example.com", "ok2@example.com;reject2@example.com"],
+            content="hello",
+        )
+        self.assertEqual([result["success"] for result in results], [True, False, True])
+        self.assertIn("reject@example.com", results[1]["refused"])
+        self.assertIn("reject2@example.com", results[2]["refused"])
+
+    def test_retry_on_rate_limit(self):
+        self.handler.busy = 2
+        with mock.patch.object(core_smtp_bulk, "RETRY_BACKOFF", 0.01):
+            results = self.login().send(
+                user="robot@example.com",
+                user_name="",
+                receiver=["a@example.com", "b@example.com", "c@example.com"],
+                content="hello",
+                concurrency=1,
+            )
+        self.assertTrue(all(result["success"] for result in results))
+        self.assertEqual(len(self.handler.messages), 3)
+
+    def test_rate_limiter(self):
+        limiter = core_smtp_bulk.RateLimiter(per_minute=600)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.45)
@@ -1,5 +1,14 @@
+import os
+import sys
 from enum import Enum
 
+# Excel 实现：com 为 Windows 下的 Excel/WPS 自动化，headless 为无界面的 openpyxl/calamine 实现
+# 默认 Windows 使用 com、其他平台使用 headless，可通过环境变量 ASTRON_EXCEL_BACKEND 指定（如 Windows 服务端运行时）
+EXCEL_BACKEND = os.environ.get("ASTRON_EXCEL_BACKEND", "com" if sys.platform == "win32" else "headless").lower()
+if EXCEL_BACKEND not in ("com", "headless"):
+    raise ValueError("ASTRON_EXCEL_BACKEND 只支持 com 或 headless: {}".format(EXCEL_BACKEND))
+HEADLESS = EXCEL_BACKEND == "headless"
+
 
 class ApplicationType(Enum):
     """默认创建程序类型"""
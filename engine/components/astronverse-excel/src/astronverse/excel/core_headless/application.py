@@ -0,0 +1,80 @@
+from typing import Optional
+
+from astronverse.actionlib.logger import logger
+from astronverse.excel import ApplicationType
+from astronverse.excel.core_headless.workbook import HeadlessWorkbook
+from astronverse.excel.excel_obj import ExcelObj
+
+
+class HeadlessApplication:
+    """无界面应用，仅记录本次运行中打开的工作簿"""
+
+    def __init__(self):
+        self.workbooks: list[HeadlessWorkbook] = []
+
+
+_application = HeadlessApplication()
+
+
+class Application:
+    @staticmethod
+    def init_app(
+        default_application: ApplicationType = ApplicationType.DEFAULT,
+        visible_flag: bool = None,
+        retry: int = 0,
+        retry_delay: float = 0.5,
+        prefer_existing: bool = True,
+    ) -> object:
+        """无界面模式下不区分 Excel/WPS，也没有可见窗口"""
+        return _application
+
+    @staticmethod
+    def quit_app(default_application: ApplicationType = ApplicationType.DEFAULT, save_changes: bool = False):
+        """关闭所有工作簿"""
+        for workbook in list(_application.workbooks):
+            try:
+                if save_changes:
+                    workbook.save()
+                workbook.close()
+            except Exception as e:
+                logger.warning("关闭异常 {}".format(e))
+        _application.workbooks.clear()
+
+    @staticmethod
+    def create_workbook(application, file_path: str = "", password: str = "") -> ExcelObj:
+        """创建新工作簿"""
+        workbook = HeadlessWorkbook(password=password)
+        if file_path:
+            workbook.save(file_path)
+        application.workbooks.append(workbook)
+        return ExcelObj(obj=workbook, path=file_path or "")
+
+    @staticmethod
+    def open_workbook(application, file_path: str, password: str = "", update_links: bool = True) -> ExcelObj:
+        """打开工作簿，只记录路径，读写时再按需加载"""
+        workbook = HeadlessWorkbook(path=file_path, password=password)
+        application.workbooks.append(workbook)
+        return ExcelObj(obj=workbook, path=file_path or "")
+
+    @staticmethod
+    def get_existing_workbook(application, match_name: str) -> Optional[ExcelObj]:
+        """获取已打开的工作簿"""
+        for workbook in reversed(application.workbooks):
+            if match_name in workbook.Name:
+                return ExcelObj(obj=workbook, path=workbook.path)
+        return None
+
+    @staticmethod
+    def save_workbook(excel_obj: ExcelObj, file_path: str = "", password: str = ""):
+        if password:
+            raise Exception("无界面模式暂不支持设置Excel密码")
+        excel_obj.obj.save(file_path)
+
+    @staticmethod
+    def close_workbook(excel_obj: ExcelObj, save_changes: bool = True):
+        workbook = excel_obj.obj
+        if save_changes:
+            workbook.save()
+        workbook.close()
+        if workbook in _application.workbooks:
+            _application.workbooks.remove(workbook)
@@ -0,0 +1,439 @@
+from copy import copy
+from typing import Any, Optional
+
+from astronverse.excel import (
+    ClearType,
+    FontNameType,
+    FontType,
+    HorizontalAlign,
+    NumberFormatType,
+    ReadRangeType,
+    SetType,
+    VerticalAlign,
+)
+from astronverse.excel.core_headless.workbook import MAX_COL, MAX_ROW, HeadlessRange, cell_text
+from astronverse.excel.core_headless.worksheet import col_width_pt, row_height_pt
+from astronverse.excel.utils import column_letter_to_number, column_number_to_letter
+
+# 无界面模式下的“剪贴板”：copy_range 记录源区域，paste_range 使用
+_clipboard: Optional[HeadlessRange] = None
+
+
+def _rgb_hex(rgb) -> str:
+    return "{:02X}{:02X}{:02X}".format(*rgb)
+
+
+class Range:
+    @staticmethod
+    def get_range_data(range_obj, use_text: bool = False) -> Any:
+        """单个单元格返回值，多个单元格返回二维元组（与 COM 的 Range.Value 一致）"""
+        values = Range.get_range_values(range_obj, use_text)
+        if range_obj.is_cell:
+            return values[0][0] if values and values[0] else ("" if use_text else None)
+        return tuple(tuple(row) for row in values)
+
+    @staticmethod
+    def get_range_values(range_obj, use_text: bool = False) -> list[list]:
+        """批量读取区域，直接从内存中的整表数据切片"""
+        sheet = range_obj.sheet
+        values = sheet.Parent.read(sheet.Name, range_obj.r1, range_obj.c1, range_obj.r2, range_obj.c2)
+        if use_text:
+            values = [[cell_text(v) for v in row] for row in values]
+        return values
+
+    @staticmethod
+    def get_range_color(range_obj) -> tuple[int, int, int]:
+        ws = range_obj.sheet.ws
+        fill = ws.cell(row=range_obj.r1, column=range_obj.c1).fill
+        color = fill.fgColor.rgb if fill is not None and fill.fill_type else None
+        if not isinstance(color, str):
+            # 无填充时与 Excel 一致返回白色
+            return 255, 255, 255
+        color = color[-6:]
+        return int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16)
+
+    @staticmethod
+    def get_range_size(range_obj) -> tuple[int, int, int, int]:
+        """区域的位置和大小（磅），按列宽/行高估算"""
+        ws = range_obj.sheet.ws
+        left = sum(col_width_pt(ws, c) for c in range(1, range_obj.c1))
+        top = sum(row_height_pt(ws, r) for r in range(1, range_obj.r1))
+        width = sum(col_width_pt(ws, c) for c in range(range_obj.c1, range_obj.c2 + 1))
+        height = sum(row_height_pt(ws, r) for r in range(range_obj.r1, range_obj.r2 + 1))
+        return left, top, width, height
+
+    @staticmethod
+    def set_range_data(range_obj, value: Any):
+        """区域内所有单元格写入同一个值"""
+        rows = range_obj.r2 - range_obj.r1 + 1
+        cols = range_obj.c2 - range_obj.c1 + 1
+        Range.set_range_values(range_obj, [[value] * cols for _ in range(rows)])
+
+    @staticmethod
+    def set_range_values(range_obj, values: list[list]):
+        """以二维列表批量写入区域，从区域左上角开始"""
+        sheet = range_obj.sheet
+        try:
+            sheet.Parent.write(sheet.Name, range_obj.r1, range_obj.c1, values)
+        except Exception as e:
+            raise ValueError(f"设置区域数据失败: {e}")
+
+    @staticmethod
+    def set_range_type(
+        range_obj,
+        col_width: Optional[str] = None,
+        bg_color: Optional[tuple[int, int, int]] = None,
+        font_color: Optional[tuple[int, int, int]] = None,
+        font_type: FontType = FontType.NO_CHANGE,
+        font_name: FontNameType = FontNameType.NO_CHANGE,
+        font_size: Optional[int] = None,
+        number_format: NumberFormatType = NumberFormatType.NO_CHANGE,
+        number_format_other: str = "",
+        horizontal_align: HorizontalAlign = HorizontalAlign.NO_CHANGE,
+        vertical_align: VerticalAlign = VerticalAlign.NO_CHANGE,
+        wrap_text: bool = True,
+        design_type: ReadRangeType = ReadRangeType.CELL,
+        auto_row_height: bool = False,
+        auto_column_width: bool = False,
+    ):
+        from openpyxl.styles import Alignment, PatternFill
+
+        h_align_map = {
+            HorizontalAlign.DEFAULT.value: "general",
+            HorizontalAlign.LEFT.value: "left",
+            HorizontalAlign.RIGHT.value: "right",
+            HorizontalAlign.CENTER.value: "center",
+            HorizontalAlign.PADDING.value: "fill",
+            HorizontalAlign.BOTH.value: "justify",
+            HorizontalAlign.CROSS.value: "centerContinuous",
+            HorizontalAlign.DISTRIBUTED.value: "distributed",
+        }
+        v_align_map = {
+            VerticalAlign.UP.value: "top",
+            VerticalAlign.MIDDLE.value: "center",
+            VerticalAlign.DOWN.value: "bottom",
+            VerticalAlign.BOTH.value: "justify",
+            VerticalAlign.DISTRIBUTED.value: "distributed",
+        }
+
+        ws = range_obj.sheet.ws
+        if col_width:
+            for col in range(range_obj.c1, range_obj.c2 + 1):
+                ws.column_dimensions[column_number_to_letter(col)].width = float(col_width)
+
+        if number_format != NumberFormatType.NO_CHANGE:
+            format_str = number_format_other if number_format == NumberFormatType.CUSTOM else number_format.value
+            if format_str == NumberFormatType.GENERAL.value:
+                format_str = "General"
+        else:
+            format_str = None
+
+        for cell in range_obj.cells():
+            font = copy(cell.font)
+            font.color = _rgb_hex(font_color) if font_color else "000000"
+            if font_name != FontNameType.NO_CHANGE:
+                font.name = font_name.value
+            if font_size:
+                font.size = font_size
+            if font_type == FontType.BOLD:
+                font.bold = True
+            elif font_type == FontType.ITALIC:
+                font.italic = True
+            elif font_type == FontType.BOLD_ITALIC:
+                font.bold = True
+                font.italic = True
+            elif font_type == FontType.NORMAL:
+                font.bold = False
+                font.italic = False
+            cell.font = font
+
+            if bg_color:
+                color = _rgb_hex(tuple(bg_color))
+                cell.fill = PatternFill(fill_type="solid", fgColor=color, bgColor=color)
+            else:
+                cell.fill = PatternFill(fill_type=None)
+
+            alignment = copy(cell.alignment) if cell.alignment else Alignment()
+            alignment.wrap_text = True if wrap_text is True else False
+            if horizontal_align != HorizontalAlign.NO_CHANGE:
+                alignment.horizontal = h_align_map.get(horizontal_align.value)
+            if vertical_align != VerticalAlign.NO_CHANGE:
+                alignment.vertical = v_align_map.get(vertical_align.value)
+            cell.alignment = alignment
+
+            if format_str is not None:
+                cell.number_format = format_str
+
+        if design_type == ReadRangeType.COLUMN and auto_column_width:
+            Range._autofit_columns(range_obj)
+
+    @staticmethod
+    def _autofit_columns(range_obj):
+        """按内容最长文本估算列宽"""
+        sheet = range_obj.sheet
+        grid = sheet.Parent.grid(sheet.Name)
+        for col in range(range_obj.c1, min(range_obj.c2, max((len(r) for r in grid), default=0)) + 1):
+            longest = max((len(cell_text(row[col - 1])) for row in grid if col - 1 < len(row)), default=0)
+            sheet.ws.column_dimensions[column_number_to_letter(col)].width = max(longest + 2, 8.43)
+
+    @staticmethod
+    def delete_range(range_obj, direction: str = "") -> None:
+        sheet = range_obj.sheet
+        ws = sheet.ws
+        rows = range_obj.r2 - range_obj.r1 + 1
+        cols = range_obj.c2 - range_obj.c1 + 1
+        try:
+            if range_obj.c1 == 1 and range_obj.c2 >= MAX_COL:
+                ws.delete_rows(range_obj.r1, rows)
+            elif range_obj.r1 == 1 and range_obj.r2 >= MAX_ROW:
+                ws.delete_cols(range_obj.c1, cols)
+            elif direction == "right_move_left":
+                for cell in range_obj.cells():
+                    cell.value = None
+                if ws.max_column > range_obj.c2:
+                    ws.move_range(
+                        "{}{}:{}{}".format(
+                            column_number_to_letter(range_obj.c2 + 1),
+                            range_obj.r1,
+                            column_number_to_letter(ws.max_column),
+                            range_obj.r2,
+                        ),
+                        cols=-cols,
+                    )
+            else:
+                # 默认与 Excel 一致：下方单元格上移
+                for cell in range_obj.cells():
+                    cell.value = None
+                if ws.max_row > range_obj.r2:
+                    ws.move_range(
+                        "{}{}:{}{}".format(
+                            column_number_to_letter(range_obj.c1),
+                            range_obj.r2 + 1,
+                            column_number_to_letter(range_obj.c2),
+                            ws.max_row,
+                        ),
+                        rows=-rows,
+                    )
+        except Exception as e:
+            raise ValueError(f"删除区域失败: {e}")
+        sheet.Parent.invalidate(sheet.Name)
+
+    @staticmethod
+    def clear_range(range_obj, clear_type: str = ""):
+        from openpyxl.cell.cell import Cell
+
+        if clear_type not in (ClearType.CONTENT.value, ClearType.STYLE.value, ClearType.ALL.value):
+            raise ValueError(f"清理区域失败: 不支持的清理类型: {clear_type}")
+        sheet = range_obj.sheet
+        default_style = Cell(sheet.ws).style
+        for cell in range_obj.cells():
+            if clear_type in (ClearType.CONTENT.value, ClearType.ALL.value):
+                cell.value = None
+            if clear_type in (ClearType.STYLE.value, ClearType.ALL.value):
+                cell.style = default_style
+        sheet.Parent.invalidate(sheet.Name)
+
+    @staticmethod
+    def copy_range(range_obj):
+        global _clipboard
+        _clipboard = range_obj
+
+    @staticmethod
+    def copied_text() -> str:
+        """与 Excel 复制到剪贴板的文本格式一致：列以制表符分隔，行以换行分隔"""
+        if _clipboard is None:
+            return ""
+        values = Range.get_range_values(_clipboard, use_text=True)
+        return "".join("\t".join(row) + "\r\n" for row in values)
+
+    @staticmethod
+    def paste_range(
+        range_obj,
+        paste_type: str = "",
+        skip_blanks=False,
+        transpose=False,
+    ):
+        supported = (
+            "all",
+            "value_and_format",
+            "format",
+            "exclude_frame",
+            "col_width_only",
+            "formula_only",
+            "formula_and_format",
+            "paste_value",
+        )
+        if paste_type not in supported:
+            raise ValueError(f"不支持的粘贴类型: {paste_type}")
+        if _clipboard is None:
+            raise ValueError("区域粘贴失败: 剪贴板为空")
+
+        src_ws = _clipboard.sheet.ws
+        dst_ws = range_obj.sheet.ws
+        if paste_type == "col_width_only":
+            for offset, col in enumerate(range(_clipboard.c1, _clipboard.c2 + 1)):
+                src_dim = src_ws.column_dimensions[column_number_to_letter(col)]
+                dst_col = column_number_to_letter(range_obj.c1 + offset)
+                dst_ws.column_dimensions[dst_col].width = src_dim.width
+            return
+
+        copy_value = paste_type != "format"
+        copy_style = paste_type not in ("paste_value", "formula_only")
+        for src_row in src_ws.iter_rows(
+            min_row=_clipboard.r1, max_row=_clipboard.r2, min_col=_clipboard.c1, max_col=_clipboard.c2
+        ):
+            for src in src_row:
+                dr, dc = src.row - _clipboard.r1, src.column - _clipboard.c1
+                if transpose:
+                    dr, dc = dc, dr
+                if skip_blanks and src.value is None:
+                    continue
+                dst = dst_ws.cell(row=range_obj.r1 + dr, column=range_obj.c1 + dc)
+                if copy_value:
+                    dst.value = src.value
+                if copy_style and src.has_style:
+                    dst._style = copy(src._style)
+        range_obj.sheet.Parent.invalidate(range_obj.sheet.Name)
+
+    @staticmethod
+    def insert_range(range_obj, axis: str = "row"):
+        ws = range_obj.sheet.ws
+        if axis == "row":
+            ws.insert_rows(range_obj.r1, range_obj.r2 - range_obj.r1 + 1)
+        elif axis == "column":
+            ws.insert_cols(range_obj.c1, range_obj.c2 - range_obj.c1 + 1)
+        else:
+            raise ValueError(f"不支持的axis参数: {axis}")
+        range_obj.sheet.Parent.invalidate(range_obj.sheet.Name)
+
+    @staticmethod
+    def merge_range(range_obj, job_type: str):
+        ws = range_obj.sheet.ws
+        try:
+            if job_type == "merge":
+                ws.merge_cells(range_obj.Address)
+            else:
+                for merged in list(ws.merged_cells.ranges):
+                    if merged.coord == range_obj.Address or (
+                        merged.min_row >= range_obj.r1
+                        and merged.max_row <= range_obj.r2
+                        and merged.min_col >= range_obj.c1
+                        and merged.max_col <= range_obj.c2
+                    ):
+                        ws.unmerge_cells(merged.coord)
+        except Exception as e:
+            raise ValueError(f"合并/拆分单元格失败: {e}")
+        range_obj.sheet.Parent.invalidate(range_obj.sheet.Name)
+
+    @staticmethod
+    def autofill_range(range_obj, target_range):
+        """把起始单元格的公式按相对引用填充到目标区域"""
+        from openpyxl.formula.translate import Translator
+
+        ws = range_obj.sheet.ws
+        origin = ws.cell(row=range_obj.r1, column=range_obj.c1)
+        formula = origin.value
+        try:
+            values = []
+            for r in range(target_range.r1, target_range.r2 + 1):
+                row = []
+                for c in range(target_range.c1, target_range.c2 + 1):
+                    dest = "{}{}".format(column_number_to_letter(c), r)
+                    if isinstance(formula, str) and formula.startswith("="):
+                        row.append(Translator(formula, origin=origin.coordinate).translate_formula(dest))
+                    else:
+                        row.append(formula)
+                values.append(row)
+            Range.set_range_values(target_range, values)
+        except Exception as e:
+            raise ValueError(f"区域自动填充失败: {e}")
+
+    @staticmethod
+    def set_row_height(range_obj, set_type: SetType, height_float: float):
+        ws = range_obj.sheet.ws
+        for row in range(range_obj.r1, range_obj.r2 + 1):
+            # 自动行高：清除固定行高，由打开文件的程序自行计算
+            ws.row_dimensions[row].height = height_float if set_type == SetType.VALUE else None
+
+    @staticmethod
+    def set_column_width(range_obj, set_type: SetType, width_float: float):
+        if set_type == SetType.VALUE:
+            ws = range_obj.sheet.ws
+            for col in range(range_obj.c1, range_obj.c2 + 1):
+                ws.column_dimensions[column_number_to_letter(col)].width = width_float
+        elif set_type == SetType.AUTO:
+            Range._autofit_columns(range_obj)
+
+    @staticmethod
+    def convert_text_to_number(range_obj, temp_range):
+        """temp_range 仅为与 COM 实现保持接口一致，这里直接在 Python 中转换"""
+        values = Range.get_range_values(range_obj)
+        converted = []
+        for row in values:
+            new_row = []
+            for value in row:
+                if isinstance(value, str) and value.strip():
+                    try:
+                        number = float(value.strip().replace(",", ""))
+                        value = int(number) if number.is_integer() else number
+                    except ValueError:
+                        pass
+                new_row.append(value)
+            converted.append(new_row)
+        Range.set_range_values(range_obj, converted)
+        for cell in range_obj.cells():
+            if isinstance(cell.value, (int, float)):
+                cell.number_format = "General"
+
+    @staticmethod
+    def convert_number_to_text(range_obj):
+        values = Range.get_range_values(range_obj)
+        converted = [[cell_text(v) if v is not None and not isinstance(v, str) else v for v in row] for row in values]
+        Range.set_range_values(range_obj, converted)
+        for cell in range_obj.cells():
+            cell.number_format = "@"
+
+    @staticmethod
+    def add_comment(range_obj, comment_text: str):
+        from openpyxl.comments import Comment
+
+        range_obj.sheet.ws.cell(row=range_obj.r1, column=range_obj.c1).comment = Comment(comment_text, "")
+
+    @staticmethod
+    def delete_comment(range_obj):
+        cell = range_obj.sheet.ws.cell(row=range_obj.r1, column=range_obj.c1)
+        if cell.comment:
+            cell.comment = None
+        else:
+            raise ValueError("不存在批注")
+
+    @staticmethod
+    def search_and_replace(
+        range_obj,
+        find_str: str,
+        replace_str: str = "",
+        exact_match: bool = False,
+        case_flag: bool = False,
+        match_all: bool = True,
+    ) -> list:
+        """在内存数据中查找，命中的单元格按行优先排序后返回，需要替换时批量写回"""
+        values = Range.get_range_values(range_obj)
+        needle = find_str if case_flag else find_str.lower()
+        res = []
+        for dr, row in enumerate(values):
+            for dc, value in enumerate(row):
+                if value is None:
+                    continue
+                text = cell_text(value)
+                hay = text if case_flag else text.lower()
+                if (hay == needle) if exact_match else (needle in hay):
+                    r, c = range_obj.r1 + dr, range_obj.c1 + dc
+                    res.append({"row": str(r), "col": column_number_to_letter(c)})
+                    if replace_str:
+                        Range.set_range_values(
+                            type(range_obj)(range_obj.sheet, r, c, r, c), [[text.replace(find_str, replace_str)]]
+                        )
+                    if not match_all:
+                        return res
+        res.sort(key=lambda x: (int(x["row"]), column_letter_to_number(x["col"])))
+        return res
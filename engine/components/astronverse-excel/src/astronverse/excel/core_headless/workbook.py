@@ -0,0 +1,278 @@
+"""
+无界面 Excel 会话
+
+读取优先使用 python-calamine，整张表一次性读入内存；写入、格式、结构调整使用 openpyxl，
+openpyxl 工作簿只在第一次需要时加载，所有修改都在内存中完成，保存时统一写盘一次。
+对外提供与 COM 对象相似的 Name/Parent 属性，供 core_headless 下的 Application/Worksheet/Range 使用。
+"""
+
+import os
+import re
+from typing import Any, Optional
+
+from astronverse.excel.utils import column_letter_to_number, column_number_to_letter
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # pragma: no cover
+    CalamineWorkbook = None
+
+# 工作表最大行列数，整行/整列区域以此为边界
+MAX_ROW = 1048576
+MAX_COL = 16384
+
+
+def parse_address(address: str) -> tuple[int, int, int, int]:
+    """
+    解析区域字符串为 (起始行, 起始列, 结束行, 结束列)，支持 A1、A1:B10、$A$1、A:C、1:3
+    """
+    address = address.replace("$", "").strip().upper()
+    parts = address.split(":")
+    if len(parts) == 1:
+        parts = [parts[0], parts[0]]
+    bounds = []
+    for part in parts[:2]:
+        match = re.fullmatch(r"([A-Z]*)(\d*)", part)
+        if not match or not (match.group(1) or match.group(2)):
+            raise ValueError(f"区域'{address}'格式有误")
+        col = column_letter_to_number(match.group(1)) if match.group(1) else None
+        row = int(match.group(2)) if match.group(2) else None
+        bounds.append((row, col))
+    (r1, c1), (r2, c2) = bounds
+    # 整列 A:C / 整行 1:3
+    r1 = r1 or 1
+    c1 = c1 or 1
+    r2 = r2 or MAX_ROW
+    c2 = c2 or MAX_COL
+    return min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2)
+
+
+def cell_text(value: Any) -> str:
+    """模拟单元格显示文本"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class HeadlessWorkbook:
+    """工作簿会话，同一个 ExcelObj 在一次运行内复用"""
+
+    def __init__(self, path: str = "", password: str = ""):
+        if password:
+            raise Exception("无界面模式暂不支持带密码的Excel文件")
+        self.path = path
+        self._book = None
+        self._reader = None
+        self._grids: dict[str, list[list]] = {}
+        # 公式单元格 -> (加载时的公式, 文件中缓存的计算结果)
+        self._formula_values: dict[Any, tuple[Any, Any]] = {}
+        self._active: Optional[str] = None
+        if not path or not os.path.exists(path):
+            from openpyxl import Workbook
+
+            self._book = Workbook()
+
+    @property
+    def Name(self) -> str:  # noqa: N802 与 COM 工作簿对象属性名一致
+        return os.path.basename(self.path) if self.path else "工作簿1.xlsx"
+
+    @property
+    def book(self):
+        """openpyxl 工作簿，首次写入/格式操作时加载"""
+        if self._book is None:
+            from openpyxl import load_workbook
+
+            if self.path.lower().endswith(".xls"):
+                raise Exception("无界面模式下 .xls 文件只支持读取，请另存为 .xlsx")
+            book = load_workbook(self.path, keep_vba=self.path.lower().endswith(".xlsm"))
+            self._remember_formula_values(book)
+            self._book = book
+            if self._active is not None:
+                self._book.active = self._book.sheetnames.index(self._active)
+        return self._book
+
+    @property
+    def reader(self):
+        """calamine 读取器，仅在 openpyxl 未加载时使用"""
+        if self._book is not None or CalamineWorkbook is None:
+            return None
+        if self._reader is None:
+            self._reader = CalamineWorkbook.from_path(self.path)
+        return self._reader
+
+    def _file_values(self, name: str) -> list[list]:
+        """文件中保存的单元格值，公式单元格为上次保存时的计算结果"""
+        if CalamineWorkbook is not None:
+            reader = self._reader or CalamineWorkbook.from_path(self.path)
+            try:
+                rows = reader.get_sheet_by_name(name).to_python(skip_empty_area=False)
+            finally:
+                if reader is not self._reader:
+                    reader.close()
+            return [[None if v == "" else v for v in row] for row in rows]
+        from openpyxl import load_workbook
+
+        values_book = load_workbook(self.path, data_only=True, read_only=True)
+        try:
+            return [list(row) for row in values_book[name].iter_rows(values_only=True)]
+        finally:
+            values_book.close()
+
+    def _remember_formula_values(self, book):
+        """
+        openpyxl 只保留公式文本，加载时记下公式单元格的缓存结果，
+        之后从 openpyxl 重建读缓存时读到的仍是计算结果，与 calamine 读取一致。
+        按单元格对象记录，插入/删除行列移动单元格后依然对应
+        """
+        for ws in book.worksheets:
+            formulas = [cell for cell in ws._cells.values() if cell.data_type == "f"]
+            if not formulas:
+                continue
+            values = self._file_values(ws.title)
+            for cell in formulas:
+                row = values[cell.row - 1] if cell.row - 1 < len(values) else []
+                cached = row[cell.column - 1] if cell.column - 1 < len(row) else None
+                self._formula_values[cell] = (cell.value, cached)
+
+    def _cell_value(self, cell) -> Any:
+        """单元格的值，公式未被改写时返回文件中的计算结果"""
+        remembered = self._formula_values.get(cell)
+        if remembered is not None and remembered[0] == cell.value:
+            return remembered[1]
+        return cell.value
+
+    def sheet_names(self) -> list[str]:
+        if self.reader is not None:
+            return list(self.reader.sheet_names)
+        return list(self.book.sheetnames)
+
+    def active_name(self) -> str:
+        if self._book is not None:
+            return self._book.active.title
+        if self._active is None:
+            self._active = self.sheet_names()[0]
+        return self._active
+
+    def activate(self, name: str):
+        if self._book is not None:
+            self._book.active = self._book.sheetnames.index(name)
+        self._active = name
+
+    def grid(self, name: str) -> list[list]:
+        """整张表的值（从 A1 开始的二维列表，空单元格为 None）"""
+        if name not in self._grids:
+            if self.reader is not None:
+                sheet = self.reader.get_sheet_by_name(name)
+                rows = sheet.to_python(skip_empty_area=False)
+                self._grids[name] = [[None if v == "" else v for v in row] for row in rows]
+            else:
+                ws = self.book[name]
+                self._grids[name] = [[self._cell_value(cell) for cell in row] for row in ws.iter_rows()]
+        return self._grids[name]
+
+    def invalidate(self, name: Optional[str] = None):
+        """结构变化（插入/删除/合并/重命名等）后丢弃缓存，下次从 openpyxl 重建"""
+        if name is None:
+            self._grids.clear()
+        else:
+            self._grids.pop(name, None)
+
+    def read(self, name: str, r1: int, c1: int, r2: int, c2: int) -> list[list]:
+        grid = self.grid(name)
+        # 整行/整列区域只读到已使用范围为止
+        if r2 >= MAX_ROW:
+            r2 = max(len(grid), r1)
+        if c2 >= MAX_COL:
+            c2 = max(max((len(row) for row in grid), default=0), c1)
+        result = []
+        for r in range(r1, r2 + 1):
+            row = grid[r - 1] if r - 1 < len(grid) else []
+            result.append([row[c - 1] if c - 1 < len(row) else None for c in range(c1, c2 + 1)])
+        return result
+
+    def write(self, name: str, r1: int, c1: int, values: list[list]):
+        """批量写入，同时更新读缓存"""
+        ws = self.book[name]
+        grid = self._grids.get(name)
+        for dr, row in enumerate(values):
+            for dc, value in enumerate(row):
+                r, c = r1 + dr, c1 + dc
+                ws.cell(row=r, column=c, value=value)
+                if grid is not None:
+                    while len(grid) < r:
+                        grid.append([])
+                    line = grid[r - 1]
+                    if len(line) < c:
+                        line.extend([None] * (c - len(line)))
+                    line[c - 1] = value
+
+    def used_range(self, name: str) -> tuple[int, int, int, int]:
+        grid = self.grid(name)
+        rows = [i for i, row in enumerate(grid, 1) if any(v is not None for v in row)]
+        if not rows:
+            return 1, 1, 1, 1
+        cols = [j for row in grid for j, v in enumerate(row, 1) if v is not None]
+        return rows[0], min(cols), rows[-1], max(cols)
+
+    def save(self, path: str = ""):
+        path = path or self.path
+        if not path:
+            raise Exception("请先指定Excel保存路径")
+        if self._book is None:
+            if os.path.abspath(path) == os.path.abspath(self.path):
+                # 未修改过，无需写盘
+                return
+        self.book.save(path)
+        self.path = path
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+        if self._book is not None:
+            self._book.close()
+        self._book = None
+        self._reader = None
+        self._grids.clear()
+        self._formula_values.clear()
+
+
+class HeadlessSheet:
+    """工作表代理"""
+
+    def __init__(self, workbook: HeadlessWorkbook, name: str):
+        self.Parent = workbook
+        self.Name = name
+
+    @property
+    def ws(self):
+        return self.Parent.book[self.Name]
+
+
+class HeadlessRange:
+    """区域代理，行列均为 1-based 闭区间"""
+
+    def __init__(self, sheet: HeadlessSheet, r1: int, c1: int, r2: int, c2: int):
+        self.sheet = sheet
+        self.r1, self.c1, self.r2, self.c2 = r1, c1, r2, c2
+
+    @property
+    def Address(self) -> str:  # noqa: N802 与 COM Range 对象属性名一致
+        start = f"{column_number_to_letter(self.c1)}{self.r1}"
+        end = f"{column_number_to_letter(self.c2)}{self.r2}"
+        return start if start == end else f"{start}:{end}"
+
+    @property
+    def is_cell(self) -> bool:
+        return self.r1 == self.r2 and self.c1 == self.c2
+
+    def cells(self):
+        """遍历区域内的 openpyxl 单元格，整行/整列区域只遍历到已使用范围为止"""
+        ws = self.sheet.ws
+        max_row = min(self.r2, max(ws.max_row, self.r1))
+        max_col = min(self.c2, max(ws.max_column, self.c1))
+        for row in ws.iter_rows(min_row=self.r1, max_row=max_row, min_col=self.c1, max_col=max_col):
+            yield from row
@@ -0,0 +1,209 @@
+from astronverse.excel import CopySheetLocationType
+from astronverse.excel.core_headless.workbook import HeadlessRange, HeadlessSheet, parse_address
+from astronverse.excel.excel_obj import ExcelObj
+from astronverse.excel.utils import column_number_to_letter
+
+# openpyxl 默认列宽（字符）/行高（磅），以及 1 个字符宽度约等于的磅数
+DEFAULT_COL_WIDTH = 8.43
+DEFAULT_ROW_HEIGHT = 15.0
+CHAR_WIDTH_PT = 5.7
+
+
+def col_width_pt(ws, col: int) -> float:
+    width = ws.column_dimensions[column_number_to_letter(col)].width or DEFAULT_COL_WIDTH
+    return width * CHAR_WIDTH_PT
+
+
+def row_height_pt(ws, row: int) -> float:
+    return ws.row_dimensions[row].height or DEFAULT_ROW_HEIGHT
+
+
+class Worksheet:
+    @staticmethod
+    def get_worksheet(excel_obj: ExcelObj, sheet_name: str = "", default: int = 0) -> object:
+        workbook = excel_obj.obj
+        if not sheet_name:
+            if default == 0:
+                return Worksheet.get_active_worksheet(excel_obj)
+            else:
+                sheet_name = default
+
+        sheet_names = workbook.sheet_names()
+        if sheet_name in sheet_names:
+            return HeadlessSheet(workbook, sheet_name)
+        # 尝试按索引获取
+        try:
+            sheet_index = int(sheet_name)
+            if 1 <= sheet_index <= len(sheet_names):
+                return HeadlessSheet(workbook, sheet_names[sheet_index - 1])
+        except ValueError:
+            pass
+        raise ValueError(f"工作表'{sheet_name}'不存在")
+
+    @staticmethod
+    def get_all_worksheets(excel_obj: ExcelObj) -> list[object]:
+        workbook = excel_obj.obj
+        return [HeadlessSheet(workbook, name) for name in workbook.sheet_names()]
+
+    @staticmethod
+    def get_all_worksheet_names(excel_obj: ExcelObj) -> list[str]:
+        return excel_obj.obj.sheet_names()
+
+    @staticmethod
+    def get_active_worksheet(excel_obj: ExcelObj) -> object:
+        workbook = excel_obj.obj
+        return HeadlessSheet(workbook, workbook.active_name())
+
+    @staticmethod
+    def add_worksheet(excel_obj: ExcelObj, sheet_name: str, before=None, after=None):
+        book = excel_obj.obj.book
+        if before:
+            index = Worksheet._sheet_index(book, before)
+        elif after:
+            index = Worksheet._sheet_index(book, after) + 1
+        else:
+            index = len(book.sheetnames)
+        book.create_sheet(title=sheet_name, index=index)
+        excel_obj.obj.activate(sheet_name)
+        return HeadlessSheet(excel_obj.obj, sheet_name)
+
+    @staticmethod
+    def _sheet_index(book, sheet) -> int:
+        """sheet 可以是名称或 1-based 序号"""
+        if isinstance(sheet, int):
+            return sheet - 1
+        return book.sheetnames.index(sheet)
+
+    @staticmethod
+    def move_worksheet(worksheet, before=None, after=None):
+        book = worksheet.Parent.book
+        ws = book[worksheet.Name]
+        current = book.sheetnames.index(worksheet.Name)
+        if before:
+            target = Worksheet._sheet_index(book, before)
+        elif after:
+            target = Worksheet._sheet_index(book, after) + 1
+        else:
+            target = len(book.sheetnames)
+        if target > current:
+            target -= 1
+        book.move_sheet(ws, offset=target - current)
+
+    @staticmethod
+    def get_worksheet_name(worksheet) -> str:
+        return worksheet.Name
+
+    @staticmethod
+    def rename_worksheet(worksheet, new_name: str):
+        workbook = worksheet.Parent
+        workbook.book[worksheet.Name].title = new_name
+        workbook.invalidate(worksheet.Name)
+        if workbook.active_name() == worksheet.Name:
+            workbook.activate(new_name)
+        worksheet.Name = new_name
+
+    @staticmethod
+    def delete_worksheet(worksheet):
+        workbook = worksheet.Parent
+        workbook.book.remove(workbook.book[worksheet.Name])
+        workbook.invalidate(worksheet.Name)
+
+    @staticmethod
+    def copy_worksheet(
+        worksheet, excel, location: CopySheetLocationType = CopySheetLocationType.LAST, is_same_workbook=False
+    ):
+        """复制工作表，openpyxl 只支持同一工作簿内复制"""
+        if excel.obj is not worksheet.Parent:
+            raise Exception("无界面模式暂不支持跨工作簿复制工作表")
+        book = worksheet.Parent.book
+        source_index = book.sheetnames.index(worksheet.Name)
+        new_ws = book.copy_worksheet(book[worksheet.Name])
+        if location == CopySheetLocationType.BEFORE:
+            target = source_index
+        elif location == CopySheetLocationType.AFTER:
+            target = source_index + 1
+        elif location == CopySheetLocationType.FIRST:
+            target = 0
+        else:
+            target = len(book.sheetnames) - 1
+        book.move_sheet(new_ws, offset=target - (len(book.sheetnames) - 1))
+        worksheet.Parent.activate(new_ws.title)
+
+    @staticmethod
+    def get_worksheet_used_range(worksheet):
+        r1, c1, r2, c2 = worksheet.Parent.used_range(worksheet.Name)
+        address = "${}${}:${}${}".format(column_number_to_letter(c1), r1, column_number_to_letter(c2), r2)
+        if r1 == r2 and c1 == c2:
+            address = "${}${}".format(column_number_to_letter(c1), r1)
+        return r1, c1, r2, c2, address
+
+    @staticmethod
+    def get_cell(worksheet, row: int, col: int) -> object:
+        if row < 1 or col < 1:
+            raise ValueError(f"获取单元格({row}, {col})失败")
+        return HeadlessRange(worksheet, row, col, row, col)
+
+    @staticmethod
+    def get_range(worksheet, cell: str) -> object:
+        try:
+            return HeadlessRange(worksheet, *parse_address(cell))
+        except Exception as e:
+            raise ValueError(f"获取区域 '{cell}' 失败: {e}")
+
+    @staticmethod
+    def get_rows(worksheet, rows) -> object:
+        return Worksheet.get_range(worksheet, "{0}:{0}".format(rows) if isinstance(rows, int) else str(rows))
+
+    @staticmethod
+    def get_columns(worksheet, columns) -> object:
+        if isinstance(columns, int):
+            columns = column_number_to_letter(columns)
+        columns = str(columns)
+        return Worksheet.get_range(worksheet, columns if ":" in columns else "{0}:{0}".format(columns))
+
+    @staticmethod
+    def get_range_from_cells(worksheet, start_cell, end_cell) -> object:
+        return HeadlessRange(
+            worksheet,
+            min(start_cell.r1, end_cell.r1),
+            min(start_cell.c1, end_cell.c1),
+            max(start_cell.r2, end_cell.r2),
+            max(start_cell.c2, end_cell.c2),
+        )
+
+    @staticmethod
+    def insert_picture(worksheet, image_path, pic_left=0, pic_top=0, pic_height=300, pic_width=400, pic_scale=1.0):
+        """插入图片，left/top（磅）换算为锚定单元格"""
+        from openpyxl.drawing.image import Image
+
+        ws = worksheet.ws
+        picture = Image(image_path)
+        if pic_scale != 1.0:
+            picture.width = picture.width * pic_scale
+            picture.height = picture.height * pic_scale
+        else:
+            # 磅转像素
+            picture.width = pic_width * 4 / 3
+            picture.height = pic_height * 4 / 3
+
+        col, offset = 1, 0.0
+        while offset + col_width_pt(ws, col) <= pic_left:
+            offset += col_width_pt(ws, col)
+            col += 1
+        row, offset = 1, 0.0
+        while offset + row_height_pt(ws, row) <= pic_top:
+            offset += row_height_pt(ws, row)
+            row += 1
+        ws.add_image(picture, "{}{}".format(column_number_to_letter(col), row))
+        return picture
+
+    @staticmethod
+    def delete_all_comments(worksheet):
+        found = False
+        for row in worksheet.ws.iter_rows():
+            for cell in row:
+                if cell.comment:
+                    cell.comment = None
+                    found = True
+        if not found:
+            raise ValueError("不存在批注")
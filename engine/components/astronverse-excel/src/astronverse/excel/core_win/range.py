@@ -27,6 +27,25 @@ class Range:
         except Exception as e:
             raise ValueError(f"获取区域数据失败: {e}")
 
+    @staticmethod
+    def get_range_values(range_obj, use_text: bool = False) -> list[list]:
+        """
+        批量获取区域数据，返回二维列表
+
+        读取值时整块区域只需一次 COM 调用；Range.Text 不支持多单元格，读取显示文本时仍逐个单元格读取
+        """
+        try:
+            if use_text:
+                rows = range_obj.Rows.Count
+                cols = range_obj.Columns.Count
+                return [[range_obj.Cells(r, c).Text for c in range(1, cols + 1)] for r in range(1, rows + 1)]
+            value = range_obj.Value
+            if not isinstance(value, tuple):
+                return [[value]]
+            return [list(row) for row in value]
+        except Exception as e:
+            raise ValueError(f"获取区域数据失败: {e}")
+
     @staticmethod
     def get_range_color(range_obj) -> tuple[int, int, int]:
         """
@@ -71,6 +90,20 @@ class Range:
         except Exception as e:
             raise ValueError(f"设置区域数据失败: {e}")
 
+    @staticmethod
+    def set_range_values(range_obj, values: list[list]):
+        """
+        以二维列表批量写入区域，整块区域只需一次 COM 调用
+
+        Args:
+            range_obj: Range 对象，尺寸需与 values 一致
+            values: 二维列表
+        """
+        try:
+            range_obj.Value = tuple(tuple(row) for row in values)
+        except Exception as e:
+            raise ValueError(f"设置区域数据失败: {e}")
+
     @staticmethod
     def set_range_type(
         range_obj,
@@ -2,17 +2,32 @@ import ast
 import time
 from itertools import zip_longest
 
-import win32clipboard as cv
 from astronverse.actionlib import AtomicFormType, AtomicFormTypeMeta, AtomicLevel, DynamicsItem
 from astronverse.actionlib.atomic import atomicMg
 from astronverse.actionlib.types import PATH
 from astronverse.excel import *
-from astronverse.excel.core_win.application import Application
-from astronverse.excel.core_win.range import Range
-from astronverse.excel.core_win.worksheet import Worksheet
+from astronverse.excel import HEADLESS
 from astronverse.excel.excel_obj import ExcelObj
 from astronverse.excel.utils import *
 
+if HEADLESS:
+    from astronverse.excel.core_headless.application import Application
+    from astronverse.excel.core_headless.range import Range
+    from astronverse.excel.core_headless.worksheet import Worksheet
+else:
+    import win32clipboard as cv
+    from astronverse.excel.core_win.application import Application
+    from astronverse.excel.core_win.range import Range
+    from astronverse.excel.core_win.worksheet import Worksheet
+
+
+def _get_area(worksheet, start_row: int, start_col: int, end_row: int, end_col: int):
+    """按行列号获取区域，整块读写只需一次调用"""
+    return Worksheet.get_range(
+        worksheet,
+        "{}{}:{}{}".format(column_number_to_letter(start_col), start_row, column_number_to_letter(end_col), end_row),
+    )
+
 
 class Excel:
     @staticmethod
@@ -64,6 +79,12 @@ class Excel:
         ],
     )
     def get_excel(file_name) -> ExcelObj:
+        if HEADLESS:
+            excel_obj = Application.get_existing_workbook(Application.init_app(), match_name=file_name)
+            if not excel_obj:
+                raise Exception("不存在已打开的Excel文件:{0}".format(file_name))
+            return excel_obj
+
         excel_flag, excel_pid, wps_flag, wps_pid = get_excel_processes()
         if not excel_flag and not wps_flag:
             raise Exception("未检测到wps或office打开！")
@@ -292,6 +313,10 @@ class Excel:
             if save_type_all == SaveType_ALL.SAVE:
                 save_changes = True
 
+            if HEADLESS:
+                Application.quit_app(save_changes=save_changes)
+                return
+
             excel_flag, excel_pid, wps_flag, wps_pid = get_excel_processes()
             if wps_flag:
                 Application.quit_app(default_application=ApplicationType.WPS, save_changes=save_changes)
@@ -362,16 +387,16 @@ class Excel:
             if not isinstance(value, list):
                 raise Exception("填写内容的列表格式有误")
             first_col = end_col + 1 if edit_type == EditType.APPEND else start_col_num
-            for offset, val in enumerate(value):
-                r_obj = Worksheet.get_cell(worksheet, start_row_num, first_col + offset)
-                Range.set_range_data(r_obj, val)
+            if value:
+                r_obj = _get_area(worksheet, start_row_num, first_col, start_row_num, first_col + len(value) - 1)
+                Range.set_range_values(r_obj, [value])
         elif edit_range == EditRangeType.COLUMN:
             if not isinstance(value, list):
                 raise Exception("填写内容的列表格式有误")
             first_row = end_row + 1 if edit_type == EditType.APPEND else start_row_num
-            for offset, val in enumerate(value):
-                r_obj = Worksheet.get_cell(worksheet, first_row + offset, start_col_num)
-                Range.set_range_data(r_obj, val)
+            if value:
+                r_obj = _get_area(worksheet, first_row, start_col_num, first_row + len(value) - 1, start_col_num)
+                Range.set_range_values(r_obj, [[val] for val in value])
         elif edit_range == EditRangeType.AREA:
             if not isinstance(value, list):
                 raise Exception("填写内容的列表格式有误")
@@ -380,9 +405,10 @@ class Excel:
             first_col = end_col + 1 if edit_type == EditType.APPEND else start_col_num
             first_row = end_row + 1 if edit_type == EditType.APPEND else start_row_num
             for row in value:
-                for offset, val in enumerate(row):
-                    r_obj = Worksheet.get_cell(worksheet, first_row, first_col + offset)
-                    Range.set_range_data(r_obj, val)
+                # 每行长度可能不同，按行批量写入，避免覆盖行尾之外的单元格
+                if row:
+                    r_obj = _get_area(worksheet, first_row, first_col, first_row, first_col + len(row) - 1)
+                    Range.set_range_values(r_obj, [row])
                 first_row += 1  # 写完一行，整体下移
         elif edit_range == EditRangeType.CELL:
             r_obj = Worksheet.get_cell(worksheet, start_row_num, start_col_num)
@@ -485,40 +511,24 @@ class Excel:
             content = Range.get_range_data(r_obj, use_text=True if read_display else False)
         elif read_range == ReadRangeType.ROW:
             start_row_num = handle_row_input(row, r_end_row)
-            content = []
-            for col in range(1, r_end_col + 1):
-                r_obj = Worksheet.get_cell(worksheet, start_row_num, col)
-                cell_text = Range.get_range_data(r_obj, use_text=True if read_display else False)
-                content.append(cell_text)
+            r_obj = _get_area(worksheet, start_row_num, 1, start_row_num, r_end_col)
+            content = Range.get_range_values(r_obj, use_text=True if read_display else False)[0]
         elif read_range == ReadRangeType.COLUMN:
             start_col_num = handle_column_input(column, r_end_col)
-            content = []
-            for row in range(1, r_end_row + 1):
-                r_obj = Worksheet.get_cell(worksheet, row, start_col_num)
-                cell_text = Range.get_range_data(r_obj, use_text=True if read_display else False)
-                content.append(cell_text)
+            r_obj = _get_area(worksheet, 1, start_col_num, r_end_row, start_col_num)
+            content = [row[0] for row in Range.get_range_values(r_obj, use_text=True if read_display else False)]
         elif read_range == ReadRangeType.AREA:
             start_col_num = handle_column_input(start_col, r_end_col)
             end_col_num = handle_column_input(end_col, r_end_col)
             start_row_num = handle_row_input(start_row, r_end_row)
             end_row_num = handle_row_input(end_row, r_end_row)
             content = []
-            for row in range(start_row_num, end_row_num + 1):
-                row_data = []
-                for col in range(start_col_num, end_col_num + 1):
-                    r_obj = Worksheet.get_cell(worksheet, row, col)
-                    cell_text = Range.get_range_data(r_obj, use_text=True if read_display else False)
-                    row_data.append(cell_text)
-                content.append(row_data)
+            if start_row_num <= end_row_num and start_col_num <= end_col_num:
+                r_obj = _get_area(worksheet, start_row_num, start_col_num, end_row_num, end_col_num)
+                content = Range.get_range_values(r_obj, use_text=True if read_display else False)
         elif read_range == ReadRangeType.ALL:
-            content = []
-            for row in range(1, r_end_row + 1):
-                row_data = []
-                for col in range(1, r_end_col + 1):
-                    r_obj = Worksheet.get_cell(worksheet, row, col)
-                    cell_text = Range.get_range_data(r_obj, use_text=True if read_display else False)
-                    row_data.append(cell_text)
-                content.append(row_data)
+            r_obj = _get_area(worksheet, 1, 1, r_end_row, r_end_col)
+            content = Range.get_range_values(r_obj, use_text=True if read_display else False)
         else:
             raise NotImplementedError()
 
@@ -748,6 +758,8 @@ class Excel:
 
         r_obj = Worksheet.get_range(worksheet, cell)
         Range.copy_range(r_obj)
+        if HEADLESS:
+            return Range.copied_text()
         try:
             cv.OpenClipboard()
             return cv.GetClipboardData(cv.CF_UNICODETEXT)
@@ -1,8 +1,8 @@
-import sys
 from typing import Any
 
 from astronverse.actionlib.error import PARAM_VERIFY_ERROR_FORMAT
 from astronverse.actionlib.types import typesMg
+from astronverse.excel import HEADLESS
 from astronverse.excel.error import *
 
 
@@ -20,10 +20,7 @@ class ExcelObj:
         raise BaseException(PARAM_VERIFY_ERROR_FORMAT.format(name, value), "{}参数验证失败{}".format(name, value))
 
     def get_name(self):
-        if sys.platform == "win32":
-            return self.obj.Name
-        else:
-            return ""
+        return self.obj.Name
 
     @typesMg.shortcut("ExcelObj", res_type="Str")
     def get_full_name(self) -> str:
@@ -33,11 +30,12 @@ class ExcelObj:
     def get_first_free_row(self) -> int:
         """同get_excel_first_available_row"""
 
-        if sys.platform == "win32":
+        if HEADLESS:
+            from astronverse.excel.core_headless.range import Range
+            from astronverse.excel.core_headless.worksheet import Worksheet
+        else:
             from astronverse.excel.core_win.range import Range
             from astronverse.excel.core_win.worksheet import Worksheet
-        else:
-            return 0
         worksheet = Worksheet.get_worksheet(self, "", default=1)
         used_range = Worksheet.get_worksheet_used_range(worksheet)
         r_start_row, r_start_col, r_end_row, r_end_col, r_address = used_range
@@ -0,0 +1,134 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from astronverse.excel.core_headless import workbook as headless_workbook
+from astronverse.excel.core_headless.application import Application
+from astronverse.excel.core_headless.range import Range
+from astronverse.excel.core_headless.worksheet import Worksheet
+from openpyxl import Workbook, load_workbook
+
+
+def make_xlsx(path: str):
+    """Sheet1: 数据 + 公式 C2=A2+B2（文件中缓存结果 3）；Sheet2: 空表"""
+    book = Workbook()
+    ws = book.active
+    ws.title = "Sheet1"
+    ws.append(["名称", "数量", "合计"])
+    ws.append([1, 2, "=A2+B2"])
+    ws.append(["a", 1.5, None])
+    book.create_sheet("Sheet2")
+    book.save(path)
+    # openpyxl 不写公式的计算结果，模拟 Excel 保存过的文件
+    with zipfile.ZipFile(path) as src:
+        items = {name: src.read(name) for name in src.namelist()}
+    sheet = items["xl/worksheets/sheet1.xml"].decode("utf-8")
+    items["xl/worksheets/sheet1.xml"] = sheet.replace("<f>A2+B2</f><v></v>", "<f>A2+B2</f><v>3</v>").encode("utf-8")
+    with zipfile.ZipFile(path, "w") as dst:
+        for name, data in items.items():
+            dst.writestr(name, data)
+
+
+class TestHeadless(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "book.xlsx")
+        make_xlsx(self.path)
+        self.app = Application.init_app()
+
+    def tearDown(self):
+        Application.quit_app()
+        shutil.rmtree(self.tmp)
+
+    def open(self, path: str = ""):
+        excel = Application.open_workbook(self.app, path or self.path)
+        return excel, Worksheet.get_worksheet(excel, "Sheet1")
+
+    def test_read(self):
+        for reader in ("calamine", "openpyxl"):
+            with self.subTest(reader=reader):
+                with patch.object(
+                    headless_workbook,
+                    "CalamineWorkbook",
+                    headless_workbook.CalamineWorkbook if reader == "calamine" else None,
+                ):
+                    excel, sheet = self.open()
+                    self.assertEqual(Worksheet.get_all_worksheet_names(excel), ["Sheet1", "Sheet2"])
+                    self.assertEqual(Range.get_range_data(Worksheet.get_range(sheet, "A1")), "名称")
+                    values = Range.get_range_values(Worksheet.get_range(sheet, "A2:C3"))
+                    self.assertEqual(values, [[1, 2, 3], ["a", 1.5, None]])
+                    self.assertEqual(
+                        Range.get_range_values(Worksheet.get_range(sheet, "A2:C2"), use_text=True), [["1", "2", "3"]]
+                    )
+                    self.assertEqual(Worksheet.get_worksheet_used_range(sheet), (1, 1, 3, 3, "$A$1:$C$3"))
+                    # 整列只读到已使用范围
+                    self.assertEqual(len(Range.get_range_values(Worksheet.get_columns(sheet, "B"))), 3)
+                    Application.close_workbook(excel, save_changes=False)
+
+    def test_write_and_save(self):
+        excel, sheet = self.open()
+        Range.set_range_values(Worksheet.get_range(sheet, "A4"), [["b", 4], ["c", 5]])
+        Range.set_range_data(Worksheet.get_range(sheet, "C4:C5"), "x")
+        # 读缓存同步更新
+        self.assertEqual(
+            Range.get_range_values(Worksheet.get_range(sheet, "A4:C5")), [["b", 4, "x"], ["c", 5, "x"]]
+        )
+        self.assertEqual(Worksheet.get_worksheet_used_range(sheet)[:4], (1, 1, 5, 3))
+
+        target = os.path.join(self.tmp, "saved.xlsx")
+        Application.save_workbook(excel, target)
+        ws = load_workbook(target)["Sheet1"]
+        self.assertEqual([cell.value for cell in ws[5]], ["c", 5, "x"])
+        self.assertEqual(ws["C2"].value, "=A2+B2")
+
+    def test_unmodified_save_does_not_rewrite(self):
+        excel, sheet = self.open()
+        Range.get_range_values(Worksheet.get_range(sheet, "A1:C3"))
+        mtime = os.path.getmtime(self.path)
+        Application.close_workbook(excel, save_changes=True)
+        self.assertEqual(os.path.getmtime(self.path), mtime)
+
+    def test_formula_keeps_cached_value_after_write(self):
+        excel, sheet = self.open()
+        self.assertEqual(Range.get_range_data(Worksheet.get_range(sheet, "C2")), 3)
+
+        # 写入其他单元格后改由 openpyxl 读取，公式单元格仍返回文件中的计算结果
+        Range.set_range_data(Worksheet.get_range(sheet, "D1"), "备注")
+        excel.obj.invalidate()
+        self.assertEqual(Range.get_range_values(Worksheet.get_range(sheet, "A2:D2")), [[1, 2, 3, None]])
+
+        # 插入行后计算结果跟随单元格移动
+        Range.insert_range(Worksheet.get_range(sheet, "1:1"), "row")
+        self.assertEqual(Range.get_range_data(Worksheet.get_range(sheet, "C3")), 3)
+
+        # 公式被改写后没有计算结果，返回公式文本
+        Range.set_range_data(Worksheet.get_range(sheet, "C3"), "=A3*B3")
+        excel.obj.invalidate()
+        self.assertEqual(Range.get_range_data(Worksheet.get_range(sheet, "C3")), "=A3*B3")
+
+    def test_create_workbook(self):
+        target = os.path.join(self.tmp, "new.xlsx")
+        excel = Application.create_workbook(self.app, target)
+        sheet = Worksheet.get_active_worksheet(excel)
+        Range.set_range_values(Worksheet.get_range(sheet, "B2"), [[1, 2, 3]])
+        Application.close_workbook(excel)
+        self.assertEqual([cell.value for cell in load_workbook(target).active[2]], [None, 1, 2, 3])
+
+
+class TestBackendSwitch(TestCase):
+    def backend(self, value: str) -> subprocess.CompletedProcess:
+        env = {**os.environ, "ASTRON_EXCEL_BACKEND": value}
+        code = "import astronverse.excel as e; print(e.EXCEL_BACKEND, e.HEADLESS)"
+        return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+
+    def test_env_selects_backend(self):
+        self.assertEqual(self.backend("Headless").stdout.strip(), "headless True")
+        self.assertEqual(self.backend("com").stdout.strip(), "com False")
+        result = self.backend("xlwings")
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("ASTRON_EXCEL_BACKEND", result.stderr)
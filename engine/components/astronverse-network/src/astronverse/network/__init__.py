@@ -44,3 +44,8 @@ class FileExistenceType(Enum):
     RENAME = "rename"
     OVERWRITE = "overwrite"
     CANCEL = "cancel"
+
+
+class SyncDirectionType(Enum):
+    UPLOAD = "upload"
+    DOWNLOAD = "download"
@@ -1,14 +1,17 @@
 import ftplib
 import os
+import posixpath
+
+from astronverse.network.ftp_transfer import FtpTransfer, list_dir, log_progress
 
 
 class FtpCore:
     @staticmethod
-    def create_ftp():
+    def create_ftp(tls: bool = False):
         """
-        创建FTP实例
+        创建FTP实例，tls=True 时为FTPS（显式TLS）
         """
-        ftp_instance = ftplib.FTP()
+        ftp_instance = ftplib.FTP_TLS() if tls else ftplib.FTP()
         ftp_instance.encoding = "gbk"
         return ftp_instance
 
@@ -24,7 +27,12 @@ class FtpCore:
         """
         登陆ftp
         """
-        return ftp_instance.login(user, password)
+        res = ftp_instance.login(user, password)
+        # 记录账号，传输引擎按需创建并行连接
+        ftp_instance._astron_credentials = (user, password)
+        if isinstance(ftp_instance, ftplib.FTP_TLS):
+            ftp_instance.prot_p()
+        return res
 
     @staticmethod
     def close_ftp(ftp_instance: ftplib.FTP):
@@ -81,42 +89,28 @@ class FtpCore:
         return ftp_instance.rename(old_name, new_name)
 
     @staticmethod
-    def ftp_upload_file(ftp_instance: ftplib.FTP, src_path: str, file_name: str):
+    def get_entries(ftp_instance: ftplib.FTP, path: str = ""):
+        """
+        获取目录下的文件及文件夹（含类型、大小、修改时间），一次往返
+        """
+        return list_dir(ftp_instance, path)
+
+    @staticmethod
+    def ftp_upload_file(ftp_instance: ftplib.FTP, src_path: str, file_name: str, resume: bool = False):
         """
         向FTP指定目录上传文件
         """
-        bufsize = 1024
-        fp = open(src_path, "rb")
-        ftp_instance.storbinary("STOR " + file_name, fp, bufsize)
-        ftp_instance.set_debuglevel(0)
-        fp.close()
+        FtpTransfer(ftp_instance).upload_file(src_path, file_name, resume=resume)
         return FtpCore.get_path(ftp_instance, file_name)
 
     @staticmethod
-    def ftp_upload_dir(ftp_instance: ftplib.FTP, src: str, folder_name: str):
+    def ftp_upload_dir(ftp_instance: ftplib.FTP, src: str, folder_name: str, incremental: bool = False):
         """
-        向FTP指定目录上传文件夹
+        向FTP指定目录上传文件夹，文件通过并行连接上传
         """
-        if not os.path.isdir(src):
-            raise ValueError("{}非有效目录".format(src))
-
-        if not FtpCore.is_dir(ftp_instance, folder_name):
-            res = FtpCore.create_dir(ftp_instance, folder_name)
-            if not res:
-                raise ValueError("工作目录创建失败，请检查FTP连接")
-
-        ftp_instance.cwd(folder_name)
-
-        upload_name_list = os.listdir(src)
-        for name in upload_name_list:
-            local_path = os.path.join(src, name)
-            if os.path.isdir(local_path):
-                FtpCore.ftp_upload_dir(ftp_instance, local_path, name)
-            else:
-                FtpCore.ftp_upload_file(ftp_instance, local_path, name)
-
-        ftp_instance.cwd("..")
-        return FtpCore.get_path(ftp_instance, folder_name)
+        remote_path = FtpCore.get_path(ftp_instance, folder_name)
+        FtpTransfer(ftp_instance, progress=log_progress()).upload_dir(src, remote_path, incremental=incremental)
+        return remote_path
 
     @staticmethod
     def ftp_delete_file(ftp_instance: ftplib.FTP, file_name: str):
@@ -130,47 +124,43 @@ class FtpCore:
         """
         删除文件夹
         """
-        ftp_instance.cwd(dir_name)
-        name_list = ftp_instance.nlst()
-        for name in name_list:
-            if FtpCore.is_dir(ftp_instance, name):
-                FtpCore.ftp_delete_dir(ftp_instance, name)
-            else:
-                FtpCore.ftp_delete_file(ftp_instance, name)
-        ftp_instance.cwd("..")
-        ftp_instance.rmd(dir_name)
-
-    @staticmethod
-    def ftp_download_file(ftp_instance: ftplib.FTP, remote_path, local_path: str):
-        bufsize = 1024
-        fp = open(local_path, "wb")
-        ftp_instance.retrbinary(f"RETR {remote_path}", fp.write, bufsize)
-        ftp_instance.set_debuglevel(0)
-        fp.close()
+        FtpTransfer(ftp_instance).delete_dir(FtpCore.get_path(ftp_instance, dir_name))
+
+    @staticmethod
+    def ftp_download_file(ftp_instance: ftplib.FTP, remote_path, local_path: str, resume: bool = False):
+        FtpTransfer(ftp_instance).download_file(remote_path, local_path, resume=resume)
         return local_path
 
     @staticmethod
-    def ftp_download_dir(ftp_instance: ftplib.FTP, remote_path, local_path: str):
-        if not os.path.isdir(local_path):
-            os.makedirs(local_path)
-        ftp_instance.cwd(remote_path)
-        name_list = ftp_instance.nlst()
-        for name in name_list:
-            local_item_path = os.path.join(local_path, name)
-            if not FtpCore.is_dir(ftp_instance, name):
-                FtpCore.ftp_download_file(ftp_instance, os.path.join(remote_path, name), local_item_path)
-            else:
-                FtpCore.ftp_download_dir(ftp_instance, os.path.join(remote_path, name), local_item_path)
-        ftp_instance.cwd("..")
+    def ftp_download_dir(ftp_instance: ftplib.FTP, remote_path, local_path: str, incremental: bool = False):
+        """
+        下载FTP文件夹，文件通过并行连接下载
+        """
+        FtpTransfer(ftp_instance, progress=log_progress()).download_dir(
+            remote_path, local_path, incremental=incremental
+        )
         return local_path
 
+    @staticmethod
+    def ftp_sync_dir(ftp_instance: ftplib.FTP, local_path: str, remote_path: str, upload: bool, workers: int):
+        """
+        增量同步本地目录与FTP目录，只传输大小或修改时间有变化的文件
+        """
+        transfer = FtpTransfer(ftp_instance, workers=workers, progress=log_progress())
+        remote_path = FtpCore.get_path(ftp_instance, remote_path)
+        if upload:
+            return transfer.upload_dir(local_path, remote_path, incremental=True, resume=True)
+        return transfer.download_dir(remote_path, local_path, incremental=True, resume=True)
+
     @staticmethod
     def get_path(ftp_instance: ftplib.FTP, name: str):
         """
         获取当前工作目录下的文件/文件夹路径
         """
+        if name.startswith("/"):
+            return name
         pwd = ftp_instance.pwd()
-        return os.path.join(pwd, name)
+        return posixpath.join(pwd, name)
 
     @staticmethod
     def generate_name(ftp_instance, rename: str):
@@ -178,9 +168,10 @@ class FtpCore:
         为重名文件/文件夹生成副本
         """
         base, extension = os.path.splitext(rename)
+        exist_names = set(FtpCore.get_nlst(ftp_instance))
         counter = 1
         new_name = f"{base}({counter}){extension}"
-        while new_name in FtpCore.get_nlst(ftp_instance):
+        while new_name in exist_names:
             counter += 1
             new_name = f"{base}({counter}){extension}"
         return new_name
@@ -190,6 +181,14 @@ class FtpCore:
         """
         判断FTP服务器中的指定路径是否存在
         """
+        try:
+            # MLST 一次往返即可得到类型
+            facts = ftp_instance.sendcmd("MLST {}".format(dir_name))
+            for line in facts.splitlines()[1:-1]:
+                return "type=dir;" in line.lower() or "type=cdir;" in line.lower()
+        except ftplib.error_perm as e:
+            if not str(e).startswith(("500", "502")):
+                return False
         current_dir = ftp_instance.pwd()
         try:
             ftp_instance.cwd(dir_name)
@@ -1,7 +1,8 @@
 import json
-import os
+from urllib.parse import parse_qsl
 
 import requests
+from astronverse.network.http_client import MultipartStream, RangedDownloader, http_client
 from astronverse.network.utils import is_json
 
 
@@ -14,7 +15,6 @@ class NetworkCore:
         files: str = "",
         timeout: int = 60,
     ):
-        file_arr = []
         headers = json.loads(header) if header else {}
 
         json_body = None
@@ -25,33 +25,39 @@ class NetworkCore:
             else:
                 headers["Content-Type"] = "application/x-www-form-urlencoded"
 
+        stream = None
         if files:
-            files_dict = json.loads(files)
-            for key in files_dict:
-                value = files_dict[key]
-                basename = os.path.basename(value)
-                with open(value, "rb") as f:
-                    file_arr.append((key, (basename, f, "application/octet-stream")))
+            # 文件从磁盘流式上传，请求体中的字段作为表单字段一并提交
+            if isinstance(json_body, dict):
+                fields = json_body
+            else:
+                fields = dict(parse_qsl(body, keep_blank_values=True)) if body else {}
+            stream = MultipartStream(fields, list(json.loads(files).items()))
+            headers["Content-Type"] = stream.content_type
+            body, json_body = stream, None
 
         try:
-            res = requests.post(
-                url=url,
+            res = http_client.request(
+                "POST",
+                url,
                 headers=headers,
                 data=body,
                 json=json_body,
-                files=file_arr,
                 timeout=timeout,
             )
             return res.text
         except requests.RequestException as e:
             raise Exception(f"Request failed: {e}")
+        finally:
+            if stream is not None:
+                stream.close()
 
     @staticmethod
     def get_request(url: str = "", header: str = "", timeout: int = 60):
         headers = json.loads(header) if header else {}
 
         try:
-            response = requests.get(url=url, headers=headers, timeout=timeout)
+            response = http_client.request("GET", url, headers=headers, timeout=timeout)
             return response.text
         except requests.RequestException as e:
             raise Exception(f"Request failed: {e}")
@@ -64,16 +70,16 @@ class NetworkCore:
         headers = json.loads(header) if header else {}
 
         try:
-            # 使用 requests.Session() 创建一个会话
-            with requests.Session() as session:
-                # 准备请求
-                req = requests.Request("CONNECT", url, headers=headers)
-                prepped = session.prepare_request(req)
+            # 使用该源站的复用会话
+            session = http_client.session(url)
+            # 准备请求
+            req = requests.Request("CONNECT", url, headers=headers)
+            prepped = session.prepare_request(req)
 
-                # 发送请求
-                response = session.send(prepped, timeout=timeout)
+            # 发送请求
+            response = session.send(prepped, timeout=timeout)
 
-                return response.text
+            return response.text
         except requests.RequestException as e:
             raise Exception(f"Request failed: {e}")
 
@@ -87,7 +93,7 @@ class NetworkCore:
 
         try:
             # 发送 HEAD 请求
-            response = requests.head(url, headers=headers, timeout=timeout)
+            response = http_client.request("HEAD", url, headers=headers, timeout=timeout)
 
             # 返回响应头
             return response.headers
@@ -109,7 +115,7 @@ class NetworkCore:
             else:
                 header_dict["Content-Type"] = "application/x-www-form-urlencoded"
         try:
-            res = requests.put(url=url, headers=header_dict, data=body, json=json_body, timeout=timeout)
+            res = http_client.request("PUT", url, headers=header_dict, data=body, json=json_body, timeout=timeout)
             return res.text
         except requests.RequestException as e:
             raise Exception(f"Request failed: {e}")
@@ -124,7 +130,7 @@ class NetworkCore:
 
         try:
             # 发送 DELETE 请求
-            response = requests.delete(url, headers=headers, timeout=timeout)
+            response = http_client.request("DELETE", url, headers=headers, timeout=timeout)
 
             # 返回响应状态码和内容
             return response.text
@@ -141,7 +147,7 @@ class NetworkCore:
 
         try:
             # 发送 OPTIONS 请求
-            response = requests.options(url, headers=headers, timeout=timeout)
+            response = http_client.request("OPTIONS", url, headers=headers, timeout=timeout)
 
             # 返回支持的请求方法和其他相关信息
             return response.headers.get("Allow")
@@ -158,7 +164,7 @@ class NetworkCore:
 
         try:
             # 发送 TRACE 请求
-            response = requests.request("TRACE", url, headers=headers, timeout=timeout)
+            response = http_client.request("TRACE", url, headers=headers, timeout=timeout)
             return response.text
         except requests.RequestException as e:
             raise Exception(f"Request failed: {e}")
@@ -179,16 +185,14 @@ class NetworkCore:
                 headers["Content-Type"] = "application/x-www-form-urlencoded"
         try:
             # 发送 PATCH 请求
-            response = requests.patch(url, data=body, headers=headers, json=json_body, timeout=timeout)
+            response = http_client.request("PATCH", url, data=body, headers=headers, json=json_body, timeout=timeout)
             return response.json()
         except requests.RequestException as e:
             raise Exception(f"Request failed: {e}")
 
     @staticmethod
-    def http_download(url: str = "", dst_path: str = ""):
-        with requests.get(url=url, stream=True) as response:
-            response.raise_for_status()
-            with open(dst_path, "wb") as f:
-                f.writelines(response.iter_content(chunk_size=8192))
-
-        return dst_path
+    def http_download(url: str = "", dst_path: str = "", timeout: int = 60):
+        """
+        下载文件，大文件分段并行下载；中断后再次下载同一地址到同一路径时断点续传
+        """
+        return RangedDownloader(url, dst_path, timeout=timeout).download()
@@ -17,6 +17,7 @@ FTP_RENAME_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("FTP文件/文件
 FTP_CREATE_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("FTP目录创建失败：{},请检查FTP连接"))
 FTP_UPLOAD_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("{}上传失败，请检查FTP连接"))
 FTP_DOWNLOAD_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("{}下载失败，请检查FTP连接"))
+FTP_SYNC_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("FTP同步失败：{}"))
 
 FILE_EXIST_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("文件：{}不存在或格式错误，请检查文件路径信息"))
 FOLDER_EXIST_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("文件夹：{}不存在，请检查文件夹路径信息"))
@@ -1,9 +1,10 @@
 import ftplib
 import os.path
+import posixpath
 
 from astronverse.actionlib import AtomicFormType, AtomicFormTypeMeta, DynamicsItem
 from astronverse.actionlib.atomic import atomicMg
-from astronverse.network import FileExistenceType, FileType, ListType, StateType
+from astronverse.network import FileExistenceType, FileType, ListType, StateType, SyncDirectionType
 from astronverse.network.core_ftp import FtpCore
 from astronverse.network.error import *
 from astronverse.network.utils import (
@@ -155,12 +156,11 @@ class FTP:
             raise BaseException(FTP_STATUS_FORMAT.format(e), "{e}")
 
         try:
-            list_file = FtpCore.get_nlst(ftp_instance)
-            for item in list_file:
-                if FtpCore.is_dir(ftp_instance, item):
-                    file_structure["folders"].append(item)
+            for entry in FtpCore.get_entries(ftp_instance):
+                if entry.is_dir:
+                    file_structure["folders"].append(entry.name)
                 else:
-                    file_structure["files"].append(item)
+                    file_structure["files"].append(entry.name)
 
             if file_type == ListType.FILE:
                 return file_structure["files"]
@@ -521,7 +521,7 @@ class FTP:
                 try:
                     download_file = FtpCore.ftp_download_file(
                         ftp_instance,
-                        os.path.join(work_dir, file),
+                        posixpath.join(work_dir, file),
                         os.path.join(dst_path, file_name),
                     )
                 except Exception as e:
@@ -552,7 +552,7 @@ class FTP:
                 try:
                     download_folder = FtpCore.ftp_download_dir(
                         ftp_instance,
-                        os.path.join(work_dir, folder),
+                        posixpath.join(work_dir, folder),
                         os.path.join(dst_path, folder_new),
                     )
                 except Exception as e:
@@ -632,3 +632,50 @@ class FTP:
                 raise NotImplementedError()
         except Exception as e:
             raise BaseException(FTP_DELETE_FORMAT.format(e), "请检查文件/文件夹是否已删除")
+
+    @staticmethod
+    @atomicMg.atomic(
+        "Network",
+        inputList=[
+            atomicMg.param("ftp_instance", types="Str", required=True),
+            atomicMg.param("direction", required=False),
+            atomicMg.param(
+                "local_path",
+                formType=AtomicFormTypeMeta(
+                    AtomicFormType.INPUT_VARIABLE_PYTHON_FILE.value,
+                    params={"filters": [], "file_type": "folder"},
+                ),
+                required=True,
+            ),
+            atomicMg.param("remote_path", types="Str", required=True),
+            atomicMg.param("workers", types="Int", required=False),
+        ],
+        outputList=[
+            atomicMg.param("sync_ftp_result", types="Dict"),
+        ],
+    )
+    def ftp_sync(
+        ftp_instance: ftplib.FTP,
+        direction: SyncDirectionType = SyncDirectionType.UPLOAD,
+        local_path: str = "",
+        remote_path: str = "",
+        workers: int = 4,
+    ):
+        """
+        增量同步本地文件夹与FTP文件夹，只传输新增或大小/修改时间有变化的文件，中断的文件断点续传
+        :param ftp_instance: FTP连接对象
+        :param direction: 同步方向 上传/下载
+        :param local_path: 本地文件夹
+        :param remote_path: FTP文件夹（相对当前工作目录或绝对路径）
+        :param workers: 并行传输连接数
+        :return: 传输文件数、跳过文件数、传输字节数
+        """
+        if direction == SyncDirectionType.UPLOAD and not folder_is_exist(local_path):
+            raise BaseException(FOLDER_EXIST_FORMAT.format(local_path), "待同步文件夹不存在")
+        try:
+            result = FtpCore.ftp_sync_dir(
+                ftp_instance, local_path, remote_path, direction == SyncDirectionType.UPLOAD, workers
+            )
+        except Exception as e:
+            raise BaseException(FTP_SYNC_FORMAT.format(e), "FTP同步失败，请检查FTP连接")
+        return {"files": result.files, "skipped": result.skipped, "bytes": result.bytes}
@@ -0,0 +1,451 @@
+"""
+FTP/FTPS 传输引擎
+
+- 目录列表优先使用 MLSD（一次往返即可区分文件/文件夹，并带大小和修改时间），服务器不支持时回退到解析 LIST
+- 多文件传输使用多条并行的数据连接（每个工作线程一条独立的控制连接），单文件使用大缓冲区
+- 支持 REST 断点续传，以及按大小/修改时间的增量同步；目录传输先写入 .astron.part 临时文件，完成后再改名，
+  只有中断留下的临时文件才续传，其余有变化的文件都从头覆盖
+- 通过 progress 回调报告进度
+"""
+
+import calendar
+import ftplib
+import os
+import posixpath
+import queue
+import re
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from astronverse.actionlib.logger import logger
+
+# 单次读写的缓冲区大小
+BUFSIZE = 256 * 1024
+# 多文件传输时的并行连接数
+WORKERS = 4
+
+FILE = "file"
+DIR = "dir"
+# 目录传输中未完成文件的后缀
+PART_SUFFIX = ".astron.part"
+
+_UNIX_LIST = re.compile(
+    r"^(?P<mode>[\-dlbcps][\-rwxsStT]{9})\S*\s+\d+\s+\S+\s+\S+\s+(?P<size>\d+)\s+"
+    r"(?P<date>\w{3}\s+\d{1,2}\s+(?:\d{1,2}:\d{2}|\d{4}))\s(?P<name>.+)$"
+)
+_DOS_LIST = re.compile(
+    r"^(?P<date>\d{2}-\d{2}-\d{2,4})\s+(?P<time>\d{1,2}:\d{2}(?:AM|PM)?)\s+(?P<size><DIR>|\d+)\s+(?P<name>.+)$",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class RemoteEntry:
+    name: str
+    type: str
+    size: int = 0
+    # 修改时间（UTC 时间戳），LIST 回退时为 None
+    modify: Optional[float] = None
+
+    @property
+    def is_dir(self) -> bool:
+        return self.type == DIR
+
+
+@dataclass
+class TransferResult:
+    files: int = 0
+    skipped: int = 0
+    bytes: int = 0
+
+
+def parse_mlsd_time(value: str) -> Optional[float]:
+    """MLSD 的 modify 为 UTC 时间 YYYYMMDDHHMMSS[.sss]"""
+    try:
+        return float(calendar.timegm(time.strptime(value[:14], "%Y%m%d%H%M%S")))
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_list_line(line: str) -> Optional[RemoteEntry]:
+    """解析 unix 或 windows(IIS) 风格的 LIST 行，LIST 的时间精度不足，不作为修改时间使用"""
+    match = _UNIX_LIST.match(line)
+    if match:
+        mode = match.group("mode")
+        name = match.group("name")
+        if mode[0] == "l":
+            # 符号链接 name -> target，按文件处理
+            name = name.split(" -> ", 1)[0]
+        return RemoteEntry(name, DIR if mode[0] == "d" else FILE, int(match.group("size")))
+    match = _DOS_LIST.match(line)
+    if match:
+        size = match.group("size")
+        if size.upper() == "<DIR>":
+            return RemoteEntry(match.group("name"), DIR)
+        return RemoteEntry(match.group("name"), FILE, int(size))
+    return None
+
+
+def supports_mlsd(ftp_instance: ftplib.FTP) -> Optional[bool]:
+    return getattr(ftp_instance, "_astron_mlsd", None)
+
+
+def list_dir(ftp_instance: ftplib.FTP, path: str = "") -> list[RemoteEntry]:
+    """列出目录内容，一次往返即可区分文件和文件夹"""
+    if supports_mlsd(ftp_instance) is not False:
+        try:
+            entries = []
+            for name, facts in ftp_instance.mlsd(path, facts=["type", "size", "modify"]):
+                entry_type = facts.get("type", "").lower()
+                if entry_type in ("cdir", "pdir") or name in (".", ".."):
+                    continue
+                entries.append(
+                    RemoteEntry(
+                        name,
+                        DIR if entry_type == "dir" else FILE,
+                        int(facts.get("size", 0) or 0),
+                        parse_mlsd_time(facts.get("modify", "")),
+                    )
+                )
+            ftp_instance._astron_mlsd = True
+            return entries
+        except ftplib.error_perm as e:
+            # 500/502 命令不支持时回退，其他错误（如目录不存在）直接抛出
+            if not str(e).startswith(("500", "502")):
+                raise
+            ftp_instance._astron_mlsd = False
+
+    lines = []
+    ftp_instance.retrlines("LIST {}".format(path) if path else "LIST", lines.append)
+    entries = []
+    for line in lines:
+        entry = parse_list_line(line)
+        if entry and entry.name not in (".", ".."):
+            entries.append(entry)
+    return entries
+
+
+def remote_mtime(ftp_instance: ftplib.FTP, path: str) -> Optional[float]:
+    """MDTM 获取远程文件修改时间（UTC），不支持时返回 None"""
+    try:
+        return parse_mlsd_time(ftp_instance.sendcmd("MDTM {}".format(path))[4:].strip())
+    except ftplib.all_errors:
+        return None
+
+
+def remote_size(ftp_instance: ftplib.FTP, path: str) -> Optional[int]:
+    try:
+        ftp_instance.voidcmd("TYPE I")
+        return ftp_instance.size(path)
+    except ftplib.all_errors:
+        return None
+
+
+def clone_connection(ftp_instance: ftplib.FTP) -> ftplib.FTP:
+    """按原连接的地址、账号、编码、TLS 设置新建一条连接"""
+    new_instance = ftp_instance.__class__()
+    new_instance.encoding = ftp_instance.encoding
+    new_instance.connect(ftp_instance.host, ftp_instance.port, timeout=ftp_instance.timeout)
+    credentials = getattr(ftp_instance, "_astron_credentials", None)
+    if credentials:
+        new_instance.login(*credentials)
+    if isinstance(new_instance, ftplib.FTP_TLS):
+        new_instance.prot_p()
+    new_instance._astron_mlsd = supports_mlsd(ftp_instance)
+    return new_instance
+
+
+def _close_quietly(ftp_instance: ftplib.FTP):
+    try:
+        ftp_instance.quit()
+    except Exception:
+        try:
+            ftp_instance.close()
+        except Exception:
+            pass
+
+
+class Progress:
+    """线程安全的进度统计，每次变化时回调 callback(done_bytes, total_bytes, done_files, total_files)"""
+
+    def __init__(self, callback: Optional[Callable] = None):
+        self.callback = callback
+        self.total_bytes = 0
+        self.total_files = 0
+        self.done_bytes = 0
+        self.done_files = 0
+        self._lock = threading.Lock()
+
+    def add_total(self, size: int, files: int = 1):
+        with self._lock:
+            self.total_bytes += size
+            self.total_files += files
+
+    def advance(self, size: int = 0, files: int = 0):
+        with self._lock:
+            self.done_bytes += size
+            self.done_files += files
+            snapshot = (self.done_bytes, self.total_bytes, self.done_files, self.total_files)
+        if self.callback:
+            self.callback(*snapshot)
+
+
+class FtpTransfer:
+    """
+    基于一个已登录连接的传输引擎：主连接负责列表和建目录，文件传输分发到并行连接池；
+    服务器拒绝新连接时退化为使用主连接串行传输
+    """
+
+    def __init__(
+        self,
+        ftp_instance: ftplib.FTP,
+        workers: int = WORKERS,
+        bufsize: int = BUFSIZE,
+        progress: Optional[Callable] = None,
+    ):
+        self.ftp = ftp_instance
+        self.workers = max(1, workers)
+        self.bufsize = bufsize
+        self.progress = Progress(progress)
+
+    # ---------- 单文件 ----------
+
+    def upload_file(self, local_path: str, remote_path: str, resume: bool = False, ftp_instance=None) -> int:
+        """上传单个文件，resume=True 时从远程已有大小处续传；返回本次传输的字节数"""
+        ftp_instance = ftp_instance or self.ftp
+        offset = 0
+        if resume:
+            offset = remote_size(ftp_instance, remote_path) or 0
+            if offset > os.path.getsize(local_path):
+                offset = 0
+        with open(local_path, "rb") as fp:
+            fp.seek(offset)
+            sent = 0
+
+            def callback(block):
+                nonlocal sent
+                sent += len(block)
+                self.progress.advance(len(block))
+
+            ftp_instance.storbinary("STOR {}".format(remote_path), fp, self.bufsize, callback, rest=offset or None)
+        return sent
+
+    def download_file(self, remote_path: str, local_path: str, resume: bool = False, ftp_instance=None) -> int:
+        """下载单个文件，resume=True 时从本地已有大小处续传；返回本次传输的字节数"""
+        ftp_instance = ftp_instance or self.ftp
+        offset = os.path.getsize(local_path) if resume and os.path.isfile(local_path) else 0
+        received = 0
+        with open(local_path, "ab" if offset else "wb") as fp:
+
+            def callback(block):
+                nonlocal received
+                fp.write(block)
+                received += len(block)
+                self.progress.advance(len(block))
+
+            ftp_instance.retrbinary("RETR {}".format(remote_path), callback, self.bufsize, rest=offset or None)
+        return received
+
+    # ---------- 目录 ----------
+
+    def walk_remote(self, root: str) -> tuple[list[str], list[tuple[str, RemoteEntry]]]:
+        """
+        遍历远程目录，每个目录一次列表往返
+        :return: (相对目录列表[父目录在前], [(相对文件路径, 条目)])
+        """
+        dirs, files = [], []
+        pending = [""]
+        while pending:
+            rel = pending.pop(0)
+            for entry in list_dir(self.ftp, posixpath.join(root, rel) if rel else root):
+                child = posixpath.join(rel, entry.name) if rel else entry.name
+                if entry.is_dir:
+                    dirs.append(child)
+                    pending.append(child)
+                else:
+                    files.append((child, entry))
+        return dirs, files
+
+    def _rename_remote(self, source: str, target: str, ftp_instance: ftplib.FTP):
+        """把远程临时文件改名为目标文件，服务器不允许覆盖时先删除目标文件"""
+        try:
+            ftp_instance.rename(source, target)
+        except ftplib.error_perm:
+            try:
+                ftp_instance.delete(target)
+            except ftplib.error_perm:
+                pass
+            ftp_instance.rename(source, target)
+
+    def _remote_index(self, root: str) -> tuple[set, dict]:
+        try:
+            dirs, files = self.walk_remote(root)
+        except ftplib.error_perm:
+            return set(), {}
+        return set(dirs), dict(files)
+
+    def _run(self, tasks: list[Callable]) -> list:
+        """把传输任务分发到并行连接上执行，返回各任务结果；任一任务失败则抛出第一个异常"""
+        if not tasks:
+            return []
+        count = min(self.workers, len(tasks))
+        pool: queue.Queue = queue.Queue()
+        opened = []
+        for _ in range(count):
+            try:
+                conn = clone_connection(self.ftp)
+            except ftplib.all_errors as e:
+                logger.info("FTP并行连接创建失败，使用已有连接传输: {}".format(e))
+                break
+            opened.append(conn)
+            pool.put(conn)
+        if not opened:
+            pool.put(self.ftp)
+
+        def execute(task):
+            conn = pool.get()
+            try:
+                return task(conn)
+            finally:
+                pool.put(conn)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, len(opened))) as executor:
+                futures = [executor.submit(execute, task) for task in tasks]
+                return [future.result() for future in futures]
+        finally:
+            for conn in opened:
+                _close_quietly(conn)
+
+    def upload_dir(self, local_root: str, remote_root: str, incremental: bool = True, resume: bool = False):
+        """
+        上传本地目录到远程目录（不存在时创建）
+        :param incremental: 远程已有同大小且不早于本地修改时间的文件时跳过
+        :param resume: 远程留有上次中断的临时文件时从其大小处续传
+        """
+        if not os.path.isdir(local_root):
+            raise ValueError("{}非有效目录".format(local_root))
+        result = TransferResult()
+        remote_dirs, remote_files = self._remote_index(remote_root) if incremental or resume else (set(), {})
+        if not remote_dirs and not remote_files:
+            try:
+                self.ftp.mkd(remote_root)
+            except ftplib.error_perm:
+                pass
+
+        tasks = []
+        for dirpath, dirnames, filenames in os.walk(local_root):
+            dirnames.sort()
+            rel_dir = os.path.relpath(dirpath, local_root).replace(os.sep, "/")
+            rel_dir = "" if rel_dir == "." else rel_dir
+            if rel_dir and rel_dir not in remote_dirs:
+                try:
+                    self.ftp.mkd(posixpath.join(remote_root, rel_dir))
+                except ftplib.error_perm:
+                    pass
+            for filename in sorted(filenames):
+                rel = posixpath.join(rel_dir, filename) if rel_dir else filename
+                local_path = os.path.join(dirpath, filename)
+                stat = os.stat(local_path)
+                remote = remote_files.get(rel)
+                if incremental and remote and remote.size == stat.st_size:
+                    modify = remote.modify
+                    if modify is None:
+                        modify = remote_mtime(self.ftp, posixpath.join(remote_root, rel))
+                    if modify is None or modify >= int(stat.st_mtime):
+                        result.skipped += 1
+                        continue
+                part = remote_files.get(rel + PART_SUFFIX) if resume else None
+                offset = part.size if part and part.size <= stat.st_size else 0
+                self.progress.add_total(stat.st_size - offset)
+                tasks.append(self._upload_task(local_path, posixpath.join(remote_root, rel), bool(offset)))
+        sizes = self._run(tasks)
+        result.files, result.bytes = len(sizes), sum(sizes)
+        return result
+
+    def _upload_task(self, local_path: str, remote_path: str, resume: bool):
+        def task(conn):
+            part_path = remote_path + PART_SUFFIX
+            size = self.upload_file(local_path, part_path, resume=resume, ftp_instance=conn)
+            self._rename_remote(part_path, remote_path, conn)
+            self.progress.advance(files=1)
+            return size
+
+        return task
+
+    def download_dir(self, remote_root: str, local_root: str, incremental: bool = True, resume: bool = False):
+        """
+        下载远程目录到本地目录；下载后的文件修改时间设置为远程修改时间，供下次增量同步比较
+        :param incremental: 本地已有同大小且不早于远程修改时间的文件时跳过
+        :param resume: 本地留有上次中断的临时文件时从其大小处续传
+        """
+        result = TransferResult()
+        dirs, files = self.walk_remote(remote_root)
+        os.makedirs(local_root, exist_ok=True)
+        for rel in dirs:
+            os.makedirs(os.path.join(local_root, *rel.split("/")), exist_ok=True)
+
+        tasks = []
+        for rel, entry in files:
+            if rel.endswith(PART_SUFFIX):
+                continue
+            local_path = os.path.join(local_root, *rel.split("/"))
+            remote_path = posixpath.join(remote_root, rel)
+            exists = os.path.isfile(local_path)
+            if incremental and exists and os.path.getsize(local_path) == entry.size:
+                modify = entry.modify if entry.modify is not None else remote_mtime(self.ftp, remote_path)
+                if modify is None or int(os.path.getmtime(local_path)) >= modify:
+                    result.skipped += 1
+                    continue
+            part_path = local_path + PART_SUFFIX
+            offset = os.path.getsize(part_path) if resume and os.path.isfile(part_path) else 0
+            if offset > entry.size:
+                offset = 0
+            self.progress.add_total(entry.size - offset)
+            tasks.append(self._download_task(remote_path, local_path, entry.modify, bool(offset)))
+        sizes = self._run(tasks)
+        result.files, result.bytes = len(sizes), sum(sizes)
+        return result
+
+    def _download_task(self, remote_path: str, local_path: str, modify, resume: bool):
+        def task(conn):
+            part_path = local_path + PART_SUFFIX
+            size = self.download_file(remote_path, part_path, resume=resume, ftp_instance=conn)
+            os.replace(part_path, local_path)
+            mtime = modify if modify is not None else remote_mtime(conn, remote_path)
+            if mtime is not None:
+                os.utime(local_path, (mtime, mtime))
+            self.progress.advance(files=1)
+            return size
+
+        return task
+
+    def delete_dir(self, remote_root: str):
+        """删除远程目录：文件并行删除，目录由深到浅删除"""
+        dirs, files = self.walk_remote(remote_root)
+        tasks = []
+        for rel, _ in files:
+            path = posixpath.join(remote_root, rel)
+            tasks.append(lambda conn, path=path: conn.delete(path))
+        self._run(tasks)
+        for rel in sorted(dirs, key=lambda item: item.count("/"), reverse=True):
+            self.ftp.rmd(posixpath.join(remote_root, rel))
+        self.ftp.rmd(remote_root)
+
+
+def log_progress(interval: float = 1.0) -> Callable:
+    """按时间间隔把进度输出到日志的 progress 回调"""
+    last = [0.0]
+
+    def callback(done_bytes, total_bytes, done_files, total_files):
+        now = time.time()
+        if now - last[0] < interval and done_files != total_files:
+            return
+        last[0] = now
+        logger.info("FTP传输进度: {}/{} 个文件, {}/{} 字节".format(done_files, total_files, done_bytes, total_bytes))
+
+    return callback
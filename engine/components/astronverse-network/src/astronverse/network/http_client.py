@@ -0,0 +1,354 @@
+"""
+HTTP 客户端
+
+- 同一次运行内按源站（scheme://host:port）复用 keep-alive 连接池，避免每次请求都重新握手
+- 幂等请求在连接失败/5xx/429 时按指数退避重试
+- 会话只复用连接，不保存 Cookie：每次请求只带调用方传入的 Cookie，互不相关的原子之间不会串用登录状态
+- multipart 上传从磁盘流式读取文件，不把文件整体读入内存
+- 大文件分段并行下载，中断后可断点续传
+"""
+
+import atexit
+import http.cookiejar
+import json
+import mimetypes
+import os
+import threading
+import time
+import uuid
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from astronverse.actionlib.logger import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 每个源站的最大连接数
+POOL_MAXSIZE = 16
+# 重试次数及退避系数（0.5s, 1s, 2s...）
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# 流式读写的块大小
+CHUNK_SIZE = 1024 * 1024
+# 超过该大小且服务器支持 Range 时分段并行下载
+SEGMENT_THRESHOLD = 16 * 1024 * 1024
+SEGMENTS = 4
+# 下载进度落盘间隔
+STATE_SAVE_INTERVAL = 8 * 1024 * 1024
+
+
+def origin_of(url: str) -> str:
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return "{}://{}:{}".format(parts.scheme, parts.hostname, port)
+
+
+class HttpClientManager:
+    """按源站缓存会话，进程退出时统一关闭"""
+
+    def __init__(self, pool_maxsize: int = POOL_MAXSIZE, retries: int = RETRY_TOTAL):
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self._sessions: dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        # 会话按源站共享，拒绝保存响应中的 Cookie；同一次请求内重定向的 Cookie 仍由 requests 单独处理
+        session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=RETRY_BACKOFF,
+            status_forcelist=RETRY_STATUS,
+            # 默认只重试幂等方法，POST/PATCH 不重试，避免重复提交
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def session(self, url: str) -> requests.Session:
+        key = origin_of(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._new_session()
+                self._sessions[key] = session
+            return session
+
+    def request(self, method: str, url: str, **kwargs):
+        """
+        发送请求，参数与 requests.request 一致
+        :return: requests 响应对象
+        """
+        return self.session(url).request(method, url, **kwargs)
+
+    def stats(self) -> dict:
+        """各源站新建的连接数和发出的请求数（用于观察连接复用情况）"""
+        result = {}
+        with self._lock:
+            for key, session in self._sessions.items():
+                pools = session.get_adapter(key).poolmanager.pools
+                connections = requests_count = 0
+                for pool_key in pools.keys():  # noqa: SIM118  RecentlyUsedContainer 不支持迭代
+                    pool = pools[pool_key]
+                    connections += pool.num_connections
+                    requests_count += pool.num_requests
+                result[key] = {"connections": connections, "requests": requests_count}
+        return result
+
+    def close_all(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                pass
+
+
+http_client = HttpClientManager()
+atexit.register(http_client.close_all)
+
+
+class MultipartStream:
+    """
+    流式 multipart/form-data 请求体：requests 按块调用 read，文件内容直接从磁盘读取；
+    长度预先算出，请求带 Content-Length 而不是 chunked
+    """
+
+    def __init__(self, fields: Optional[dict] = None, files: Optional[list[tuple[str, str]]] = None):
+        self.boundary = uuid.uuid4().hex
+        self._parts: list = []
+        for key, value in (fields or {}).items():
+            if not isinstance(value, (str, bytes)):
+                value = json.dumps(value, ensure_ascii=False)
+            if isinstance(value, str):
+                value = value.encode("utf-8")
+            self._parts.append(self._header(key) + value + b"\r\n")
+        for key, path in files or []:
+            filename = os.path.basename(path)
+            content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            self._parts.append(self._header(key, filename, content_type))
+            self._parts.append(path)
+            self._parts.append(b"\r\n")
+        self._parts.append("--{}--\r\n".format(self.boundary).encode("utf-8"))
+        self.len = sum(os.path.getsize(part) if isinstance(part, str) else len(part) for part in self._parts)
+        self._index = 0
+        self._current = None
+
+    @property
+    def content_type(self) -> str:
+        return "multipart/form-data; boundary={}".format(self.boundary)
+
+    def _header(self, key: str, filename: str = "", content_type: str = "") -> bytes:
+        disposition = 'form-data; name="{}"'.format(key)
+        header = "--{}\r\nContent-Disposition: {}".format(self.boundary, disposition)
+        if filename:
+            header += '; filename="{}"\r\nContent-Type: {}'.format(filename, content_type)
+        return (header + "\r\n\r\n").encode("utf-8")
+
+    def __len__(self):
+        return self.len
+
+    def __iter__(self):
+        while True:
+            block = self.read(CHUNK_SIZE)
+            if not block:
+                break
+            yield block
+
+    def _open_next(self):
+        part = self._parts[self._index]
+        self._index += 1
+        if isinstance(part, str):
+            self._current = open(part, "rb")  # noqa: SIM115
+        else:
+            self._current = _BytesReader(part)
+
+    def read(self, size: int = -1) -> bytes:
+        size = CHUNK_SIZE if size is None or size < 0 else size
+        result = b""
+        while len(result) < size:
+            if self._current is None:
+                if self._index >= len(self._parts):
+                    break
+                self._open_next()
+            block = self._current.read(size - len(result))
+            if not block:
+                self._current.close()
+                self._current = None
+                continue
+            result += block
+        return result
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+class _BytesReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def read(self, size: int) -> bytes:
+        block = self.data[self.offset : self.offset + size]
+        self.offset += len(block)
+        return block
+
+    def close(self):
+        pass
+
+
+class RangedDownloader:
+    """
+    断点续传下载：文件先写入 <目标>.part，进度记录在 <目标>.part.json；
+    服务器支持 Range 且文件较大时分段并行下载，校验 ETag/Last-Modified 与大小一致才续传
+    """
+
+    def __init__(
+        self,
+        url: str,
+        dst_path: str,
+        headers: Optional[dict] = None,
+        timeout: int = 60,
+        segments: int = SEGMENTS,
+        threshold: int = SEGMENT_THRESHOLD,
+        retries: int = RETRY_TOTAL,
+        manager: HttpClientManager = http_client,
+    ):
+        self.url = url
+        self.dst_path = dst_path
+        self.part_path = dst_path + ".part"
+        self.state_path = dst_path + ".part.json"
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.segments = max(1, segments)
+        self.threshold = threshold
+        self.retries = retries
+        self.session = manager.session(url)
+        self._lock = threading.Lock()
+        self._state: dict = {}
+        self._unsaved = 0
+
+    def _probe(self) -> tuple[Optional[int], bool, str]:
+        """用 Range: bytes=0-0 探测大小、是否支持分段、版本标识"""
+        headers = dict(self.headers, Range="bytes=0-0")
+        with self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            validator = response.headers.get("ETag") or response.headers.get("Last-Modified") or ""
+            if response.status_code == 206:
+                content_range = response.headers.get("Content-Range", "")
+                total = content_range.rsplit("/", 1)[-1]
+                return (int(total) if total.isdigit() else None), True, validator
+            length = response.headers.get("Content-Length")
+            return (int(length) if length and length.isdigit() else None), False, validator
+
+    def _load_state(self, size: Optional[int], validator: str) -> Optional[dict]:
+        if not (os.path.isfile(self.state_path) and os.path.isfile(self.part_path)):
+            return None
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != self.url or state.get("size") != size or state.get("validator") != validator:
+            return None
+        return state
+
+    def _save_state(self, force: bool = False):
+        with self._lock:
+            if not force and self._unsaved < STATE_SAVE_INTERVAL:
+                return
+            self._unsaved = 0
+            content = json.dumps(self._state)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, self.state_path)
+
+    def _plan(self, size: int) -> list[list[int]]:
+        """[start, end(含), 已下载字节]"""
+        count = self.segments if size >= self.threshold else 1
+        step = -(-size // count)
+        return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+    def _fetch_segment(self, segment: list[int]):
+        attempt = 0
+        while True:
+            start, end, done = segment
+            if start + done > end:
+                return
+            headers = dict(self.headers, Range="bytes={}-{}".format(start + done, end))
+            try:
+                with self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code != 206:
+                        raise requests.RequestException("服务器未返回分段内容: {}".format(response.status_code))
+                    with open(self.part_path, "r+b") as f:
+                        f.seek(start + done)
+                        for block in response.iter_content(CHUNK_SIZE):
+                            f.write(block)
+                            with self._lock:
+                                segment[2] += len(block)
+                                self._unsaved += len(block)
+                            self._save_state()
+                return
+            except (requests.RequestException, OSError) as e:
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                logger.info("分段下载中断，{}秒后从断点重试: {}".format(RETRY_BACKOFF * 2**attempt, e))
+                time.sleep(RETRY_BACKOFF * 2**attempt)
+
+    def _download_stream(self):
+        """不支持 Range 或大小未知时整体下载"""
+        with self.session.get(self.url, headers=self.headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            with open(self.part_path, "wb") as f:
+                for block in response.iter_content(CHUNK_SIZE):
+                    f.write(block)
+
+    def download(self) -> str:
+        size, ranged, validator = self._probe()
+        if not ranged or not size:
+            self._download_stream()
+        else:
+            state = self._load_state(size, validator)
+            if state is None:
+                state = {"url": self.url, "size": size, "validator": validator, "segments": self._plan(size)}
+                with open(self.part_path, "wb") as f:
+                    f.truncate(size)
+            self._state = state
+            self._save_state(force=True)
+            pending = [segment for segment in state["segments"] if segment[0] + segment[2] <= segment[1]]
+            threads = []
+            errors = []
+
+            def run(segment):
+                try:
+                    self._fetch_segment(segment)
+                except Exception as e:
+                    errors.append(e)
+
+            for segment in pending[1:]:
+                thread = threading.Thread(target=run, args=(segment,), daemon=True)
+                thread.start()
+                threads.append(thread)
+            if pending:
+                run(pending[0])
+            for thread in threads:
+                thread.join()
+            self._save_state(force=True)
+            if errors:
+                raise errors[0]
+        os.replace(self.part_path, self.dst_path)
+        if os.path.isfile(self.state_path):
+            os.remove(self.state_path)
+        return self.dst_path
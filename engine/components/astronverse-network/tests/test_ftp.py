@@ -0,0 +1,227 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from astronverse.network.core_ftp import FtpCore
+from astronverse.network.ftp_transfer import PART_SUFFIX, FtpTransfer, parse_list_line
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import ThreadedFTPServer
+
+
+class _NoMlsdHandler(FTPHandler):
+    """模拟不支持 MLSD 的服务器"""
+
+    def ftp_MLSD(self, path):  # noqa: N802
+        self.respond("500 Command not understood.")
+
+    def ftp_MLST(self, path):  # noqa: N802
+        self.respond("500 Command not understood.")
+
+
+class _FtpServerTest(TestCase):
+    handler = FTPHandler
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.local = tempfile.mkdtemp()
+        authorizer = DummyAuthorizer()
+        authorizer.add_user("user", "12345", self.root, perm="elradfmwMT")
+        handler = type("Handler", (self.handler,), {"authorizer": authorizer})
+        self.server = ThreadedFTPServer(("127.0.0.1", 0), handler)
+        self.port = self.server.socket.getsockname()[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"timeout": 0.1}, daemon=True)
+        self.thread.start()
+        self.ftp = FtpCore.create_ftp()
+        self.ftp.encoding = "utf-8"
+        FtpCore.ftp_connection(self.ftp, "127.0.0.1", self.port)
+        FtpCore.ftp_login(self.ftp, "user", "12345")
+
+    def tearDown(self):
+        FtpCore.close_ftp(self.ftp)
+        self.server.close_all()
+        self.thread.join(2)
+
+    def make_tree(self, count=30):
+        for i in range(count):
+            folder = os.path.join(self.local, "d{}".format(i % 3), "sub")
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, "f{}.txt".format(i)), "w") as f:
+                f.write("x" * (i + 1))
+        with open(os.path.join(self.local, "top.bin"), "wb") as f:
+            f.write(os.urandom(600 * 1024))
+
+    @staticmethod
+    def read(*parts):
+        with open(os.path.join(*parts)) as f:
+            return f.read()
+
+    def test_upload_download_dir(self):
+        self.make_tree()
+        FtpCore.ftp_upload_dir(self.ftp, self.local, "remote")
+        self.assertEqual(os.path.getsize(os.path.join(self.root, "remote", "top.bin")), 600 * 1024)
+        self.assertTrue(os.path.isfile(os.path.join(self.root, "remote", "d2", "sub", "f29.txt")))
+
+        out = os.path.join(tempfile.mkdtemp(), "out")
+        FtpCore.ftp_download_dir(self.ftp, "/remote", out)
+        with open(os.path.join(out, "d1", "sub", "f4.txt")) as f:
+            self.assertEqual(f.read(), "x" * 5)
+
+        entries = {entry.name: entry for entry in FtpCore.get_entries(self.ftp, "/remote")}
+        self.assertTrue(entries["d0"].is_dir)
+        self.assertEqual(entries["top.bin"].size, 600 * 1024)
+        self.assertTrue(FtpCore.is_dir(self.ftp, "remote"))
+        self.assertFalse(FtpCore.is_dir(self.ftp, "remote/top.bin"))
+
+        FtpCore.ftp_delete_dir(self.ftp, "remote")
+        self.assertFalse(os.path.exists(os.path.join(self.root, "remote")))
+
+    def test_incremental_sync(self):
+        self.make_tree()
+        result = FtpCore.ftp_sync_dir(self.ftp, self.local, "remote", True, 4)
+        self.assertEqual((result.files, result.skipped), (31, 0))
+
+        result = FtpCore.ftp_sync_dir(self.ftp, self.local, "remote", True, 4)
+        self.assertEqual((result.files, result.skipped), (0, 31))
+
+        changed = os.path.join(self.local, "d0", "sub", "f0.txt")
+        with open(changed, "w") as f:
+            f.write("changed")
+        result = FtpCore.ftp_sync_dir(self.ftp, self.local, "remote", True, 4)
+        self.assertEqual((result.files, result.skipped), (1, 30))
+        self.assertEqual(self.read(self.root, "remote", "d0", "sub", "f0.txt"), "changed")
+
+        # 变短和同大小的修改都从头覆盖，而不是按对方大小续传
+        shrunk = os.path.join(self.local, "d2", "sub", "f29.txt")
+        with open(shrunk, "w") as f:
+            f.write("short")
+        same_size = os.path.join(self.local, "d1", "sub", "f1.txt")
+        with open(same_size, "w") as f:
+            f.write("yy")
+        later = time.time() + 10
+        os.utime(same_size, (later, later))
+        result = FtpCore.ftp_sync_dir(self.ftp, self.local, "remote", True, 4)
+        self.assertEqual((result.files, result.skipped, result.bytes), (2, 29, 7))
+        self.assertEqual(self.read(self.root, "remote", "d2", "sub", "f29.txt"), "short")
+        self.assertEqual(self.read(self.root, "remote", "d1", "sub", "f1.txt"), "yy")
+
+        out = tempfile.mkdtemp()
+        result = FtpCore.ftp_sync_dir(self.ftp, out, "/remote", False, 4)
+        self.assertEqual(result.files, 31)
+        result = FtpCore.ftp_sync_dir(self.ftp, out, "/remote", False, 4)
+        self.assertEqual((result.files, result.skipped), (0, 31))
+
+        remote_changed = os.path.join(self.root, "remote", "d1", "sub", "f1.txt")
+        with open(remote_changed, "w") as f:
+            f.write("zz")
+        later += 10
+        os.utime(remote_changed, (later, later))
+        remote_shrunk = os.path.join(self.root, "remote", "d0", "sub", "f0.txt")
+        with open(remote_shrunk, "w") as f:
+            f.write("c")
+        result = FtpCore.ftp_sync_dir(self.ftp, out, "/remote", False, 4)
+        self.assertEqual((result.files, result.bytes), (2, 3))
+        self.assertEqual(self.read(out, "d1", "sub", "f1.txt"), "zz")
+        self.assertEqual(self.read(out, "d0", "sub", "f0.txt"), "c")
+        self.assertFalse(os.path.exists(os.path.join(out, "d0", "sub", "f0.txt" + PART_SUFFIX)))
+
+    def test_sync_resumes_interrupted_transfer(self):
+        data = os.urandom(300 * 1024)
+        with open(os.path.join(self.local, "big.bin"), "wb") as f:
+            f.write(data)
+        os.makedirs(os.path.join(self.root, "remote"))
+        with open(os.path.join(self.root, "remote", "big.bin" + PART_SUFFIX), "wb") as f:
+            f.write(data[: 100 * 1024])
+        result = FtpCore.ftp_sync_dir(self.ftp, self.local, "remote", True, 4)
+        self.assertEqual((result.files, result.bytes), (1, 200 * 1024))
+        self.assertEqual(os.listdir(os.path.join(self.root, "remote")), ["big.bin"])
+        with open(os.path.join(self.root, "remote", "big.bin"), "rb") as f:
+            self.assertEqual(f.read(), data)
+
+        out = tempfile.mkdtemp()
+        with open(os.path.join(out, "big.bin" + PART_SUFFIX), "wb") as f:
+            f.write(data[: 50 * 1024])
+        result = FtpCore.ftp_sync_dir(self.ftp, out, "/remote", False, 4)
+        self.assertEqual((result.files, result.bytes), (1, 250 * 1024))
+        self.assertEqual(os.listdir(out), ["big.bin"])
+        with open(os.path.join(out, "big.bin"), "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_resume(self):
+        data = os.urandom(300 * 1024)
+        src = os.path.join(self.local, "big.bin")
+        with open(src, "wb") as f:
+            f.write(data)
+        with open(os.path.join(self.root, "big.bin"), "wb") as f:
+            f.write(data[: 100 * 1024])
+        transfer = FtpTransfer(self.ftp)
+        self.assertEqual(transfer.upload_file(src, "big.bin", resume=True), 200 * 1024)
+        with open(os.path.join(self.root, "big.bin"), "rb") as f:
+            self.assertEqual(f.read(), data)
+
+        dst = os.path.join(self.local, "copy.bin")
+        with open(dst, "wb") as f:
+            f.write(data[: 50 * 1024])
+        self.assertEqual(transfer.download_file("big.bin", dst, resume=True), 250 * 1024)
+        with open(dst, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_progress(self):
+        self.make_tree(10)
+        calls = []
+        transfer = FtpTransfer(self.ftp, progress=lambda *args: calls.append(args))
+        transfer.upload_dir(self.local, "/remote")
+        done_bytes, total_bytes, done_files, total_files = calls[-1]
+        self.assertEqual((done_files, total_files), (11, 11))
+        self.assertEqual(done_bytes, total_bytes)
+
+    def test_generate_name(self):
+        for name in ("a.txt", "a(1).txt", "a(2).txt"):
+            open(os.path.join(self.root, name), "w").close()
+        self.assertEqual(FtpCore.generate_name(self.ftp, "a.txt"), "a(3).txt")
+
+    def test_many_small_files(self):
+        for i in range(200):
+            with open(os.path.join(self.local, "f{}.txt".format(i)), "w") as f:
+                f.write(str(i))
+        FtpTransfer(self.ftp, workers=1).upload_dir(self.local, "/serial")
+        FtpTransfer(self.ftp, workers=8).upload_dir(self.local, "/parallel")
+        for remote in ("serial", "parallel"):
+            remote_dir = os.path.join(self.root, remote)
+            self.assertEqual(sorted(os.listdir(remote_dir)), sorted(os.listdir(self.local)))
+            for i in range(200):
+                with open(os.path.join(remote_dir, "f{}.txt".format(i))) as f:
+                    self.assertEqual(f.read(), str(i))
+
+
+class TestFtp(_FtpServerTest):
+    pass
+
+
+class TestFtpListFallback(_FtpServerTest):
+    handler = _NoMlsdHandler
+
+    def test_list_fallback(self):
+        self.make_tree(6)
+        FtpCore.ftp_upload_dir(self.ftp, self.local, "remote")
+        entries = {entry.name: entry for entry in FtpCore.get_entries(self.ftp, "/remote")}
+        self.assertTrue(entries["d1"].is_dir)
+        self.assertIsNone(entries["top.bin"].modify)
+        self.assertFalse(self.ftp._astron_mlsd)
+        self.assertTrue(FtpCore.is_dir(self.ftp, "remote"))
+
+
+class TestParseList(TestCase):
+    def test_unix(self):
+        entry = parse_list_line("drwxr-xr-x   2 user group     4096 Jan 01 12:00 my folder")
+        self.assertEqual((entry.name, entry.is_dir), ("my folder", True))
+        entry = parse_list_line("-rw-r--r--   1 user group    12345 Mar  5  2023 a b.txt")
+        self.assertEqual((entry.name, entry.size, entry.is_dir), ("a b.txt", 12345, False))
+
+    def test_dos(self):
+        entry = parse_list_line("01-02-24  10:15AM       <DIR>          docs")
+        self.assertEqual((entry.name, entry.is_dir), ("docs", True))
+        entry = parse_list_line("01-02-24  10:15AM                 1024 report.txt")
+        self.assertEqual((entry.name, entry.size), ("report.txt", 1024))
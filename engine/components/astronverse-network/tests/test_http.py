@@ -0,0 +1,175 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+import requests
+from astronverse.network.core_network import NetworkCore
+from astronverse.network.http_client import HttpClientManager, MultipartStream, RangedDownloader, http_client
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 123)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    fail_after = None
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        # 响应头和响应体分两次写出，关闭 Nagle 避免 keep-alive 连接上的延迟确认
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with _Handler.lock:
+            _Handler.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body: bytes, status=200, headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/login":
+            return self._send(b"ok", headers={"Set-Cookie": "token=secret; Path=/"})
+        if self.path == "/cookie":
+            return self._send(self.headers.get("Cookie", "").encode("utf-8"))
+        if self.path.startswith("/api"):
+            return self._send(b'{"ok": true}', headers={"Content-Type": "application/json"})
+        if self.path == "/flaky":
+            with _Handler.lock:
+                _Handler.flaky = getattr(_Handler, "flaky", 0) + 1
+                count = _Handler.flaky
+            return self._send(b"ok" if count >= 3 else b"busy", status=200 if count >= 3 else 503)
+        headers = {"ETag": '"v1"', "Accept-Ranges": "bytes"}
+        range_header = self.headers.get("Range")
+        if not range_header:
+            return self._send(PAYLOAD, headers=headers)
+        start, end = range_header.split("=")[1].split("-")
+        start, end = int(start), int(end) if end else len(PAYLOAD) - 1
+        body = PAYLOAD[start : end + 1]
+        headers["Content-Range"] = "bytes {}-{}/{}".format(start, end, len(PAYLOAD))
+        if _Handler.fail_after is not None and start > 0:
+            # 模拟连接中断：声明完整长度但只发送一部分
+            self.send_response(206)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body[: _Handler.fail_after])
+            self.close_connection = True
+            return
+        self._send(body, status=206, headers=headers)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        result = {
+            "length": length,
+            "chunked": self.headers.get("Transfer-Encoding"),
+            "type": self.headers.get("Content-Type", "").split(";")[0],
+            "body_has_file": PAYLOAD[:1024] in body,
+            "body_has_field": b'name="a"' in body,
+        }
+        self._send(json.dumps(result).encode("utf-8"))
+
+
+class TestHttpClient(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.url = "http://127.0.0.1:{}".format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        http_client.close_all()
+
+    def setUp(self):
+        _Handler.connections = 0
+        _Handler.fail_after = None
+        http_client.close_all()
+        self.tmp = tempfile.mkdtemp()
+
+    def test_connection_reuse(self):
+        for _ in range(50):
+            self.assertEqual(json.loads(NetworkCore.get_request(self.url + "/api")), {"ok": True})
+        self.assertEqual(_Handler.connections, 1)
+        stats = http_client.stats()["http://127.0.0.1:{}".format(self.server.server_address[1])]
+        self.assertEqual(stats, {"connections": 1, "requests": 50})
+
+    def test_cookies_not_shared_between_calls(self):
+        NetworkCore.get_request(self.url + "/login")
+        self.assertEqual(NetworkCore.get_request(self.url + "/cookie"), "")
+        response = http_client.request("GET", self.url + "/cookie", cookies={"token": "mine"})
+        self.assertEqual(response.text, "token=mine")
+        self.assertEqual(_Handler.connections, 1)
+
+    def test_retry_with_backoff(self):
+        manager = HttpClientManager()
+        _Handler.flaky = 0
+        self.assertEqual(manager.request("GET", self.url + "/flaky").text, "ok")
+        manager.close_all()
+
+    def test_multipart_stream(self):
+        path = os.path.join(self.tmp, "data.bin")
+        with open(path, "wb") as f:
+            f.write(PAYLOAD)
+        result = json.loads(
+            NetworkCore.post_request(self.url + "/upload", body='{"a": 1}', files=json.dumps({"file": path}))
+        )
+        self.assertEqual(result["type"], "multipart/form-data")
+        self.assertIsNone(result["chunked"])
+        self.assertTrue(result["body_has_file"])
+        self.assertTrue(result["body_has_field"])
+        self.assertGreater(result["length"], len(PAYLOAD))
+
+        stream = MultipartStream({"a": "1"}, [("file", path)])
+        self.assertEqual(len(b"".join(stream)), stream.len)
+
+    def test_segmented_download(self):
+        dst = os.path.join(self.tmp, "out.bin")
+        RangedDownloader(self.url + "/file", dst, threshold=1024 * 1024, segments=4).download()
+        with open(dst, "rb") as f:
+            self.assertEqual(f.read(), PAYLOAD)
+        self.assertFalse(os.path.exists(dst + ".part"))
+        self.assertFalse(os.path.exists(dst + ".part.json"))
+
+    def test_resume_download(self):
+        dst = os.path.join(self.tmp, "out.bin")
+        _Handler.fail_after = 200 * 1024
+        with self.assertRaises(Exception):
+            RangedDownloader(self.url + "/file", dst, threshold=1024 * 1024, segments=4, retries=0).download()
+        self.assertTrue(os.path.exists(dst + ".part.json"))
+        with open(dst + ".part.json") as f:
+            done = sum(segment[2] for segment in json.load(f)["segments"])
+        self.assertGreater(done, 0)
+
+        _Handler.fail_after = None
+        NetworkCore.http_download(self.url + "/file", dst)
+        with open(dst, "rb") as f:
+            self.assertEqual(f.read(), PAYLOAD)
+
+    def test_pooled_connections(self):
+        manager = HttpClientManager()
+        for _ in range(200):
+            manager.request("GET", self.url + "/api")
+        manager.close_all()
+        self.assertEqual(_Handler.connections, 1)
+
+        # 对照：不复用会话时每个请求都新建连接
+        _Handler.connections = 0
+        for _ in range(20):
+            requests.get(self.url + "/api")
+        self.assertEqual(_Handler.connections, 20)
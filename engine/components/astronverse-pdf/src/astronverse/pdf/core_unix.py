@@ -1,7 +1,5 @@
-from astronverse.pdf.core import IPDFCore
+from astronverse.pdf.core_shared import PDFSharedCore
 
 
-class PDFCore(IPDFCore):
-    @staticmethod
-    def print(msg: str = "") -> str:
-        return "linux {}".format(msg)
+class PDFCore(PDFSharedCore):
+    pass
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from astronverse.pdf import PictureType, core_shared
+from astronverse.pdf.core_shared import PDFSharedCore, _split_pages, _text_worker, map_pages
+from PIL import Image, ImageChops
+
+PAGES = 6
+
+
+class _FakeOs:
+    """只替换 cpu_count，其余转发给 os"""
+
+    def __getattr__(self, name):
+        return getattr(os, name)
+
+    @staticmethod
+    def cpu_count():
+        return 2
+
+
+def make_pdf(path: str, pages: int):
+    """每页一行文字和一个位置不同的方块，页面内容互不相同"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for i in range(pages):
+        stream = "BT /F1 24 Tf 72 700 Td (Page {} of {}) Tj ET\n{} 400 50 50 re f".format(i + 1, pages, 72 + i * 60)
+        objects.append("<< /Length {} >>\nstream\n{}\nendstream".format(len(stream), stream).encode("latin-1"))
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {} 0 R "
+            "/Resources << /Font << /F1 3 0 R >> >> >>".format(len(objects)).encode("latin-1")
+        )
+        kids.append("{} 0 R".format(len(objects)))
+    objects[1] = "<< /Type /Pages /Kids [{}] /Count {} >>".format(" ".join(kids), pages).encode("latin-1")
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(bytes(data))
+
+
+class TestMapPages(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.pdf = os.path.join(cls.tmp, "doc.pdf")
+        make_pdf(cls.pdf, PAGES)
+
+    @classmethod
+    def tearDownClass(cls):
+        core_shared._shutdown_pool()
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def pooled(self):
+        """降低阈值并保证至少两个进程，使小文件也走进程池"""
+        return patch.multiple(core_shared, PARALLEL_MIN_PAGES=2, os=_FakeOs())
+
+    def test_split_pages(self):
+        self.assertEqual(_split_pages([0, 1, 2, 3, 4], 2), [[0, 1, 2], [3, 4]])
+        self.assertEqual(_split_pages([0, 1], 8), [[0], [1]])
+
+    def test_serial_below_threshold(self):
+        core_shared._shutdown_pool()
+        texts = PDFSharedCore.get_page_text(self.pdf)
+        self.assertIsNone(core_shared._pool)
+        self.assertEqual([text.strip() for text in texts], ["Page {} of {}".format(i + 1, PAGES) for i in range(PAGES)])
+
+    def test_text_pooled_matches_serial(self):
+        pages = [5, 0, 3, 1, 4, 2]
+        serial = _text_worker(self.pdf, "", pages)
+        with self.pooled():
+            pooled = map_pages(_text_worker, pages, self.pdf, "")
+            self.assertIsNotNone(core_shared._pool)
+        self.assertEqual(pooled, serial)
+        self.assertEqual(pooled[0].strip(), "Page 6 of 6")
+
+    def test_render_pooled_matches_serial(self):
+        serial_dir = os.path.join(self.tmp, "serial")
+        pooled_dir = os.path.join(self.tmp, "pooled")
+        os.makedirs(serial_dir)
+        os.makedirs(pooled_dir)
+        PDFSharedCore.pdf_to_image(self.pdf, save_dir=serial_dir, image_type=PictureType.PNG, prefix="p")
+        with self.pooled():
+            PDFSharedCore.pdf_to_image(self.pdf, save_dir=pooled_dir, image_type=PictureType.PNG, prefix="p")
+            self.assertIsNotNone(core_shared._pool)
+
+        names = sorted(os.listdir(serial_dir))
+        self.assertEqual(names, ["p_{}.png".format(i + 1) for i in range(PAGES)])
+        self.assertEqual(sorted(os.listdir(pooled_dir)), names)
+        for name in names:
+            with Image.open(os.path.join(serial_dir, name)) as a, Image.open(os.path.join(pooled_dir, name)) as b:
+                self.assertIsNone(ImageChops.difference(a.convert("RGB"), b.convert("RGB")).getbbox())
@@ -2,14 +2,10 @@ import base64
 import io
 
 import cv2
-import numpy as np
 import pyautogui
-from astronverse.vision.cv_match import AnchorMatch
+from astronverse.vision.cv_engine import match_engine
 from PIL import Image
 
-desktop_filepath = "desktop.png"
-desktop_filepath_match = "desktop_filepath_match.png"
-
 
 class CvCore:
     def __init__(self):
@@ -24,45 +20,12 @@ class CvCore:
         return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
     @staticmethod
-    def match_imgs(input_data=None, match_similarity=0.95, canny_flag=False):
-        match = AnchorMatch()
-        if input_data is None:
-            raise ValueError("input_data cannot be None")
-        data = input_data.get("elementData")
-
-        # data = input_data
-        target_img = CvCore.base64_to_image(data["img"]["self"])
-        center_coords_aim = f"{data['pos']['self_x']},{data['pos']['self_y']}"
-
-        if data["img"]["parent"]:
-            anchor_img = CvCore.base64_to_image(data["img"]["parent"])
-            center_coords_anchor = f"{data['pos']['parent_x']},{data['pos']['parent_y']}"
-        else:
-            anchor_img = None
-            center_coords_anchor = ""
-
-        match_img = pyautogui.screenshot(region=None)
-        match_img.save(desktop_filepath_match)
-        ratio_w = match_img.width / data["sr"]["screen_w"]
-        ratio_h = match_img.height / data["sr"]["screen_h"]
-        ratio = f"{ratio_w},{ratio_h}"
-        match_img = np.array(match_img)
-
-        result = match.process_image(
-            match_img,
-            target_img,
-            anchor_img,
-            center_coords_aim=center_coords_aim,
-            center_coords_anchor=center_coords_anchor,
-            canny_flag=canny_flag,
-            ratio=ratio,
-            match_similarity=match_similarity,
-        )
-        if result is None or not isinstance(result, (list, tuple)) or len(result) != 2:
-            raise ValueError("match.process_image did not return a valid (out_img, match_box) tuple")
-        out_img, match_box = result
-        cv2.imwrite(desktop_filepath, out_img)
-        return match_box
+    def match_imgs(input_data=None, match_similarity=0.95, canny_flag=False, screen=None):
+        """
+        匹配目标元素，返回 (x, y, w, h)，未匹配到返回 None
+        模板按元素缓存、截图不落盘，优先在上次命中/锚点相对区域内搜索
+        """
+        return match_engine.match(input_data, match_similarity=match_similarity, canny_flag=canny_flag, screen=screen)
 
     @staticmethod
     def base64_to_image(base64_str):
@@ -0,0 +1,335 @@
+"""
+图像匹配引擎
+
+等待类原子（点击/悬停/存在/等待/输入）会在超时前反复匹配同一个元素，原流程每次都要：
+解码模板、截图落盘、全屏多次 matchTemplate、再写一张标注图。这里改为：
+
+1. 模板缓存：按 元素 + 屏幕缩放比例 + 是否边缘检测 缓存解码、缩放、灰度（及金字塔）后的模板，一次运行内只处理一次
+2. 全内存：截图直接转为 numpy 灰度图，不再读写 desktop.png
+3. 区域优先：先在上次命中位置附近、再在锚点相对位置附近搜索，都未命中才做全屏搜索
+4. 金字塔：全屏搜索先在缩小的图上粗定位，再回到原图在候选点附近精确匹配
+
+match 支持直接传入截图（RGB 数组），便于无界面环境下用合成图测试与基准测试。
+"""
+
+import base64
+import hashlib
+import io
+import json
+import math
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import cv2
+import numpy as np
+from astronverse.actionlib.logger import logger
+from PIL import Image
+
+# 模板缓存上限（元素个数）
+TEMPLATE_CACHE_SIZE = 64
+# 金字塔最大层数，每层缩小一半
+PYRAMID_MAX_LEVEL = 2
+# 金字塔中模板最短边不小于该值，否则不再缩小
+PYRAMID_MIN_SIDE = 16
+# 缩小后的模板放大回原尺寸与原模板的相似度不低于该值时才使用该层
+PYRAMID_MIN_FIDELITY = 0.9
+# 粗定位阈值相对精确阈值的放宽量
+PYRAMID_COARSE_MARGIN = 0.2
+# 粗定位保留的候选点个数
+PYRAMID_CANDIDATES = 3
+# 锚点相对区域向外扩展的比例（与原锚点匹配一致）
+ROI_EXPAND = 1 / 5
+# 上次命中区域向外扩展的像素
+LAST_HIT_MARGIN = 32
+
+# 边缘检测模式下的阈值（与原锚点匹配一致）
+CANNY_TARGET_THRESHOLD = 0.40
+CANNY_ANCHOR_THRESHOLD = 0.60
+
+
+def _decode(base64_str: str) -> Optional[np.ndarray]:
+    """base64 图片解码为 RGB 数组"""
+    if not base64_str:
+        return None
+    try:
+        image = Image.open(io.BytesIO(base64.b64decode(base64_str)))
+        return np.asarray(image.convert("RGB"))
+    except Exception as e:
+        logger.error(f"Error converting base64 to image: {e}")
+        return None
+
+
+def _to_gray(rgb: np.ndarray, canny_flag: bool) -> np.ndarray:
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY) if rgb.ndim == 3 else rgb
+    if canny_flag:
+        gray = cv2.Canny(gray, 50, 250)
+    return gray
+
+
+def _pyramid(gray: np.ndarray, levels: int) -> list[np.ndarray]:
+    """第 0 层为原图，之后每层缩小一半"""
+    result = [gray]
+    for _ in range(levels):
+        result.append(cv2.pyrDown(result[-1]))
+    return result
+
+
+class Template:
+    """预处理后的模板：按比例缩放后的灰度图及其金字塔"""
+
+    def __init__(self, rgb: np.ndarray, rw: float, rh: float, canny_flag: bool):
+        self.w = max(1, int(rgb.shape[1] * rw))
+        self.h = max(1, int(rgb.shape[0] * rh))
+        resized = cv2.resize(rgb, (self.w, self.h), interpolation=cv2.INTER_CUBIC)
+        self.gray = _to_gray(resized, canny_flag)
+
+        # 边缘图缩小后线条会断裂，不使用金字塔
+        self.pyramid = [self.gray] if canny_flag else self._build_pyramid()
+        self.levels = len(self.pyramid) - 1
+
+    def _build_pyramid(self) -> list[np.ndarray]:
+        """
+        只保留缩小后仍能代表原模板的层：把该层放大回原尺寸与原模板比较，
+        细节过多（文字、噪点）的模板缩小后失真，只做原图匹配
+        """
+        pyramid = _pyramid(self.gray, PYRAMID_MAX_LEVEL)
+        levels = 0
+        for level in range(1, PYRAMID_MAX_LEVEL + 1):
+            if min(pyramid[level].shape[:2]) < PYRAMID_MIN_SIDE:
+                break
+            restored = cv2.resize(pyramid[level], (self.w, self.h), interpolation=cv2.INTER_LINEAR)
+            fidelity = cv2.matchTemplate(self.gray, restored, cv2.TM_CCOEFF_NORMED)[0][0]
+            if fidelity < PYRAMID_MIN_FIDELITY:
+                break
+            levels = level
+        return pyramid[: levels + 1]
+
+
+class Element:
+    """一个待匹配元素：目标模板、锚点模板以及二者中心点的相对位移"""
+
+    def __init__(self, data: dict, rw: float, rh: float, canny_flag: bool):
+        target = _decode(data["img"]["self"])
+        if target is None:
+            raise ValueError("目标元素图片解析失败")
+        self.target = Template(target, rw, rh, canny_flag)
+
+        self.anchor = None
+        self.offset = None
+        anchor = _decode(data["img"].get("parent"))
+        if anchor is not None and data["pos"].get("parent_x") not in (None, ""):
+            self.anchor = Template(anchor, rw, rh, canny_flag)
+            pos = data["pos"]
+            self.offset = (
+                (int(float(pos["self_x"])) - int(float(pos["parent_x"]))) * rw,
+                (int(float(pos["self_y"])) - int(float(pos["parent_y"]))) * rh,
+            )
+
+
+def _clip_box(x1, y1, x2, y2, shape) -> tuple[int, int, int, int]:
+    height, width = shape[:2]
+    return max(0, int(x1)), max(0, int(y1)), min(width, int(x2)), min(height, int(y2))
+
+
+def _match_in(gray: np.ndarray, template: np.ndarray, box: tuple[int, int, int, int]):
+    """在 box 区域内匹配，返回 (得分, 左上角坐标)；区域小于模板时返回 None"""
+    x1, y1, x2, y2 = box
+    roi = gray[y1:y2, x1:x2]
+    if roi.shape[0] < template.shape[0] or roi.shape[1] < template.shape[1]:
+        return None
+    res = cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    return max_val, (x1 + max_loc[0], y1 + max_loc[1])
+
+
+def _coarse_candidates(res: np.ndarray, count: int, min_val: float, suppress: tuple[int, int]) -> list:
+    """从匹配结果中取出得分最高的若干个互不重叠的候选点"""
+    res = res.copy()
+    result = []
+    sw, sh = suppress
+    for _ in range(count):
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        if max_val < min_val:
+            break
+        result.append(max_loc)
+        x, y = max_loc
+        res[max(0, y - sh) : y + sh + 1, max(0, x - sw) : x + sw + 1] = -1
+    return result
+
+
+class MatchEngine:
+    def __init__(self, cache_size: int = TEMPLATE_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._elements: OrderedDict = OrderedDict()
+        self._last_hits: dict = {}
+        self._lock = threading.Lock()
+        self.stats = {"template_hits": 0, "template_misses": 0, "last_hit": 0, "anchor_roi": 0, "full": 0}
+
+    @staticmethod
+    def element_key(input_data: dict, data: dict) -> str:
+        """优先使用元素 id，没有时以图片内容摘要作为键"""
+        element_id = input_data.get("elementId") or input_data.get("id")
+        if element_id:
+            return str(element_id)
+        h = hashlib.md5(data["img"]["self"].encode("utf-8"))
+        h.update((data["img"].get("parent") or "").encode("utf-8"))
+        return h.hexdigest()
+
+    def _element(self, key: str, data: dict, rw: float, rh: float, canny_flag: bool) -> Element:
+        cache_key = (key, round(rw, 4), round(rh, 4), canny_flag)
+        with self._lock:
+            element = self._elements.get(cache_key)
+            if element is not None:
+                self._elements.move_to_end(cache_key)
+                self.stats["template_hits"] += 1
+                return element
+        element = Element(data, rw, rh, canny_flag)
+        with self._lock:
+            self.stats["template_misses"] += 1
+            self._elements[cache_key] = element
+            while len(self._elements) > self.cache_size:
+                self._elements.popitem(last=False)
+        return element
+
+    def clear(self):
+        with self._lock:
+            self._elements.clear()
+            self._last_hits.clear()
+
+    @staticmethod
+    def search_full(gray: np.ndarray, template: Template, threshold: float):
+        """金字塔由粗到细全屏搜索，返回 (得分, 左上角坐标) 或 None"""
+        if gray.shape[0] < template.h or gray.shape[1] < template.w:
+            return None
+        level = template.levels
+        while level > 0 and (
+            gray.shape[0] >> level < template.pyramid[level].shape[0]
+            or gray.shape[1] >> level < template.pyramid[level].shape[1]
+        ):
+            level -= 1
+        if level == 0:
+            return _match_in(gray, template.gray, (0, 0, gray.shape[1], gray.shape[0]))
+
+        small = gray
+        for _ in range(level):
+            small = cv2.pyrDown(small)
+        res = cv2.matchTemplate(small, template.pyramid[level], cv2.TM_CCOEFF_NORMED)
+        tpl = template.pyramid[level]
+        candidates = _coarse_candidates(
+            res,
+            PYRAMID_CANDIDATES,
+            threshold - PYRAMID_COARSE_MARGIN,
+            (max(1, tpl.shape[1] // 2), max(1, tpl.shape[0] // 2)),
+        )
+
+        best = None
+        scale = 1 << level
+        margin = scale * 2
+        for cx, cy in candidates:
+            x, y = cx * scale, cy * scale
+            box = _clip_box(x - margin, y - margin, x + template.w + margin, y + template.h + margin, gray.shape)
+            hit = _match_in(gray, template.gray, box)
+            if hit is not None and (best is None or hit[0] > best[0]):
+                best = hit
+        return best
+
+    def locate(
+        self,
+        screen: np.ndarray,
+        element: Element,
+        key: str,
+        match_similarity: float = 0.95,
+        canny_flag: bool = False,
+    ) -> Optional[tuple[int, int, int, int]]:
+        """在截图（RGB 或灰度数组）中定位元素，返回 (x, y, w, h)"""
+        gray = _to_gray(screen, canny_flag)
+        target = element.target
+        threshold = CANNY_TARGET_THRESHOLD if canny_flag else match_similarity
+
+        # 1. 上次命中位置附近；有锚点的元素说明目标在屏幕上不唯一，由锚点区分，不走此捷径
+        last = self._last_hits.get(key) if element.anchor is None else None
+        if last is not None:
+            x, y = last
+            box = _clip_box(
+                x - LAST_HIT_MARGIN,
+                y - LAST_HIT_MARGIN,
+                x + target.w + LAST_HIT_MARGIN,
+                y + target.h + LAST_HIT_MARGIN,
+                gray.shape,
+            )
+            hit = _match_in(gray, target.gray, box)
+            if hit is not None and hit[0] >= threshold:
+                self.stats["last_hit"] += 1
+                return self._hit(key, hit[1], target)
+
+        # 2. 锚点相对区域
+        if element.anchor is not None:
+            anchor_threshold = CANNY_ANCHOR_THRESHOLD if canny_flag else match_similarity
+            anchor_hit = self.search_full(gray, element.anchor, anchor_threshold)
+            if anchor_hit is not None and anchor_hit[0] >= anchor_threshold:
+                ax, ay = anchor_hit[1]
+                # 拾取坐标为中心点，换算为目标左上角
+                rx = ax + element.anchor.w / 2 + element.offset[0] - target.w / 2
+                ry = ay + element.anchor.h / 2 + element.offset[1] - target.h / 2
+                box = _clip_box(
+                    math.ceil(rx - target.w * ROI_EXPAND),
+                    math.ceil(ry - target.h * ROI_EXPAND),
+                    math.ceil(rx + target.w * (1 + ROI_EXPAND)),
+                    math.ceil(ry + target.h * (1 + ROI_EXPAND)),
+                    gray.shape,
+                )
+                hit = _match_in(gray, target.gray, box)
+                if hit is not None and hit[0] >= threshold:
+                    logger.info("元素已在锚点相对范围内匹配完成")
+                    self.stats["anchor_roi"] += 1
+                    return self._hit(key, hit[1], target)
+            else:
+                logger.info("屏幕上不存在锚点元素或者当前界面像素过低导致找不到锚点元素")
+
+        # 3. 全屏兜底
+        hit = self.search_full(gray, target, threshold)
+        if hit is not None and hit[0] >= threshold:
+            logger.info(f"元素匹配完成 {hit[0]}")
+            self.stats["full"] += 1
+            return self._hit(key, hit[1], target)
+
+        logger.info("当前屏幕目标元素不存在或发生了变化")
+        self._last_hits.pop(key, None)
+        return None
+
+    def _hit(self, key: str, loc: tuple[int, int], template: Template) -> tuple[int, int, int, int]:
+        self._last_hits[key] = (int(loc[0]), int(loc[1]))
+        return int(loc[0]), int(loc[1]), template.w, template.h
+
+    def match(
+        self,
+        input_data: dict,
+        match_similarity: float = 0.95,
+        canny_flag: bool = False,
+        screen: Optional[np.ndarray] = None,
+    ) -> Optional[tuple[int, int, int, int]]:
+        """
+        匹配拾取的 CV 元素
+        :param input_data: 拾取数据，包含 elementData
+        :param screen: 截图 RGB 数组，不传时实时截屏
+        """
+        if input_data is None:
+            raise ValueError("input_data cannot be None")
+        data = input_data.get("elementData")
+        if isinstance(data, str):
+            data = json.loads(data)
+
+        if screen is None:
+            import pyautogui
+
+            screen = np.asarray(pyautogui.screenshot())
+
+        rw = screen.shape[1] / data["sr"]["screen_w"]
+        rh = screen.shape[0] / data["sr"]["screen_h"]
+        key = self.element_key(input_data, data)
+        element = self._element(key, data, rw, rh, canny_flag)
+        return self.locate(screen, element, key, match_similarity, canny_flag)
+
+
+match_engine = MatchEngine()
@@ -0,0 +1,141 @@
+import base64
+import io
+from unittest import TestCase
+
+import numpy as np
+from astronverse.vision.cv_engine import MatchEngine
+from PIL import Image
+
+SCREEN_W, SCREEN_H = 1920, 1080
+
+
+def to_base64(rgb: np.ndarray) -> str:
+    buffer = io.BytesIO()
+    Image.fromarray(rgb).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+def make_screen(seed=0) -> np.ndarray:
+    """合成截图：平滑背景上叠加随机色块，模拟界面元素"""
+    rng = np.random.default_rng(seed)
+    screen = np.full((SCREEN_H, SCREEN_W, 3), 235, dtype=np.uint8)
+    for _ in range(300):
+        x, y = rng.integers(0, SCREEN_W - 60), rng.integers(0, SCREEN_H - 30)
+        w, h = rng.integers(10, 60), rng.integers(8, 30)
+        screen[y : y + h, x : x + w] = rng.integers(0, 255, 3)
+    return screen
+
+
+def make_icon(seed=1, w=48, h=32, noise=False) -> np.ndarray:
+    """图标：由 8x8 的色块放大而成；noise=True 时为逐像素噪点，模拟细节很多的模板"""
+    rng = np.random.default_rng(seed)
+    if noise:
+        return rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    blocks = rng.integers(0, 255, (8, 8, 3), dtype=np.uint8)
+    return np.asarray(Image.fromarray(blocks).resize((w, h), Image.BILINEAR))
+
+
+def paste(screen: np.ndarray, icon: np.ndarray, x: int, y: int) -> np.ndarray:
+    screen = screen.copy()
+    screen[y : y + icon.shape[0], x : x + icon.shape[1]] = icon
+    return screen
+
+
+def pick_data(target, anchor=None, target_pos=(0, 0), anchor_pos=None, element_id="e1"):
+    return {
+        "elementId": element_id,
+        "elementData": {
+            "img": {"self": to_base64(target), "parent": to_base64(anchor) if anchor is not None else ""},
+            "pos": {
+                "self_x": target_pos[0],
+                "self_y": target_pos[1],
+                "parent_x": anchor_pos[0] if anchor_pos else "",
+                "parent_y": anchor_pos[1] if anchor_pos else "",
+            },
+            "sr": {"screen_w": SCREEN_W, "screen_h": SCREEN_H},
+        },
+    }
+
+
+class TestMatchEngine(TestCase):
+    def test_full_frame(self):
+        icon = make_icon()
+        screen = paste(make_screen(), icon, 1201, 613)
+        engine = MatchEngine()
+        self.assertEqual(engine.match(pick_data(icon), 0.95, screen=screen), (1201, 613, 48, 32))
+        self.assertEqual(engine.stats["full"], 1)
+
+    def test_full_frame_detailed_template(self):
+        icon = make_icon(noise=True)
+        screen = paste(make_screen(), icon, 777, 333)
+        engine = MatchEngine()
+        self.assertEqual(engine.match(pick_data(icon), 0.95, screen=screen), (777, 333, 48, 32))
+
+    def test_not_exist(self):
+        engine = MatchEngine()
+        self.assertIsNone(engine.match(pick_data(make_icon()), 0.95, screen=make_screen()))
+
+    def test_template_cache_and_last_hit(self):
+        icon = make_icon()
+        screen = paste(make_screen(), icon, 300, 200)
+        engine = MatchEngine()
+        data = pick_data(icon)
+        for _ in range(5):
+            self.assertEqual(engine.match(data, 0.95, screen=screen), (300, 200, 48, 32))
+        self.assertEqual(engine.stats["template_misses"], 1)
+        self.assertEqual(engine.stats["template_hits"], 4)
+        self.assertEqual(engine.stats["last_hit"], 4)
+
+        # 元素移动后回退到全屏搜索
+        moved = paste(make_screen(), icon, 1500, 900)
+        self.assertEqual(engine.match(data, 0.95, screen=moved), (1500, 900, 48, 32))
+
+    def test_anchor_disambiguates(self):
+        icon = make_icon()
+        anchor = make_icon(seed=2, w=80, h=24)
+        screen = paste(paste(make_screen(), icon, 100, 100), icon, 900, 500)
+        screen = paste(screen, anchor, 850, 440)
+        data = pick_data(icon, anchor, target_pos=(924, 516), anchor_pos=(890, 452))
+        engine = MatchEngine()
+        self.assertEqual(engine.match(data, 0.95, screen=screen), (900, 500, 48, 32))
+        self.assertEqual(engine.stats["anchor_roi"], 1)
+
+    def test_scaled_screen(self):
+        """拾取时 1920x1080，运行时 2880x1620（150%）"""
+        icon = make_icon(w=64, h=40)
+        engine = MatchEngine()
+        screen = make_screen()
+        big_icon = np.asarray(Image.fromarray(icon).resize((96, 60), Image.BICUBIC))
+        big = np.asarray(Image.fromarray(screen).resize((2880, 1620), Image.NEAREST)).copy()
+        big[600:660, 1000:1096] = big_icon
+        box = engine.match(pick_data(icon), 0.9, screen=big)
+        self.assertIsNotNone(box)
+        self.assertLessEqual(abs(box[0] - 1000), 2)
+        self.assertLessEqual(abs(box[1] - 600), 2)
+
+    def test_anchor_checked_before_last_hit(self):
+        """目标重复出现时，上次命中位置附近的副本不能绕过锚点"""
+        icon = make_icon()
+        anchor = make_icon(seed=2, w=80, h=24)
+        data = pick_data(icon, anchor, target_pos=(924, 516), anchor_pos=(890, 452))
+        engine = MatchEngine()
+        screen = paste(paste(paste(make_screen(), icon, 100, 100), icon, 900, 500), anchor, 850, 440)
+        self.assertEqual(engine.match(data, 0.95, screen=screen), (900, 500, 48, 32))
+
+        # 锚点移到另一个副本旁，上次命中的位置仍然有一个副本
+        screen = paste(paste(paste(make_screen(), icon, 100, 100), icon, 900, 500), anchor, 50, 40)
+        self.assertEqual(engine.match(data, 0.95, screen=screen), (100, 100, 48, 32))
+        self.assertEqual(engine.stats["anchor_roi"], 2)
+        self.assertEqual(engine.stats["last_hit"], 0)
+
+    def test_repeat_match_uses_last_hit(self):
+        icon = make_icon()
+        screen = paste(make_screen(), icon, 1201, 613)
+        data = pick_data(icon)
+
+        engine = MatchEngine()
+        for _ in range(21):
+            self.assertEqual(engine.match(data, 0.95, screen=screen), (1201, 613, 48, 32))
+        # 只有首次全屏搜索，之后都在上次命中位置附近完成
+        self.assertEqual(engine.stats["full"], 1)
+        self.assertEqual(engine.stats["last_hit"], 20)
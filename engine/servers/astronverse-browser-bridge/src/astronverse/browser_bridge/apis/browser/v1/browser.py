@@ -4,30 +4,14 @@ from astronverse.browser_bridge.apis.context import ServiceContext, get_svc
 from astronverse.browser_bridge.apis.response import CustomResponse
 from astronverse.browser_bridge.apis.ws_route import error_to_base_error, wsmg
 from astronverse.browser_bridge.error import *
+from astronverse.browser_bridge.scripts import is_cache_miss, script_registry
 from astronverse.websocket_server.ws_service import BaseMsg
 from fastapi import APIRouter, Depends, Request
 
 router = APIRouter()
 
 
-@router.post("/transition")
-async def transition(request: Request, svc: ServiceContext = Depends(get_svc)):
-    req_data = await request.json()
-    key = req_data.get("key", "")
-    data = req_data.get("data", {})
-    data_path = req_data.get("data_path", "")
-    time_out_ws = req_data.get("time_out", 10)
-    if data_path and not data:
-        with open(data_path, encoding="utf-8") as file:
-            # 读取文件内容
-            data = file.read()
-    browser_type = req_data.get("browser_type", "")
-    if (not key) or (not data) or (not browser_type):
-        raise BaseException(
-            PARAMETER_ERROR_FORMAT.format((key, data, browser_type)),
-            "error: PARAMETER ERROR FORMAT {}".format((key, data, browser_type)),
-        )
-
+async def _send_wait(key: str, data, browser_type: str, time_out_ws):
     wait = asyncio.Event()
     res = {}
     res_e = None
@@ -55,6 +39,37 @@ async def transition(request: Request, svc: ServiceContext = Depends(get_svc)):
     await wait.wait()
     if res_e:
         raise error_to_base_error(res_e)
+    return res
+
+
+@router.post("/transition")
+async def transition(request: Request, svc: ServiceContext = Depends(get_svc)):
+    req_data = await request.json()
+    key = req_data.get("key", "")
+    data = req_data.get("data", {})
+    data_path = req_data.get("data_path", "")
+    time_out_ws = req_data.get("time_out", 10)
+    browser_type = req_data.get("browser_type", "")
+    script = None
+    if data_path and not data:
+        # 脚本按内容哈希缓存，插件已有时只发送哈希
+        script = script_registry.load(data_path)
+        data = script.code
+    if (not key) or (not data) or (not browser_type):
+        raise BaseException(
+            PARAMETER_ERROR_FORMAT.format((key, data, browser_type)),
+            "error: PARAMETER ERROR FORMAT {}".format((key, data, browser_type)),
+        )
+
+    if script is None:
+        res = await _send_wait(key, data, browser_type, time_out_ws)
+    else:
+        conns = wsmg.conns.get("${}$".format(browser_type), [])
+        res = await _send_wait(key, script_registry.payload(conns, script), browser_type, time_out_ws)
+        if is_cache_miss(res):
+            # 插件缓存已失效，带上脚本内容重发
+            script_registry.forget(conns, script)
+            res = await _send_wait(key, script_registry.payload(conns, script), browser_type, time_out_ws)
 
     # 正常回复
     return CustomResponse.tojson(res)
@@ -63,3 +78,8 @@ async def transition(request: Request, svc: ServiceContext = Depends(get_svc)):
 @router.get("/health")
 async def health():
     return "ok"
+
+
+@router.get("/scripts")
+async def scripts():
+    return CustomResponse.tojson(script_registry.stats())
@@ -1,4 +1,3 @@
-import asyncio
 import os
 import traceback
 from base64 import b64decode
@@ -8,6 +7,7 @@ from astronverse.browser_bridge.apis.context import ServiceContext, get_svc
 from astronverse.browser_bridge.apis.response import CustomResponse
 from astronverse.browser_bridge.error import *
 from astronverse.browser_bridge.logger import logger
+from astronverse.browser_bridge.scripts import parse_hashes, script_registry
 from astronverse.websocket_server.ws import BaseMsg, Conn, IWebSocket, WsException
 from astronverse.websocket_server.ws_service import WsManager
 from fastapi import APIRouter, Depends
@@ -64,22 +64,29 @@ class WsSocket(IWebSocket):
         return await self.ws.close()
 
 
-async def browser_init_inject(ws: IWebSocket, uuid: str):
-    data_list = [
-        {"data_path": os.path.join(inject_path, "backgroundInject.js"), "key": "backgroundInject"},
-        {"data_path": os.path.join(inject_path, "contentInject.js"), "key": "contentInject"},
-    ]
-    for data in data_list:
-        with open(data.get("data_path"), encoding="utf-8") as file:
-            file_data = file.read()
-        await ws.send(
+INJECT_SCRIPTS = {
+    "backgroundInject": os.path.join(inject_path, "backgroundInject.js"),
+    "contentInject": os.path.join(inject_path, "contentInject.js"),
+}
+
+
+def preload_inject_scripts():
+    for path in INJECT_SCRIPTS.values():
+        script_registry.load(path)
+
+
+async def browser_init_inject(conn: Conn, uuid: str):
+    for key, path in INJECT_SCRIPTS.items():
+        script = script_registry.load(path)
+        await conn.send_text(
             BaseMsg(
                 channel="browser",
-                key=data.get("key"),
+                key=key,
                 uuid="$root$",
                 send_uuid=uuid,
                 need_ack=False,
-                data=file_data,
+                # 不等待回复，插件缓存未命中时无法重发，因此总是带上脚本内容
+                data=script_registry.payload([conn], script, full=True),
             )
             .init()
             .tojson()
@@ -87,7 +94,9 @@ async def browser_init_inject(ws: IWebSocket, uuid: str):
 
 
 @router.websocket("")
-async def websocket_endpoint(ws: WebSocket, svc: ServiceContext = Depends(get_svc), token: str = None):
+async def websocket_endpoint(
+    ws: WebSocket, svc: ServiceContext = Depends(get_svc), token: str = None, scripts: str = None
+):
     await ws.accept()
     if not token:
         token = ws.headers.get("token", "")
@@ -100,6 +109,12 @@ async def websocket_endpoint(ws: WebSocket, svc: ServiceContext = Depends(get_sv
     if not uuid:
         return
 
-    ws = WsSocket(ws)
-    await browser_init_inject(ws, uuid)
-    await asyncio.gather(wsmg.listen(uuid, Conn(ws=ws), svc), wsmg.start_ping(), wsmg.clear_watch())
+    # ping检查和watch清理在应用启动时统一启动，这里只负责本连接的消息
+    conn = Conn(ws=WsSocket(ws))
+    if scripts is not None:
+        script_registry.add_conn(conn, parse_hashes(scripts))
+    try:
+        await browser_init_inject(conn, uuid)
+        await wsmg.listen(uuid, conn, svc)
+    finally:
+        script_registry.remove_conn(conn)
@@ -0,0 +1,124 @@
+"""
+脚本注册表
+
+注入脚本和 /transition 的 data_path 脚本只从磁盘读取一次，按内容哈希登记：
+- 文件的修改时间、大小不变时直接使用缓存，不再重复读取
+- 插件连接时通过 scripts 参数声明支持脚本缓存，并带上本地已缓存的哈希
+- 发给支持缓存的连接时，对方没有的脚本发送 {"$script": 哈希, "code": 脚本}，已有的只发送 {"$script": 哈希}
+- 插件缓存丢失时回复 SCRIPT_CACHE_MISS，调用方带上脚本内容重发；不等待回复的消息（连接时的注入脚本）总是带上脚本内容
+- 插件最多缓存 MAX_CACHED_SCRIPTS 个脚本，按收到脚本内容的先后淘汰最早的，这里按同样的顺序淘汰记录
+- 未声明支持的旧版插件仍然收到原始脚本内容
+"""
+
+import hashlib
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+SCRIPT_FIELD = "$script"
+SCRIPT_CODE_FIELD = "code"
+# 插件端脚本缓存未命中
+SCRIPT_CACHE_MISS = "5010"
+
+# 插件端最多缓存的脚本数，与插件 scriptCache.ts 的 MAX_SCRIPTS 一致
+MAX_CACHED_SCRIPTS = 32
+
+
+@dataclass(frozen=True)
+class Script:
+    hash: str
+    code: str
+
+
+def script_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()[:16]
+
+
+def parse_hashes(value: str) -> list[str]:
+    """解析连接参数中的哈希列表，逗号分隔，由旧到新"""
+    return [h for h in value.split(",") if h][-MAX_CACHED_SCRIPTS:]
+
+
+def is_cache_miss(data) -> bool:
+    return isinstance(data, dict) and data.get("code") == SCRIPT_CACHE_MISS
+
+
+class ScriptRegistry:
+    def __init__(self):
+        # 文件路径 -> ((修改时间, 大小), 脚本)
+        self._files: dict[str, tuple[tuple[int, int], Script]] = {}
+        # 支持脚本缓存的连接 -> 对方已有的脚本哈希（由旧到新，与插件的淘汰顺序一致）
+        self._known: dict[int, dict[str, None]] = {}
+
+        # 统计
+        self.loads = 0
+        self.full_sent = 0
+        self.ref_sent = 0
+
+    def load(self, path: str) -> Script:
+        """读取脚本文件，文件未变化时返回缓存"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._files.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        with open(path, encoding="utf-8") as file:
+            code = file.read()
+        script = Script(hash=script_hash(code), code=code)
+        self._files[path] = (key, script)
+        self.loads += 1
+        return script
+
+    def add_conn(self, conn, hashes: Iterable[str] = ()):
+        """登记支持脚本缓存的连接，hashes 为插件本地已缓存的脚本"""
+        self._known[id(conn)] = dict.fromkeys(hashes)
+
+    def remove_conn(self, conn):
+        self._known.pop(id(conn), None)
+
+    def payload(self, conns: list, script: Script, full: bool = False):
+        """
+        生成发给一组连接的消息数据，发送后这些连接视为已有该脚本
+        :param full: 总是带上脚本内容，用于收不到缓存未命中回复的消息
+        """
+        known = [self._known.get(id(conn)) for conn in conns]
+        if not known or any(k is None for k in known):
+            # 存在旧版插件，发送原始脚本
+            self.full_sent += 1
+            return script.code
+
+        data = {SCRIPT_FIELD: script.hash}
+        if not full and all(script.hash in k for k in known):
+            self.ref_sent += 1
+            return data
+
+        data[SCRIPT_CODE_FIELD] = script.code
+        for k in known:
+            # 插件收到脚本内容时把它移到最新，超出上限时淘汰最早的
+            k.pop(script.hash, None)
+            k[script.hash] = None
+            while len(k) > MAX_CACHED_SCRIPTS:
+                del k[next(iter(k))]
+        self.full_sent += 1
+        return data
+
+    def forget(self, conns: list, script: Script):
+        """插件缓存未命中时调用，下次发送带上脚本内容"""
+        for conn in conns:
+            k = self._known.get(id(conn))
+            if k is not None:
+                k.pop(script.hash, None)
+
+    def stats(self) -> dict:
+        return {
+            "scripts": len(self._files),
+            "conns": len(self._known),
+            "loads": self.loads,
+            "full_sent": self.full_sent,
+            "ref_sent": self.ref_sent,
+        }
+
+
+script_registry = ScriptRegistry()
@@ -1,15 +1,28 @@
 import argparse
 import os
+from contextlib import asynccontextmanager
 
 import uvicorn
-from astronverse.browser_bridge.apis import context, route
+from astronverse.browser_bridge.apis import context, route, ws_route
 from astronverse.browser_bridge.config import Config as conf
 from astronverse.browser_bridge.logger import logger  # 必须排第一
 from fastapi import FastAPI
 from no_config import Config
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 每个WsManager只启动一份ping检查和watch清理，与连接数无关
+    ws_route.preload_inject_scripts()
+    ws_route.wsmg.start_background()
+    try:
+        yield
+    finally:
+        await ws_route.wsmg.stop_background()
+
+
 # 0. app实例化，并做初始化
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 route.handler(app)
 
 
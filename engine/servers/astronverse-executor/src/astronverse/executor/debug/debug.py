@@ -68,22 +68,20 @@ class Debug:
     def start(self, params: list) -> dict:
         """执行代码"""
 
-        # 环境准备, 下载依赖环境
+        # 环境准备, 下载依赖环境（工程与组件的依赖合并后整体安装）
+        requirements = []
         if self.svc.ast_globals.project_info.requirement:
-            for k, v in self.svc.ast_globals.project_info.requirement.items():
-                self.svc.package.download(
-                    library=v.get("package_name"),
-                    version=v.get("package_version", ""),
-                    mirror=v.get("package_mirror", ""),
-                )
+            requirements.extend(self.svc.ast_globals.project_info.requirement.values())
         if self.svc.ast_globals.component_info:
             for c_id, c in self.svc.ast_globals.component_info.items():
-                for k, v in c.requirement.items():
-                    self.svc.package.download(
-                        library=v.get("package_name"),
-                        version=v.get("package_version", ""),
-                        mirror=v.get("package_mirror", ""),
-                    )
+                if c.requirement:
+                    requirements.extend(c.requirement.values())
+        if requirements:
+            self.svc.package.install(
+                requirements,
+                project_id=self.svc.ast_globals.project_info.project_id,
+                version=self.svc.ast_globals.project_info.version,
+            )
 
         # 断点设置
         if self.svc.debug_model:
@@ -0,0 +1,262 @@
+"""
+依赖管理
+
+把一个机器人（含其组件）的全部 pip 依赖作为一个整体处理：
+1. 一次解析：pip install --dry-run --report 基于当前已安装的包解析，得到需要安装的包（含传递依赖）
+2. 并行下载：缺失的 wheel 按解析结果的地址并行下载到终端级共享缓存，按 sha256 校验
+3. 一次安装：离线 --no-index --find-links 指向共享缓存，带 hash 一次性安装，由 pip 校验依赖约束
+4. 锁文件：按 工程id/版本 记录解析结果，后续运行跳过解析；依赖均已安装时完全不调用 pip
+
+缓存目录结构（package_cache_dir 下）：
+    wheels/                 共享 wheel 缓存，文件名即 wheel 名，内容由锁文件中的 sha256 校验
+    locks/<project_id>/     每个机器人版本一个锁文件 <version>.json
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+import requests
+from astronverse.executor.logger import logger
+from astronverse.executor.utils.utils import exec_run
+from importlib_metadata import version as check_version
+
+# 并行下载线程数
+DOWNLOAD_WORKERS = 8
+# 单个 pip 命令超时时间
+PIP_TIMEOUT = 600
+# 锁文件格式版本，解析方式变化时递增，旧锁文件自动失效
+LOCK_VERSION = "2"
+
+
+def canonical_name(name: str) -> str:
+    """PEP 503 规范化包名"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def installed_version(name: str) -> Optional[str]:
+    try:
+        return check_version(name)
+    except Exception:
+        return None
+
+
+def mirror_args(mirrors: list[str]) -> list[str]:
+    """第一个镜像作为主源，其余作为附加源"""
+    args = []
+    for i, mirror in enumerate(mirrors):
+        args += ["--index-url" if i == 0 else "--extra-index-url", mirror]
+        args += ["--trusted-host", urlparse(mirror).hostname]
+    return args
+
+
+class DependencyConflict(ValueError):
+    """解析结果需要改动环境中已安装的非直接依赖，逐个安装同样会冲突，不回退"""
+
+
+class DependencyManager:
+    def __init__(self, cache_dir: str):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.wheel_dir = os.path.join(self.cache_dir, "wheels")
+        self.lock_dir = os.path.join(self.cache_dir, "locks")
+        os.makedirs(self.wheel_dir, exist_ok=True)
+
+    def lock_path(self, project_id: str, version: str) -> str:
+        return os.path.join(self.lock_dir, project_id or "default", "{}.json".format(version or "latest"))
+
+    @staticmethod
+    def lock_key(specs: list[str]) -> str:
+        """依赖集合 + 解释器 + 平台 + 锁格式版本 决定锁是否可复用"""
+        content = "\n".join(sorted(specs) + [sys.version.split()[0], sys.platform, LOCK_VERSION])
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def load_lock(self, path: str, key: str) -> Optional[dict]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                lock = json.load(f)
+        except Exception as e:
+            logger.warning("lock 文件读取失败 {}: {}".format(path, e))
+            return None
+        if lock.get("key") != key:
+            return None
+        return lock
+
+    @staticmethod
+    def save_lock(path: str, lock: dict):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(lock, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def missing(packages: list[dict]) -> list[dict]:
+        """锁中版本不一致或未安装的包"""
+        return [p for p in packages if installed_version(p["name"]) != p["version"]]
+
+    @staticmethod
+    def check_conflicts(packages: list[dict]):
+        """
+        执行器与机器人共用解释器，机器人未直接声明的包（numpy、requests 等传递依赖）
+        如果需要升级/降级已安装的版本，拒绝安装，避免影响执行器自身及其他机器人
+        """
+        conflicts = []
+        for p in packages:
+            current = installed_version(p["name"])
+            if current is not None and current != p["version"] and not p.get("requested"):
+                conflicts.append("{} {} -> {}".format(p["name"], current, p["version"]))
+        if conflicts:
+            raise DependencyConflict(", ".join(conflicts))
+
+    def resolve(self, specs: list[str], mirrors: list[str]) -> Optional[list[dict]]:
+        """
+        一次解析完整依赖树，返回 [{name, version, file, url, sha256}]
+        存在无法锁定的来源（本地目录、vcs 等）时返回 None
+        """
+        fd, report = tempfile.mkstemp(suffix=".json", prefix="pip_report_")
+        os.close(fd)
+        try:
+            exec_run(
+                [
+                    sys.executable,
+                    "-m",
+                    "pip",
+                    "install",
+                    *specs,
+                    "--dry-run",
+                    "--report",
+                    report,
+                    "--find-links={}".format(self.wheel_dir),
+                    *mirror_args(mirrors),
+                    "--disable-pip-version-check",
+                ],
+                False,
+                PIP_TIMEOUT,
+            )
+            with open(report, encoding="utf-8") as f:
+                items = json.load(f).get("install", [])
+        finally:
+            os.remove(report)
+
+        packages = []
+        for item in items:
+            info = item.get("download_info", {})
+            if "archive_info" not in info:
+                return None
+            url = info["url"]
+            archive = info["archive_info"]
+            sha256 = archive.get("hashes", {}).get("sha256", "")
+            if not sha256 and archive.get("hash", "").startswith("sha256="):
+                sha256 = archive["hash"][len("sha256=") :]
+            packages.append(
+                {
+                    "name": canonical_name(item["metadata"]["name"]),
+                    "version": item["metadata"]["version"],
+                    "file": unquote(os.path.basename(urlparse(url).path)),
+                    "url": url,
+                    "sha256": sha256,
+                    "requested": bool(item.get("requested")),
+                }
+            )
+        return packages
+
+    def _fetch(self, package: dict):
+        """下载单个文件到共享缓存，校验 sha256 后原子替换"""
+        target = os.path.join(self.wheel_dir, package["file"])
+        if os.path.exists(target):
+            if not package["sha256"] or file_sha256(target) == package["sha256"]:
+                return
+            logger.warning("缓存文件校验失败，重新下载: {}".format(target))
+
+        url = package["url"]
+        if url.startswith("file:"):
+            raise FileNotFoundError(target)
+        tmp = target + ".part"
+        h = hashlib.sha256()
+        with requests.get(url, stream=True, timeout=60, proxies={"http": None, "https": None}) as r:
+            r.raise_for_status()
+            with open(tmp, "wb") as f:
+                for chunk in r.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+                    h.update(chunk)
+        if package["sha256"] and h.hexdigest() != package["sha256"]:
+            os.remove(tmp)
+            raise ValueError("sha256 mismatch: {}".format(package["file"]))
+        os.replace(tmp, target)
+
+    def fetch(self, packages: list[dict]):
+        """并行补齐共享缓存中缺失的文件"""
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix="pip_fetch") as pool:
+            for _ in pool.map(self._fetch, packages):
+                pass
+        for package in packages:
+            if not package["sha256"]:
+                package["sha256"] = file_sha256(os.path.join(self.wheel_dir, package["file"]))
+
+    def install_locked(self, packages: list[dict]):
+        """离线、带 hash 一次性安装，pip 按已安装的包校验依赖约束"""
+        fd, req_file = tempfile.mkstemp(suffix=".txt", prefix="pip_lock_")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for p in packages:
+                f.write("{}=={} --hash=sha256:{}\n".format(p["name"], p["version"], p["sha256"]))
+        try:
+            exec_run(
+                [
+                    sys.executable,
+                    "-m",
+                    "pip",
+                    "install",
+                    "-r",
+                    req_file,
+                    "--no-index",
+                    "--require-hashes",
+                    "--find-links={}".format(self.wheel_dir),
+                    "--no-warn-script-location",
+                    "--disable-pip-version-check",
+                ],
+                False,
+                PIP_TIMEOUT,
+            )
+        finally:
+            os.remove(req_file)
+
+    def sync(self, specs: list[str], mirrors: list[str], project_id: str = "", version: str = "") -> bool:
+        """
+        同步依赖，返回是否实际调用了 pip 安装
+        锁文件命中且均已安装时不调用 pip
+        """
+        path = self.lock_path(project_id, version)
+        key = self.lock_key(specs)
+        lock = self.load_lock(path, key)
+        if lock is not None:
+            packages = lock["packages"]
+        else:
+            packages = self.resolve(specs, mirrors)
+            if packages is None:
+                raise ValueError("存在无法锁定的依赖来源")
+
+        todo = self.missing(packages)
+        self.check_conflicts(todo)
+        if todo:
+            self.fetch(todo)
+            self.install_locked(todo)
+
+        if lock is None:
+            self.save_lock(path, {"key": key, "specs": sorted(specs), "packages": packages})
+        return len(todo) > 0
@@ -3,6 +3,7 @@ import sys
 from urllib.parse import urlparse
 
 from astronverse.actionlib import ReportTip
+from astronverse.executor.debug.dependency import DependencyConflict, DependencyManager
 from astronverse.executor.error import *
 from astronverse.executor.logger import logger
 from astronverse.executor.utils.utils import exec_run
@@ -42,11 +43,69 @@ def find_version(lib, ver, ver_strict) -> bool:
     return False
 
 
+def requirement_spec(library: str, version: str, version_strict: bool = False) -> str:
+    """pip 依赖描述，宽松模式锁定主版本号"""
+    if not version:
+        return library
+    if version_strict:
+        return "{}=={}".format(library, version)
+    v1 = [[int(x) for x in version.split(".")][0]]
+    v2 = [v1[0] + 1]
+    return "{}>={},<{}".format(library, ".".join(str(x) for x in v1), ".".join(str(x) for x in v2))
+
+
 class Package:
     def __init__(self, svc):
         self.svc = svc
         self.library_cache = {}
 
+    def install(self, requirements: list[dict], project_id: str = "", version: str = ""):
+        """
+        整体安装机器人的全部依赖（一次解析、并行下载、一次安装、按版本写锁文件）
+        下载/pip 失败时回退为逐个下载安装，版本冲突直接报错
+        """
+        libraries = {}
+        for v in requirements:
+            library = v.get("package_name")
+            if library and library not in self.library_cache:
+                libraries[library] = v
+        if not libraries:
+            return
+
+        # 全部满足时直接结束，不调用pip
+        todo = {
+            k: v
+            for k, v in libraries.items()
+            if not find_version(k, v.get("package_version", ""), v.get("version_strict", False))
+        }
+        if not todo:
+            self.library_cache.update(dict.fromkeys(libraries, True))
+            return
+
+        specs = [
+            requirement_spec(k, v.get("package_version", ""), v.get("version_strict", False))
+            for k, v in libraries.items()
+        ]
+        mirrors = list(dict.fromkeys(v.get("package_mirror") for v in libraries.values() if v.get("package_mirror")))
+        names = ",".join(todo.keys())
+        try:
+            self.svc.report.info(ReportTip(msg_str=MSG_DOWNLOAD_FORMAT.format(names)))
+            DependencyManager(self.svc.conf.package_cache_dir).sync(specs, mirrors, project_id, version)
+            self.library_cache.update(dict.fromkeys(libraries, True))
+            self.svc.report.info(ReportTip(msg_str=MSG_DOWNLOAD_SUCCESS_FORMAT.format(names)))
+        except DependencyConflict as e:
+            logger.error("依赖版本冲突: {}".format(e))
+            raise BaseException(DEPENDENCY_CONFLICT_ERROR_FORMAT.format(e), str(e)) from e
+        except Exception as e:
+            logger.warning("依赖整体安装失败，回退为逐个安装: {}".format(e))
+            for k, v in todo.items():
+                self.download(
+                    library=k,
+                    version=v.get("package_version", ""),
+                    mirror=v.get("package_mirror", ""),
+                    version_strict=v.get("version_strict", False),
+                )
+
     def download(self, library: str, version: str, mirror: str = "", version_strict: bool = False, error_try=True):
         # 1. 快速结束
         if not library:
@@ -71,15 +130,7 @@ class Package:
         # 6. 下载
 
         # 6.1 下载的名称
-        if version:
-            if version_strict:
-                cmd_name = "{}=={}".format(library, version)
-            else:
-                v1 = [[int(x) for x in version.split(".")][0]]
-                v2 = [v1[0] + 1]
-                cmd_name = "{}>={},<{}".format(library, ".".join(str(x) for x in v1), ".".join(str(x) for x in v2))
-        else:
-            cmd_name = library
+        cmd_name = requirement_spec(library, version, version_strict)
 
         # 6.2 下载的mirror
         if mirror:
@@ -22,6 +22,7 @@ ONLY_ONE_CATCH_CAN_BE_RETAINED = _("只能保留一个catch语句")
 # 外部获取
 ELEMENT_ACCESS_ERROR_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("元素获取异常: {}"))
 PROCESS_ACCESS_ERROR_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("工程数据异常: {}"))
+DEPENDENCY_CONFLICT_ERROR_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("依赖与当前环境已安装的版本冲突: {}"))
 
 # 报告和状态消息
 MSG_FLOW_INIT_START = _("开始初始化...")
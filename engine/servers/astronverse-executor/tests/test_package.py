@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from astronverse.executor.debug import dependency, package
+from astronverse.executor.debug.dependency import DependencyConflict, DependencyManager
+from astronverse.executor.debug.package import Package
+from astronverse.executor.error import BaseException
+
+REQUIREMENTS = [
+    {"package_name": "alpha", "package_version": "1.0", "version_strict": True},
+    {"package_name": "beta", "package_version": "2", "package_mirror": "https://mirror.example/simple"},
+]
+
+
+def locked(name, version, requested=True):
+    return {"name": name, "version": version, "file": "{}-{}.whl".format(name, version), "sha256": "0" * 64,
+            "url": "https://mirror.example/{}-{}.whl".format(name, version), "requested": requested}
+
+
+class FakeSvc:
+    def __init__(self, cache_dir):
+        self.conf = MagicMock(package_cache_dir=cache_dir)
+        self.report = MagicMock()
+
+
+class TestDependencyManager(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = DependencyManager(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def save_lock(self, specs, packages, project_id="p", version="1"):
+        self.manager.save_lock(
+            self.manager.lock_path(project_id, version),
+            {"key": self.manager.lock_key(specs), "specs": sorted(specs), "packages": packages},
+        )
+
+    def test_conflict_with_installed_transitive_dependency(self):
+        installed = {"alpha": "1.0", "numpy": "1.26.4"}
+        packages = [locked("alpha", "1.0"), locked("numpy", "2.0.0", requested=False)]
+        with patch.object(dependency, "installed_version", installed.get):
+            with self.assertRaises(DependencyConflict) as ctx:
+                self.manager.check_conflicts(packages)
+        self.assertIn("numpy 1.26.4 -> 2.0.0", str(ctx.exception))
+
+        # 机器人直接声明的包允许升级，未安装的传递依赖直接安装
+        with patch.object(dependency, "installed_version", installed.get):
+            self.manager.check_conflicts([locked("alpha", "2.0"), locked("scipy", "1.13.0", requested=False)])
+
+    def test_locked_and_installed_skips_pip(self):
+        specs = ["alpha==1.0"]
+        self.save_lock(specs, [locked("alpha", "1.0")])
+        with (
+            patch.object(dependency, "installed_version", {"alpha": "1.0"}.get),
+            patch.object(dependency, "exec_run") as exec_run,
+        ):
+            self.assertFalse(self.manager.sync(specs, [], "p", "1"))
+        exec_run.assert_not_called()
+
+    def test_conflict_is_raised_before_download(self):
+        specs = ["alpha==1.0"]
+        self.save_lock(specs, [locked("alpha", "1.0"), locked("numpy", "2.0.0", requested=False)])
+        with (
+            patch.object(dependency, "installed_version", {"numpy": "1.26.4"}.get),
+            patch.object(self.manager, "fetch") as fetch,
+            patch.object(dependency, "exec_run") as exec_run,
+        ):
+            with self.assertRaises(DependencyConflict):
+                self.manager.sync(specs, [], "p", "1")
+        fetch.assert_not_called()
+        exec_run.assert_not_called()
+
+    def test_resolved_packages_are_locked(self):
+        specs = ["alpha==1.0"]
+        with (
+            patch.object(self.manager, "resolve", return_value=[locked("alpha", "1.0")]),
+            patch.object(dependency, "installed_version", lambda name: None),
+            patch.object(self.manager, "fetch") as fetch,
+            patch.object(self.manager, "install_locked") as install_locked,
+        ):
+            self.assertTrue(self.manager.sync(specs, [], "p", "1"))
+        fetch.assert_called_once()
+        install_locked.assert_called_once()
+        with open(self.manager.lock_path("p", "1"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["packages"], [locked("alpha", "1.0")])
+
+
+class TestPackageInstall(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.package = Package(FakeSvc(os.path.join(self.tmp.name, "cache")))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_all_satisfied_short_circuits(self):
+        with (
+            patch.object(package, "find_version", return_value=True),
+            patch.object(package, "DependencyManager") as manager,
+            patch.object(self.package, "download") as download,
+        ):
+            self.package.install(REQUIREMENTS, "p", "1")
+        manager.assert_not_called()
+        download.assert_not_called()
+        self.assertEqual(set(self.package.library_cache), {"alpha", "beta"})
+
+    def test_installs_all_requirements_at_once(self):
+        with (
+            patch.object(package, "find_version", return_value=False),
+            patch.object(package, "DependencyManager") as manager,
+            patch.object(self.package, "download") as download,
+        ):
+            self.package.install(REQUIREMENTS, "p", "1")
+        manager.return_value.sync.assert_called_once_with(
+            ["alpha==1.0", "beta>=2,<3"], ["https://mirror.example/simple"], "p", "1"
+        )
+        download.assert_not_called()
+
+    def test_pip_failure_falls_back_to_single_packages(self):
+        with (
+            patch.object(package, "find_version", lambda lib, ver, strict: lib == "alpha"),
+            patch.object(package, "DependencyManager") as manager,
+            patch.object(self.package, "download") as download,
+        ):
+            manager.return_value.sync.side_effect = TimeoutError("error: timeout")
+            self.package.install(REQUIREMENTS, "p", "1")
+        download.assert_called_once_with(
+            library="beta", version="2", mirror="https://mirror.example/simple", version_strict=False
+        )
+
+    def test_conflict_is_reported_without_fallback(self):
+        with (
+            patch.object(package, "find_version", return_value=False),
+            patch.object(package, "DependencyManager") as manager,
+            patch.object(self.package, "download") as download,
+        ):
+            manager.return_value.sync.side_effect = DependencyConflict("numpy 1.26.4 -> 2.0.0")
+            with self.assertRaises(BaseException) as ctx:
+                self.package.install(REQUIREMENTS, "p", "1")
+        self.assertIn("numpy 1.26.4 -> 2.0.0", ctx.exception.message)
+        download.assert_not_called()
+        self.assertEqual(self.package.library_cache, {})
@@ -0,0 +1,124 @@
+"""
+拾取请求调度
+
+ws 服务只有一个事件循环，录制的悬停推送、F4/ESC 回调、推送确认都在这个循环里处理：
+- 浏览器插件等阻塞调用交给有上限的线程池执行，事件循环不被占用
+- UIA/MSAA 等 COM 调用交给唯一的 COM 线程（单线程套间），COM 对象只在创建它的线程上使用
+- 每个拾取请求作为独立任务运行，新的请求可以取代同类的旧请求，旧请求被取消并回复 cancel
+- 线程池中已经开始的调用无法中断，取消后只是丢弃其结果
+"""
+
+import asyncio
+import functools
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from astronverse.picker import PickerSign
+from astronverse.picker.logger import logger
+
+# 线程池大小
+MAX_WORKERS = 4
+
+# 新请求到来时需要取消的进行中请求
+SUPERSEDES = {
+    PickerSign.START: (PickerSign.VALIDATE,),
+    PickerSign.VALIDATE: (PickerSign.VALIDATE,),
+    PickerSign.HIGHLIGHT: (PickerSign.HIGHLIGHT,),
+    PickerSign.GAIN: (PickerSign.GAIN,),
+}
+
+
+class Superseded(Exception):
+    """请求被更新的请求取代"""
+
+
+def _init_com_worker():
+    """COM 线程初始化为单线程套间（STA），UIA/MSAA 调用需要"""
+    try:
+        import pythoncom
+
+        pythoncom.CoInitialize()
+    except ImportError:
+        pass
+
+
+class PickDispatcher:
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="picker_worker")
+        # 定位器缓存的 COM 对象属于创建它的套间，所有 COM 调用固定在同一个线程上
+        self.com_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="picker_com", initializer=_init_com_worker
+        )
+        # 进行中的请求
+        self._tasks: dict[Any, asyncio.Task] = {}
+
+        # 统计
+        self.offloaded = 0
+        self.offload_seconds = 0.0
+        self.superseded = 0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在线程池中执行阻塞调用，不能用于 COM 调用"""
+        return await self._offload(self.executor, func, *args, **kwargs)
+
+    async def run_com(self, func: Callable, *args, **kwargs) -> Any:
+        """在 COM 线程中执行 UIA/MSAA 等阻塞调用"""
+        return await self._offload(self.com_executor, func, *args, **kwargs)
+
+    async def _offload(self, executor: ThreadPoolExecutor, func: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.offloaded += 1
+            self.offload_seconds += time.perf_counter() - start
+
+    def cancel(self, key) -> bool:
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    async def dispatch(self, key: Optional[PickerSign], coro) -> Any:
+        """
+        运行一个请求，先取消被它取代的进行中请求
+
+        Raises:
+            Superseded: 运行期间被更新的请求取代
+        """
+        for old in SUPERSEDES.get(key, ()):
+            if self.cancel(old):
+                logger.info("[Dispatcher] {} 被新的 {} 请求取代".format(old, key))
+
+        task = asyncio.ensure_future(coro)
+        if key in SUPERSEDES:
+            self._tasks[key] = task
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+        if task.cancelled():
+            self.superseded += 1
+            raise Superseded()
+        return task.result()
+
+    def stats(self) -> dict:
+        return {
+            "running": sum(1 for task in self._tasks.values() if not task.done()),
+            "offloaded": self.offloaded,
+            "avg_offload_ms": round(self.offload_seconds * 1000 / self.offloaded, 3) if self.offloaded else 0,
+            "superseded": self.superseded,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.com_executor.shutdown(wait=False, cancel_futures=True)
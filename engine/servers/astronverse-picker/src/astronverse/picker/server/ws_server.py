@@ -8,9 +8,13 @@ from typing import Any, Optional
 import websockets
 from astronverse.picker import OperationResult, PickerSign, PickerType, RecordAction, SmartComponentAction, SVCSign
 from astronverse.picker.logger import logger
+from astronverse.picker.server.dispatcher import PickDispatcher, Superseded
 from astronverse.picker.utils.browser import Browser
 from pydantic import BaseModel
 
+# 校验结果高亮显示时间（秒）
+VALIDATE_SHOW_SECONDS = 3
+
 
 class PickerRequire(BaseModel):
     """拾取器请求参数模型"""
@@ -87,8 +91,9 @@ class PickerMessage(BaseModel):
 class PickerRequestHandler:
     """拾取请求处理器 - 抽离所有业务处理逻辑"""
 
-    def __init__(self, svc):
+    def __init__(self, svc, dispatcher: PickDispatcher):
         self.svc = svc
+        self.dispatcher = dispatcher
 
     async def handle_request(self, ws, input_data: PickerRequire) -> bool:
         """处理拾取请求，返回是否需要关闭连接"""
@@ -240,46 +245,37 @@ class PickerRequestHandler:
     async def _handle_pick_validate(self, input_data: PickerRequire) -> dict[str, Any]:
         """处理拾取校验"""
         try:
-            from astronverse.locator.locator import LocatorManager
             from astronverse.picker.core.highlight_client import highlight_client
 
             with highlight_client:
                 highlight_client.start_wnd("validate")
-                input_data.data = self._process_element_data(input_data)
-
-                res = LocatorManager().locator(input_data.data)
-                if isinstance(res, list):
-                    rects = [item.rect() for item in res]
-                else:
-                    rects = res.rect()
+                rects = await self.dispatcher.run_com(self._locate_rects, input_data)
 
                 highlight_client.draw_wnd(rects, "", "validate")
 
-                time.sleep(3)
+                # 被新的请求取代时在这里取消，退出时隐藏高亮
+                await asyncio.sleep(VALIDATE_SHOW_SECONDS)
 
                 return OperationResult.success(data="校验成功").to_dict()
 
         except Exception as e:
             return OperationResult.error(str(e)).to_dict()
 
+    def _locate_rects(self, input_data: PickerRequire):
+        """定位元素并获取位置，在 COM 线程中执行"""
+        from astronverse.locator.locator import LocatorManager
+
+        input_data.data = self._process_element_data(input_data)
+
+        res = LocatorManager().locator(input_data.data)
+        if isinstance(res, list):
+            return [item.rect() for item in res]
+        return res.rect()
+
     async def _handle_pick_highlight(self, input_data: PickerRequire) -> dict[str, Any]:
         """处理拾取高亮"""
         try:
-            from astronverse.locator.locator import LocatorManager
-
-            input_data.data = self._process_element_data(input_data)
-            data = (
-                LocatorManager.parse_element_json(input_data.data)
-                if isinstance(input_data.data, str)
-                else input_data.data
-            )
-
-            Browser.send_browser_extension(
-                browser_type=data.get("app"),
-                data=data.get("path"),
-                key="highLightColumn",
-                gate_way_port=self.svc.route_port,
-            )
+            await self.dispatcher.run(self._send_browser_extension, input_data, "highLightColumn")
 
             return OperationResult.success(data="高亮成功").to_dict()
 
@@ -289,35 +285,43 @@ class PickerRequestHandler:
     async def _handle_pick_gain(self, input_data: PickerRequire) -> dict[str, Any]:
         """处理拾取获取数据"""
         try:
-            from astronverse.locator.locator import LocatorManager
-            from astronverse.picker.utils.table_filter import (
-                DataFilter,
-                table_json_merge_values,
-            )
-
-            input_data.data = self._process_element_data(input_data)
-            data = (
-                LocatorManager.parse_element_json(input_data.data)
-                if isinstance(input_data.data, str)
-                else input_data.data
-            )
-
-            web_info = Browser.send_browser_extension(
-                browser_type=data.get("app"),
-                data=data.get("path"),
-                key="getBatchData",
-                gate_way_port=self.svc.route_port,
-            )
-            values = web_info["values"]
-            batch_element = data.get("path")
-            batch_element = table_json_merge_values(batch_element, values)
-            locate_data = DataFilter(data_json=batch_element).get_filtered_data()
+            locate_data = await self.dispatcher.run(self._gain_data, input_data)
 
             return OperationResult.success(data=locate_data).to_dict()
 
         except Exception as e:
             return OperationResult.error(str(e)).to_dict()
 
+    def _send_browser_extension(self, input_data: PickerRequire, key: str):
+        """发送浏览器插件请求，在线程池中执行，返回元素数据和插件结果"""
+        from astronverse.locator.locator import LocatorManager
+
+        input_data.data = self._process_element_data(input_data)
+        data = (
+            LocatorManager.parse_element_json(input_data.data) if isinstance(input_data.data, str) else input_data.data
+        )
+
+        web_info = Browser.send_browser_extension(
+            browser_type=data.get("app"),
+            data=data.get("path"),
+            key=key,
+            gate_way_port=self.svc.route_port,
+        )
+        return data, web_info
+
+    def _gain_data(self, input_data: PickerRequire):
+        """获取批量数据，在线程池中执行"""
+        from astronverse.picker.utils.table_filter import (
+            DataFilter,
+            table_json_merge_values,
+        )
+
+        data, web_info = self._send_browser_extension(input_data, "getBatchData")
+        values = web_info["values"]
+        batch_element = data.get("path")
+        batch_element = table_json_merge_values(batch_element, values)
+        return DataFilter(data_json=batch_element).get_filtered_data()
+
     def _process_element_data(self, input_data: PickerRequire):
         """处理元素数据"""
         from astronverse.locator.locator import LocatorManager
@@ -393,8 +397,9 @@ class WsServer:
         self.svc = svc
         self.port = port
 
-        # 业务处理器
-        self.request_handler = PickerRequestHandler(svc)
+        # 业务处理器，阻塞调用交给调度器的线程池
+        self.dispatcher = PickDispatcher()
+        self.request_handler = PickerRequestHandler(svc, self.dispatcher)
         self.push_manager = PushManager()
 
         # 设置录制事件回调
@@ -446,7 +451,15 @@ class WsServer:
                 # 2. 检查是否是拾取请求
                 if data.get("pick_sign"):
                     input_data = PickerRequire(**data)
-                    should_close = await self.request_handler.handle_request(ws, input_data)
+                    try:
+                        should_close = await self.dispatcher.dispatch(
+                            input_data.pick_sign, self.request_handler.handle_request(ws, input_data)
+                        )
+                    except Superseded:
+                        await self.request_handler._send_response(
+                            ws, OperationResult.cancel("已被新的拾取请求取代").to_dict()
+                        )
+                        should_close = True
                     if should_close:
                         await ws.close()
                     continue
@@ -489,4 +502,5 @@ class WsServer:
         except KeyboardInterrupt:
             logger.info("picker ws接口被中断")
         finally:
+            self.dispatcher.shutdown()
             loop.close()
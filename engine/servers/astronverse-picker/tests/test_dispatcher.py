@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+from unittest import TestCase
+
+from astronverse.picker import PickerSign
+from astronverse.picker.server.dispatcher import PickDispatcher, Superseded
+
+# 模拟一次慢速定位
+LOCATE_SECONDS = 0.3
+
+
+class FakeLocator:
+    """记录调用所在线程的假定位器"""
+
+    def __init__(self):
+        self.threads = set()
+
+    def locate(self, name: str):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(LOCATE_SECONDS)
+        return name
+
+
+class TestPickDispatcher(TestCase):
+    def setUp(self):
+        self.dispatcher = PickDispatcher()
+        self.locator = FakeLocator()
+
+    def tearDown(self):
+        self.dispatcher.shutdown()
+
+    def test_requests_run_concurrently(self):
+        async def request(key):
+            return await self.dispatcher.dispatch(key, self.dispatcher.run(self.locator.locate, key.name))
+
+        async def main():
+            # 悬停推送等事件循环上的工作在定位期间仍然按时执行
+            lag = 0.0
+
+            async def ticker():
+                nonlocal lag
+                while True:
+                    start = time.perf_counter()
+                    await asyncio.sleep(0.01)
+                    lag = max(lag, time.perf_counter() - start - 0.01)
+
+            tick = asyncio.ensure_future(ticker())
+            start = time.perf_counter()
+            results = await asyncio.gather(request(PickerSign.HIGHLIGHT), request(PickerSign.GAIN))
+            elapsed = time.perf_counter() - start
+            tick.cancel()
+            return results, elapsed, lag
+
+        results, elapsed, lag = asyncio.run(main())
+        self.assertEqual(results, ["HIGHLIGHT", "GAIN"])
+        self.assertLess(elapsed, LOCATE_SECONDS * 1.8)
+        self.assertLess(lag, LOCATE_SECONDS / 2)
+
+    def test_newer_request_supersedes(self):
+        async def validate(name):
+            locate = self.dispatcher.run_com(self.locator.locate, name)
+            return await self.dispatcher.dispatch(PickerSign.VALIDATE, locate)
+
+        async def main():
+            first = asyncio.ensure_future(validate("first"))
+            await asyncio.sleep(0.05)
+            second = await validate("second")
+            with self.assertRaises(Superseded):
+                await first
+            return second
+
+        self.assertEqual(asyncio.run(main()), "second")
+        self.assertEqual(self.dispatcher.stats()["superseded"], 1)
+
+    def test_com_calls_share_one_thread(self):
+        async def main():
+            await asyncio.gather(*(self.dispatcher.run_com(self.locator.locate, str(i)) for i in range(3)))
+
+        asyncio.run(main())
+        self.assertEqual(len(self.locator.threads), 1)
+        self.assertTrue(next(iter(self.locator.threads)).startswith("picker_com"))
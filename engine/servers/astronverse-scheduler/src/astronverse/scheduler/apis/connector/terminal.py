@@ -4,7 +4,7 @@ import io
 import pyautogui
 from astronverse.scheduler.apis.response import ResCode, res_msg
 from astronverse.scheduler.core.svc import Svc, get_svc
-from astronverse.scheduler.core.terminal.terminal import Terminal
+from astronverse.scheduler.core.terminal.terminal import Terminal, telemetry
 from fastapi import APIRouter, Depends
 
 router = APIRouter()
@@ -89,3 +89,12 @@ def terminal_ping(svc: Svc = Depends(get_svc)):
 @router.get("/terminal_id")
 def terminal_id():
     return res_msg(msg="获取成功", data={"terminal_id": Terminal.get_terminal_id()})
+
+
+@router.get("/metrics")
+def terminal_metrics():
+    """本机及各执行器的资源占用，取后台采样结果"""
+    return res_msg(
+        msg="获取成功",
+        data={**telemetry.metrics(), "executors": telemetry.executor_metrics(), "sampler": telemetry.stats()},
+    )
@@ -10,7 +10,7 @@ from dataclasses import field
 from enum import Enum
 
 from astronverse.scheduler.apis.response import ResCode, res_msg
-from astronverse.scheduler.core.schduler.venv import create_project_venv, get_project_venv
+from astronverse.scheduler.core.schduler.venv import VenvManager, create_project_venv, get_project_venv
 from astronverse.scheduler.core.svc import Svc, get_svc
 from astronverse.scheduler.logger import logger
 from astronverse.scheduler.utils.ai import InputType, get_factors
@@ -366,6 +366,11 @@ def package_version(pck: PipPackages, svc: Svc = Depends(get_svc)):
     return res_msg(msg="", data={"package": package, "version": version})
 
 
+@router.get("/venv/pool/stats")
+def venv_pool_stats(svc: Svc = Depends(get_svc)):
+    return res_msg(msg="", data=VenvManager.stats(svc))
+
+
 @router.post("/alert/test")
 def notify_text(param: NotifyText, svc: Svc = Depends(get_svc)):
     from astronverse.scheduler.utils.notify_utils import NotifyUtils
@@ -22,3 +22,9 @@ class Config:
     python_base = sys.executable
     # 虚拟环境dir
     venv_base_dir = "venvs"
+    # 预构建虚拟环境池大小
+    venv_pool_size: int = 3
+    # 语言服务 worker 数量上限，超出后按最近最少使用淘汰
+    lsp_max_workers: int = 3
+    # jedi/parso 语法树缓存目录
+    lsp_cache_dir = "lsp_cache"
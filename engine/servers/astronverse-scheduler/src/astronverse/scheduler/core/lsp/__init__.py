@@ -10,6 +10,8 @@ class SessionOptions(BaseModel):
     config_overrides: Optional[dict[str, bool]] = Field(default_factory=dict)
     locale: Optional[str] = None
     code: Optional[str] = None
+    # 编辑器提交的增量修改（LSP TextDocumentContentChangeEvent），提交后可不再携带完整的 code
+    changes: Optional[list[dict]] = None
     position: Optional[dict[str, int]] = None
     newName: Optional[str] = None
     completionItem: Optional[dict] = None
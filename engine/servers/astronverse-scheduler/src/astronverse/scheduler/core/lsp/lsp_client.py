@@ -1,198 +1,239 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
 from dataclasses import dataclass
-from threading import Event
 from typing import Optional
+from uuid import uuid4
 
 from astronverse.scheduler.core.lsp import SessionId, SessionOptions
-from astronverse.scheduler.core.lsp.session import PUBLISH_DIAGNOSTICS, LspSession
+from astronverse.scheduler.core.lsp.pool import LspWorker, lsp_pool
+from astronverse.scheduler.core.lsp.text_sync import TextDocument
 from astronverse.scheduler.core.schduler.venv import get_project_venv
 from astronverse.scheduler.core.svc import get_svc
 from astronverse.scheduler.logger import logger
 from astronverse.scheduler.utils.platform_utils import platform_python_venv_run_dir
 from pylsp import uris
 
-document_uri = "file:///Untitled.py"
-
 LSP_EXIT_TIMEOUT = 5000
 
+# 等待诊断结果的最长时间（秒），pylsp 自身对 lint 有 0.5s 的防抖
+DIAGNOSTICS_TIMEOUT = 2
+
+
+def _set_waiter(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
 
 class LspClient:
+    """一个编辑器会话，对应共享 worker 中工程目录下的一个文档"""
+
     def __init__(self, project_id: str):
-        self._document_version: int = 1
-        self._document_text: str = ""
+        self._document = TextDocument()
         self._document_diags: dict = None
-        self._pending_diag_event: Event = None
+        self._diag_version: int = 0
+        # 等待诊断结果的请求 [(文档版本, 事件循环, future)]，诊断通知在 pylsp 的读线程中到达
+        self._diag_waiters: list[tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._diag_lock = threading.Lock()
+        # 进行中的请求，按方法名保留最新的一个
+        self._inflight: dict[str, Future] = {}
         self.svc = get_svc()
         self._project_path = get_project_venv(self.svc, project_id)
         self._project_dir = platform_python_venv_run_dir(self._project_path)
-        self._lsp_session = LspSession()
-        self._lsp_session.enter()
+        self._document_uri = uris.from_fs_path(
+            os.path.join(self._project_dir, "Untitled_{}.py".format(uuid4().hex[:8]))
+        )
+        self._worker: LspWorker = lsp_pool.acquire(self._project_path)
 
     def initialize(self, session_options: SessionOptions):
-        init = {
-            "rootUri": uris.from_fs_path(self._project_dir),
-            "rootPath": self._project_dir,
-            "processId": 1,
-            "capabilities": {
-                "textDocument": {
-                    "publishDiagnostics": {
-                        "tagSupport": {
-                            "valueSet": [
-                                1,
-                                2,
-                            ]
-                        },
-                        "versionSupport": True,
-                    },
-                    "hover": {
-                        "contentFormat": ["markdown", "plaintext"],
-                    },
-                    "signatureHelp": {},
-                },
-            },
-        }
-
-        if session_options.locale is not None:
-            init["locale"] = session_options.locale
-
-        self._document_text = session_options.code or ""
-
-        self._lsp_session.initialize(init)
+        self._document.text = session_options.code or ""
+        self._open_document()
 
-        # 监听来自 language server 的诊断信息
-        def _handler(diag_info):
-            # 更新缓存的诊断信息
-            self._document_diags = diag_info
-
-            if self._pending_diag_event is not None:
-                self._pending_diag_event.set()
-
-        self._lsp_session.set_notification_callback(PUBLISH_DIAGNOSTICS, _handler)
-
-        # Update the settings
-        self._lsp_session.notify_did_change_configuration(
-            {
-                "settings": {
-                    "pylsp": {
-                        "plugins": {
-                            "pycodestyle": {"enabled": False},
-                            "pyflakes": {"enabled": True},
-                            "mccabe": {"enabled": True},
-                            "pylint": {"enabled": False},
-                            "jedi": {"environment": self._project_path},
-                        },
-                    }
-                }
-            }
-        )
-
-        # Simulate an "open file" event
-        self._lsp_session.notify_did_open(
-            {
-                "textDocument": {
-                    "uri": document_uri,
-                    "languageId": "python",
-                    "version": self._document_version,
-                    "text": self._document_text,
-                }
-            }
+    def _open_document(self):
+        self._worker.open_document(
+            self._document_uri, self._project_dir, self._document.text, self._document.version, client=self
         )
 
-    def get_diagnostics(self, code: str):
-        code_changed = self._document_text != code
-
-        if not code_changed and self._document_diags is not None:
+    async def _ensure_worker(self):
+        """worker 被淘汰或进程退出后重新获取，并以当前内容重新打开文档"""
+        if self._worker.is_alive():
+            return
+        logger.info("Lsp worker is gone, reopening document")
+        self._inflight.clear()
+        self._worker = await asyncio.to_thread(lsp_pool.acquire, self._project_path)
+        self._open_document()
+
+    def on_diagnostics(self, diag_info):
+        """监听来自 language server 的诊断信息"""
+        # 更新缓存的诊断信息，未携带版本号时 pylsp 检查的是当前最新文档
+        version = diag_info.get("version")
+        self._document_diags = diag_info
+        self._diag_version = version if version is not None else self._document.version
+
+        with self._diag_lock:
+            ready = [w for w in self._diag_waiters if w[0] <= self._diag_version]
+            self._diag_waiters = [w for w in self._diag_waiters if w[0] > self._diag_version]
+        for _, loop, fut in ready:
+            loop.call_soon_threadsafe(_set_waiter, fut)
+
+    async def get_diagnostics(self, code: Optional[str] = None, changes: Optional[list] = None):
+        await self._ensure_worker()
+        self.sync_document(code, changes)
+        version = self._document.version
+
+        if self._document_diags is not None and self._diag_version >= version:
             return self._document_diags.get("diagnostics")
 
-        if code_changed:
-            self.update_text_document(code)
-
-        if self._pending_diag_event is None or self._pending_diag_event.is_set():
-            self._pending_diag_event = Event()
+        # 只让最新的请求等待新的诊断结果，之前还在等待的请求直接返回当前结果
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        with self._diag_lock:
+            superseded = self._diag_waiters
+            self._diag_waiters = [(version, loop, waiter)]
+        for _, waiter_loop, fut in superseded:
+            waiter_loop.call_soon_threadsafe(_set_waiter, fut)
 
-        self._pending_diag_event.wait(2)  # 2 seconds timeout
+        try:
+            await asyncio.wait_for(waiter, DIAGNOSTICS_TIMEOUT)
+        except TimeoutError:
+            pass
+        finally:
+            with self._diag_lock:
+                self._diag_waiters = [w for w in self._diag_waiters if w[2] is not waiter]
 
         if self._document_diags is not None:
             return self._document_diags.get("diagnostics")
 
-    def get_hover_info(self, code: str, position):
-        if self._document_text != code:
-            self.update_text_document(code)
+    async def get_hover_info(self, code: Optional[str], position, changes: Optional[list] = None):
+        await self._ensure_worker()
+        self.sync_document(code, changes)
 
         params = {
             "textDocument": {
-                "uri": document_uri,
+                "uri": self._document_uri,
             },
             "position": position,
         }
 
-        return self._lsp_session.text_document_hover(params)
+        return await self._request("textDocument/hover", params)
 
-    def get_rename_edits(self, code: str, position, new_name: str):
-        if self._document_text != code:
-            self.update_text_document(code)
+    async def get_rename_edits(self, code: Optional[str], position, new_name: str, changes: Optional[list] = None):
+        await self._ensure_worker()
+        self.sync_document(code, changes)
 
         params = {
             "textDocument": {
-                "uri": document_uri,
+                "uri": self._document_uri,
             },
             "position": position,
             "newName": new_name,
         }
 
-        return self._lsp_session.text_document_rename(params)
+        return await self._request("textDocument/rename", params, cancel_previous=False)
 
-    def get_signature_help(self, code: str, position):
-        if self._document_text != code:
-            self.update_text_document(code)
+    async def get_signature_help(self, code: Optional[str], position, changes: Optional[list] = None):
+        await self._ensure_worker()
+        self.sync_document(code, changes)
 
         params = {
             "textDocument": {
-                "uri": document_uri,
+                "uri": self._document_uri,
             },
             "position": position,
         }
 
-        return self._lsp_session.text_document_signature_help(params)
+        return await self._request("textDocument/signatureHelp", params)
 
-    def get_completion(self, code: str, position):
-        if self._document_text != code:
-            self.update_text_document(code)
+    async def get_completion(self, code: Optional[str], position, changes: Optional[list] = None):
+        await self._ensure_worker()
+        self.sync_document(code, changes)
 
         params = {
             "textDocument": {
-                "uri": document_uri,
+                "uri": self._document_uri,
             },
             "position": position,
         }
 
-        return self._lsp_session.text_document_completion(params)
+        return await self._request("textDocument/completion", params)
+
+    async def resolve_completion(self, completion_item):
+        await self._ensure_worker()
+        return await self._request("completionItem/resolve", completion_item)
 
-    def resolve_completion(self, completion_item):
-        return self._lsp_session.completion_item_resolve(completion_item)
+    async def _request(self, method: str, params, cancel_previous: bool = True):
+        """
+        发送请求并异步等待结果
 
-    def update_text_document(self, code: str) -> int:
-        self._document_text = code
-        self._document_version += 1
+        同一类请求只保留最新的一个：编辑器连续输入时，上一次还没返回的补全/悬停请求已经没有意义，
+        取消对应的 future 后 pylsp_jsonrpc 会发送 $/cancelRequest，被取消的请求返回 None。
+        """
+        if cancel_previous:
+            previous = self._inflight.get(method)
+            if previous is not None and not previous.done():
+                previous.cancel()
 
-        logger.info(f"Updating text document to version ${self._document_version}")
+        fut = self._worker.session.request(method, params)
+        if cancel_previous:
+            self._inflight[method] = fut
+        try:
+            return await asyncio.wrap_future(fut)
+        except asyncio.CancelledError:
+            if fut.cancelled() and self._inflight.get(method) is not fut:
+                logger.info(f"Request {method} superseded")
+                return None
+            raise
+        finally:
+            if self._inflight.get(method) is fut:
+                del self._inflight[method]
+
+    def sync_document(self, code: Optional[str] = None, changes: Optional[list] = None) -> int:
+        """
+        把编辑器的修改同步给 language server，返回同步后的文档版本
+
+        changes 为编辑器提交的增量修改；同时提交了 code 时会校验应用结果，不一致则以 code 为准重新比较。
+        """
+        if changes:
+            before = self._document.text
+            self._document.apply_changes(changes)
+            if code is not None and self._document.text != code:
+                logger.info("Incremental changes out of sync, falling back to diff")
+                self._document.text = before
+                changes = self._document.diff(code)
+                self._document.text = code
+        elif code is not None:
+            changes = self._document.diff(code)
+            self._document.text = code
+
+        if not changes:
+            return self._document.version
+        return self.update_text_document(changes)
+
+    def update_text_document(self, changes: list) -> int:
+        self._document.version += 1
+
+        logger.info(f"Updating text document to version {self._document.version}")
+
+        if not self._worker.incremental_sync:
+            changes = [{"text": self._document.text}]
 
         try:
-            self._lsp_session.notify_did_change(
+            self._worker.session.notify_did_change(
                 {
                     "textDocument": {
-                        "uri": document_uri,
-                        "version": self._document_version,
+                        "uri": self._document_uri,
+                        "version": self._document.version,
                     },
-                    "contentChanges": [{"text": code}],
+                    "contentChanges": changes,
                 }
             )
-            logger.info("Successfully sent text document to language server")
-            return self._document_version
         except Exception as e:
-            logger.error(f"Error sending text document to language server: ${e}")
+            logger.error(f"Error sending text document to language server: {e}")
+        return self._document.version
 
     def shutdown(self):
-        self._lsp_session.exit()
+        self._worker.close_document(self._document_uri, self._project_dir)
 
 
 @dataclass
@@ -0,0 +1,358 @@
+"""
+语言服务 worker 池
+
+每个 pylsp 进程（worker）对应一个 jedi 解释器环境，使用同一解释器的工程共用一个 worker：
+- 每个工程目录作为 worker 的一个 workspace folder，每个会话是其中的一个文档
+- 工程虚拟环境中安装的包与模板环境完全一致时，直接使用模板解释器，与其他工程共用 worker
+- worker 总数有上限，超出时按最近最少使用淘汰没有打开文档的 worker，仍有文档的 worker 不淘汰
+- jedi/parso 的语法树缓存写到固定目录，重启后继续使用
+- 调度器启动时预热 actionlib/组件接口，打开机器人后的第一次补全不必再解析这些模块
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from uuid import uuid4
+
+from astronverse.scheduler.core.lsp.session import PUBLISH_DIAGNOSTICS, LspSession
+from astronverse.scheduler.core.lsp.text_sync import TEXT_DOCUMENT_SYNC_INCREMENTAL
+from astronverse.scheduler.core.schduler.venv import TEMPLATE_DIR
+from astronverse.scheduler.core.svc import get_svc
+from astronverse.scheduler.logger import logger
+from astronverse.scheduler.utils.platform_utils import platform_python_venv_path
+from pylsp import uris
+
+# 预热的模块，机器人脚本中最常用到的接口
+WARMUP_MODULES = (
+    "astronverse.actionlib",
+    "astronverse.actionlib.atomic",
+    "astronverse.actionlib.types",
+    "astronverse.actionlib.report",
+    "astronverse.baseline.logger.logger",
+)
+
+# 预热时等待单个补全请求的最长时间（秒）
+WARMUP_TIMEOUT = 60
+
+
+def _site_packages(venv_dir: str) -> Optional[str]:
+    if sys.platform == "win32":
+        path = os.path.join(venv_dir, "Lib", "site-packages")
+        return path if os.path.isdir(path) else None
+    lib = os.path.join(venv_dir, "lib")
+    if not os.path.isdir(lib):
+        return None
+    for name in os.listdir(lib):
+        path = os.path.join(lib, name, "site-packages")
+        if os.path.isdir(path):
+            return path
+    return None
+
+
+def _installed(site_packages: str) -> set:
+    return {name for name in os.listdir(site_packages) if name != "__pycache__"}
+
+
+def resolve_environment(svc, environment: str) -> str:
+    """工程虚拟环境与模板环境安装的包完全一致时返回模板解释器，否则返回工程解释器"""
+    if svc.is_venv:
+        return environment
+
+    template_dir = os.path.join(svc.config.venv_base_dir, TEMPLATE_DIR)
+    template_python = platform_python_venv_path(template_dir)
+    if not os.path.exists(template_python):
+        return environment
+    if os.path.normcase(os.path.abspath(environment)) == os.path.normcase(os.path.abspath(template_python)):
+        return template_python
+
+    try:
+        project_site = _site_packages(os.path.dirname(os.path.dirname(environment)))
+        template_site = _site_packages(os.path.join(template_dir, "venv"))
+        if project_site and template_site and _installed(project_site) == _installed(template_site):
+            return template_python
+    except OSError as e:
+        logger.warning(f"Compare venv site-packages failed: {e}")
+    return environment
+
+
+def default_environment(svc) -> str:
+    """新建工程使用的解释器，预热用"""
+    if svc.is_venv:
+        return svc.config.python_base
+    return platform_python_venv_path(os.path.join(svc.config.venv_base_dir, TEMPLATE_DIR))
+
+
+class LspWorker:
+    """一个 pylsp 进程，服务使用同一解释器的所有工程"""
+
+    def __init__(self, environment: str, cache_dir: Optional[str] = None):
+        self.environment = environment
+        self.session = LspSession(cache_dir=cache_dir)
+        self.incremental_sync = False
+        self.alive = False
+        self.last_used = time.monotonic()
+        # 文档 uri -> 接收诊断信息的客户端
+        self._documents: dict = {}
+        # workspace folder uri -> 打开的文档数
+        self._folders: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._started = threading.Event()
+        self._start_error: Optional[Exception] = None
+        self._starting = False
+
+    @property
+    def document_count(self) -> int:
+        return len(self._documents)
+
+    def start(self):
+        """启动并完成 initialize 握手，多个线程同时调用时只有一个真正启动，其余等待"""
+        with self._lock:
+            starting = self._starting
+            self._starting = True
+        if starting:
+            self._started.wait()
+            if self._start_error is not None:
+                raise self._start_error
+            return
+
+        try:
+            self._start()
+            self.alive = True
+        except Exception as e:
+            self._start_error = e
+            raise
+        finally:
+            self._started.set()
+
+    def _start(self):
+        logger.info(f"Starting lsp worker for {self.environment}")
+        self.session.enter()
+
+        def _capabilities(result):
+            sync = ((result or {}).get("capabilities") or {}).get("textDocumentSync")
+            kind = sync.get("change") if isinstance(sync, dict) else sync
+            self.incremental_sync = kind == TEXT_DOCUMENT_SYNC_INCREMENTAL
+
+        root = os.path.dirname(os.path.abspath(self.environment))
+        self.session.initialize(
+            {
+                "rootUri": uris.from_fs_path(root),
+                "rootPath": root,
+                "processId": os.getpid(),
+                "capabilities": {
+                    "workspace": {"workspaceFolders": True},
+                    "textDocument": {
+                        "publishDiagnostics": {
+                            "tagSupport": {
+                                "valueSet": [
+                                    1,
+                                    2,
+                                ]
+                            },
+                            "versionSupport": True,
+                        },
+                        "hover": {
+                            "contentFormat": ["markdown", "plaintext"],
+                        },
+                        "signatureHelp": {},
+                    },
+                },
+            },
+            _capabilities,
+        )
+        self.session.set_notification_callback(PUBLISH_DIAGNOSTICS, self._on_diagnostics)
+        self.session.notify_did_change_configuration(
+            {
+                "settings": {
+                    "pylsp": {
+                        "plugins": {
+                            "pycodestyle": {"enabled": False},
+                            "pyflakes": {"enabled": True},
+                            "mccabe": {"enabled": True},
+                            "pylint": {"enabled": False},
+                            "jedi": {"environment": self.environment},
+                        },
+                    }
+                }
+            }
+        )
+
+    def _on_diagnostics(self, diag_info):
+        client = self._documents.get(diag_info.get("uri"))
+        if client is not None:
+            client.on_diagnostics(diag_info)
+
+    def open_document(self, uri: str, folder: str, text: str, version: int, client=None):
+        """打开文档，folder 为文档所属工程目录，第一次出现时加入 workspace folders"""
+        self.last_used = time.monotonic()
+        folder_uri = uris.from_fs_path(folder)
+        with self._lock:
+            count = self._folders.get(folder_uri, 0)
+            self._folders[folder_uri] = count + 1
+            if client is not None:
+                self._documents[uri] = client
+        if count == 0:
+            self.session.notify_did_change_workspace_folders(
+                {"event": {"added": [{"uri": folder_uri, "name": os.path.basename(folder)}], "removed": []}}
+            )
+        self.session.notify_did_open(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": version,
+                    "text": text,
+                }
+            }
+        )
+
+    def close_document(self, uri: str, folder: str):
+        folder_uri = uris.from_fs_path(folder)
+        with self._lock:
+            self._documents.pop(uri, None)
+            count = self._folders.get(folder_uri, 0) - 1
+            if count > 0:
+                self._folders[folder_uri] = count
+            else:
+                self._folders.pop(folder_uri, None)
+        if not self.alive:
+            return
+        self.session.notify_did_close({"textDocument": {"uri": uri}})
+        if count <= 0:
+            self.session.notify_did_change_workspace_folders(
+                {"event": {"added": [], "removed": [{"uri": folder_uri, "name": os.path.basename(folder)}]}}
+            )
+
+    def is_alive(self) -> bool:
+        return self.alive and self.session.is_alive()
+
+    def stale(self) -> bool:
+        """启动失败、进程退出或已被淘汰"""
+        return self._started.is_set() and not self.is_alive()
+
+    def shutdown(self):
+        if not self.alive:
+            return
+        self.alive = False
+        logger.info(f"Shutting down lsp worker for {self.environment}")
+        try:
+            self.session.exit()
+        except Exception as e:
+            logger.error(f"Lsp worker shutdown error: {e}")
+
+
+class LspWorkerPool:
+    """按解释器管理 worker，总数超过上限时按最近最少使用淘汰"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._max_workers = max_workers
+        self._workers: OrderedDict[str, LspWorker] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_workers(self) -> int:
+        if self._max_workers is not None:
+            return self._max_workers
+        return max(1, get_svc().config.lsp_max_workers)
+
+    @staticmethod
+    def _cache_dir() -> Optional[str]:
+        cache_dir = get_svc().config.lsp_cache_dir
+        return os.path.abspath(cache_dir) if cache_dir else None
+
+    @staticmethod
+    def _key(environment: str) -> str:
+        return os.path.normcase(os.path.abspath(environment))
+
+    def acquire(self, environment: str) -> LspWorker:
+        """取得解释器对应的 worker，不存在或已退出时启动新的（阻塞，需在线程中调用）"""
+        environment = resolve_environment(get_svc(), environment)
+        key = self._key(environment)
+        evicted = []
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is not None and worker.stale():
+                logger.info(f"Lsp worker for {environment} is not running, restarting")
+                self._workers.pop(key)
+                evicted.append(worker)
+                worker = None
+            if worker is None:
+                self.misses += 1
+                worker = LspWorker(environment, self._cache_dir())
+                self._workers[key] = worker
+                evicted.extend(self._evict(keep=key))
+            else:
+                self.hits += 1
+                self._workers.move_to_end(key)
+        for old in evicted:
+            old.shutdown()
+
+        worker.start()
+        worker.last_used = time.monotonic()
+        return worker
+
+    def _evict(self, keep: str) -> list[LspWorker]:
+        """
+        淘汰最近最少使用的空闲 worker；其余 worker 都还有打开的文档时暂时超出上限，
+        等文档关闭后的下一次获取再淘汰
+        """
+        evicted = []
+        while len(self._workers) > self.max_workers:
+            idle = [k for k, w in self._workers.items() if k != keep and w.document_count == 0]
+            if not idle:
+                break
+            key = idle[0]
+            evicted.append(self._workers.pop(key))
+            self.evictions += 1
+            logger.info(f"Lsp worker count exceeded max limit, evicting {key}")
+        return evicted
+
+    def warmup(self, environment: str, modules=WARMUP_MODULES):
+        """对常用模块各请求一次补全，让 jedi 提前解析并缓存"""
+        start = time.time()
+        worker = self.acquire(environment)
+        folder = os.path.dirname(os.path.abspath(environment))
+        uri = uris.from_fs_path(os.path.join(folder, "__warmup_{}.py".format(uuid4().hex)))
+        lines = ["import {} as m{}".format(module, i) for i, module in enumerate(modules)]
+        first = len(lines)
+        lines += ["m{}.".format(i) for i in range(len(modules))]
+        worker.open_document(uri, folder, "\n".join(lines), 1)
+        try:
+            for i in range(len(modules)):
+                position = {"line": first + i, "character": len("m{}.".format(i))}
+                fut = worker.session.request(
+                    "textDocument/completion", {"textDocument": {"uri": uri}, "position": position}
+                )
+                fut.result(WARMUP_TIMEOUT)
+        finally:
+            worker.close_document(uri, folder)
+        logger.info(f"Lsp worker warmed up for {environment} in {time.time() - start:.2f}s")
+
+    def shutdown_all(self):
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.shutdown()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": [
+                    {"environment": w.environment, "documents": w.document_count, "alive": w.alive}
+                    for w in self._workers.values()
+                ],
+                "max_workers": self.max_workers,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+lsp_pool = LspWorkerPool()
@@ -14,7 +14,7 @@ async def create_session(req: SessionOptions, svc: Svc = Depends(get_svc)):
 
     try:
         create_project_venv(svc, req.project_id)
-        session_id = service.create_session(req)
+        session_id = await service.create_session(req)
         return {"sessionId": session_id}
     except Exception as err:
         logger.error("createNewSession returning a 500: ", exc_info=err)
@@ -34,7 +34,7 @@ async def get_diagnostics(sid: str, req: SessionOptions):
         raise HTTPException(status_code=400, detail="Unknown session ID")
 
     try:
-        diagnostics = service.get_diagnostics(session, req)
+        diagnostics = await service.get_diagnostics(session, req)
         return {"diagnostics": diagnostics}
     except Exception as err:
         logger.error("getDiagnostics returning a 500: ", exc_info=err)
@@ -49,7 +49,7 @@ async def get_hover_info(sid: str, req: SessionOptions):
         raise HTTPException(status_code=400, detail="Unknown session ID")
 
     try:
-        hover = service.get_hover_info(session, req)
+        hover = await service.get_hover_info(session, req)
         return {"hover": hover}
     except Exception as err:
         logger.error("getHoverInfo returning a 500: ", exc_info=err)
@@ -64,7 +64,7 @@ async def get_rename_edits(sid: str, req: SessionOptions):
         raise HTTPException(status_code=400, detail="Unknown session ID")
 
     try:
-        edits = service.get_rename_edits(session, req)
+        edits = await service.get_rename_edits(session, req)
         return {"edits": edits}
     except Exception as err:
         logger.error("getRenameEdits returning a 500: ", exc_info=err)
@@ -79,7 +79,7 @@ async def get_signature_help(sid: str, req: SessionOptions):
         raise HTTPException(status_code=400, detail="Unknown session ID")
 
     try:
-        signature_help = service.get_signature_help(session, req)
+        signature_help = await service.get_signature_help(session, req)
         return {"signatureHelp": signature_help}
     except Exception as err:
         logger.error("getSignatureHelp returning a 500: ", exc_info=err)
@@ -94,7 +94,7 @@ async def get_completion(sid: str, req: SessionOptions):
         raise HTTPException(status_code=400, detail="Unknown session ID")
 
     try:
-        completion_list = service.get_completion(session, req)
+        completion_list = await service.get_completion(session, req)
         return {"completionList": completion_list}
     except Exception as err:
         logger.error("getCompletion returning a 500: ", exc_info=err)
@@ -109,7 +109,7 @@ async def resolve_completion(sid: str, req: SessionOptions):
         raise HTTPException(status_code=400, detail="Unknown session ID")
 
     try:
-        completion_item = service.resolve_completion(session, req)
+        completion_item = await service.resolve_completion(session, req)
         return {"completionItem": completion_item}
     except Exception as err:
         logger.error("resolveCompletion returning a 500: ", exc_info=err)
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Optional
 from uuid import uuid4
@@ -24,7 +25,7 @@ def get_session_by_id(session_id: SessionId) -> Optional[Session]:
     return session
 
 
-def create_session(session_options: SessionOptions) -> SessionId:
+async def create_session(session_options: SessionOptions) -> SessionId:
     """
     Allocate a new session and return its ID.
     """
@@ -33,19 +34,20 @@ def create_session(session_options: SessionOptions) -> SessionId:
     compatible_session = get_compatible_session(session_options)
 
     if compatible_session:
-        return restart_session(compatible_session, session_options)
+        return await restart_session(compatible_session, session_options)
 
-    return start_session(session_options)
+    return await start_session(session_options)
 
 
-def start_session(session_options: SessionOptions = None) -> SessionId:
+async def start_session(session_options: SessionOptions = None) -> SessionId:
     """
     Start a new session and return its ID.
     """
     logger.info("Starting new session")
 
     session_id = str(uuid4())
-    lang_client = LspClient(session_options.project_id)
+    # 启动 pylsp 进程和 initialize 握手会阻塞，放到线程中执行
+    lang_client = await asyncio.to_thread(LspClient, session_options.project_id)
 
     active_sessions[session_id] = Session(
         id=session_id,
@@ -53,23 +55,23 @@ def start_session(session_options: SessionOptions = None) -> SessionId:
         lang_client=lang_client,
     )
 
-    lang_client.initialize(session_options=session_options)
+    await asyncio.to_thread(lang_client.initialize, session_options)
 
     if session_options.code:
-        lang_client.get_diagnostics(session_options.code)
+        await lang_client.get_diagnostics(session_options.code)
         logger.info("Received diagnostics from warm up")
 
     return session_id
 
 
-def restart_session(session: Session, session_options: SessionOptions = None) -> SessionId:
+async def restart_session(session: Session, session_options: SessionOptions = None) -> SessionId:
     logger.info(f"Restarting inactive session ${session.id}")
 
     session.options = session_options
     active_sessions[session.id] = session
 
     if session.lang_client and session_options.code is not None:
-        session.lang_client.get_diagnostics(session_options.code)
+        await session.lang_client.get_diagnostics(session_options.code)
 
     return session.id
 
@@ -91,52 +93,54 @@ def close_session(session_id: SessionId):
     logger.info(f"Recycling session (currently ${len(inactive_sessions)} in inactive queue)")
 
 
-def get_diagnostics(session: Session, session_options: SessionOptions):
+async def get_diagnostics(session: Session, session_options: SessionOptions):
     lang_client = session.lang_client
     if lang_client is None:
         return
 
-    return lang_client.get_diagnostics(session_options.code)
+    return await lang_client.get_diagnostics(session_options.code, session_options.changes)
 
 
-def get_hover_info(session: Session, session_options: SessionOptions):
+async def get_hover_info(session: Session, session_options: SessionOptions):
     lang_client = session.lang_client
     if lang_client is None:
         return
 
-    return lang_client.get_hover_info(session_options.code, session_options.position)
+    return await lang_client.get_hover_info(session_options.code, session_options.position, session_options.changes)
 
 
-def get_rename_edits(session: Session, session_options: SessionOptions):
+async def get_rename_edits(session: Session, session_options: SessionOptions):
     lang_client = session.lang_client
     if lang_client is None:
         return
 
-    return lang_client.get_rename_edits(session_options.code, session_options.position, session_options.newName)
+    return await lang_client.get_rename_edits(
+        session_options.code, session_options.position, session_options.newName, session_options.changes
+    )
 
 
-def get_signature_help(session: Session, session_options: SessionOptions):
+async def get_signature_help(session: Session, session_options: SessionOptions):
     lang_client = session.lang_client
     if lang_client is None:
         return
 
-    return lang_client.get_signature_help(session_options.code, session_options.position)
+    return await lang_client.get_signature_help(session_options.code, session_options.position, session_options.changes)
 
 
-def get_completion(session: Session, session_options: SessionOptions):
+async def get_completion(session: Session, session_options: SessionOptions):
     lang_client = session.lang_client
     if lang_client is None:
         return
 
-    return lang_client.get_completion(session_options.code, session_options.position)
+    return await lang_client.get_completion(session_options.code, session_options.position, session_options.changes)
 
 
-def resolve_completion(session: Session, session_options: SessionOptions):
+async def resolve_completion(session: Session, session_options: SessionOptions):
     lang_client = session.lang_client
     if lang_client is None:
         return
 
-    return lang_client.resolve_completion(session_options.completionItem)
+    return await lang_client.resolve_completion(session_options.completionItem)
 
 
 def get_compatible_session(session_options: SessionOptions = None) -> Optional[Session]:
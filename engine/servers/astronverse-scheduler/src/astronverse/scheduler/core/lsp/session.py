@@ -15,13 +15,23 @@ PUBLISH_DIAGNOSTICS = "textDocument/publishDiagnostics"
 WINDOW_LOG_MESSAGE = "window/logMessage"
 WINDOW_SHOW_MESSAGE = "window/showMessage"
 
+# 指定 jedi 磁盘缓存目录后再启动 pylsp，jedi 解析时把该目录作为 parso 的 cache_path，缓存的语法树在重启后可直接复用
+PYLSP_BOOTSTRAP = (
+    "import sys, jedi;"
+    "jedi.settings.cache_directory = sys.argv[1];"
+    "sys.argv = sys.argv[:1];"
+    "from pylsp.__main__ import main;"
+    "main()"
+)
+
 
 class LspSession(MethodDispatcher):
     """Send and Receive messages over LSP as a test LS Client."""
 
-    def __init__(self, cwd=None):
+    def __init__(self, cwd=None, cache_dir=None):
         self.svc = get_svc()
         self.cwd = cwd or os.getcwd()
+        self.cache_dir = cache_dir
         self._thread_pool = ThreadPoolExecutor()
         self._sub = None
         self._writer = None
@@ -33,9 +43,14 @@ class LspSession(MethodDispatcher):
         """Context manager entrypoint."""
         python_path = self.svc.config.python_core
         logger.info(f"Starting pylsp process, python_path: {python_path}")
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cmd = [python_path, "-c", PYLSP_BOOTSTRAP, self.cache_dir]
+        else:
+            cmd = [python_path, "-m", "pylsp"]
         try:
             self._sub = subprocess.Popen(
-                [python_path, "-m", "pylsp"],
+                cmd,
                 stdout=subprocess.PIPE,
                 stdin=subprocess.PIPE,
                 bufsize=0,
@@ -78,10 +93,12 @@ class LspSession(MethodDispatcher):
         server_initialized = Event()
 
         def _after_initialize(fut):
-            if process_server_capabilities:
-                process_server_capabilities(fut.result())
-            self.initialized()
-            server_initialized.set()
+            try:
+                if process_server_capabilities:
+                    process_server_capabilities(fut.result())
+                self.initialized()
+            finally:
+                server_initialized.set()
 
         self._send_request(
             "initialize",
@@ -171,6 +188,10 @@ class LspSession(MethodDispatcher):
         fut = self._send_request("completionItem/resolve", params=resolve_params)
         return fut.result()
 
+    def request(self, name, params=None) -> Future:
+        """Sends {name} request without waiting, cancelling the future sends $/cancelRequest."""
+        return self._send_request(name, params=params)
+
     def notify_did_change(self, did_change_params):
         """Sends did change notification to LSP Server."""
         self._send_notification("textDocument/didChange", params=did_change_params)
@@ -183,6 +204,17 @@ class LspSession(MethodDispatcher):
         """Sends did open notification to LSP Server."""
         self._send_notification("textDocument/didOpen", params=did_open_params)
 
+    def notify_did_close(self, did_close_params):
+        """Sends did close notification to LSP Server."""
+        self._send_notification("textDocument/didClose", params=did_close_params)
+
+    def notify_did_change_workspace_folders(self, did_change_workspace_folders_params):
+        """Sends did change workspace folders notification to LSP Server."""
+        self._send_notification("workspace/didChangeWorkspaceFolders", params=did_change_workspace_folders_params)
+
+    def is_alive(self) -> bool:
+        return self._sub is not None and self._sub.poll() is None
+
     def notify_did_change_configuration(self, did_change_configuration_params):
         """Sends did change configuration notification to LSP Server."""
         self._send_notification("workspace/didChangeConfiguration", params=did_change_configuration_params)
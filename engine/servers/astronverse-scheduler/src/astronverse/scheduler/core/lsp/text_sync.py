@@ -0,0 +1,101 @@
+"""
+文档增量同步
+
+编辑器每次按键只改动很少的内容，把整篇文档重新发给 pylsp 会让它重建整个文档。
+这里在网关侧维护一份文档副本：
+- 编辑器直接提交增量修改（LSP contentChanges）时，应用到副本后原样转发
+- 只提交完整代码时，与副本比较公共前缀/后缀，得到一个最小的范围修改再转发
+
+位置中的 character 按 Python 字符串下标计算，与 pylsp Document.apply_change 的处理方式一致。
+"""
+
+from typing import Optional
+
+# TextDocumentSyncKind
+TEXT_DOCUMENT_SYNC_FULL = 1
+TEXT_DOCUMENT_SYNC_INCREMENTAL = 2
+
+# 比较公共前缀/后缀时先按块比较，减少逐字符循环
+_BLOCK = 4096
+
+
+def offset_to_position(text: str, offset: int) -> dict:
+    line = text.count("\n", 0, offset)
+    line_start = text.rfind("\n", 0, offset) + 1
+    return {"line": line, "character": offset - line_start}
+
+
+def position_to_offset(text: str, position: dict) -> int:
+    offset = 0
+    for _ in range(position["line"]):
+        line_end = text.find("\n", offset)
+        if line_end < 0:
+            return len(text)
+        offset = line_end + 1
+    line_end = text.find("\n", offset)
+    if line_end < 0:
+        line_end = len(text)
+    return min(offset + position["character"], line_end)
+
+
+def _common_prefix(a: str, b: str, limit: int) -> int:
+    i = 0
+    while i + _BLOCK <= limit and a[i : i + _BLOCK] == b[i : i + _BLOCK]:
+        i += _BLOCK
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    la, lb = len(a), len(b)
+    i = 0
+    while i + _BLOCK <= limit and a[la - i - _BLOCK : la - i] == b[lb - i - _BLOCK : lb - i]:
+        i += _BLOCK
+    while i < limit and a[la - i - 1] == b[lb - i - 1]:
+        i += 1
+    return i
+
+
+def diff_change(old: str, new: str) -> Optional[dict]:
+    """生成把 old 变成 new 的单个范围修改，内容相同时返回 None"""
+    if old == new:
+        return None
+    if "\r" in old or "\r" in new:
+        # 单独的 \r 在 pylsp 中也算换行，行号无法对齐，直接整篇同步
+        return {"text": new}
+    limit = min(len(old), len(new))
+    start = _common_prefix(old, new, limit)
+    suffix = _common_suffix(old, new, limit - start)
+    return {
+        "range": {
+            "start": offset_to_position(old, start),
+            "end": offset_to_position(old, len(old) - suffix),
+        },
+        "text": new[start : len(new) - suffix],
+    }
+
+
+class TextDocument:
+    """网关侧的文档副本"""
+
+    def __init__(self, text: str = "", version: int = 1):
+        self.text = text
+        self.version = version
+
+    def apply_changes(self, changes: list[dict]):
+        text = self.text
+        for change in changes:
+            if "range" not in change:
+                text = change["text"]
+                continue
+            start = position_to_offset(text, change["range"]["start"])
+            end = position_to_offset(text, change["range"]["end"])
+            if start > end:
+                raise ValueError("invalid range: {}".format(change["range"]))
+            text = text[:start] + change["text"] + text[end:]
+        self.text = text
+
+    def diff(self, new_text: str) -> list[dict]:
+        change = diff_change(self.text, new_text)
+        return [change] if change is not None else []
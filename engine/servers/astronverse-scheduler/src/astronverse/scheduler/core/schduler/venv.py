@@ -1,11 +1,299 @@
 import os
+import queue
 import re
+import shutil
+import stat
 import sys
+import threading
+import time
+import uuid
 
 from astronverse.scheduler.logger import logger
 from astronverse.scheduler.utils.platform_utils import platform_python_venv_path
 from astronverse.scheduler.utils.subprocess import SubPopen
 
+# 模板虚拟环境目录，所有工程虚拟环境都从它克隆
+TEMPLATE_DIR = ".template"
+# 模板对应的 python_base，变化后重建模板
+TEMPLATE_STAMP = "python_base"
+# 等待后台删除的目录前缀
+TRASH_PREFIX = ".trash_"
+# 正在克隆中的目录前缀
+CLONE_PREFIX = ".clone_"
+
+# linux FICLONE ioctl（btrfs/xfs 等支持写时复制的文件系统）
+FICLONE = 0x40049409
+
+
+def _reflink(src: str, dst: str):
+    import fcntl
+
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+    shutil.copystat(src, dst)
+
+
+def _venv_created(venv_dir: str) -> bool:
+    """python -m venv 是否成功：pyvenv.cfg 和解释器都已生成"""
+    bin_dir = os.path.join(venv_dir, "Scripts" if sys.platform == "win32" else "bin")
+    if not os.path.exists(os.path.join(venv_dir, "pyvenv.cfg")) or not os.path.isdir(bin_dir):
+        return False
+    return any(name.startswith("python") for name in os.listdir(bin_dir))
+
+
+def _rmtree_onerror(func, path, exc_info):
+    """windows 下只读文件无法删除，去掉只读后重试"""
+    try:
+        os.chmod(path, stat.S_IWRITE)
+        func(path)
+    except Exception:
+        pass
+
+
+class VenvReaper:
+    """
+    后台删除器
+
+    删除时先把目录重命名为 .trash_xxx（同一磁盘内的重命名是原子且瞬间完成的），
+    再交给后台线程慢慢删除，调用方不再等待 rm -rf
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="venv_reaper", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                shutil.rmtree(path, onerror=_rmtree_onerror)
+                logger.info("venv reaped: {}".format(path))
+            except Exception as e:
+                logger.error("venv reap failed {}: {}".format(path, e))
+
+    def reap(self, path: str):
+        if not os.path.exists(path):
+            return
+        name = os.path.basename(path.rstrip("/\\"))
+        if name.startswith(TRASH_PREFIX):
+            trash = path
+        else:
+            trash = os.path.join(os.path.dirname(path), "{}{}".format(TRASH_PREFIX, uuid.uuid4().hex))
+            try:
+                os.rename(path, trash)
+            except Exception as e:
+                logger.warning("venv rename for reap failed {}: {}".format(path, e))
+                trash = path
+        self._queue.put(trash)
+        self._ensure_thread()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+
+class VenvPool:
+    """
+    预构建虚拟环境池
+
+    1. 模板：venvs/.template/venv 只用 python -m venv 创建一次
+    2. 克隆：新的 temp_venvN 从模板按文件克隆，优先 reflink（写时复制），其次硬链接，最后复制；
+       硬链接与模板共用同一份文件，只用于 site-packages 下的包文件：pip 安装/升级/卸载包时先删除旧文件再写新文件，
+       不会原地改写；.pth、pyvenv.cfg、bin/Scripts 下的脚本等可能被原地改写的文件始终复制
+    3. 池：后台保持 venv_pool_size 个 temp_venvN，工程取用时直接重命名；池空时同步克隆一个，不再报错
+    4. 删除：统一交给 VenvReaper 后台完成
+
+    venv 本身在 temp_venvN -> 工程目录 之间会被重命名，bin/Scripts 下脚本中的绝对路径本就不可靠，
+    使用方统一以 python -m 的方式调用，因此克隆时不需要改写路径。
+    """
+
+    def __init__(self, svc):
+        self.svc = svc
+        self.reaper = VenvReaper()
+        self._lock = threading.Lock()
+        # 创建模板耗时较长，单独加锁，不阻塞从池中取用环境
+        self._template_lock = threading.Lock()
+        self._cleaned = False
+        self._clone_mode = None
+        self.hits = 0
+        self.misses = 0
+        self.clones = 0
+        self.clone_seconds = 0.0
+
+    @property
+    def base_dir(self) -> str:
+        return self.svc.config.venv_base_dir
+
+    @property
+    def size(self) -> int:
+        return self.svc.config.venv_pool_size
+
+    @property
+    def template_venv(self) -> str:
+        return os.path.join(self.base_dir, TEMPLATE_DIR, "venv")
+
+    # ---------- 克隆 ----------
+
+    @staticmethod
+    def _linkable(path: str) -> bool:
+        """只有 site-packages 下的包文件可以硬链接，其他可能被原地改写的文件需要复制"""
+        parts = os.path.normpath(path).split(os.sep)
+        return "site-packages" in parts and not path.endswith(".pth")
+
+    def _clone_file(self, src: str, dst: str):
+        """按 reflink -> hardlink -> copy 顺序克隆，成功的方式会被记住"""
+        modes = [self._clone_mode] if self._clone_mode else ["reflink", "hardlink", "copy"]
+        for mode in modes:
+            try:
+                if mode == "reflink":
+                    if sys.platform != "linux":
+                        continue
+                    _reflink(src, dst)
+                elif mode == "hardlink":
+                    if not self._linkable(src):
+                        shutil.copy2(src, dst)
+                        return
+                    os.link(src, dst)
+                else:
+                    shutil.copy2(src, dst)
+                self._clone_mode = mode
+                return
+            except Exception:
+                if os.path.lexists(dst):
+                    os.remove(dst)
+        # 记住的方式失效（例如跨盘），重新探测
+        self._clone_mode = None
+        shutil.copy2(src, dst)
+
+    def _clone_tree(self, src: str, dst: str):
+        os.makedirs(dst)
+        for entry in os.scandir(src):
+            target = os.path.join(dst, entry.name)
+            if entry.is_symlink():
+                os.symlink(os.readlink(entry.path), target)
+            elif entry.is_dir():
+                self._clone_tree(entry.path, target)
+            else:
+                self._clone_file(entry.path, target)
+
+    def clone(self, dst_parent: str):
+        """从模板克隆出 dst_parent/venv，先在 .clone_xxx 中完成再重命名，避免出现半成品"""
+        self.ensure_template()
+        start = time.time()
+        work = os.path.join(self.base_dir, "{}{}".format(CLONE_PREFIX, uuid.uuid4().hex))
+        try:
+            self._clone_tree(self.template_venv, os.path.join(work, "venv"))
+            os.rename(work, dst_parent)
+        except Exception:
+            self.reaper.reap(work)
+            raise
+        with self._lock:
+            self.clones += 1
+            self.clone_seconds += time.time() - start
+
+    # ---------- 模板 ----------
+
+    def _template_valid(self) -> bool:
+        stamp = os.path.join(self.base_dir, TEMPLATE_DIR, TEMPLATE_STAMP)
+        if not os.path.exists(os.path.join(self.template_venv, "pyvenv.cfg")):
+            return False
+        if not os.path.exists(stamp):
+            return False
+        with open(stamp, encoding="utf-8") as f:
+            return f.read().strip() == self.svc.config.python_base
+
+    def ensure_template(self):
+        with self._template_lock:
+            if self._template_valid():
+                return
+
+            logger.info("create template venv...")
+            work = os.path.join(self.base_dir, "{}{}".format(CLONE_PREFIX, uuid.uuid4().hex))
+            cmd = [
+                self.svc.config.python_base,
+                "-m",
+                "venv",
+                os.path.join(work, "venv"),
+                "--system-site-packages",
+            ]
+            _, err = SubPopen(name="create_venv", cmd=cmd).run(log=True).logger_handler()
+            if not _venv_created(os.path.join(work, "venv")):
+                # 创建失败不写标记，下次重新创建，避免坏模板被一直复用
+                self.reaper.reap(work)
+                raise Exception("create template venv failed: {}".format(err))
+            if err:
+                logger.warning("create template venv: {}".format(err))
+            with open(os.path.join(work, TEMPLATE_STAMP), "w", encoding="utf-8") as f:
+                f.write(self.svc.config.python_base)
+
+            # 旧模板及其克隆出来的空闲环境一并淘汰
+            self.reaper.reap(os.path.join(self.base_dir, TEMPLATE_DIR))
+            for temp_venv in VenvManager.list_temp_venvs(self.svc):
+                self.reaper.reap(os.path.join(self.base_dir, temp_venv))
+            os.rename(work, os.path.join(self.base_dir, TEMPLATE_DIR))
+
+    # ---------- 池 ----------
+
+    def cleanup(self):
+        """启动时清理上次遗留的半成品和待删除目录"""
+        if not os.path.exists(self.base_dir):
+            return
+        for file_name in os.listdir(self.base_dir):
+            path = os.path.join(self.base_dir, file_name)
+            if file_name == TEMPLATE_DIR:
+                continue
+            if file_name.startswith(".") or not os.path.exists(os.path.join(path, "venv")):
+                self.reaper.reap(path)
+
+    def fill(self, size: int | None = None):
+        """补齐池中的空闲环境，size 为空时使用配置的池大小"""
+        if size is None:
+            size = self.size
+        if not self._cleaned:
+            os.makedirs(self.base_dir, exist_ok=True)
+            self.cleanup()
+            self._cleaned = True
+
+        while len(VenvManager.list_temp_venvs(self.svc)) < size:
+            with self._lock:
+                temp_venv_list = VenvManager.list_temp_venvs(self.svc)
+                num = int(temp_venv_list[-1].split("temp_venv")[-1]) + 1 if temp_venv_list else 1
+            logger.info("create new venv...")
+            self.clone(os.path.join(self.base_dir, "temp_venv{}".format(num)))
+
+    def acquire(self, v_path: str):
+        """取出一个空闲环境作为工程环境，池空时同步克隆"""
+        with self._lock:
+            for temp_v in VenvManager.list_temp_venvs(self.svc):
+                try:
+                    os.rename(os.path.join(self.base_dir, temp_v), v_path)
+                except OSError:
+                    continue
+                self.hits += 1
+                return
+            self.misses += 1
+        self.clone(v_path)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": self.size,
+            "ready": len(VenvManager.list_temp_venvs(self.svc)),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "clones": self.clones,
+            "avg_clone_ms": round(self.clone_seconds * 1000 / self.clones, 1) if self.clones else None,
+            "clone_mode": self._clone_mode,
+            "reaping": self.reaper.pending(),
+        }
+
 
 class VenvManager:
     @staticmethod
@@ -19,7 +307,7 @@ class VenvManager:
         for temp_venv in os.listdir(svc.config.venv_base_dir):
             if re.search(r"^temp_venv\d+$", temp_venv):
                 res.append(temp_venv)
-        res.sort()
+        res.sort(key=lambda x: int(x[len("temp_venv") :]))
         return res
 
     @staticmethod
@@ -37,73 +325,19 @@ class VenvManager:
 
     @staticmethod
     def remove_temp_venv(svc):
-        if os.path.exists(svc.config.venv_base_dir):
-            files = os.listdir(svc.config.venv_base_dir)
-            for file_name in files:
-                if file_name.startswith("."):
-                    try:
-                        # os.remove 无法删除.文件
-                        if sys.platform == "win32":
-                            os.system("rd /s/q {}".format(os.path.join(svc.config.venv_base_dir, file_name)))
-                        else:
-                            os.system("rm -rf {}".format(os.path.join(svc.config.venv_base_dir, file_name)))
-                    except Exception as e:
-                        pass
-                if not os.path.exists(os.path.join(svc.config.venv_base_dir, file_name, "venv")):
-                    try:
-                        # os.remove 无法删除.文件
-                        if sys.platform == "win32":
-                            os.system("rd /s/q {}".format(os.path.join(svc.config.venv_base_dir, file_name)))
-                        else:
-                            os.system("rm -rf {}".format(os.path.join(svc.config.venv_base_dir, file_name)))
-                    except Exception as e:
-                        pass
+        """清理遗留目录，实际删除在后台完成"""
+        svc.venv_pool.cleanup()
 
     @staticmethod
-    def create_new(svc, temp_venv_maxsize=1):
+    def create_new(svc, temp_venv_maxsize=None):
         """
-        穿件一个新的工程运行的venv
+        补齐工程运行的venv池
         """
+        svc.venv_pool.fill(temp_venv_maxsize)
 
-        # 1. 清空temp_venv保证是最新的
-        VenvManager.remove_temp_venv(svc)
-        temp_venv_list = VenvManager.list_temp_venvs(svc)
-        if len(temp_venv_list) >= temp_venv_maxsize:
-            return
-
-        # 2. 虚拟环创建
-        logger.info("create new venv...")
-
-        # 2.1 名称获取
-        temp_venv_num_start = 1
-        if temp_venv_list:
-            temp_venv_num_start = int(temp_venv_list[-1].split("temp_venv")[-1]) + 1
-        env_dir_parent = os.path.join(
-            svc.config.venv_base_dir,
-            ".temp_venv{}".format(temp_venv_num_start),
-        )
-        env_dir_temp = os.path.join(env_dir_parent, "venv")
-
-        # 2.2 创建虚拟环境
-        cmd = [
-            svc.config.python_base,
-            "-m",
-            "venv",
-            env_dir_temp,
-            "--system-site-packages",
-        ]
-        _, err = SubPopen(name="create_venv", cmd=cmd).run(log=True).logger_handler()
-        if err:
-            logger.error("create venv failed: {}".format(err))
-
-        # 2.3 .temp_venv重命名成temp_venv
-        os.rename(
-            env_dir_parent,
-            os.path.join(
-                svc.config.venv_base_dir,
-                "temp_venv{}".format(temp_venv_num_start),
-            ),
-        )
+    @staticmethod
+    def stats(svc) -> dict:
+        return svc.venv_pool.stats()
 
 
 def create_project_venv(svc, project_id: str):
@@ -115,11 +349,7 @@ def create_project_venv(svc, project_id: str):
 
     v_path = os.path.join(svc.config.venv_base_dir, project_id)
     if not os.path.exists(v_path):
-        temp_envs = VenvManager.list_temp_venvs(svc)
-        if not temp_envs:
-            raise Exception("empty venv runtime...")
-        temp_v = temp_envs[0]
-        os.rename(os.path.join(svc.config.venv_base_dir, temp_v), v_path)
+        svc.venv_pool.acquire(v_path)
     return platform_python_venv_path(v_path)
 
 
@@ -1,10 +1,12 @@
+import os
 import time
 
 from astronverse.scheduler import ServerLevel
+from astronverse.scheduler.core.lsp.pool import default_environment, lsp_pool
 from astronverse.scheduler.core.schduler.venv import VenvManager
 from astronverse.scheduler.core.server import IServer
 from astronverse.scheduler.core.setup.setup import Process
-from astronverse.scheduler.core.terminal.terminal import Terminal
+from astronverse.scheduler.core.terminal.terminal import Terminal, telemetry
 from astronverse.scheduler.logger import logger
 
 
@@ -48,14 +50,15 @@ class TerminalAsyncServer(IServer):
         super().__init__(svc=svc, name="terminal_async", level=ServerLevel.NORMAL, run_is_async=True)
 
     def run(self):
+        # 资源数据在后台线程采样，心跳只读取结果
+        Terminal.start_telemetry(self.svc)
         i = 1
         while True:
             try:
                 if i % 10 == 0:
-                    # 创建空的虚拟环境
                     res = Terminal.upload(self.svc)
-                    if res == "TERMINAL_NOT_FOUND":
-                        # 未注册，先去注册
+                    if res == "TERMINAL_NOT_FOUND" or telemetry.take_static_changed():
+                        # 未注册或设备信息（IP、设备名等）变化，重新注册
                         Terminal.register(self.svc)
             except Exception as e:
                 logger.exception("Terminal upload error: {}".format(e))
@@ -105,3 +108,23 @@ class CheckStartPidExitsServer(IServer):
 
     def run(self):
         Process.pid_exist_check()
+
+
+class LspWarmupAsyncServer(IServer):
+    def __init__(self, svc):
+        super().__init__(svc=svc, name="lsp_warmup", level=ServerLevel.NORMAL, run_is_async=True)
+
+    def run(self):
+        # 等待模板虚拟环境创建完成
+        environment = default_environment(self.svc)
+        for _ in range(600):
+            if os.path.exists(environment):
+                break
+            time.sleep(1)
+        else:
+            logger.info("lsp warmup skipped, environment not found: {}".format(environment))
+            return
+        try:
+            lsp_pool.warmup(environment)
+        except Exception as e:
+            logger.exception("lsp warmup error: {}".format(e))
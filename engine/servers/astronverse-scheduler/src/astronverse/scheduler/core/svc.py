@@ -7,6 +7,7 @@ from astronverse.scheduler import ComponentType
 from astronverse.scheduler.config import Config
 from astronverse.scheduler.core.executor.executor import ExecutorManager
 from astronverse.scheduler.core.picker.picker import Picker
+from astronverse.scheduler.core.schduler.venv import VenvPool
 from astronverse.scheduler.core.servers.normal_server import TriggerServer, VNCServer
 from astronverse.scheduler.logger import logger
 from astronverse.scheduler.utils.utils import check_port
@@ -64,6 +65,8 @@ class Svc:
 
         # 是否是在虚拟环境中运行[虚拟环境中运行，执行器不会创建虚拟环境]
         self.is_venv = False
+        # 工程虚拟环境池
+        self.venv_pool = VenvPool(self)
 
         # 4. 全局状态
         self.pip_download_ing = False
@@ -0,0 +1,208 @@
+"""
+终端资源采样
+
+后台线程定时采样，上报心跳时直接读取最近的结果：
+- CPU 使用 psutil 的非阻塞差值（两次调用之间的占用率），取最近几次的平均值
+- 内存每次采样，磁盘变化慢，间隔更长再采样
+- 设备名、账号、操作系统、IP/MAC 等静态信息缓存，定期重新获取，发生变化时标记，由调用方重新注册
+- 顺带采集每个执行器进程（含子进程）的 CPU、内存
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Optional
+
+import psutil
+from astronverse.scheduler.logger import logger
+
+# 采样间隔（秒）
+SAMPLE_INTERVAL = 2
+# CPU 平均值使用的采样次数
+CPU_WINDOW = 5
+# 磁盘使用率采样间隔（秒）
+DISK_INTERVAL = 30
+# 静态信息重新获取间隔（秒）
+STATIC_INTERVAL = 60
+# 启动时同步采样的 CPU 测量时长（秒），启动后立即注册时上报的不是 0
+FIRST_CPU_INTERVAL = 0.1
+
+
+def install_disk() -> str:
+    """安装目录所在的盘符"""
+    if sys.platform == "win32":
+        return os.path.splitdrive(os.path.abspath(__file__))[0] + os.sep
+    return "/"
+
+
+class TelemetrySampler:
+    def __init__(
+        self,
+        collect_static: Callable[[], dict],
+        interval: float = SAMPLE_INTERVAL,
+        cpu_window: int = CPU_WINDOW,
+        disk_interval: float = DISK_INTERVAL,
+        static_interval: float = STATIC_INTERVAL,
+    ):
+        self.collect_static = collect_static
+        self.interval = interval
+        self.disk_interval = disk_interval
+        self.static_interval = static_interval
+        self.disk_path = install_disk()
+
+        self.memory = 0.0
+        self.disk = 0.0
+        self._cpu = deque(maxlen=cpu_window)
+        self._disk_time = 0.0
+
+        self._static: Optional[dict] = None
+        self._static_time = 0.0
+        self._static_changed = False
+
+        # 执行器 exec_id -> (进程, 子进程缓存)
+        self._procs: dict[str, tuple[psutil.Process, dict[int, psutil.Process]]] = {}
+        self._executors: list[dict] = []
+        self._executor_source: Optional[Callable[[], dict]] = None
+
+        # 启动时在锁内同步采样，采样中刷新静态信息会再次加锁
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计
+        self.samples = 0
+        self.sample_seconds = 0.0
+
+    def start(self, executor_source: Optional[Callable[[], dict]] = None):
+        """启动采样线程，executor_source 返回 {exec_id: pid}"""
+        with self._lock:
+            if executor_source is not None:
+                self._executor_source = executor_source
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            # 同步采样一次，同时作为后续非阻塞 CPU 采样的基准
+            try:
+                self.sample(cpu_interval=FIRST_CPU_INTERVAL)
+            except Exception as e:
+                logger.error("终端资源采样失败: {}".format(e))
+            self._thread = threading.Thread(target=self._run, name="terminal_telemetry", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error("终端资源采样失败: {}".format(e))
+
+    def sample(self, cpu_interval: Optional[float] = None):
+        start = time.perf_counter()
+        now = time.monotonic()
+
+        self._cpu.append(psutil.cpu_percent(interval=cpu_interval))
+        self.memory = psutil.virtual_memory().percent
+        if now - self._disk_time >= self.disk_interval:
+            self._disk_time = now
+            try:
+                self.disk = psutil.disk_usage(self.disk_path).percent
+            except Exception as e:
+                logger.error("获取磁盘使用率失败: {}".format(e))
+        if now - self._static_time >= self.static_interval:
+            self.refresh_static()
+        if self._executor_source is not None:
+            self._executors = self._sample_executors(self._executor_source())
+
+        self.samples += 1
+        self.sample_seconds += time.perf_counter() - start
+
+    @property
+    def cpu(self) -> float:
+        if not self._cpu:
+            return 0.0
+        return sum(self._cpu) / len(self._cpu)
+
+    def metrics(self) -> dict:
+        """最近一次采样结果，心跳直接使用"""
+        return {
+            "cpu": int(self.cpu),
+            "memory": int(self.memory),
+            "disk": int(self.disk),
+        }
+
+    def refresh_static(self) -> dict:
+        static = self.collect_static()
+        with self._lock:
+            if self._static is not None and static != self._static:
+                logger.info("终端信息发生变化: {} -> {}".format(self._static, static))
+                self._static_changed = True
+            self._static = static
+            self._static_time = time.monotonic()
+        return static
+
+    def static_facts(self) -> dict:
+        if self._static is None:
+            return self.refresh_static()
+        return self._static
+
+    def take_static_changed(self) -> bool:
+        """静态信息是否变化过，读取后清除标记"""
+        with self._lock:
+            changed = self._static_changed
+            self._static_changed = False
+        return changed
+
+    def _sample_executors(self, pids: dict) -> list[dict]:
+        for exec_id in list(self._procs):
+            if exec_id not in pids:
+                del self._procs[exec_id]
+
+        res = []
+        for exec_id, pid in pids.items():
+            try:
+                cached = self._procs.get(exec_id)
+                if cached is None or cached[0].pid != pid:
+                    proc = psutil.Process(pid)
+                    # 记录基准
+                    proc.cpu_percent(interval=None)
+                    cached = (proc, {})
+                    self._procs[exec_id] = cached
+                proc, children = cached
+
+                cpu = proc.cpu_percent(interval=None)
+                rss = proc.memory_info().rss
+                alive = set()
+                for child in proc.children(recursive=True):
+                    alive.add(child.pid)
+                    if child.pid not in children:
+                        children[child.pid] = child
+                        child.cpu_percent(interval=None)
+                        continue
+                    try:
+                        cpu += children[child.pid].cpu_percent(interval=None)
+                        rss += children[child.pid].memory_info().rss
+                    except psutil.Error:
+                        pass
+                for child_pid in list(children):
+                    if child_pid not in alive:
+                        del children[child_pid]
+                res.append({"exec_id": exec_id, "pid": pid, "cpu": round(cpu, 1), "rss": rss})
+            except psutil.Error:
+                self._procs.pop(exec_id, None)
+        return res
+
+    def executor_metrics(self) -> list[dict]:
+        """每个执行器进程树的 CPU（单核百分比之和）和内存"""
+        return list(self._executors)
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "avg_ms": round(self.sample_seconds * 1000 / self.samples, 3) if self.samples else 0,
+        }
@@ -4,11 +4,13 @@ import platform
 import random
 import socket
 import string
-import sys
+import threading
 
 import psutil
 import requests
+from astronverse.scheduler.core.terminal.telemetry import TelemetrySampler, install_disk
 from astronverse.scheduler.logger import logger
+from requests.adapters import HTTPAdapter
 
 
 def generate_password(length=8):
@@ -17,7 +19,42 @@ def generate_password(length=8):
     return "".join(random.choice(chars) for _ in range(length))
 
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """心跳、注册共用的 HTTP 会话，连接保持复用"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def executor_pids(svc) -> dict:
+    """正在运行的执行器进程 {exec_id: pid}"""
+    executor_mg = svc.executor_mg
+    if not executor_mg:
+        return {}
+    with executor_mg.thread_lock:
+        executors = list(executor_mg.executor_list.values())
+    res = {}
+    for executor in executors:
+        proc = getattr(executor.ins, "proc", None)
+        if proc is not None and proc.poll() is None:
+            res[executor.exec_id] = proc.pid
+    return res
+
+
 class Terminal:
+    @staticmethod
+    def start_telemetry(svc):
+        telemetry.start(lambda: executor_pids(svc))
+
     @staticmethod
     def register(svc):
         api = "/api/robot/terminal/register"
@@ -25,25 +62,28 @@ class Terminal:
             if not terminal_id:
                 logger.error("terminal_id 为空")
                 return
+            Terminal.start_telemetry(svc)
+            static = telemetry.refresh_static()
+            metrics = telemetry.metrics()
             data = {
                 "terminalId": terminal_id,  # 终端唯一标识，如设备mac地址
-                "name": Terminal.get_device_name(),  # 终端名称
-                "account": Terminal.get_account(),  # 设备账号
-                "os": Terminal.get_os_info(),  # 操作系统
+                "name": static["name"],  # 终端名称
+                "account": static["account"],  # 设备账号
+                "os": static["os"],  # 操作系统
                 "osPwd": terminal_pwd,
                 "port": svc.rpa_route_port,
-                "ip": ",".join(ips),  # IP地址
+                "ip": static["ip"],  # IP地址
                 "status": "busy"
                 if svc.executor_mg.status()
                 else "free",  # 当前状态，用于计算最终状态，只有两种状态，运行中busy，空闲free
-                "cpu": int(Terminal.get_cpu_percent()),  # CPU占用率（百分比)
-                "memory": int(Terminal.get_memory_percent()),  # 内存占用率（百分比)
-                "disk": int(Terminal.get_disk_percent()),  # 硬盘占用率（百分比)
+                "cpu": metrics["cpu"],  # CPU占用率（百分比)
+                "memory": metrics["memory"],  # 内存占用率（百分比)
+                "disk": metrics["disk"],  # 硬盘占用率（百分比)
                 "isDispatch": 1 if svc.terminal_mod else 0,  # 是否调度模式 (0: 否, 1: 是)
                 "monitorUrl": "/terminal/ping",  # 视频监控URL
             }
             logger.info("Terminal register data: {}".format(data))
-            response = requests.post(
+            response = http_session().post(
                 url="http://127.0.0.1:{}{}".format(svc.rpa_route_port, api),
                 json=data,
                 timeout=10,
@@ -63,18 +103,18 @@ class Terminal:
             if not terminal_id:
                 logger.error("terminal_id 为空")
                 return
+            # 资源数据由后台采样，这里只读取最近的结果
+            Terminal.start_telemetry(svc)
             data = {
                 "terminalId": terminal_id,  # 终端唯一标识，如设备mac地址
                 "status": "busy"
                 if svc.executor_mg.status()
                 else "free",  # 当前状态，用于计算最终状态，只有两种状态，运行中busy，空闲free
                 "isDispatch": 1 if svc.terminal_mod else 0,  # 是否调度模式 (0: 否, 1: 是)
-                "cpu": int(Terminal.get_cpu_percent()),  # CPU占用率（百分比)
-                "memory": int(Terminal.get_memory_percent()),  # 内存占用率（百分比)
-                "disk": int(Terminal.get_disk_percent()),  # 硬盘占用率（百分比)
+                **telemetry.metrics(),  # CPU、内存、硬盘占用率（百分比)
             }
             logger.info("Terminal upload data: {}".format(data))
-            response = requests.post(
+            response = http_session().post(
                 url="http://127.0.0.1:{}{}".format(svc.rpa_route_port, api),
                 json=data,
                 timeout=10,
@@ -157,14 +197,7 @@ class Terminal:
         获取安装目录的盘符, 并计算利用率
         """
         try:
-            abs_path = os.path.abspath(__file__)
-            if sys.platform == "win32":
-                drive = os.path.splitdrive(abs_path)[0]
-                logger.info("disk percent: {}".format(drive))
-                return psutil.disk_usage(drive).percent
-            else:
-                root_path = "/"
-                return psutil.disk_usage(root_path).percent
+            return psutil.disk_usage(install_disk()).percent
         except Exception as e:
             logger.error("获取磁盘使用率失败: {}".format(e))
             return 0.0
@@ -172,11 +205,10 @@ class Terminal:
     @staticmethod
     def get_cpu_percent() -> float:
         """
-        获取CPU利用率
+        获取CPU利用率，取后台采样的平均值，不阻塞
         """
         try:
-            ls = psutil.cpu_percent(interval=1, percpu=True)
-            return sum(ls) / len(ls)
+            return telemetry.cpu
         except Exception as e:
             logger.error("获取CPU使用率失败: {}".format(e))
             return 0.0
@@ -229,7 +261,18 @@ class Terminal:
             return ""
 
 
+def collect_static() -> dict:
+    """注册用的静态信息，后台定期重新获取并比较"""
+    return {
+        "name": Terminal.get_device_name(),
+        "account": Terminal.get_account(),
+        "os": Terminal.get_os_info(),
+        "ip": ",".join(v.get("ipv4") for v in Terminal.get_ip_address()),
+    }
+
+
 ip_address = Terminal.get_ip_address()
 ips = [v.get("ipv4") for v in ip_address]
 terminal_id = Terminal.get_terminal_id()
 terminal_pwd = generate_password(8)
+telemetry = TelemetrySampler(collect_static)
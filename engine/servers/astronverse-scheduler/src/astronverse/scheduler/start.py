@@ -12,6 +12,7 @@ from astronverse.scheduler.core.server import ServerManager
 from astronverse.scheduler.core.servers.async_server import (
     CheckPickProcessAliveServer,
     CheckStartPidExitsServer,
+    LspWarmupAsyncServer,
     RpaSchedulerAsyncServer,
     TerminalAsyncServer,
 )
@@ -62,6 +63,7 @@ def start():
         server_mg.register(TerminalAsyncServer(svc))
         server_mg.register(CheckPickProcessAliveServer(svc))
         server_mg.register(CheckStartPidExitsServer(svc))
+        server_mg.register(LspWarmupAsyncServer(svc))
         server_mg.register(svc.trigger_server)
         if svc.vnc_server:
             server_mg.register(svc.vnc_server)
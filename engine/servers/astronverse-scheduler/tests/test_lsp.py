@@ -0,0 +1,180 @@
+import asyncio
+import random
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from astronverse.scheduler.core.lsp import lsp_client, session
+from astronverse.scheduler.core.lsp.lsp_client import LspClient
+from astronverse.scheduler.core.lsp.session import LspSession
+from astronverse.scheduler.core.lsp.text_sync import TextDocument, diff_change
+from pylsp_jsonrpc.endpoint import Endpoint
+
+# 编辑器中较大的机器人脚本
+LARGE_LINES = 3000
+# 网关侧同步一次修改的目标耗时（秒）
+SYNC_BUDGET = 0.1
+
+
+def change(start, end, text):
+    return {
+        "range": {"start": {"line": start[0], "character": start[1]}, "end": {"line": end[0], "character": end[1]}},
+        "text": text,
+    }
+
+
+def large_script() -> str:
+    return "\n".join("value_{0} = compute({0}, name='row {0}')".format(i) for i in range(LARGE_LINES))
+
+
+class FakeWorker:
+    """记录发送给 pylsp 的通知，请求交给真实的 LspSession/Endpoint"""
+
+    def __init__(self, incremental_sync=True):
+        self.sent = []
+        self.incremental_sync = incremental_sync
+        with patch.object(session, "get_svc", return_value=None):
+            self.session = LspSession()
+        self.session._endpoint = Endpoint({}, self.sent.append)
+
+    def is_alive(self):
+        return True
+
+    def open_document(self, uri, folder, text, version, client=None):
+        self.opened = (uri, text, version)
+
+    def close_document(self, uri, folder):
+        pass
+
+    def messages(self, method):
+        return [m for m in self.sent if m.get("method") == method]
+
+    def respond(self, request, result):
+        self.session._endpoint.consume({"jsonrpc": "2.0", "id": request["id"], "result": result})
+
+
+def make_client(worker: FakeWorker, code: str = "") -> LspClient:
+    with patch.multiple(
+        lsp_client,
+        get_svc=MagicMock(),
+        get_project_venv=MagicMock(return_value="/projects/p1/venv/bin/python"),
+        platform_python_venv_run_dir=MagicMock(return_value="/projects/p1"),
+        lsp_pool=MagicMock(**{"acquire.return_value": worker}),
+    ):
+        client = LspClient("p1")
+    client.initialize(MagicMock(code=code))
+    return client
+
+
+class TestTextDocument(TestCase):
+    def test_incremental_changes(self):
+        doc = TextDocument("import os\nprint(os.getcwd())\n")
+        doc.apply_changes(
+            [
+                # 插入
+                change((0, 9), (0, 9), ", sys"),
+                # 替换
+                change((1, 6), (1, 17), "sys.path"),
+                # 跨行删除
+                change((0, 7), (1, 0), ""),
+            ]
+        )
+        self.assertEqual(doc.text, "import print(sys.path)\n")
+
+        # 不带范围的修改为整篇替换，之后的增量修改基于新内容
+        doc.apply_changes([{"text": "a\nb"}, change((1, 1), (1, 1), "c")])
+        self.assertEqual(doc.text, "a\nbc")
+
+        # 超出行尾的位置按行尾处理
+        doc.apply_changes([change((0, 99), (1, 0), "")])
+        self.assertEqual(doc.text, "abc")
+
+        with self.assertRaises(ValueError):
+            doc.apply_changes([change((0, 2), (0, 1), "")])
+
+    def test_diff_round_trip(self):
+        rng = random.Random(7)
+        alphabet = "ab \n\t中"
+        old = "".join(rng.choice(alphabet) for _ in range(200))
+        for _ in range(200):
+            start = rng.randrange(len(old) + 1)
+            end = min(len(old), start + rng.randrange(5))
+            new = old[:start] + "".join(rng.choice(alphabet) for _ in range(rng.randrange(5))) + old[end:]
+            doc = TextDocument(old)
+            doc.apply_changes(doc.diff(new))
+            self.assertEqual(doc.text, new)
+            old = new
+
+        self.assertIsNone(diff_change("same", "same"))
+        self.assertEqual(diff_change("a\rb", "a\rc"), {"text": "a\rc"})
+
+    def test_large_document_keystroke(self):
+        text = large_script()
+        doc = TextDocument(text)
+        edited = text.replace("value_1500 =", "value_1500x =")
+
+        start = time.perf_counter()
+        changes = doc.diff(edited)
+        doc.apply_changes(changes)
+        elapsed = time.perf_counter() - start
+
+        # 只转发改动的那一个字符，pylsp 不必重建整篇文档
+        self.assertEqual(changes, [change((1500, 10), (1500, 10), "x")])
+        self.assertEqual(doc.text, edited)
+        self.assertLess(elapsed, SYNC_BUDGET)
+
+
+class TestLspClient(TestCase):
+    def test_sync_document(self):
+        worker = FakeWorker()
+        client = make_client(worker, "x = 1\n")
+
+        self.assertEqual(client.sync_document("x = 1\n"), 1)
+        self.assertEqual(worker.messages("textDocument/didChange"), [])
+
+        # 编辑器提交增量修改，原样转发
+        edit = change((0, 4), (0, 5), "2")
+        self.assertEqual(client.sync_document(changes=[edit]), 2)
+        # 增量修改与完整代码不一致时，以完整代码为准重新比较
+        self.assertEqual(client.sync_document("y = 2\n", changes=[change((0, 4), (0, 5), "3")]), 3)
+
+        sent = [m["params"] for m in worker.messages("textDocument/didChange")]
+        self.assertEqual([p["textDocument"]["version"] for p in sent], [2, 3])
+        self.assertEqual(sent[0]["contentChanges"], [edit])
+        self.assertEqual(sent[1]["contentChanges"], [change((0, 0), (0, 1), "y")])
+        self.assertEqual(client._document.text, "y = 2\n")
+
+    def test_full_sync_worker(self):
+        worker = FakeWorker(incremental_sync=False)
+        client = make_client(worker, "x = 1\n")
+        client.sync_document("x = 10\n")
+        [message] = worker.messages("textDocument/didChange")
+        self.assertEqual(message["params"]["contentChanges"], [{"text": "x = 10\n"}])
+
+    def test_superseded_request_is_cancelled(self):
+        worker = FakeWorker()
+        client = make_client(worker)
+        position = {"line": 0, "character": 0}
+
+        async def main():
+            first = asyncio.create_task(client.get_completion(None, position))
+            await asyncio.sleep(0)
+            rename = asyncio.create_task(client.get_rename_edits(None, position, "y"))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(client.get_completion(None, position))
+            await asyncio.sleep(0)
+
+            completions = worker.messages("textDocument/completion")
+            worker.respond(completions[1], {"items": ["print"]})
+            worker.respond(worker.messages("textDocument/rename")[0], {"changes": {}})
+            return await first, await second, await rename, completions
+
+        first, second, rename, completions = asyncio.run(main())
+        self.assertIsNone(first)
+        self.assertEqual(second, {"items": ["print"]})
+        # rename 不会被其他请求取消
+        self.assertEqual(rename, {"changes": {}})
+        self.assertEqual(worker.messages("$/cancelRequest"), [
+            {"jsonrpc": "2.0", "method": "$/cancelRequest", "params": {"id": completions[0]["id"]}}
+        ])
+        self.assertEqual(client._inflight, {})
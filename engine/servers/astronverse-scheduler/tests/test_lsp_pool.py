@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from astronverse.scheduler.config import Config
+from astronverse.scheduler.core.lsp import pool
+from astronverse.scheduler.core.lsp.pool import LspWorkerPool, resolve_environment
+from astronverse.scheduler.utils.platform_utils import platform_python_venv_path
+
+
+class FakeWorker:
+    """不启动 pylsp 的 worker"""
+
+    def __init__(self, environment, cache_dir=None):
+        self.environment = environment
+        self.cache_dir = cache_dir
+        self.alive = False
+        self.documents = 0
+        self.started = 0
+        self.stopped = False
+
+    @property
+    def document_count(self):
+        return self.documents
+
+    def start(self):
+        self.started += 1
+        self.alive = True
+
+    def stale(self):
+        return self.started > 0 and not self.alive
+
+    def shutdown(self):
+        self.alive = False
+        self.stopped = True
+
+
+class TestLspWorkerPool(TestCase):
+    def setUp(self):
+        self.svc = MagicMock(config=Config)
+        patches = [
+            patch.object(pool, "LspWorker", FakeWorker),
+            patch.object(pool, "get_svc", return_value=self.svc),
+            patch.object(pool, "resolve_environment", lambda svc, environment: environment),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_config(self):
+        lsp_pool = LspWorkerPool()
+        self.assertEqual(lsp_pool.max_workers, Config.lsp_max_workers)
+        worker = lsp_pool.acquire("/envs/a/python")
+        self.assertEqual(worker.cache_dir, os.path.abspath(Config.lsp_cache_dir))
+
+    def test_same_environment_shares_worker(self):
+        lsp_pool = LspWorkerPool(max_workers=2)
+        a = lsp_pool.acquire("/envs/a/python")
+        self.assertIs(lsp_pool.acquire("/envs/a/../a/python"), a)
+        self.assertEqual((lsp_pool.misses, lsp_pool.hits), (1, 1))
+        self.assertEqual(a.started, 2)
+
+    def test_evicts_least_recently_used_idle_worker(self):
+        lsp_pool = LspWorkerPool(max_workers=2)
+        a = lsp_pool.acquire("/envs/a/python")
+        b = lsp_pool.acquire("/envs/b/python")
+        lsp_pool.acquire("/envs/a/python")
+        c = lsp_pool.acquire("/envs/c/python")
+
+        self.assertTrue(b.stopped)
+        self.assertFalse(a.stopped or c.stopped)
+        self.assertEqual([w["environment"] for w in lsp_pool.stats()["workers"]], [a.environment, c.environment])
+        self.assertEqual(lsp_pool.evictions, 1)
+
+    def test_workers_with_documents_are_kept(self):
+        lsp_pool = LspWorkerPool(max_workers=2)
+        a = lsp_pool.acquire("/envs/a/python")
+        b = lsp_pool.acquire("/envs/b/python")
+        a.documents = b.documents = 1
+
+        # 其他工程仍打开着文档，暂时超出上限
+        c = lsp_pool.acquire("/envs/c/python")
+        c.documents = 1
+        self.assertFalse(a.stopped or b.stopped)
+        self.assertEqual(len(lsp_pool.stats()["workers"]), 3)
+
+        # 文档关闭后的下一次获取淘汰空闲的 worker
+        b.documents = 0
+        d = lsp_pool.acquire("/envs/d/python")
+        self.assertTrue(b.stopped)
+        self.assertFalse(a.stopped or c.stopped or d.stopped)
+        self.assertEqual(lsp_pool.evictions, 1)
+
+    def test_stale_worker_is_restarted(self):
+        lsp_pool = LspWorkerPool(max_workers=2)
+        a = lsp_pool.acquire("/envs/a/python")
+        a.alive = False
+        again = lsp_pool.acquire("/envs/a/python")
+        self.assertIsNot(again, a)
+        self.assertTrue(a.stopped)
+        self.assertTrue(again.alive)
+
+
+class TestResolveEnvironment(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.svc = MagicMock(is_venv=False, config=MagicMock(venv_base_dir=self.tmp))
+        self.template = self.make_venv(pool.TEMPLATE_DIR, ["requests", "astronverse_actionlib"])
+
+    def make_venv(self, name, packages) -> str:
+        python = platform_python_venv_path(os.path.join(self.tmp, name))
+        site = os.path.join(self.tmp, name, "venv", "lib", "python3.13", "site-packages")
+        if os.name == "nt":
+            site = os.path.join(self.tmp, name, "venv", "Lib", "site-packages")
+        for package in [*packages, "__pycache__"]:
+            os.makedirs(os.path.join(site, package))
+        os.makedirs(os.path.dirname(python), exist_ok=True)
+        open(python, "w").close()
+        return python
+
+    def test_projects_matching_template_share_interpreter(self):
+        same = self.make_venv("p1", ["requests", "astronverse_actionlib"])
+        extra = self.make_venv("p2", ["requests", "astronverse_actionlib", "pandas"])
+        self.assertEqual(resolve_environment(self.svc, same), self.template)
+        self.assertEqual(resolve_environment(self.svc, extra), extra)
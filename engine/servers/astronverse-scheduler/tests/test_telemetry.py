@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import psutil
+from astronverse.scheduler.core.terminal import telemetry
+from astronverse.scheduler.core.terminal.telemetry import TelemetrySampler
+
+STATIC = {"name": "host", "account": "user", "os": "linux", "ip": "10.0.0.2", "mac": "aa:bb"}
+
+
+class FakeProcess:
+    def __init__(self, pid, cpu=10.0, rss=100, children=()):
+        self.pid = pid
+        self.cpu = cpu
+        self.rss = rss
+        self._children = list(children)
+
+    def cpu_percent(self, interval=None):
+        return self.cpu
+
+    def memory_info(self):
+        return SimpleNamespace(rss=self.rss)
+
+    def children(self, recursive=False):
+        return self._children
+
+
+class TestTelemetrySampler(TestCase):
+    def setUp(self):
+        self.static = dict(STATIC)
+        self.cpu = MagicMock(side_effect=[10.0, 20.0, 30.0, 40.0, 50.0, 60.0])
+        patches = [
+            patch.object(psutil, "cpu_percent", self.cpu),
+            patch.object(psutil, "virtual_memory", return_value=SimpleNamespace(percent=42.5)),
+            patch.object(psutil, "disk_usage", return_value=SimpleNamespace(percent=77.9)),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.sampler = TelemetrySampler(lambda: dict(self.static), interval=3600, cpu_window=3)
+        self.addCleanup(self.sampler.stop)
+
+    def test_metrics_before_first_sample(self):
+        self.assertEqual(self.sampler.metrics(), {"cpu": 0, "memory": 0, "disk": 0})
+
+    def test_sample_averages_cpu_window(self):
+        for _ in range(4):
+            self.sampler.sample()
+        # 只保留最近 3 次：20、30、40
+        self.assertEqual(self.sampler.metrics(), {"cpu": 30, "memory": 42, "disk": 77})
+        self.assertEqual(self.sampler.stats()["samples"], 4)
+
+    def test_disk_sampled_less_often(self):
+        self.sampler.sample()
+        with patch.object(psutil, "disk_usage", return_value=SimpleNamespace(percent=10.0)) as disk_usage:
+            self.sampler.sample()
+        disk_usage.assert_not_called()
+        self.assertEqual(self.sampler.metrics()["disk"], 77)
+
+    def test_start_samples_synchronously(self):
+        self.sampler.start()
+        # 启动后立即注册，不等后台线程第一次采样
+        self.assertEqual(self.sampler.metrics(), {"cpu": 10, "memory": 42, "disk": 77})
+        self.cpu.assert_called_once_with(interval=telemetry.FIRST_CPU_INTERVAL)
+        self.assertEqual(self.sampler.static_facts(), STATIC)
+
+        # 重复启动不再采样
+        self.sampler.start()
+        self.assertEqual(self.sampler.stats()["samples"], 1)
+
+    def test_take_static_changed(self):
+        self.sampler.refresh_static()
+        self.assertFalse(self.sampler.take_static_changed())
+
+        self.sampler.refresh_static()
+        self.assertFalse(self.sampler.take_static_changed())
+
+        self.static["ip"] = "10.0.0.3"
+        self.sampler.refresh_static()
+        self.assertTrue(self.sampler.take_static_changed())
+        # 读取后清除标记
+        self.assertFalse(self.sampler.take_static_changed())
+        self.assertEqual(self.sampler.static_facts()["ip"], "10.0.0.3")
+
+    def test_executor_metrics_include_children(self):
+        child = FakeProcess(101, cpu=5.0, rss=50)
+        procs = {100: FakeProcess(100, children=[child])}
+        with patch.object(psutil, "Process", side_effect=lambda pid: procs[pid]):
+            self.sampler.start(lambda: {"exec-1": 100})
+            # 新出现的子进程第一次只记录基准
+            self.assertEqual(
+                self.sampler.executor_metrics(), [{"exec_id": "exec-1", "pid": 100, "cpu": 10.0, "rss": 100}]
+            )
+            self.sampler.sample()
+        self.assertEqual(
+            self.sampler.executor_metrics(), [{"exec_id": "exec-1", "pid": 100, "cpu": 15.0, "rss": 150}]
+        )
@@ -1,10 +1,10 @@
 import threading
-from collections import deque
 from typing import Optional
 
 from astronverse.trigger.core.config import config
 from astronverse.trigger.core.logger import logger
 from astronverse.trigger.core.queue_manager import TaskQueueManager
+from astronverse.trigger.core.queue_store import TaskQueueStore
 from astronverse.trigger.terminal import Terminal
 from astronverse.trigger.trigger import Trigger
 
@@ -25,8 +25,8 @@ class AppContext:
             "deduplicate": False,  # 是否去重
         }
 
-        # 用于监控的队列，存储当前正在排队的任务信息
-        self.task_queue_monitor = deque(maxlen=1000)  # 设置最大长度为1000，防止内存溢出
+        # 用于监控的队列，存储当前正在排队的任务信息，持久化到本地，最多1000个
+        self.task_queue_monitor = TaskQueueStore()
 
         # 线程管理
         self._threads = []
@@ -38,6 +38,10 @@ class AppContext:
         # 初始化触发器
         await self._init_trigger()
 
+        # 恢复排队任务和队列配置
+        self.task_queue_monitor.open()
+        self.queue_config = self.task_queue_monitor.load_config(self.queue_config)
+
         # 初始化任务队列管理器
         self._init_task_queue_manager()
 
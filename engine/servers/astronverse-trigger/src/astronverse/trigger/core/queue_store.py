@@ -0,0 +1,312 @@
+"""
+排队任务持久化
+
+排队中的任务保存在本地 SQLite（WAL 模式），服务重启或崩溃后不会丢失：
+- 每个任务一行，按入队顺序（seq）排列，trigger_id、任务名称、任务类型、过期时间建立索引
+- 下发前先标记为下发中，下发成功后再删除；启动时下发中的任务恢复为排队，重新下发
+- 状态查询按条件直接分页，顺序翻页按 seq > 上一页最后的 seq 续查（走索引，不随页深变慢），
+  只有直接跳页时才用 OFFSET；不再遍历整个队列并深拷贝
+- 队列配置一并保存，重启后沿用
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from astronverse.trigger.core.logger import logger
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 最多保存的排队任务数，防止无限增长
+MAX_SIZE = 1000
+
+# 任务状态
+STATE_QUEUED = 0
+STATE_DISPATCHING = 1
+
+# 不保存在任务内容中的字段，从列中还原
+_TIME_FIELDS = ("enqueue_time", "expire_time", "unique_id", "seq")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_queue (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    unique_id TEXT NOT NULL UNIQUE,
+    trigger_id TEXT,
+    trigger_name TEXT,
+    task_type TEXT,
+    mode TEXT,
+    enqueue_at REAL NOT NULL,
+    expire_at REAL NOT NULL,
+    state INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_task_queue_trigger_id ON task_queue (trigger_id, state);
+CREATE INDEX IF NOT EXISTS idx_task_queue_task_type ON task_queue (state, task_type, seq);
+CREATE INDEX IF NOT EXISTS idx_task_queue_trigger_name ON task_queue (state, trigger_name);
+CREATE INDEX IF NOT EXISTS idx_task_queue_expire_at ON task_queue (state, expire_at);
+CREATE TABLE IF NOT EXISTS queue_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def default_path() -> str:
+    return os.path.join(os.getcwd(), "data", "trigger_queue.db")
+
+
+def format_time(ts: float) -> str:
+    return time.strftime(TIME_FORMAT, time.localtime(ts))
+
+
+class TaskQueueStore:
+    """排队任务队列，接口与原来的 deque 用法对应，len() 只统计排队中的任务"""
+
+    def __init__(self, path: Optional[str] = None, max_size: int = MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._size = 0
+        # 有新任务入队时唤醒下发线程
+        self._added = threading.Event()
+
+    def open(self):
+        """打开数据库，恢复上次未完成的任务"""
+        if self._conn is not None:
+            return
+        start = time.perf_counter()
+        path = self.path or default_path()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        with self._lock:
+            self._conn = conn
+            # 上次下发中被中断的任务重新排队
+            resumed = conn.execute(
+                "UPDATE task_queue SET state = ? WHERE state = ?", (STATE_QUEUED, STATE_DISPATCHING)
+            ).rowcount
+            self._size = conn.execute("SELECT COUNT(*) FROM task_queue WHERE state = ?", (STATE_QUEUED,)).fetchone()[0]
+        if self._size:
+            self._added.set()
+        logger.info(
+            "排队任务恢复完成: {} 个任务（其中下发中断 {} 个），耗时 {:.1f}ms".format(
+                self._size, resumed, (time.perf_counter() - start) * 1000
+            )
+        )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    @staticmethod
+    def _to_task(row: sqlite3.Row) -> dict:
+        task = json.loads(row["payload"])
+        task["enqueue_time"] = format_time(row["enqueue_at"])
+        task["expire_time"] = format_time(row["expire_at"])
+        task["unique_id"] = row["unique_id"]
+        task["seq"] = row["seq"]
+        return task
+
+    def _count(self):
+        self._size = self._conn.execute("SELECT COUNT(*) FROM task_queue WHERE state = ?", (STATE_QUEUED,)).fetchone()[
+            0
+        ]
+
+    def _delete(self, select: str, args) -> list:
+        """删除 select 查到的行（第一列为 seq），需持有锁"""
+        rows = self._conn.execute(select, args).fetchall()
+        if rows:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("DELETE FROM task_queue WHERE seq = ?", [(row[0],) for row in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._count()
+        return rows
+
+    def append(self, task: dict, unique_id: str, max_wait_minutes: int) -> bool:
+        """入队，队列已达到上限时返回 False"""
+        now = time.time()
+        payload = {k: v for k, v in task.items() if k not in _TIME_FIELDS}
+        with self._lock:
+            if self._size >= self.max_size:
+                return False
+            self._conn.execute(
+                "INSERT INTO task_queue (unique_id, trigger_id, trigger_name, task_type, mode, enqueue_at, expire_at, "
+                "payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    unique_id,
+                    task.get("trigger_id"),
+                    str(task.get("trigger_name", "")).lower(),
+                    str(task.get("task_type", "")).lower(),
+                    task.get("mode"),
+                    now,
+                    now + max_wait_minutes * 60,
+                    json.dumps(payload, ensure_ascii=False, default=str),
+                ),
+            )
+            self._size += 1
+        self._added.set()
+        return True
+
+    def wait(self, timeout: float) -> bool:
+        """等待有任务入队"""
+        self._added.clear()
+        if self._size:
+            return True
+        return self._added.wait(timeout)
+
+    def first(self) -> Optional[dict]:
+        """最早入队的排队任务，只查看不移除"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM task_queue WHERE state = ? ORDER BY seq LIMIT 1", (STATE_QUEUED,)
+            ).fetchone()
+        return self._to_task(row) if row else None
+
+    def take(self, unique_id: str) -> bool:
+        """标记为下发中，任务已被删除时返回 False"""
+        with self._lock:
+            changed = self._conn.execute(
+                "UPDATE task_queue SET state = ? WHERE unique_id = ? AND state = ?",
+                (STATE_DISPATCHING, unique_id, STATE_QUEUED),
+            ).rowcount
+            if changed:
+                self._size -= 1
+        return bool(changed)
+
+    def done(self, unique_id: str):
+        """下发完成或丢弃，删除任务"""
+        with self._lock:
+            self._conn.execute("DELETE FROM task_queue WHERE unique_id = ?", (unique_id,))
+            self._count()
+
+    def remove(self, unique_ids: list[str]) -> int:
+        """删除排队中的任务，返回删除数量"""
+        if not unique_ids:
+            return 0
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM task_queue WHERE state = ? AND unique_id IN ({})".format(",".join("?" * len(unique_ids))),
+                (STATE_QUEUED, *unique_ids),
+            ).rowcount
+            self._count()
+        return removed
+
+    def has_trigger(self, trigger_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM task_queue WHERE trigger_id = ? AND state = ? LIMIT 1", (trigger_id, STATE_QUEUED)
+            ).fetchone()
+        return row is not None
+
+    def purge_expired(self, now: Optional[float] = None) -> list[str]:
+        """删除已超时的排队任务，返回其 trigger_id"""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._delete(
+                "SELECT seq, trigger_id FROM task_queue WHERE state = ? AND expire_at < ?", (STATE_QUEUED, now)
+            )
+        return [row[1] for row in rows]
+
+    def page(
+        self,
+        offset: int,
+        limit: int,
+        name: Optional[str] = None,
+        task_type: Optional[str] = None,
+        last_seq: Optional[int] = None,
+    ) -> tuple[int, list[dict]]:
+        """
+        按条件分页查询排队中的任务，返回 (总数, 当前页)
+
+        Args:
+            offset: 跳过的任务数，last_seq 不为空时忽略
+            last_seq: 上一页最后一个任务的 seq，从其后继续查询
+        """
+        where = ["state = ?"]
+        args: list = [STATE_QUEUED]
+        if task_type:
+            where.append("task_type = ?")
+            args.append(task_type.lower())
+        if name:
+            where.append("instr(trigger_name, ?) > 0")
+            args.append(name.lower())
+        clause = " AND ".join(where)
+        if last_seq is not None:
+            page_clause, page_args = clause + " AND seq > ?", (*args, last_seq)
+            offset = 0
+        else:
+            page_clause, page_args = clause, tuple(args)
+        with self._lock:
+            # 排队任务数不超过 max_size，总数直接统计
+            total = self._conn.execute("SELECT COUNT(*) FROM task_queue WHERE {}".format(clause), args).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT * FROM task_queue WHERE {} ORDER BY seq LIMIT ? OFFSET ?".format(page_clause),
+                (*page_args, limit, max(offset, 0)),
+            ).fetchall()
+        return total, [self._to_task(row) for row in rows]
+
+    def update_expire(self, max_wait_minutes: int):
+        """按新的最大等待时间重新计算过期时间"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE task_queue SET expire_at = enqueue_at + ? WHERE state = ?",
+                (max_wait_minutes * 60, STATE_QUEUED),
+            )
+
+    def trim(self, max_length: int) -> list[str]:
+        """超出长度的排队任务从队尾删除，保留最早的任务，返回删除的 unique_id"""
+        with self._lock:
+            rows = self._delete(
+                "SELECT seq, unique_id FROM task_queue WHERE state = ? ORDER BY seq LIMIT -1 OFFSET ?",
+                (STATE_QUEUED, max(max_length, 0)),
+            )
+        return [row[1] for row in rows]
+
+    def deduplicate(self) -> list[str]:
+        """同一 trigger_id 只保留最早的排队任务，返回删除的 unique_id"""
+        with self._lock:
+            rows = self._delete(
+                "SELECT seq, unique_id FROM task_queue WHERE state = ? AND seq NOT IN "
+                "(SELECT MIN(seq) FROM task_queue WHERE state = ? GROUP BY trigger_id)",
+                (STATE_QUEUED, STATE_QUEUED),
+            )
+        return [row[1] for row in rows]
+
+    def load_config(self, default: dict) -> dict:
+        """读取保存的队列配置，缺少的项使用默认值"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM queue_meta WHERE key = 'queue_config'").fetchone()
+        res = dict(default)
+        if row:
+            try:
+                saved = json.loads(row[0])
+                res.update({k: v for k, v in saved.items() if k in default})
+            except Exception as e:
+                logger.error("读取队列配置失败: {}".format(e))
+        return res
+
+    def save_config(self, queue_config: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO queue_meta (key, value) VALUES ('queue_config', ?)", (json.dumps(queue_config),)
+            )
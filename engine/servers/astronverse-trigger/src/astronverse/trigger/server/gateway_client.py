@@ -1,9 +1,23 @@
 import json
+import threading
 
 import requests
 from astronverse.trigger import CONVERT_COLUMN, TERMINAL_CONVERT_COLUMN
 from astronverse.trigger.core.config import config
 from astronverse.trigger.core.logger import logger
+from astronverse.trigger.sync import NOT_MODIFIED, body_digest
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """同步任务列表使用的 HTTP 会话，连接保持复用"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        return _session
 
 
 def execute_multiple_projects(project_info: dict):
@@ -77,53 +91,71 @@ def send_stop_current():
         return {"code": "5001", "msg": "请求失败", "data": None}
 
 
-def list_trigger():
-    def convert(recorder: list[dict]) -> dict:
-        trigger_tasks = {}
-        for task in recorder:
-            _d = {}
-            for k, v in CONVERT_COLUMN.items():
-                # 规则转换（进行服务端的规范0和1转换）
-                if k == "enable" or k == "queueEnable":
-                    _d[v] = True if task.get(k) == 1 else False
-                    continue
-                # taskJson对Dict进行扩充
-                elif k == "taskJson":
-                    task[k] = task.get(k).replace("'", '"')
-                    _d.update(json.loads(task.get(k)))
-                    # taskJson本体也保留
-                elif k == "robotInfoList":
-                    callback_infos_list = []
-                    for i in task.get(k):
-                        callback_infos = {}
-                        for key, value in i.items():
-                            if value is not None:
-                                callback_infos[key] = value
-                        callback_infos_list.append(callback_infos)
-                    _d[v] = callback_infos_list
-                    continue
-
-                _d[v] = task.get(k)
-            _d["mode"] = "EXECUTOR"
-            if _d.get("open_virtual_desk") is None:
-                _d["open_virtual_desk"] = False
-            if _d.get("screen_record_enable") is None:
-                _d["screen_record_enable"] = False
-            if _d.get("retry_num"):
-                _d["retry_num"] = int(_d.get("retry_num"))
-            else:
-                _d["retry_num"] = 0
-
-            trigger_tasks[_d["trigger_id"]] = _d
+def convert_triggers(recorder: list[dict]) -> dict:
+    """服务端触发器记录转换为本地任务参数 {trigger_id: 参数}"""
+    trigger_tasks = {}
+    for task in recorder:
+        _d = {}
+        for k, v in CONVERT_COLUMN.items():
+            # 规则转换（进行服务端的规范0和1转换）
+            if k == "enable" or k == "queueEnable":
+                _d[v] = True if task.get(k) == 1 else False
+                continue
+            # taskJson对Dict进行扩充
+            elif k == "taskJson":
+                task[k] = task.get(k).replace("'", '"')
+                _d.update(json.loads(task.get(k)))
+                # taskJson本体也保留
+            elif k == "robotInfoList":
+                callback_infos_list = []
+                for i in task.get(k):
+                    callback_infos = {}
+                    for key, value in i.items():
+                        if value is not None:
+                            callback_infos[key] = value
+                    callback_infos_list.append(callback_infos)
+                _d[v] = callback_infos_list
+                continue
+
+            _d[v] = task.get(k)
+        _d["mode"] = "EXECUTOR"
+        if _d.get("open_virtual_desk") is None:
+            _d["open_virtual_desk"] = False
+        if _d.get("screen_record_enable") is None:
+            _d["screen_record_enable"] = False
+        if _d.get("retry_num"):
+            _d["retry_num"] = int(_d.get("retry_num"))
+        else:
+            _d["retry_num"] = 0
+
+        trigger_tasks[_d["trigger_id"]] = _d
+
+    return trigger_tasks
+
+
+def list_trigger(etag: str = None):
+    """
+    获取全量触发器列表
 
-        return trigger_tasks
+    Args:
+        etag: 上一次的 ETag，列表没有变化时返回 NOT_MODIFIED
 
+    Returns:
+        (触发器列表或NOT_MODIFIED, 本次的ETag)
+    """
     url = "http://127.0.0.1:{}/api/robot/triggerTask/page/list4Trigger".format(config.GATEWAY_PORT)
     headers = {"Content-Type": "application/json"}
+    if etag:
+        headers["If-None-Match"] = etag
     payload = json.dumps({"pageSize": 100, "pageNo": 1, "name": "", "taskType": ""})
-    response = requests.request("POST", url, headers=headers, data=payload, timeout=5)
+    response = http_session().request("POST", url, headers=headers, data=payload, timeout=5)
+    if response.status_code == 304:
+        return NOT_MODIFIED, etag
+    new_etag = response.headers.get("ETag") or body_digest(response.content)
+    if etag and new_etag == etag:
+        return NOT_MODIFIED, etag
     if response.json()["code"] == "000000":
-        return convert(response.json()["data"]["records"])
+        return convert_triggers(response.json()["data"]["records"]), new_etag
     else:
         raise Exception("获取任务列表失败")
 
@@ -140,16 +172,22 @@ def terminal_poll_update():
     """
     url = "http://127.0.0.1:{}/api/robot/dispatch-task/poll-task-update".format(config.GATEWAY_PORT)
     params = {"terminalId": config.TERMINAL_ID}
-    response = requests.request("GET", url, params=params, timeout=5)
+    response = http_session().request("GET", url, params=params, timeout=5)
     if int(response.status_code) == 200:
         return response.json()["data"]
     else:
         return False
 
 
-def terminal_list_task():
+def terminal_list_task(etag: str = None):
     """
     从节点获取任务列表接口
+
+    Args:
+        etag: 上一次的 ETag，列表没有变化时返回 NOT_MODIFIED
+
+    Returns:
+        ((调度任务, 重试任务, 停止任务)或NOT_MODIFIED, 本次的ETag)
     """
 
     def convert(recorder: dict):
@@ -209,9 +247,16 @@ def terminal_list_task():
 
     url = "http://127.0.0.1:{}/api/robot/dispatch-task/terminal-task-detail".format(config.GATEWAY_PORT)
     headers = {"Content-Type": "application/json"}
+    if etag:
+        headers["If-None-Match"] = etag
     params = {"terminalId": config.TERMINAL_ID}
-    response = requests.request("GET", url, headers=headers, params=params, timeout=5)
+    response = http_session().request("GET", url, headers=headers, params=params, timeout=5)
+    if response.status_code == 304:
+        return NOT_MODIFIED, etag
     if int(response.status_code) == 200:
-        return convert(response.json()["data"])
+        new_etag = response.headers.get("ETag") or body_digest(response.content)
+        if etag and new_etag == etag:
+            return NOT_MODIFIED, etag
+        return convert(response.json()["data"]), new_etag
     else:
-        return None
+        return None, etag
@@ -1,5 +1,4 @@
 import asyncio
-import copy
 import threading
 import time
 
@@ -21,6 +20,7 @@ from astronverse.trigger.server.gateway_client import (
     get_executor_status,
     send_stop_current,
 )
+from astronverse.trigger.sync import SYNC_CHANNEL, SYNC_KEY, TERMINAL_SYNC_KEY
 from astronverse.trigger.tasks.base_task import AsyncImmediateTask, AsyncSchedulerTask
 from astronverse.trigger.tasks.mail_task import MailTask
 from astronverse.trigger.tasks.scheduled_task import ScheduledTask
@@ -37,6 +37,8 @@ class WebSocketManager:
         self.ws_app = None
         self._thread = None
         self._stop_event = threading.Event()
+        # 触发器在事件循环里维护，推送消息需要切回事件循环处理
+        self.loop = None
 
     @staticmethod
     def default_log(msg, *args, **kwargs):
@@ -63,6 +65,18 @@ class WebSocketManager:
             return send_stop_current()
         return {"code": "5001", "msg": "没有任务在运行中", "data": None}
 
+    def trigger_update(self, msg: BaseMsg):
+        """处理服务端推送的触发器变化"""
+        logger.info("trigger update: {}".format(msg.data))
+        if app_context.trigger and self.loop:
+            self.loop.call_soon_threadsafe(app_context.trigger.apply_push, msg.data)
+
+    @staticmethod
+    def terminal_update(msg: BaseMsg):
+        """处理服务端推送的调度任务变化"""
+        if app_context.terminal:
+            app_context.terminal.notify_update((msg.data or {}).get("revision"))
+
     def start(self):
         """启动 WebSocket 连接"""
         try:
@@ -77,6 +91,8 @@ class WebSocketManager:
             )
             self.ws_app.event("remote", "run", self.remote_run)
             self.ws_app.event("remote", "stop_current", self.remote_stop_current)
+            self.ws_app.event(SYNC_CHANNEL, SYNC_KEY, self.trigger_update)
+            self.ws_app.event(SYNC_CHANNEL, TERMINAL_SYNC_KEY, self.terminal_update)
 
             self._thread = threading.Thread(target=self._ws_worker, daemon=True)
             self._thread.start()
@@ -129,10 +145,11 @@ async def init_trigger():
     await app_context.initialize()
 
     # 启动 WebSocket 管理器
+    ws_manager.loop = asyncio.get_running_loop()
     ws_manager.start()
 
     async def periodic_to_native():
-        """每300秒调用一次trigger.to_native()"""
+        """每300秒调用一次trigger.to_native()，触发器变化由服务端推送，这里只做兜底，列表没有变化时不做对比"""
         while True:
             logger.info("执行定期同步任务")
             if not app_context.trigger:
@@ -277,7 +294,9 @@ def future_with_create(task_info: TaskFutureExecWithoutIdInput):
 
 
 @app.get("/task/queue/status")
-async def get_queue_status(pageNo: int = 1, pageSize: int = 10, name: str = None, taskType: str = None):
+async def get_queue_status(
+    pageNo: int = 1, pageSize: int = 10, name: str = None, taskType: str = None, lastSeq: int = None
+):
     """
     获取当前任务队列状态
 
@@ -285,39 +304,19 @@ async def get_queue_status(pageNo: int = 1, pageSize: int = 10, name: str = None
     :param pageSize: 每页大小
     :param name: 任务名称，用于搜索过滤
     :param taskType: 任务类型，用于搜索过滤
+    :param lastSeq: 上一页最后一个任务的seq，顺序翻页时传入，从其后继续查询
     :return: 分页后的任务队列状态
     """
     try:
-        filtered_tasks = []
-        total = 0
-        start_idx = (pageNo - 1) * pageSize
-        end_idx = start_idx + pageSize
-
-        # 一次遍历完成过滤和分页
-        for task in app_context.task_queue_monitor:
-            # 检查是否超时
-            if app_context.task_queue_mgr.is_task_timeout(task):
-                app_context.task_queue_monitor.remove(task)
-                logger.info(
-                    f"任务等待时间超过{app_context.queue_config['max_wait_minutes']}分钟，已移除: {task.get('trigger_id')}"
-                )
-                continue
+        for trigger_id in app_context.task_queue_monitor.purge_expired():
+            logger.info(f"任务等待时间超过{app_context.queue_config['max_wait_minutes']}分钟，已移除: {trigger_id}")
 
-            # 应用搜索过滤
-            if name and name.lower() not in str(task.get("trigger_name", "")).lower():
-                continue
-            if taskType and taskType.lower() != str(task.get("task_type", "")).lower():
-                continue
-
-            # 计数
-            total += 1
-
-            # 只收集当前页的数据
-            if start_idx <= total - 1 < end_idx:
-                # 使用深拷贝避免修改原始任务对象
-                task_copy = copy.deepcopy(task)
-                task_copy["status_index"] = total
-                filtered_tasks.append(task_copy)
+        start_idx = (pageNo - 1) * pageSize
+        total, filtered_tasks = app_context.task_queue_monitor.page(
+            start_idx, pageSize, name, taskType, last_seq=lastSeq
+        )
+        for i, task in enumerate(filtered_tasks):
+            task["status_index"] = start_idx + i + 1
 
         return {
             "code": 200,
@@ -348,16 +347,9 @@ async def remove_queue_task(task_info: RemoveQueueTaskInput):
     :return:
     """
     try:
-        removed_count = 0
-        # 遍历要删除的unique_id列表
-        for unique_id in task_info.unique_id:
-            # 在队列中查找对应的任务
-            for task in list(app_context.task_queue_monitor):
-                if task.get("unique_id") == unique_id:
-                    app_context.task_queue_monitor.remove(task)
-                    removed_count += 1
-                    logger.info(f"从队列中删除任务: {unique_id}")
-                    break
+        removed_count = app_context.task_queue_monitor.remove(task_info.unique_id)
+        if removed_count:
+            logger.info(f"从队列中删除任务: {task_info.unique_id}")
 
         if removed_count > 0:
             return {
@@ -387,40 +379,20 @@ async def update_queue_config(config: QueueConfigInput):
     try:
         # 如果最大等待时间发生变化，更新所有任务的过期时间
         if config.max_wait_minutes != app_context.queue_config["max_wait_minutes"]:
-            for task in app_context.task_queue_monitor:
-                enqueue_time = task.get("enqueue_time", "")
-                if enqueue_time:
-                    # 重新计算过期时间
-                    expire_time = time.strftime(
-                        "%Y-%m-%d %H:%M:%S",
-                        time.localtime(
-                            time.mktime(time.strptime(enqueue_time, "%Y-%m-%d %H:%M:%S")) + config.max_wait_minutes * 60
-                        ),
-                    )
-                    task["expire_time"] = expire_time
-
-        # 如果队列最大长度变小了，删除超出限制的任务
+            app_context.task_queue_monitor.update_expire(config.max_wait_minutes)
+
+        # 如果队列最大长度变小了，删除超出限制的任务（从队列末尾删除，保留最早的任务）
         if config.max_length < app_context.queue_config["max_length"]:
-            current_size = len(app_context.task_queue_monitor)
-            if current_size > config.max_length:
-                # 删除超出限制的任务（从队列末尾删除，保留最早的任务）
-                tasks_to_remove = current_size - config.max_length
-                for _ in range(tasks_to_remove):
-                    if app_context.task_queue_monitor:
-                        removed_task = app_context.task_queue_monitor.pop()
-                        logger.info(f"队列长度超限，删除任务: {removed_task.get('unique_id')}")
+            for unique_id in app_context.task_queue_monitor.trim(config.max_length):
+                logger.info(f"队列长度超限，删除任务: {unique_id}")
 
         if config.deduplicate and not app_context.queue_config["deduplicate"]:
-            # 开启去重，需要重新检查所有任务是否重复
-            trigger_ids = set()
-            for task in app_context.task_queue_monitor:
-                if task.get("trigger_id") in trigger_ids:
-                    app_context.task_queue_monitor.remove(task)
-                    logger.info(f"任务已存在，跳过: {task.get('unique_id')}")
-                    continue
-                trigger_ids.add(task.get("trigger_id"))
+            # 开启去重，相同trigger_id只保留最早的任务
+            for unique_id in app_context.task_queue_monitor.deduplicate():
+                logger.info(f"任务已存在，跳过: {unique_id}")
 
         app_context.queue_config.update(config.model_dump())
+        app_context.task_queue_monitor.save_config(app_context.queue_config)
         logger.info(f"更新队列配置: {app_context.queue_config}")
         return {
             "code": 200,
@@ -0,0 +1,99 @@
+"""
+触发器同步
+
+云端触发器列表按版本同步：
+- 服务端在触发器变化时通过 websocket 推送 {"revision": 版本号, "upserts": [...], "deletes": [...]}，
+  版本号连续时直接应用推送中的增量，不连续或推送不带增量时再拉取全量
+- 拉取全量时带上一次的 ETag（If-None-Match），服务端返回 304 或内容摘要不变时跳过对比
+- 每个任务按参数计算哈希，只比较哈希，不再逐个比较参数字典
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Optional
+
+# 推送消息
+SYNC_CHANNEL = "trigger"
+SYNC_KEY = "update"
+TERMINAL_SYNC_KEY = "terminal_update"
+
+# 全量列表没有变化
+NOT_MODIFIED = object()
+
+
+def task_hash(task: dict) -> str:
+    """任务参数的哈希，字段顺序不影响结果"""
+    data = json.dumps(task, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def body_digest(content: bytes) -> str:
+    """服务端不返回 ETag 时，用响应内容摘要代替"""
+    return 'W/"{}"'.format(hashlib.sha1(content).hexdigest())
+
+
+@dataclass
+class TaskDiff:
+    added: list[dict] = field(default_factory=list)
+    changed: list[dict] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+
+def diff_tasks(
+    local: dict[str, str], remote: dict[str, dict], partial: bool = False
+) -> tuple[TaskDiff, dict[str, str]]:
+    """
+    比较本地任务哈希和云端任务
+
+    Args:
+        local: 本地 {trigger_id: 哈希}
+        remote: 云端 {trigger_id: 任务参数}
+        partial: remote 只是增量，不据此判断删除
+
+    Returns:
+        差异和云端 {trigger_id: 哈希}
+    """
+    diff = TaskDiff()
+    remote_hashes = {}
+    for trigger_id, task in remote.items():
+        h = task_hash(task)
+        remote_hashes[trigger_id] = h
+        old = local.get(trigger_id)
+        if old is None:
+            diff.added.append(task)
+        elif old != h:
+            diff.changed.append(task)
+    if not partial:
+        diff.removed = list(local.keys() - remote.keys())
+    return diff, remote_hashes
+
+
+@dataclass
+class SyncState:
+    """一个同步源（个人触发器或终端调度任务）的版本信息"""
+
+    # 服务端推送的版本号，None 表示还没有收到过
+    revision: Optional[int] = None
+    # 上一次全量列表的 ETag
+    etag: Optional[str] = None
+
+    # 统计
+    full_pulls: int = 0
+    not_modified: int = 0
+    deltas: int = 0
+
+    def accept(self, revision) -> bool:
+        """推送的版本号是否紧接本地版本，是则可以直接应用增量"""
+        if revision is None:
+            return False
+        ok = self.revision is not None and int(revision) == self.revision + 1
+        self.revision = int(revision)
+        return ok
+
+    def reset(self):
+        self.revision = None
+        self.etag = None
@@ -1,6 +1,5 @@
 import asyncio
 import threading
-import time
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from astronverse.trigger.core.logger import logger
@@ -9,6 +8,7 @@ from astronverse.trigger.server.gateway_client import (
     terminal_list_task,
     terminal_poll_update,
 )
+from astronverse.trigger.sync import NOT_MODIFIED, SyncState, diff_tasks
 from astronverse.trigger.tasks.base_task import AsyncImmediateTask, AsyncSchedulerTask
 
 
@@ -18,10 +18,15 @@ class Terminal:
         self.queue = global_queue
         self.scheduler: AsyncIOScheduler = global_scheduler
         self.tasks = {}
+        # 任务参数哈希，与云端比较使用
+        self.hashes: dict[str, str] = {}
+        self.sync = SyncState()
 
         # terminal轮询线程控制
         self.poll_thread = None
         self.poll_stop_event = threading.Event()
+        # 服务端推送任务变化时唤醒轮询线程
+        self.poll_wakeup = threading.Event()
 
     def terminal_poll_worker(self):
         """
@@ -32,23 +37,34 @@ class Terminal:
         count = 1
         while not self.poll_stop_event.is_set():
             try:
-                if count % 5 == 0:
+                if self.poll_wakeup.is_set():
+                    # 服务端推送了任务变化，立即更新
+                    self.poll_wakeup.clear()
+                    self.update_task_list()
+                elif count % 5 == 0:
                     flag = terminal_poll_update()
                     if flag:
                         logger.info("【terminal_poll_worker】terminal轮询结果：{}", flag)
-                    if flag or count % 100 == 0:
-                        # 处理terminal更新逻辑
                         self.update_task_list()
+                    elif count % 100 == 0:
+                        # 兜底全量，列表没有变化时不做处理
+                        self.update_task_list(check_modified=True)
             except Exception as e:
                 logger.error(f"【terminal_poll_worker】terminal轮询异常: {e}")
             finally:
                 count += 1
                 if count > 100:
                     count = 1
-                time.sleep(1)
+                self.poll_wakeup.wait(1)
 
         logger.info("【terminal_poll_worker】terminal轮询线程停止")
 
+    def notify_update(self, revision=None):
+        """服务端推送任务变化"""
+        logger.info("【notify_update】收到任务变化推送: {}".format(revision))
+        self.sync.revision = revision
+        self.poll_wakeup.set()
+
     def start_poll(self):
         """
         启动terminal轮询线程
@@ -80,51 +96,53 @@ class Terminal:
 
         self.delete_all_tasks()
 
-    def update_task_list(self):
+    def update_task_list(self, check_modified: bool = False):
         # 请求全量任务列表
-        new_task_list, retry_task_list, stop_task_list = terminal_list_task()
-        new_task_ids = [task["trigger_id"] for task in new_task_list if task["task_type"] != "manual"]
-        # 和本地任务的交集、本地任务差集、云端任务差集
+        res, etag = terminal_list_task(self.sync.etag if check_modified else None)
+        self.sync.full_pulls += 1
+        if res is NOT_MODIFIED:
+            self.sync.not_modified += 1
+            return
+        if res is None:
+            logger.error("【update_task_list】获取任务列表失败")
+            return
+        self.sync.etag = etag
+        new_task_list, retry_task_list, stop_task_list = res
 
         manual_new_task_list = [task for task in new_task_list if task["task_type"] == "manual"]
 
-        non_manual_new_task_list = [task for task in new_task_list if task["task_type"] != "manual"]
-        logger.info(f"【update_task_list】new_task_list全量任务列表: {non_manual_new_task_list} ")
+        non_manual_new_task_list = {task["trigger_id"]: task for task in new_task_list if task["task_type"] != "manual"}
+        logger.info(f"【update_task_list】new_task_list全量任务列表: {list(non_manual_new_task_list.values())} ")
 
-        intersection = [task for task in non_manual_new_task_list if task["trigger_id"] in self.tasks.keys()]
-        local_tasks_unique = [task_id for task_id, task in self.tasks.items() if task_id not in new_task_ids]
-        cloud_tasks_unique = [task for task in non_manual_new_task_list if task["trigger_id"] not in self.tasks.keys()]
+        # 按参数哈希比较，分出本地独有、云端独有、参数不同的部分
+        local_hashes = {task_id: self.hashes.get(task_id, "") for task_id in self.tasks}
+        diff, hashes = diff_tasks(local_hashes, non_manual_new_task_list)
 
-        logger.info(f"【update_task_list】intersection本地、云端相交部分是：{intersection} ")
-        logger.info(f"【update_task_list】local_tasks_unique本地独有任务：{local_tasks_unique} ")
-        logger.info(f"【update_task_list】cloud_tasks_unique云端独有任务：{cloud_tasks_unique} ")
+        logger.info(f"【update_task_list】changed云端、本地任务ID相同，参数不同：{diff.changed} ")
+        logger.info(f"【update_task_list】local_tasks_unique本地独有任务：{diff.removed} ")
+        logger.info(f"【update_task_list】cloud_tasks_unique云端独有任务：{diff.added} ")
 
         # 本地任务差值，直接删除
-        for task_id in local_tasks_unique:
+        for task_id in diff.removed:
             logger.info(f"【update_task_list】本地删除任务: {task_id}")
             self.delete_task(task_id)
 
         # 云端任务差值，直接添加
-        for task in cloud_tasks_unique:
+        for task in diff.added:
             logger.info(f"【update_task_list】云端添加任务: {task}")
-            self.add_task(**task)
+            if self.add_task(**task):
+                self.hashes[task["trigger_id"]] = hashes[task["trigger_id"]]
 
         # 手动任务直接添加
         for task in manual_new_task_list:
             logger.info(f"【update_task_list】手动添加任务: {task}")
             self.add_task(**task)
 
-        # 本地计划任务交集，进行更新处理
-        # intersection里拿的是新的
-        for new_task in intersection:
-            task = self.tasks[new_task["trigger_id"]]
-
-            if task.kwargs == new_task:
-                logger.info("【update_task_list】云端、本地任务ID相同，参数相同，不进行更新。 ")
-                continue
-            else:
-                logger.info(f"【update_task_list】云端、本地任务ID相同，参数不同，进行更新：{new_task} ")
-                self.update_task(**new_task)
+        # 本地计划任务参数不同的，进行更新处理
+        for new_task in diff.changed:
+            logger.info(f"【update_task_list】云端、本地任务ID相同，参数不同，进行更新：{new_task} ")
+            if self.update_task(**new_task):
+                self.hashes[new_task["trigger_id"]] = hashes[new_task["trigger_id"]]
 
         # 处理retry和stop任务
         for task in retry_task_list:
@@ -244,6 +262,7 @@ class Terminal:
             if hasattr(task, "delete"):
                 task.delete()
             del self.tasks[task_id]
+            self.hashes.pop(task_id, None)
             logger.info(f"【delete_task】任务删除成功: {task_id}")
             return True
         except Exception as e:
@@ -279,6 +298,7 @@ class Terminal:
         删除所有任务
         """
         logger.info("【delete_all_tasks】: {}".format(self.tasks.keys()))
+        self.sync.reset()
         task_keys = list(self.tasks.keys())
         for task_key in task_keys:
             logger.info("【delete_all_tasks】删除任务: {}".format(task_key))
@@ -4,7 +4,8 @@ from typing import Union
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from astronverse.trigger.core.config import config
 from astronverse.trigger.core.logger import logger
-from astronverse.trigger.server.gateway_client import list_trigger
+from astronverse.trigger.server.gateway_client import convert_triggers, list_trigger
+from astronverse.trigger.sync import NOT_MODIFIED, SyncState, TaskDiff, diff_tasks
 from astronverse.trigger.tasks.base_task import (
     AsyncImmediateTask,
     AsyncOneCallTask,
@@ -15,20 +16,20 @@ from astronverse.trigger.tasks.base_task import (
 class Trigger:
     def __init__(self):
         self.tasks: dict[str, Union[AsyncSchedulerTask, AsyncOneCallTask, AsyncImmediateTask]] = {}
+        # 任务参数哈希，与云端比较使用
+        self.hashes: dict[str, str] = {}
+        self.sync = SyncState()
         self.queue: Queue = Queue(maxsize=1000)
         self.scheduler = AsyncIOScheduler()
         self.scheduler.start()
 
-    def to_native(self, clear: bool = False):
+    def to_native(self, clear: bool = False, force: bool = False):
         """从云端同步到本地并启动"""
 
         """
-        1. 先聚合有robot_id有交集的部分，在分出没有交集的部分（分别是本地列表里的、云端下拉的）
-        2. 本地列表里没有交集的部分，删除
-        3. 云端下拉里没有交集的部分，新增
-        4. 有交集的部分：
-          4.1 判断值是否相等，相等不变
-          4.2 不相等则重启并更新
+        1. 拉取全量列表，带上一次的ETag，没有变化直接结束
+        2. 按任务哈希比较，分出本地独有、云端独有、两边都有但参数不同的部分
+        3. 本地独有的删除，云端独有的新增，参数不同的重启并更新
         """
 
         try:
@@ -38,41 +39,19 @@ class Trigger:
 
             # 从云端获取数据信息
             if not clear:
-                triggers = list_trigger()
-                if triggers is None:
-                    # 如果服务端为空就直接结束
+                triggers, etag = list_trigger(None if force else self.sync.etag)
+                self.sync.full_pulls += 1
+                if triggers is NOT_MODIFIED:
+                    self.sync.not_modified += 1
+                    logger.info("【to_native】云端任务列表没有变化")
                     return True
             else:
-                triggers = {}
-
-            trigger_ids = triggers.keys()
-            # 和本地任务的交集、本地任务差集、云端任务差集
-            intersection = [triggers.get(task_id) for task_id, task in self.tasks.items() if task_id in trigger_ids]
-            local_tasks_unique = [task_id for task_id, task in self.tasks.items() if task_id not in trigger_ids]
-            cloud_tasks_unique = [task for task_id, task in triggers.items() if task_id not in self.tasks.keys()]
-            logger.info(f"【to_native】intersection本地、云端相交部分是：{intersection} ")
-            logger.info(f"【to_native】local_tasks_unique本地独有任务：{local_tasks_unique} ")
-            logger.info(f"【to_native】cloud_tasks_unique云端独有任务：{cloud_tasks_unique} ")
-
-            # 本地任务差值，直接删除
-            for task_id in local_tasks_unique:
-                logger.info("【to_native】本地删除任务: {}".format(task_id))
-                self.delete_task(task_id)
-            # 云端任务差值，直接添加
-            for trigger in cloud_tasks_unique:
-                logger.info("【to_native】云端添加任务: {}".format(trigger))
-                self.add_task(**trigger)
-            # 本地计划任务交集，进行更新处理
-            for trigger in intersection:
-                task = self.tasks[trigger["trigger_id"]]
-
-                if task.kwargs == trigger:
-                    logger.info("【to_native】云端、本地任务ID相同，参数相同，不进行更新。 ")
-                    continue
-                else:
-                    logger.info("【to_native】云端、本地任务ID相同，参数不同，进行更新")
-                    logger.info(f"【to_native】原有task参数: {task.kwargs}, 新参数: {trigger}")
-                    self.update_task(**trigger)
+                triggers, etag = {}, None
+                self.sync.reset()
+
+            diff, hashes = diff_tasks(self._local_hashes(), triggers)
+            self.sync.etag = etag
+            self._apply_diff(diff, hashes, "to_native")
             return True
         except Exception as e:
             import traceback
@@ -80,6 +59,65 @@ class Trigger:
             logger.error("触发器同步失败: {} {}".format(e, traceback.extract_stack()))
             return False
 
+    def apply_push(self, data: dict) -> bool:
+        """
+        处理服务端推送的触发器变化
+
+        Args:
+            data: {"revision": 版本号, "upserts": [服务端触发器记录], "deletes": [trigger_id]}
+        """
+        if config.TERMINAL_MODE:
+            return True
+        data = data or {}
+        has_delta = "upserts" in data or "deletes" in data
+        if not self.sync.accept(data.get("revision")) or not has_delta:
+            # 版本不连续或没有携带增量，拉取全量
+            return self.to_native()
+
+        try:
+            upserts = convert_triggers(data.get("upserts") or [])
+            diff, hashes = diff_tasks(self._local_hashes(), upserts, partial=True)
+            diff.removed = [trigger_id for trigger_id in data.get("deletes") or [] if trigger_id in self.tasks]
+            self.sync.deltas += 1
+            # 本地已经应用了增量，上一次全量的ETag不再对应本地状态
+            self.sync.etag = None
+            self._apply_diff(diff, hashes, "apply_push")
+            return True
+        except Exception as e:
+            logger.error("触发器增量同步失败: {}".format(e))
+            return self.to_native(force=True)
+
+    def _local_hashes(self) -> dict[str, str]:
+        # 没有记录哈希的本地任务（同步失败过）视为参数不同，会被重新更新
+        return {trigger_id: self.hashes.get(trigger_id, "") for trigger_id in self.tasks}
+
+    def _apply_diff(self, diff: TaskDiff, hashes: dict[str, str], tag: str):
+        logger.info(f"【{tag}】local_tasks_unique本地独有任务：{diff.removed} ")
+        logger.info(f"【{tag}】cloud_tasks_unique云端独有任务：{diff.added} ")
+        logger.info(f"【{tag}】changed云端、本地任务ID相同，参数不同：{diff.changed} ")
+
+        # 本地任务差值，直接删除
+        for task_id in diff.removed:
+            logger.info("【{}】本地删除任务: {}".format(tag, task_id))
+            self.delete_task(task_id)
+
+        # 云端任务差值直接添加，参数不同的重启并更新
+        for trigger, update in [(t, False) for t in diff.added] + [(t, True) for t in diff.changed]:
+            trigger_id = trigger["trigger_id"]
+            try:
+                if update:
+                    logger.info(f"【{tag}】原有task参数: {self.tasks[trigger_id].kwargs}, 新参数: {trigger}")
+                    self.update_task(**trigger)
+                else:
+                    logger.info("【{}】云端添加任务: {}".format(tag, trigger))
+                    self.add_task(**trigger)
+                self.hashes[trigger_id] = hashes[trigger_id]
+            except Exception as e:
+                # 没有同步成功，下次拉取全量时重新比较
+                logger.error("【{}】同步任务失败: {} {}".format(tag, trigger_id, e))
+                self.hashes.pop(trigger_id, None)
+                self.sync.etag = None
+
     def add_task(
         self,
         trigger_id: str,
@@ -226,6 +264,7 @@ class Trigger:
 
             # 从任务字典中移除
             del self.tasks[trigger_id]
+            self.hashes.pop(trigger_id, None)
             logger.info(f"【delete_task】任务删除成功: {trigger_id}")
             return True
 
@@ -290,6 +329,8 @@ class Trigger:
         删除所有任务
         """
         logger.info("【delete_all_tasks】: {}".format(self.tasks.keys()))
+        # 本地任务清空后，下次同步需要拉取全量
+        self.sync.reset()
         task_keys = list(self.tasks.keys())
         for task_key in task_keys:
             logger.info("【delete_all_tasks】删除任务: {}".format(task_key))
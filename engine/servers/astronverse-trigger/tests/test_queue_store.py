@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from astronverse.trigger.core.queue_store import TaskQueueStore
+
+
+def make_task(trigger_id: str, name: str = "", task_type: str = "schedule") -> dict:
+    return {"trigger_id": trigger_id, "trigger_name": name or trigger_id, "task_type": task_type, "mode": "EXECUTOR"}
+
+
+class TestTaskQueueStore(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "queue.db")
+        self.store = self.reopen()
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def reopen(self, max_size: int = 100) -> TaskQueueStore:
+        store = TaskQueueStore(self.path, max_size=max_size)
+        store.open()
+        return store
+
+    def dequeue(self, store: TaskQueueStore = None) -> str:
+        store = store or self.store
+        task = store.first()
+        self.assertTrue(store.take(task["unique_id"]))
+        store.done(task["unique_id"])
+        return task["trigger_id"]
+
+    def test_fifo(self):
+        for i in range(5):
+            self.assertTrue(self.store.append(make_task("t{}".format(i)), "u{}".format(i), 10))
+        self.assertEqual(len(self.store), 5)
+        self.assertEqual([self.dequeue() for _ in range(5)], ["t0", "t1", "t2", "t3", "t4"])
+        self.assertIsNone(self.store.first())
+        self.assertFalse(self.store)
+
+    def test_max_size(self):
+        self.store.close()
+        self.store = self.reopen(max_size=2)
+        self.assertTrue(self.store.append(make_task("a"), "u1", 10))
+        self.assertTrue(self.store.append(make_task("b"), "u2", 10))
+        self.assertFalse(self.store.append(make_task("c"), "u3", 10))
+
+    def test_replay_after_reopen(self):
+        for i in range(3):
+            self.store.append(make_task("t{}".format(i)), "u{}".format(i), 10)
+        # 第一个任务下发到一半时服务退出
+        self.assertTrue(self.store.take("u0"))
+        self.assertEqual(len(self.store), 2)
+        self.store.close()
+
+        self.store = self.reopen()
+        self.assertEqual(len(self.store), 3)
+        self.assertTrue(self.store.wait(0))
+        task = self.store.first()
+        self.assertEqual(task["unique_id"], "u0")
+        self.assertEqual(task["trigger_name"], "t0")
+        self.assertEqual([self.dequeue() for _ in range(3)], ["t0", "t1", "t2"])
+
+    def test_done_not_replayed(self):
+        self.store.append(make_task("t0"), "u0", 10)
+        self.assertEqual(self.dequeue(), "t0")
+        self.store.close()
+        self.store = self.reopen()
+        self.assertEqual(len(self.store), 0)
+
+    def test_deduplicate_by_trigger_id(self):
+        for unique_id, trigger_id in [("u1", "a"), ("u2", "b"), ("u3", "a"), ("u4", "a"), ("u5", "b")]:
+            self.store.append(make_task(trigger_id), unique_id, 10)
+        self.assertTrue(self.store.has_trigger("a"))
+        self.assertFalse(self.store.has_trigger("c"))
+        self.assertEqual(sorted(self.store.deduplicate()), ["u3", "u4", "u5"])
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual([self.dequeue() for _ in range(2)], ["a", "b"])
+
+    def test_deduplicate_keeps_dispatching(self):
+        self.store.append(make_task("a"), "u1", 10)
+        self.store.append(make_task("a"), "u2", 10)
+        # 下发中的任务不参与去重，排队中的同一触发器任务保留最早的一个
+        self.assertTrue(self.store.take("u1"))
+        self.assertEqual(self.store.deduplicate(), [])
+        self.assertTrue(self.store.has_trigger("a"))
+
+    def test_page_by_seq(self):
+        for i in range(25):
+            task_type = "mail" if i % 2 else "schedule"
+            self.store.append(make_task("t{}".format(i), "Task{}".format(i), task_type), "u{}".format(i), 10)
+
+        total, first = self.store.page(0, 10)
+        self.assertEqual(total, 25)
+        self.assertEqual([task["trigger_id"] for task in first], ["t{}".format(i) for i in range(10)])
+
+        pages, last_seq = [first], first[-1]["seq"]
+        while True:
+            total, tasks = self.store.page(0, 10, last_seq=last_seq)
+            if not tasks:
+                break
+            pages.append(tasks)
+            last_seq = tasks[-1]["seq"]
+        self.assertEqual([len(tasks) for tasks in pages], [10, 10, 5])
+        self.assertEqual([task["trigger_id"] for tasks in pages for task in tasks], ["t{}".format(i) for i in range(25)])
+
+        # 按 seq 续查时，前面的任务出队不会让后面的任务被跳过
+        for _ in range(3):
+            self.dequeue()
+        total, tasks = self.store.page(10, 10, last_seq=pages[0][-1]["seq"])
+        self.assertEqual(total, 22)
+        self.assertEqual(tasks[0]["trigger_id"], "t10")
+
+        # 跳页时按偏移查询
+        total, tasks = self.store.page(20, 10)
+        self.assertEqual([task["trigger_id"] for task in tasks], ["t23", "t24"])
+
+    def test_page_filter(self):
+        for i in range(6):
+            task_type = "mail" if i % 2 else "schedule"
+            self.store.append(make_task("t{}".format(i), "Task{}".format(i), task_type), "u{}".format(i), 10)
+        total, tasks = self.store.page(0, 2, task_type="MAIL")
+        self.assertEqual(total, 3)
+        self.assertEqual([task["trigger_id"] for task in tasks], ["t1", "t3"])
+        total, tasks = self.store.page(0, 2, task_type="mail", last_seq=tasks[-1]["seq"])
+        self.assertEqual([task["trigger_id"] for task in tasks], ["t5"])
+        total, tasks = self.store.page(0, 10, name="task4")
+        self.assertEqual((total, tasks[0]["trigger_id"]), (1, "t4"))
+
+    def test_seq_not_saved_in_payload(self):
+        self.store.append(make_task("a"), "u1", 10)
+        task = self.store.first()
+        # 任务内容重新入队时，seq 不会带入新的任务
+        self.store.append(task, "u2", 10)
+        _, tasks = self.store.page(0, 10)
+        self.assertEqual([task["seq"] for task in tasks], [1, 2])
@@ -0,0 +1,306 @@
+import json
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from astronverse.trigger.server import gateway_client
+from astronverse.trigger.sync import NOT_MODIFIED, SyncState, body_digest, diff_tasks, task_hash
+from astronverse.trigger.terminal import Terminal
+from astronverse.trigger.trigger import Trigger
+
+
+def trigger_record(task_id: str, cron: str = "0 * * * *") -> dict:
+    """服务端 list4Trigger 返回的一条记录"""
+    return {
+        "taskId": task_id,
+        "name": "task-{}".format(task_id),
+        "taskType": "schedule",
+        "enable": 1,
+        "taskJson": json.dumps({"cron_expression": cron}),
+        "exceptional": "stop",
+        "timeout": 9999,
+        "retryNum": 0,
+        "queueEnable": 0,
+        "robotInfoList": [{"robotId": "r1", "version": None}],
+    }
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeSession:
+    def __init__(self, response: FakeResponse):
+        self.response = response
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.response
+
+
+class TestTaskHash(TestCase):
+    def test_key_order(self):
+        self.assertEqual(task_hash({"a": 1, "b": [1, 2]}), task_hash({"b": [1, 2], "a": 1}))
+
+    def test_value_change(self):
+        self.assertNotEqual(task_hash({"a": 1, "b": [1, 2]}), task_hash({"a": 1, "b": [2, 1]}))
+        self.assertNotEqual(task_hash({"a": 1}), task_hash({"a": "1"}))
+
+
+class TestDiffTasks(TestCase):
+    def setUp(self):
+        self.remote = {"t1": {"trigger_id": "t1", "cron": "1"}, "t2": {"trigger_id": "t2", "cron": "2"}}
+        _, self.hashes = diff_tasks({}, self.remote)
+
+    def test_unchanged(self):
+        diff, hashes = diff_tasks(self.hashes, self.remote)
+        self.assertFalse(diff)
+        self.assertEqual(hashes, self.hashes)
+
+    def test_added_changed_removed(self):
+        local = {"t1": self.hashes["t1"], "t2": "", "t3": "old"}
+        remote = dict(self.remote, t4={"trigger_id": "t4"})
+        diff, hashes = diff_tasks(local, remote)
+        self.assertEqual(diff.added, [{"trigger_id": "t4"}])
+        self.assertEqual(diff.changed, [self.remote["t2"]])
+        self.assertEqual(diff.removed, ["t3"])
+        self.assertEqual(set(hashes), {"t1", "t2", "t4"})
+
+    def test_hash_change(self):
+        remote = {"t1": self.remote["t1"], "t2": dict(self.remote["t2"], cron="3")}
+        diff, hashes = diff_tasks(self.hashes, remote)
+        self.assertEqual(diff.changed, [remote["t2"]])
+        self.assertNotEqual(hashes["t2"], self.hashes["t2"])
+
+    def test_partial_never_removes(self):
+        diff, _ = diff_tasks(self.hashes, {"t1": dict(self.remote["t1"], cron="9")}, partial=True)
+        self.assertEqual(diff.removed, [])
+        self.assertEqual(len(diff.changed), 1)
+
+
+class TestSyncState(TestCase):
+    def test_first_revision(self):
+        state = SyncState()
+        self.assertFalse(state.accept(5))
+        self.assertEqual(state.revision, 5)
+
+    def test_consecutive(self):
+        state = SyncState(revision=5)
+        self.assertTrue(state.accept(6))
+        self.assertTrue(state.accept("7"))
+        self.assertEqual(state.revision, 7)
+
+    def test_gap(self):
+        state = SyncState(revision=5)
+        self.assertFalse(state.accept(8))
+        # 拉取全量后，后续连续的版本可以继续应用增量
+        self.assertEqual(state.revision, 8)
+        self.assertTrue(state.accept(9))
+
+    def test_repeat_or_older(self):
+        state = SyncState(revision=5)
+        self.assertFalse(state.accept(5))
+        self.assertFalse(state.accept(3))
+
+    def test_none_revision(self):
+        state = SyncState(revision=5)
+        self.assertFalse(state.accept(None))
+        self.assertEqual(state.revision, 5)
+
+    def test_reset(self):
+        state = SyncState(revision=5, etag="abc", full_pulls=3)
+        state.reset()
+        self.assertIsNone(state.revision)
+        self.assertIsNone(state.etag)
+        self.assertEqual(state.full_pulls, 3)
+
+
+class TestListTrigger(TestCase):
+    def call(self, response: FakeResponse, etag=None):
+        session = FakeSession(response)
+        with patch.object(gateway_client, "http_session", return_value=session):
+            return gateway_client.list_trigger(etag), session
+
+    def body(self, *records):
+        return {"code": "000000", "data": {"records": list(records)}}
+
+    def test_not_modified_status(self):
+        (res, etag), session = self.call(FakeResponse(304), etag='"v1"')
+        self.assertIs(res, NOT_MODIFIED)
+        self.assertEqual(etag, '"v1"')
+        self.assertEqual(session.calls[0][2]["headers"]["If-None-Match"], '"v1"')
+
+    def test_same_etag_header(self):
+        (res, etag), _ = self.call(FakeResponse(200, self.body(trigger_record("t1")), {"ETag": '"v1"'}), etag='"v1"')
+        self.assertIs(res, NOT_MODIFIED)
+
+    def test_same_body_digest(self):
+        response = FakeResponse(200, self.body(trigger_record("t1")))
+        (res, _), _ = self.call(response, etag=body_digest(response.content))
+        self.assertIs(res, NOT_MODIFIED)
+
+    def test_changed(self):
+        response = FakeResponse(200, self.body(trigger_record("t1")))
+        (res, etag), session = self.call(response, etag='"v1"')
+        self.assertEqual(list(res), ["t1"])
+        self.assertEqual(res["t1"]["cron_expression"], "0 * * * *")
+        self.assertEqual(res["t1"]["callback_project_ids"], [{"robotId": "r1"}])
+        self.assertEqual(etag, body_digest(response.content))
+
+    def test_without_etag(self):
+        # 没有上一次的 ETag 时不带 If-None-Match，也不会返回 NOT_MODIFIED
+        (res, etag), session = self.call(FakeResponse(200, self.body(), {"ETag": '"v1"'}))
+        self.assertEqual(res, {})
+        self.assertEqual(etag, '"v1"')
+        self.assertNotIn("If-None-Match", session.calls[0][2]["headers"])
+
+    def test_error_code(self):
+        with self.assertRaisesRegex(Exception, "获取任务列表失败"):
+            self.call(FakeResponse(200, {"code": "500000", "data": None}))
+
+
+class TestTerminalListTask(TestCase):
+    def call(self, response: FakeResponse, etag=None):
+        session = FakeSession(response)
+        with patch.object(gateway_client, "http_session", return_value=session):
+            return gateway_client.terminal_list_task(etag), session
+
+    def body(self):
+        task = {"taskId": "d1", "taskName": "dispatch", "taskType": "trigger", "queueEnable": 1, "retryNum": "2"}
+        return {"code": "000000", "data": {"dispatchTaskInfos": [task], "retryTaskInfos": [], "stopTaskInfos": []}}
+
+    def test_not_modified_status(self):
+        (res, etag), session = self.call(FakeResponse(304), etag='"v1"')
+        self.assertIs(res, NOT_MODIFIED)
+        self.assertEqual(session.calls[0][2]["headers"]["If-None-Match"], '"v1"')
+
+    def test_same_etag(self):
+        (res, _), _ = self.call(FakeResponse(200, self.body(), {"ETag": '"v1"'}), etag='"v1"')
+        self.assertIs(res, NOT_MODIFIED)
+        response = FakeResponse(200, self.body())
+        (res, _), _ = self.call(response, etag=body_digest(response.content))
+        self.assertIs(res, NOT_MODIFIED)
+
+    def test_changed(self):
+        (res, etag), _ = self.call(FakeResponse(200, self.body(), {"ETag": '"v2"'}), etag='"v1"')
+        dispatch, retry, stop = res
+        self.assertEqual(etag, '"v2"')
+        self.assertEqual(dispatch[0]["trigger_id"], "d1")
+        self.assertEqual(dispatch[0]["task_type"], "schedule")
+        self.assertEqual(dispatch[0]["retry_num"], 2)
+        self.assertTrue(dispatch[0]["queue_enable"])
+        self.assertEqual((retry, stop), ([], []))
+
+    def test_failed(self):
+        (res, etag), _ = self.call(FakeResponse(500), etag='"v1"')
+        self.assertIsNone(res)
+        self.assertEqual(etag, '"v1"')
+
+
+class FakeTrigger(Trigger):
+    """不启动调度器，只记录任务的增删改"""
+
+    def __init__(self):
+        self.tasks = {}
+        self.hashes = {}
+        self.sync = SyncState()
+        self.log = []
+
+    def add_task(self, trigger_id: str, **kwargs):
+        self.log.append(("add", trigger_id))
+        self.tasks[trigger_id] = SimpleNamespace(kwargs=kwargs)
+        return True
+
+    def update_task(self, trigger_id: str, **kwargs):
+        self.log.append(("update", trigger_id))
+        self.tasks[trigger_id] = SimpleNamespace(kwargs=kwargs)
+        return True
+
+    def delete_task(self, trigger_id: str):
+        self.log.append(("delete", trigger_id))
+        self.tasks.pop(trigger_id, None)
+        self.hashes.pop(trigger_id, None)
+        return True
+
+
+class TestTriggerSync(TestCase):
+    def setUp(self):
+        self.trigger = FakeTrigger()
+        self.remote = gateway_client.convert_triggers([trigger_record("t1"), trigger_record("t2")])
+        self.pulls = []
+        patcher = patch("astronverse.trigger.trigger.list_trigger", side_effect=self.list_trigger)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.assertTrue(self.trigger.to_native())
+        self.trigger.log.clear()
+
+    def list_trigger(self, etag=None):
+        self.pulls.append(etag)
+        if etag == '"v1"':
+            return NOT_MODIFIED, etag
+        return dict(self.remote), '"v1"'
+
+    def test_full_pull(self):
+        self.assertEqual(set(self.trigger.tasks), {"t1", "t2"})
+        self.assertEqual(self.trigger.sync.etag, '"v1"')
+
+    def test_not_modified(self):
+        self.assertTrue(self.trigger.to_native())
+        self.assertEqual(self.pulls, [None, '"v1"'])
+        self.assertEqual(self.trigger.sync.not_modified, 1)
+        self.assertEqual(self.trigger.log, [])
+
+    def test_consecutive_push_applies_delta(self):
+        self.trigger.sync.revision = 1
+        push = {"revision": 2, "upserts": [trigger_record("t2", "5 * * * *"), trigger_record("t3")], "deletes": ["t1"]}
+        self.assertTrue(self.trigger.apply_push(push))
+        self.assertEqual(self.pulls, [None])
+        self.assertEqual(self.trigger.log, [("delete", "t1"), ("add", "t3"), ("update", "t2")])
+        self.assertEqual(self.trigger.sync.deltas, 1)
+        self.assertIsNone(self.trigger.sync.etag)
+
+    def test_unchanged_upsert_skipped(self):
+        self.trigger.sync.revision = 1
+        self.assertTrue(self.trigger.apply_push({"revision": 2, "upserts": [trigger_record("t1")]}))
+        self.assertEqual(self.trigger.log, [])
+
+    def test_revision_gap_pulls_full(self):
+        self.trigger.sync.revision = 1
+        self.assertTrue(self.trigger.apply_push({"revision": 3, "upserts": [trigger_record("t3")]}))
+        self.assertEqual(self.pulls, [None, '"v1"'])
+        self.assertNotIn("t3", self.trigger.tasks)
+        self.assertEqual(self.trigger.sync.revision, 3)
+
+    def test_none_revision_pulls_full(self):
+        self.trigger.sync.revision = 1
+        self.assertTrue(self.trigger.apply_push({"upserts": [trigger_record("t3")]}))
+        self.assertEqual(len(self.pulls), 2)
+        self.assertEqual(self.trigger.sync.revision, 1)
+
+    def test_push_without_delta_pulls_full(self):
+        self.trigger.sync.revision = 1
+        self.assertTrue(self.trigger.apply_push({"revision": 2}))
+        self.assertEqual(len(self.pulls), 2)
+        self.assertEqual(self.trigger.sync.deltas, 0)
+
+
+class TestTerminalSync(TestCase):
+    def test_not_modified(self):
+        terminal = Terminal(None, None, None)
+        terminal.sync.etag = '"v1"'
+        with patch("astronverse.trigger.terminal.terminal_list_task", return_value=(NOT_MODIFIED, '"v1"')) as mock:
+            terminal.update_task_list(check_modified=True)
+            mock.assert_called_once_with('"v1"')
+            # 服务端通知有变化时不带 ETag，总是拉取全量
+            terminal.update_task_list()
+            mock.assert_called_with(None)
+        self.assertEqual(terminal.sync.full_pulls, 2)
+        self.assertEqual(terminal.sync.not_modified, 2)
+        self.assertEqual(terminal.tasks, {})
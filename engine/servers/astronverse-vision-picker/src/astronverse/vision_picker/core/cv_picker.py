@@ -1,9 +1,11 @@
 import copy
 import os
 import time
+from typing import Optional
 
 import cv2
 import numpy as np
+from astronverse.vision_picker.core.cv_postprocess import nms_boxes, pyramid_level, scale_boxes
 from PIL import Image
 
 # def ocr_image(image, flag):
@@ -181,69 +183,7 @@ class ImageDetector:
         :param iou_threshold: IoU阈值，用于确定是否抑制。
         :return: 经过NMS处理后的边界框列表。
         """
-        if not boxes:
-            return []
-
-        # 转换为 numpy 数组以加速计算
-        boxes_array = np.array(boxes, dtype=np.float32)
-        # 计算面积
-        areas = boxes_array[:, 2] * boxes_array[:, 3]
-        # 按宽度排序（保持原有逻辑）
-        order = np.argsort(boxes_array[:, 2])
-
-        keep_boxes = []
-        suppressed = np.zeros(len(boxes), dtype=bool)
-
-        iteration = 0
-        iou_calc_count = 0
-
-        # 从后往前遍历（从大框到小框）
-        for idx in range(len(order) - 1, -1, -1):
-            i = order[idx]
-            if suppressed[i]:
-                continue
-
-            # 保留当前框
-            keep_boxes.append(boxes[i])
-            iteration += 1
-
-            # 获取当前框的坐标
-            x1, y1, w1, h1 = boxes_array[i]
-            x1_max, y1_max = x1 + w1, y1 + h1
-            area1 = areas[i]
-
-            # 批量检查需要抑制的框
-            for jdx in range(idx):
-                j = order[jdx]
-                if suppressed[j]:
-                    continue
-
-                # 快速空间剪枝：如果两个框完全不相交，跳过IoU计算
-                x2, y2, w2, h2 = boxes_array[j]
-                x2_max, y2_max = x2 + w2, y2 + h2
-
-                # 检查是否有重叠
-                if x1_max <= x2 or x2_max <= x1 or y1_max <= y2 or y2_max <= y1:
-                    continue  # 不相交，跳过
-
-                # 计算IoU（内联优化）
-                iou_calc_count += 1
-                inter_x1 = max(x1, x2)
-                inter_y1 = max(y1, y2)
-                inter_x2 = min(x1_max, x2_max)
-                inter_y2 = min(y1_max, y2_max)
-
-                inter_area = (inter_x2 - inter_x1) * (inter_y2 - inter_y1)
-
-                if inter_area > 0:
-                    area2 = areas[j]
-                    union_area = area1 + area2 - inter_area
-                    iou = inter_area / union_area
-
-                    if iou >= iou_threshold or iou < 0.0003:
-                        suppressed[j] = True
-
-        return keep_boxes
+        return nms_boxes(boxes, iou_threshold)
 
     def draw_dashed_rectangle(self, top_left, bottom_right, color, thickness, dash_length=5):
         x1, y1 = top_left
@@ -276,10 +216,11 @@ class ImageDetector:
     #     # 返回 BGR 颜色元组
     #     return (b, g, r)
 
-    def detect_objects(self, dash_color, line_width):
+    def detect_objects(self, dash_color, line_width, max_side: Optional[int] = None):
         """
         检测图像中的对象，并返回带有检测到的对象的原始图像和边界框列表。
 
+        :param max_side: (可选) 图像长边超过该值时，先在金字塔缩小层上检测，边界框再还原到原图坐标。
         :return: 带有检测到的对象的原始图像和边界框列表。
                  每个边界框以 ((左上角x, 左上角y), (右下角x, 右下角y)) 的格式表示。
         """
@@ -291,8 +232,14 @@ class ImageDetector:
 
         start_time = time.time()
 
+        # 大分辨率截图在金字塔缩小层上检测
+        level = pyramid_level(self.gray_img.shape[1], self.gray_img.shape[0], max_side)
+        gray_img = self.gray_img
+        for _ in range(level):
+            gray_img = cv2.pyrDown(gray_img)
+
         # 高斯模糊和锐化
-        blurred = cv2.GaussianBlur(self.gray_img, (3, 3), 0)
+        blurred = cv2.GaussianBlur(gray_img, (3, 3), 0)
 
         kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
         sharpened = cv2.filter2D(blurred, -1, kernel)
@@ -319,7 +266,7 @@ class ImageDetector:
         # 边框筛选
         fore_boxes = [
             (x, y, w, h)
-            for x, y, w, h in (cv2.boundingRect(contour) for contour in fore_contours)
+            for x, y, w, h in scale_boxes([cv2.boundingRect(contour) for contour in fore_contours], level)
             if (w * h) > 50
             and (h / w) < 10
             and (w * h) / (self.original_img.shape[0] * self.original_img.shape[1]) < 0.2
@@ -327,7 +274,7 @@ class ImageDetector:
 
         sobel_boxes = [
             (x, y, w, h)
-            for x, y, w, h in (cv2.boundingRect(contour) for contour in sobel_contours)
+            for x, y, w, h in scale_boxes([cv2.boundingRect(contour) for contour in sobel_contours], level)
             if (w * h) > 50
             and (h / w) < 10
             and (w * h) / (self.original_img.shape[0] * self.original_img.shape[1]) < 0.2
@@ -335,7 +282,7 @@ class ImageDetector:
 
         canny_boxes = [
             (x, y, w, h)
-            for x, y, w, h in (cv2.boundingRect(contour) for contour in canny_contours)
+            for x, y, w, h in scale_boxes([cv2.boundingRect(contour) for contour in canny_contours], level)
             if ((w * h) > 20 and (w * h) <= 50)
             or ((w * h) > 200 and (w * h) <= 350)
             and (h / w) < 10
@@ -0,0 +1,93 @@
+"""
+检测结果后处理
+
+- nms_boxes: 非极大值抑制，每保留一个框用 numpy 一次性计算它与剩余所有框的交并比
+- BoxIndex: 截图检测完成后按网格建立一次索引，鼠标移动时只检查所在格子里的框
+- pyramid_level / scale_boxes: 大分辨率截图先在金字塔缩小层上检测，再把框还原到原图坐标
+"""
+
+from typing import Optional
+
+import numpy as np
+
+# 交并比低于该值的相交框视为包含关系的噪声，一并抑制
+MIN_IOU = 0.0003
+
+# 网格边长（像素）
+GRID_SIZE = 64
+
+
+def nms_boxes(boxes: list, iou_threshold: float = 0.3, min_iou: float = MIN_IOU) -> list:
+    """
+    对 (x, y, w, h) 边界框做非极大值抑制
+
+    从宽到窄依次保留未被抑制的框，与其相交且交并比大于等于 iou_threshold 或小于 min_iou 的更窄的框被抑制
+
+    :return: 保留的框，按宽度从大到小
+    """
+    if not boxes:
+        return []
+
+    arr = np.asarray(boxes, dtype=np.float32)
+    x1, y1, w, h = arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3]
+    x2, y2 = x1 + w, y1 + h
+    areas = w * h
+
+    order = np.argsort(w)[::-1]
+    keep = []
+    with np.errstate(divide="ignore", invalid="ignore"):
+        while order.size:
+            i = order[0]
+            keep.append(i)
+            rest = order[1:]
+            inter_w = np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])
+            inter_h = np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])
+            inter = np.clip(inter_w, 0, None) * np.clip(inter_h, 0, None)
+            iou = inter / (areas[i] + areas[rest] - inter)
+            suppressed = (inter > 0) & ((iou >= iou_threshold) | (iou < min_iou))
+            order = rest[~suppressed]
+    return [boxes[i] for i in keep]
+
+
+class BoxIndex:
+    """点查询索引：返回包含某点的框中排在最前面的一个"""
+
+    def __init__(self, boxes: list, grid_size: int = GRID_SIZE):
+        self.boxes = boxes
+        self.grid_size = grid_size
+        # (列, 行) -> 与该格子相交的框序号，保持 boxes 中的顺序
+        self.cells: dict[tuple[int, int], list[int]] = {}
+
+        for idx, (bx, by, bw, bh) in enumerate(boxes):
+            if bw <= 0 or bh <= 0:
+                continue
+            for col in range(int(bx) // grid_size, (int(bx + bw) - 1) // grid_size + 1):
+                for row in range(int(by) // grid_size, (int(by + bh) - 1) // grid_size + 1):
+                    self.cells.setdefault((col, row), []).append(idx)
+
+    def query(self, x, y) -> Optional[tuple]:
+        for idx in self.cells.get((int(x) // self.grid_size, int(y) // self.grid_size), ()):
+            bx, by, bw, bh = self.boxes[idx]
+            if bx <= x < bx + bw and by <= y < by + bh:
+                return self.boxes[idx]
+        return None
+
+
+def pyramid_level(width: int, height: int, max_side: Optional[int]) -> int:
+    """长边缩小到不超过 max_side 需要的金字塔层数，每层缩小一半"""
+    level = 0
+    if not max_side:
+        return level
+    side = max(width, height)
+    while side > max_side:
+        side = (side + 1) // 2
+        level += 1
+    return level
+
+
+def scale_boxes(boxes: list, level: int) -> list:
+    """把金字塔层上的框还原到原图坐标"""
+    if level == 0:
+        return boxes
+    factor = 1 << level
+    return [(x * factor, y * factor, w * factor, h * factor) for x, y, w, h in boxes]
@@ -13,6 +13,7 @@ from astronverse.vision_picker.core import PickType, Status
 from astronverse.vision_picker.core.core import IPickCore, IRectHandler
 from astronverse.vision_picker.core.cv_match import AnchorMatch
 from astronverse.vision_picker.core.cv_picker import ImageDetector
+from astronverse.vision_picker.core.cv_postprocess import BoxIndex
 from astronverse.vision_picker.logger import logger
 from pynput import keyboard
 
@@ -25,6 +26,9 @@ anchor_filepath = os.path.join(current_directory, "imgs", "anchor.png")
 
 os.makedirs(os.path.join(current_directory, "imgs"), exist_ok=True)
 
+# 智能拾取检测的最大边长，超过时在缩小的金字塔层上检测（4K 截图缩小一半）
+DETECT_MAX_SIDE = 2560
+
 if sys.platform == "win32":
     from astronverse.vision_picker.core.core_win import PickCore, RectHandler
 elif platform.system() == "Linux":
@@ -140,6 +144,7 @@ class CVPicker:
     def __init__(self, status: Status = Status.START, picktype: PickType = PickType.TARGET, anchor_pick_img=None):
         # 拾取功能初始化
         self.bboxes = None
+        self.box_index = None  # bboxes 的点查询索引
         self.x = None
         self.y = None
         self.screen_width = 0
@@ -195,20 +200,13 @@ class CVPicker:
             self.keyboard_listener.stop()
 
     def get_minbox(self, x_pos, y_pos, bboxes):
-        min_bbox = None
-        min_area = float("inf")
+        """bboxes 按面积从小到大排列，返回包含该点的最小框"""
         if not x_pos or not y_pos:
-            return min_bbox
-        for bbox in bboxes:
-            bx, by, bw, bh = bbox
-            if bx <= x_pos < bx + bw and by <= y_pos < by + bh:
-                # 计算当前框的面积
-                area = bw * bh
-                if area < min_area:
-                    min_area = area
-                    min_bbox = bbox
-                    break
-        return min_bbox
+            return None
+        # 每次截图检测后只建立一次索引
+        if self.box_index is None or self.box_index.boxes is not bboxes:
+            self.box_index = BoxIndex(bboxes)
+        return self.box_index.query(x_pos, y_pos)
 
     # 记录接收到的socket信号
     def receive_message(self, socket):
@@ -329,7 +327,7 @@ class CVPicker:
 
             # 智能拾取模式，对界面元素进行分割
             picker_cv = ImageDetector(self.partial_screenshot)
-            output_img, self.selected_boxes = picker_cv.detect_objects("#00FF00", 1)
+            output_img, self.selected_boxes = picker_cv.detect_objects("#00FF00", 1, DETECT_MAX_SIDE)
             cv2.imwrite(alt_filepath, output_img)
 
             for box in range(len(self.selected_boxes)):
@@ -340,6 +338,7 @@ class CVPicker:
                     self.selected_boxes[box][3],
                 )
             self.bboxes = sorted(self.selected_boxes, key=lambda bbox: bbox[2] * bbox[3])
+            self.box_index = BoxIndex(self.bboxes)
 
         elif self.__status == Status.CV_CTRL:
             # 普通模式，仅保存界面截图
@@ -543,7 +542,7 @@ class CVPicker:
                 print("元素不唯一，自动选取锚点")
                 if not self.bboxes:
                     picker_cv = ImageDetector(self.partial_screenshot)
-                    output_img, self.selected_boxes = picker_cv.detect_objects("#00FF00", 1)
+                    output_img, self.selected_boxes = picker_cv.detect_objects("#00FF00", 1, DETECT_MAX_SIDE)
                     self.bboxes = sorted(self.selected_boxes, key=lambda bbox: bbox[2] * bbox[3])
 
                 for box in self.bboxes[::-1]:
@@ -585,6 +584,7 @@ class CVPicker:
         self.match_box = None
         self.match_rect = None
         self.bboxes = None
+        self.box_index = None
         self.draw_rect = None
         self.operation = None
         self.current_keys.clear()
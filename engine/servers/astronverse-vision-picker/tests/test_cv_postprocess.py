@@ -0,0 +1,140 @@
+from unittest import TestCase
+
+import numpy as np
+from astronverse.vision_picker.core.cv_postprocess import (
+    GRID_SIZE,
+    BoxIndex,
+    nms_boxes,
+    pyramid_level,
+    scale_boxes,
+)
+
+
+def nms_loop(boxes: list, iou_threshold: float = 0.3) -> list:
+    """原来 ImageDetector.apply_nms 的逐对比较实现，作为对照"""
+    if not boxes:
+        return []
+    boxes_array = np.array(boxes, dtype=np.float32)
+    areas = boxes_array[:, 2] * boxes_array[:, 3]
+    order = np.argsort(boxes_array[:, 2])
+    keep_boxes = []
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    for idx in range(len(order) - 1, -1, -1):
+        i = order[idx]
+        if suppressed[i]:
+            continue
+        keep_boxes.append(boxes[i])
+        x1, y1, w1, h1 = boxes_array[i]
+        x1_max, y1_max = x1 + w1, y1 + h1
+        for jdx in range(idx):
+            j = order[jdx]
+            if suppressed[j]:
+                continue
+            x2, y2, w2, h2 = boxes_array[j]
+            x2_max, y2_max = x2 + w2, y2 + h2
+            if x1_max <= x2 or x2_max <= x1 or y1_max <= y2 or y2_max <= y1:
+                continue
+            inter_area = (min(x1_max, x2_max) - max(x1, x2)) * (min(y1_max, y2_max) - max(y1, y2))
+            if inter_area > 0:
+                iou = inter_area / (areas[i] + areas[j] - inter_area)
+                if iou >= iou_threshold or iou < 0.0003:
+                    suppressed[j] = True
+    return keep_boxes
+
+
+def linear_query(boxes: list, x, y):
+    """原来 get_minbox 的线性扫描：按顺序返回第一个包含该点的框"""
+    for bx, by, bw, bh in boxes:
+        if bx <= x < bx + bw and by <= y < by + bh:
+            return bx, by, bw, bh
+    return None
+
+
+def random_boxes(rng, count: int, width: int = 1920, height: int = 1080, max_size: int = 300) -> list:
+    boxes = []
+    for _ in range(count):
+        w, h = int(rng.integers(1, max_size)), int(rng.integers(1, max_size))
+        boxes.append((int(rng.integers(0, width - w)), int(rng.integers(0, height - h)), w, h))
+    return boxes
+
+
+class TestNmsBoxes(TestCase):
+    def test_matches_loop(self):
+        for seed in range(20):
+            rng = np.random.default_rng(seed)
+            boxes = random_boxes(rng, int(rng.integers(1, 400)))
+            self.assertEqual(nms_boxes(boxes), nms_loop(boxes), "seed={}".format(seed))
+
+    def test_matches_loop_dense(self):
+        # 小区域内大量重叠、嵌套、等宽的框
+        rng = np.random.default_rng(100)
+        boxes = random_boxes(rng, 600, width=400, height=300, max_size=120)
+        boxes += boxes[:50] + [(x + 1, y, w, h) for x, y, w, h in boxes[:50]]
+        self.assertEqual(nms_boxes(boxes), nms_loop(boxes))
+        self.assertEqual(nms_boxes(boxes, 0.6), nms_loop(boxes, 0.6))
+
+    def test_cases(self):
+        self.assertEqual(nms_boxes([]), [])
+        # 交并比大于阈值的窄框被抑制
+        self.assertEqual(nms_boxes([(0, 0, 10, 10), (1, 1, 9, 9)]), [(0, 0, 10, 10)])
+        # 不相交、仅相邻的框都保留，按宽度从大到小
+        self.assertEqual(nms_boxes([(0, 0, 5, 5), (5, 0, 8, 5)]), [(5, 0, 8, 5), (0, 0, 5, 5)])
+        # 交并比极小（包含关系的噪声）也被抑制
+        self.assertEqual(nms_boxes([(0, 0, 1000, 1000), (10, 10, 5, 5)]), [(0, 0, 1000, 1000)])
+
+
+class TestBoxIndex(TestCase):
+    def check(self, boxes: list, points):
+        index = BoxIndex(boxes)
+        for x, y in points:
+            self.assertEqual(index.query(x, y), linear_query(boxes, x, y), "point=({}, {})".format(x, y))
+
+    def test_random_points(self):
+        rng = np.random.default_rng(0)
+        boxes = sorted(random_boxes(rng, 500), key=lambda b: b[2] * b[3])
+        points = zip(rng.integers(0, 1920, 5000).tolist(), rng.integers(0, 1080, 5000).tolist())
+        self.check(boxes, points)
+
+    def test_grid_boundaries(self):
+        rng = np.random.default_rng(1)
+        boxes = sorted(random_boxes(rng, 300), key=lambda b: b[2] * b[3])
+        # 正好落在格子边界上的框
+        boxes += [(GRID_SIZE, GRID_SIZE, GRID_SIZE, GRID_SIZE), (GRID_SIZE * 3 - 1, 0, 2, 2 * GRID_SIZE)]
+        coords = sorted({c + d for c in range(0, 1920 + GRID_SIZE, GRID_SIZE) for d in (-1, 0, 1)})
+        points = [(x, y) for x in coords for y in coords if 0 <= y < 1080 and 0 <= x < 1920]
+        # 框的四条边上和边外一个像素
+        for bx, by, bw, bh in boxes:
+            for x in (bx - 1, bx, bx + bw - 1, bx + bw):
+                for y in (by - 1, by, by + bh - 1, by + bh):
+                    points.append((x, y))
+        self.check(boxes, points)
+
+    def test_float_points_and_empty(self):
+        boxes = [(0, 0, 0, 10), (10, 10, 54, 54), (0, 0, 200, 200)]
+        self.check(boxes, [(9.5, 9.5), (10.0, 10.0), (63.9, 63.9), (64.0, 10.0), (-1, 5), (0, 5)])
+        self.assertIsNone(BoxIndex([]).query(5, 5))
+
+    def test_4k_candidates(self):
+        """4K 截图上 5000 个框，每次查询只检查所在格子里的少量框"""
+        rng = np.random.default_rng(2)
+        boxes = random_boxes(rng, 5000, width=3840, height=2160, max_size=200)
+        index = BoxIndex(boxes)
+        sizes = [len(ids) for ids in index.cells.values()]
+        self.assertLess(sum(sizes) / len(sizes), len(boxes) / 50)
+        points = zip(rng.integers(0, 3840, 2000).tolist(), rng.integers(0, 2160, 2000).tolist())
+        self.check(boxes, points)
+
+
+class TestPyramid(TestCase):
+    def test_pyramid_level(self):
+        self.assertEqual(pyramid_level(3840, 2160, None), 0)
+        self.assertEqual(pyramid_level(3840, 2160, 0), 0)
+        self.assertEqual(pyramid_level(2560, 1440, 2560), 0)
+        self.assertEqual(pyramid_level(3840, 2160, 2560), 1)
+        self.assertEqual(pyramid_level(2160, 5121, 2560), 2)
+        self.assertEqual(pyramid_level(7680, 4320, 1920), 2)
+
+    def test_scale_boxes(self):
+        boxes = [(1, 2, 3, 4)]
+        self.assertIs(scale_boxes(boxes, 0), boxes)
+        self.assertEqual(scale_boxes(boxes, 2), [(4, 8, 12, 16)])
@@ -81,8 +81,9 @@ class WsManager:
 
         # 消息监听
         self.watch_msg: dict[str, Watch] = {}
-        self.watch_interval = 1
         self.watch_msg_queue: list = []
+        # 有新的watch加入时唤醒清理任务
+        self.watch_changed = asyncio.Event()
 
         # 路由管理
         self.routes: dict[str, Route] = {}
@@ -95,6 +96,7 @@ class WsManager:
         self.check_ping_once = AsyncOnce()
         self.clear_watch_once = AsyncOnce()
         self.clear_ack_once = AsyncOnce()
+        self.background_tasks: list[asyncio.Task] = []
 
     async def _send_text(self, conn: Conn, msg: str):
         # ping/pong消息不输出日志，避免日志过多
@@ -289,6 +291,13 @@ class WsManager:
         name = "{}$${}".format(watch.watch_type, watch.watch_key)
         self.watch_msg[name] = watch
         heapq.heappush(self.watch_msg_queue, (watch.timeout, name))
+        self.watch_changed.set()
+
+    async def _wait_watch_changed(self, timeout=None):
+        try:
+            await asyncio.wait_for(self.watch_changed.wait(), timeout)
+        except TimeoutError:
+            pass
 
     async def clear_watch(self):
         """
@@ -297,10 +306,13 @@ class WsManager:
 
         async def inner_clear_watch():
             while True:
+                self.watch_changed.clear()
                 if self.watch_msg_queue:
-                    now = datetime.now()
-                    if self.watch_msg_queue[0][0] > now:
-                        await asyncio.sleep((self.watch_msg_queue[0][0] - now).total_seconds())
+                    delay = (self.watch_msg_queue[0][0] - datetime.now()).total_seconds()
+                    if delay > 0:
+                        # 等到最早的watch过期，期间加入了新的watch则重新计算
+                        await self._wait_watch_changed(delay)
+                        continue
                     _, name = heapq.heappop(self.watch_msg_queue)
 
                     try:
@@ -316,7 +328,8 @@ class WsManager:
                     except Exception as e:
                         self.log("error clear_watch: {}".format(e))
                 else:
-                    await asyncio.sleep(self.watch_interval)
+                    # 没有watch时不轮询，等待新的watch加入
+                    await self._wait_watch_changed()
 
         await self.clear_watch_once.do(inner_clear_watch)
 
@@ -346,6 +359,28 @@ class WsManager:
 
         await self.check_ping_once.do(inner_check_ping)
 
+    def start_background(self):
+        """
+        start_background 启动ping检查和watch清理，应用启动时调用，每个WsManager只启动一份
+        """
+        if self.background_tasks:
+            return
+        self.background_tasks = [
+            asyncio.create_task(self.start_ping()),
+            asyncio.create_task(self.clear_watch()),
+        ]
+
+    async def stop_background(self):
+        """
+        stop_background 停止ping检查和watch清理，应用退出时调用
+        """
+        tasks, self.background_tasks = self.background_tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.check_ping_once = AsyncOnce()
+        self.clear_watch_once = AsyncOnce()
+
     async def send(self, msg: BaseMsg):
         """
         send 发送消息，支持ack确认机制
@@ -420,7 +420,7 @@ class WsApp {
 
 const storage = get_navigator_user_agent() === '$firefox$' ? browser.storage.local : chrome.storage.local;
 
-export async function createWsApp() {
+export async function createWsApp(query = '') {
   const { cid = gen_short_id() } = await storage.get('cid')
   await storage.set({ cid })
   const ws_base_url = import.meta.env.VITE_APP_WS_URL;
@@ -429,7 +429,7 @@ export async function createWsApp() {
   console.info("token:", agent);
   const token = btoa(agent);
   const version = get_navigator_version();
-  const wsUrl = `${ws_base_url}?token=${token}&nv=${version}&cid=${cid}`;
+  const wsUrl = `${ws_base_url}?token=${token}&nv=${version}&cid=${cid}${query}`;
   const wsApp = new WsApp(
     wsUrl,
     10,
@@ -2,6 +2,7 @@ import { log } from './3rd/log'
 import { createWsApp } from './3rd/rpa_websocket'
 import { bgHandler, contentMessageHandler } from './background/backgroundInject'
 import { V2_EXTENSION_ID, V3_EXTENSION_ID } from './background/constant'
+import { cachedScriptHashes, isScriptRef, resolveScript, scriptCacheMiss } from './background/scriptCache'
 
 function getAllTabs() {
   return new Promise<chrome.tabs.Tab[]>((resolve) => {
@@ -74,20 +75,37 @@ globalThis.addEventListener('error', () => {
   log.info('Background error event triggered')
 })
 
+// 连接参数带上已缓存的脚本哈希，bridge 据此只发送哈希
+async function scriptsQuery() {
+  const hashes = await cachedScriptHashes()
+  return `&scripts=${hashes.join(',')}`
+}
+
 ; (async function () {
-  const wsApp = await createWsApp()
+  const wsApp = await createWsApp(await scriptsQuery())
   wsApp.start()
   wsApp.event('browser', '', (msg) => {
     const newMsg = msg.to_reply()
-    wsHandler(msg).then((result) => {
+    wsHandler(msg, async () => {
+      // 重连时使用最新的缓存列表
+      wsApp.url = wsApp.url.replace(/&scripts=[^&]*/, await scriptsQuery())
+    }).then((result) => {
       newMsg.data = result
       wsApp.send(newMsg)
     })
   })
 })()
 
-async function wsHandler(message) {
+async function wsHandler(message, onScriptCached: () => void) {
   const msgObject = typeof message === 'string' ? JSON.parse(message) : message
+  if (isScriptRef(msgObject.data)) {
+    const [code, added] = await resolveScript(msgObject.data)
+    if (code === null)
+      return scriptCacheMiss()
+    if (added)
+      onScriptCached()
+    msgObject.data = code
+  }
   log.info(msgObject.key, msgObject)
   log.time(msgObject.key)
   const result = await bgHandler(msgObject)
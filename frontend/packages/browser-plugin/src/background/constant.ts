@@ -12,6 +12,7 @@ export enum StatusCode {
   ELEMENT_NOT_FOUND = '5002',
   EXECUTE_ERROR = '5003',
   VERSION_ERROR = '5004',
+  SCRIPT_CACHE_MISS = '5010',
 }
 
 export enum ErrorMessage {
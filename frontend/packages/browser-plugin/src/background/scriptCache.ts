@@ -0,0 +1,58 @@
+import { StatusCode } from './constant'
+import { Utils } from './utils'
+
+// bridge 下发的脚本按内容哈希缓存，之后只收到 { $script: hash }
+const SCRIPT_FIELD = '$script'
+const STORAGE_KEY = 'scriptCache'
+// 与 bridge scripts.py 的 MAX_CACHED_SCRIPTS 一致，bridge 按同样的顺序淘汰记录
+const MAX_SCRIPTS = 32
+
+let scripts: Map<string, string> | null = null
+
+function loadScripts(): Promise<Map<string, string>> {
+  if (scripts)
+    return Promise.resolve(scripts)
+  return new Promise((resolve) => {
+    chrome.storage.local.get(STORAGE_KEY, (items) => {
+      scripts = scripts || new Map(Object.entries(items?.[STORAGE_KEY] || {}))
+      resolve(scripts)
+    })
+  })
+}
+
+function saveScripts(cache: Map<string, string>) {
+  while (cache.size > MAX_SCRIPTS) {
+    cache.delete(cache.keys().next().value)
+  }
+  chrome.storage.local.set({ [STORAGE_KEY]: Object.fromEntries(cache) })
+}
+
+export async function cachedScriptHashes() {
+  const cache = await loadScripts()
+  return [...cache.keys()]
+}
+
+export function isScriptRef(data) {
+  return !!data && typeof data === 'object' && SCRIPT_FIELD in data
+}
+
+/**
+ * 把 { $script, code? } 还原为脚本内容，本地没有缓存时返回 null
+ * @returns [脚本内容, 缓存内容或顺序是否有变化]
+ */
+export async function resolveScript(data): Promise<[string | null, boolean]> {
+  const cache = await loadScripts()
+  const hash = data[SCRIPT_FIELD]
+  if (typeof data.code === 'string') {
+    // 收到脚本内容时移到最新，保存顺序即淘汰顺序
+    cache.delete(hash)
+    cache.set(hash, data.code)
+    saveScripts(cache)
+    return [data.code, true]
+  }
+  return [cache.get(hash) ?? null, false]
+}
+
+export function scriptCacheMiss() {
+  return Utils.fail('script cache miss', StatusCode.SCRIPT_CACHE_MISS)
+}
@@ -22,11 +22,18 @@ export default function useQueueOperation() {
     }
   })
 
+  // 各页最后一个任务的 seq，顺序翻页时带上 lastSeq 从其后继续查询
+  const pageCursors = new Map<string, number>()
+  const cursorKey = (params, pageNo: number) => `${params.name ?? ''}|${params.taskType ?? ''}|${params.pageSize}|${pageNo}`
+
   // 获取队列数据
   async function getTableData(params) {
-    const { data } = await getTaskQueueList(params)
+    const lastSeq = params.pageNo > 1 ? pageCursors.get(cursorKey(params, params.pageNo - 1)) : undefined
+    const { data } = await getTaskQueueList(lastSeq === undefined ? params : { ...params, lastSeq })
     const records = data?.current_tasks || []
     const total = data?.pagination.total || 0
+    if (records.length > 0)
+      pageCursors.set(cursorKey(params, params.pageNo), records[records.length - 1].seq)
     return {
       records,
       total,